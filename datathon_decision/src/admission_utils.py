@@ -0,0 +1,181 @@
+"""
+Controle de admissão do /api/predict: limite de predições em execução e na fila por worker, prazo por requisição e
+limites de tamanho dos textos do payload.
+
+Sem isso, uma rajada de payloads com CVs grandes enfileira no worker até as requisições levarem minutos (e o health
+check falhar). Aqui cada requisição recebe um Deadline (ADMISSION_DEADLINE_MS ou o header X-Request-Deadline-Ms,
+descontado o tempo na fila do proxy quando ele envia X-Request-Start). O AdmissionController admite até
+ADMISSION_MAX_IN_FLIGHT predições ao mesmo tempo e deixa até ADMISSION_MAX_QUEUE esperando; com a fila cheia recusa
+na hora (429), e quando a espera estimada mais o tempo típico da predição (média móvel por tier) não cabem no prazo
+recusa sem esperar (503). O prazo é conferido de novo entre as etapas da predição (Deadline.check). As recusas levam
+Retry-After e os contadores ficam em /api/admission.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from datathon_decision.src.config import (
+    ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_DEADLINE_MS, ADMISSION_RETRY_AFTER_S, PAYLOAD_TEXT_LIMITS,
+)
+
+# Peso da última predição na média móvel do tempo de serviço
+SERVICE_TIME_ALPHA = 0.2
+COUNTERS = ("admitted", "completed", "shed_queue_full", "shed_deadline", "deadline_exceeded", "rejected_payload")
+
+
+class Rejected(Exception):
+    """Requisição recusada sem ser processada: status HTTP e Retry-After (s, None para não enviar)."""
+
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Rejected):
+    """Prazo da requisição estourado entre etapas da predição."""
+
+    def __init__(self, stage):
+        super().__init__(f"Prazo da requisição esgotado antes de '{stage}'.", 503, ADMISSION_RETRY_AFTER_S)
+        self.stage = stage
+
+
+class Deadline:
+    """Instante limite de uma requisição (relógio monotônico)."""
+
+    def __init__(self, budget_ms, elapsed_ms=0.0):
+        self.budget_ms = budget_ms
+        self.expires_at = time.perf_counter() + (budget_ms - elapsed_ms) / 1000
+
+    def remaining_ms(self):
+        return (self.expires_at - time.perf_counter()) * 1000
+
+    def check(self, stage):
+        """Levanta DeadlineExceeded se o prazo acabou (chamado antes de cada etapa)."""
+        if self.remaining_ms() <= 0:
+            raise DeadlineExceeded(stage)
+
+
+def _request_start_age_ms(header):
+    """Idade (ms) de X-Request-Start ('t=<epoch>' em s, ms ou µs, como nginx/HAProxy enviam); None se inválido."""
+    try:
+        started = float(header.strip().removeprefix("t="))
+    except (AttributeError, ValueError):
+        return None
+    if not math.isfinite(started):
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max((time.time() - started) * 1000, 0.0)
+
+
+def request_deadline(headers, default_ms=ADMISSION_DEADLINE_MS):
+    """
+    Deadline da requisição a partir dos headers (X-Request-Deadline-Ms e X-Request-Start) ou do padrão. O header só
+    encurta o prazo: valores acima de default_ms são limitados a ele; não numéricos, não finitos (inf/nan) e <= 0
+    são ignorados.
+    """
+    try:
+        budget_ms = float(headers.get("X-Request-Deadline-Ms", default_ms))
+    except ValueError:
+        budget_ms = default_ms
+    if not math.isfinite(budget_ms) or budget_ms <= 0:
+        budget_ms = default_ms
+    budget_ms = min(budget_ms, default_ms)
+    age_ms = _request_start_age_ms(headers.get("X-Request-Start")) or 0.0
+    return Deadline(budget_ms, elapsed_ms=age_ms)
+
+
+def check_payload_limits(payload, limits=PAYLOAD_TEXT_LIMITS):
+    """Recusa (413) payloads com textos acima dos limites em caracteres."""
+    for field, limit in limits.items():
+        value = payload.get(field) if isinstance(payload, dict) else None
+        if isinstance(value, str) and len(value) > limit:
+            raise Rejected(f"Campo '{field}' com {len(value)} caracteres (limite: {limit}).", 413)
+
+
+class AdmissionController:
+    """Fila limitada de predições deste worker, com estimativa do tempo de serviço por tier."""
+
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Cada worker (processo) tem sua própria fila e contadores; o lock do pai pode ter sido copiado travado
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.service_ms = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def count(self, counter):
+        with self._condition:
+            self.counters[counter] += 1
+
+    def _expected_wait_ms(self, tier):
+        # Predições na frente (em execução e na fila) divididas pelas vagas, cada uma com o tempo típico do tier
+        ahead = self.in_flight + self.queued - self.max_in_flight + 1
+        return max(ahead, 0) / self.max_in_flight * self.service_ms.get(tier, 0.0)
+
+    def _shed(self, counter, message, status, wait_ms):
+        self.counters[counter] += 1
+        raise Rejected(message, status, max(ADMISSION_RETRY_AFTER_S, math.ceil(wait_ms / 1000)))
+
+    @contextmanager
+    def admit(self, deadline, tier):
+        """Reserva uma vaga para a predição (esperando na fila se preciso) ou levanta Rejected (429/503)."""
+        with self._condition:
+            if deadline.remaining_ms() <= 0:
+                self._shed("shed_deadline", "Prazo da requisição esgotado antes de chegar ao worker.", 503, 0)
+            expected_wait_ms = self._expected_wait_ms(tier)
+            if self.in_flight >= self.max_in_flight and self.queued >= self.max_queue:
+                self._shed("shed_queue_full", "Fila de predições cheia; tente novamente.", 429, expected_wait_ms)
+            if expected_wait_ms + self.service_ms.get(tier, 0.0) > deadline.remaining_ms():
+                self._shed("shed_deadline", "O prazo da requisição não pode ser cumprido com a fila atual.", 503,
+                           expected_wait_ms)
+            self.queued += 1
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    if not self._condition.wait(timeout=max(deadline.remaining_ms(), 0) / 1000) or deadline.remaining_ms() <= 0:
+                        self._shed("shed_deadline", "Prazo da requisição esgotado na fila.", 503,
+                                   self._expected_wait_ms(tier))
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except DeadlineExceeded:
+            self.count("deadline_exceeded")
+            raise
+        else:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._condition:
+                previous = self.service_ms.get(tier)
+                self.service_ms[tier] = elapsed_ms if previous is None else (
+                    SERVICE_TIME_ALPHA * elapsed_ms + (1 - SERVICE_TIME_ALPHA) * previous)
+                self.counters["completed"] += 1
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def snapshot(self):
+        """Limites, ocupação atual, tempo de serviço estimado e contadores deste worker (para /api/admission)."""
+        with self._condition:
+            return {
+                "max_in_flight": self.max_in_flight, "max_queue": self.max_queue,
+                "default_deadline_ms": ADMISSION_DEADLINE_MS, "payload_text_limits": dict(PAYLOAD_TEXT_LIMITS),
+                "in_flight": self.in_flight, "queued": self.queued,
+                "service_ms": {tier: round(ms, 3) for tier, ms in self.service_ms.items()},
+                "counters": dict(self.counters),
+            }
@@ -0,0 +1,234 @@
+"""
+Profiling sob demanda do /api/predict em produção: cProfile de uma predição escolhida por amostragem
+(API_PROFILE_SAMPLE_RATE) ou pedida pela requisição (header "X-Profile: 1" com X-Profile-Token igual a
+API_PROFILE_TOKEN).
+
+Cada perfil vira um <id>.prof (pstats, abre com snakeviz/pstats) e um <id>.json com o tier, a duração, o status e o
+formato do payload (tamanho de cada texto, nunca o conteúdo), em um buffer circular de API_PROFILE_MAX_FILES perfis
+em API_PROFILE_DIR, compartilhado pelos workers; /api/profiles lista e baixa (só com o token configurado). Desligado
+(taxa 0 e sem token), nenhum profiler é ligado e o custo por requisição fica em poucos µs. Ligado, a predição medida
+roda sozinha no worker (ver RequestProfiler); requisições escolhidas enquanto outro perfil está em andamento, ou que
+não conseguem rodar sozinhas a tempo, seguem sem perfil.
+
+Sem pandas/scikit-learn: importado pelo app antes do warm-up.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from datathon_decision.src.admission_utils import DeadlineExceeded
+from datathon_decision.src.config import (
+    API_PROFILE_SAMPLE_RATE, API_PROFILE_TOKEN, API_PROFILE_DIR, API_PROFILE_MAX_FILES, API_PROFILE_MAX_WAIT_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_PATTERN = re.compile(r"^[\w.-]+$")
+# Funções mostradas no resumo em texto (GET /api/profiles/<id>?format=text)
+TEXT_SUMMARY_FUNCTIONS = 40
+
+
+def payload_shape(payload):
+    """Formato do payload sem o conteúdo: tamanho dos textos, tipo dos demais campos (seções aninhadas, um nível)."""
+    def describe(value):
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, dict):
+            return {key: describe(item) if not isinstance(item, dict) else type(item).__name__
+                    for key, item in value.items()}
+        return type(value).__name__
+    return describe(payload) if isinstance(payload, dict) else type(payload).__name__
+
+
+class ProfileStore:
+    """Buffer circular de perfis em disco: mantém os `max_files` mais recentes."""
+
+    def __init__(self, directory=API_PROFILE_DIR, max_files=API_PROFILE_MAX_FILES):
+        self.directory = str(directory)
+        self.max_files = max_files
+        self._sequence = 0
+
+    def _new_id(self):
+        # pid no id: vários workers gravam no mesmo diretório
+        self._sequence += 1
+        return f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{self._sequence}"
+
+    def save(self, profile, meta):
+        """Grava o .prof e o .json do perfil, descarta os mais antigos e retorna o id."""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = self._new_id()
+        profile.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        meta = {"id": profile_id, **meta}
+        # O .json por último (via rename): um perfil só aparece na lista quando está completo
+        meta_path = os.path.join(self.directory, f"{profile_id}.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        self.prune()
+        return profile_id
+
+    def _ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        # Ids começam pelo timestamp: ordem alfabética = ordem de gravação
+        return sorted((name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")),
+                      reverse=True)
+
+    def prune(self):
+        for profile_id in self._ids()[self.max_files:]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{profile_id}{suffix}"))
+                except FileNotFoundError:  # outro worker já removeu
+                    pass
+
+    def list(self):
+        """Metadados dos perfis guardados, do mais recente para o mais antigo."""
+        entries = []
+        for profile_id in self._ids():
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json"), "r", encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+        return entries
+
+    def path(self, profile_id):
+        """Caminho do .prof de um perfil guardado, ou None (id inválido ou já descartado)."""
+        if not PROFILE_ID_PATTERN.match(profile_id or ""):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def text_summary(self, profile_id, sort="cumulative", limit=TEXT_SUMMARY_FUNCTIONS):
+        """Tabela do pstats (funções mais caras por `sort`) de um perfil guardado, ou None."""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class RequestProfiler:
+    """
+    Decide quais requisições são medidas e grava o cProfile delas no ProfileStore.
+
+    Desde o Python 3.12 o cProfile (sys.monitoring) registra todos os threads do processo, não só o que o ligou:
+    com o gunicorn gthread, as predições de outras requisições entrariam no perfil. Por isso a predição medida roda
+    sozinha no worker: espera as predições em andamento terminarem (por até max_wait_ms ou o prazo dela; sem a
+    exclusividade a tempo, roda sem perfil) e segura as novas até acabar. As seguradas esperam no máximo até o fim do
+    prazo de cada uma, quando recebem DeadlineExceeded (503). O thread de background do registry (shadows e sketches
+    de drift) continua rodando e pode aparecer no perfil, sob ModelRegistry._background_loop.
+    """
+
+    def __init__(self, sample_rate=API_PROFILE_SAMPLE_RATE, token=API_PROFILE_TOKEN, store=None,
+                 max_wait_ms=API_PROFILE_MAX_WAIT_MS):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.store = store or ProfileStore()
+        self.max_wait_ms = max_wait_ms
+        self.enabled = sample_rate > 0 or token is not None
+        # Gerador próprio: a amostragem não depende de quem mais usa (ou semeia) o módulo random
+        self._random = random.Random()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # O lock do pai pode ter sido copiado travado; cada worker com sua própria sequência de amostragem
+        self._condition = threading.Condition()
+        self._running = 0  # predições sem perfil em andamento
+        self._profiling = False
+        self._random.seed()
+
+    def authorized(self, headers):
+        """Header X-Profile-Token confere com o token configurado (sem token configurado, ninguém é autorizado)."""
+        if self.token is None:
+            return False
+        return hmac.compare_digest(headers.get("X-Profile-Token", ""), self.token)
+
+    def trigger(self, headers):
+        """Motivo para medir esta requisição ("header" ou "sample"), ou None."""
+        if not self.enabled:
+            return None
+        if headers.get("X-Profile", "").lower() in ("1", "true", "yes") and self.authorized(headers):
+            return "header"
+        if self.sample_rate > 0 and self._random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    @contextmanager
+    def profile(self, trigger, payload=None, deadline=None, **meta):
+        """
+        Executa o bloco (a predição) e o mede com cProfile quando `trigger` não é None, nenhum outro perfil está em
+        andamento e as predições em andamento terminam a tempo; `meta` e o formato de `payload` vão para o .json do
+        perfil. O dict retornado recebe o id do perfil gravado ("profile_id", None se não foi medido) ao fim do bloco.
+        Sem perfil, espera o perfil em andamento até o fim de `deadline` (Deadline) e então levanta DeadlineExceeded.
+        """
+        result = {"profile_id": None}
+        if not self.enabled:
+            yield result
+            return
+        remaining_s = None if deadline is None else max(deadline.remaining_ms(), 0.0) / 1000
+        with self._condition:
+            exclusive = trigger is not None and not self._profiling
+            if exclusive:
+                self._profiling = True
+                wait_s = self.max_wait_ms / 1000 if remaining_s is None else min(self.max_wait_ms / 1000, remaining_s)
+                if not self._condition.wait_for(lambda: not self._running, timeout=wait_s):
+                    # Segurar as novas por mais tempo atrasaria todas: esta segue sem perfil, junto com as demais
+                    logger.info(f"Perfil não medido ({trigger}): {self._running} predição(ões) em andamento "
+                                f"após {wait_s * 1000:.0f} ms.")
+                    exclusive = self._profiling = False
+                    self._condition.notify_all()
+            if not exclusive:
+                if not self._condition.wait_for(lambda: not self._profiling, timeout=remaining_s):
+                    raise DeadlineExceeded("predição (perfil em andamento no worker)")
+                self._running += 1
+        try:
+            if not exclusive:
+                yield result
+                return
+            with self._profiled(trigger, payload, meta, result):
+                yield result
+        finally:
+            with self._condition:
+                if exclusive:
+                    self._profiling = False
+                else:
+                    self._running -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def _profiled(self, trigger, payload, meta, result):
+        profile = cProfile.Profile()
+        status = "ok"
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            profile.disable()
+            wall_ms = (time.perf_counter() - start) * 1000
+            try:
+                result["profile_id"] = self.store.save(profile, {
+                    "timestamp": datetime.now().isoformat(), "trigger": trigger, "wall_ms": wall_ms,
+                    "status": status, "pid": os.getpid(), **meta, "payload_shape": payload_shape(payload),
+                })
+                logger.info(f"Perfil da predição gravado: {result['profile_id']} ({trigger}, {wall_ms:.1f} ms)")
+            except OSError as e:
+                logger.warning(f"Falha ao gravar o perfil da predição: {e}")
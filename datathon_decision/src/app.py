@@ -1,8 +1,15 @@
+import time
+_APP_IMPORT_STARTED_AT = time.perf_counter()
+
+import gc
 import os
 import logging
-from flask import Flask, request
+from flask import Flask, request, send_file
 from flask_restx import Api, Resource, fields
-from datathon_decision.src.model_utils import predict_pipeline
+from datathon_decision.src.config import PRELOAD_MODEL_ARTIFACTS, SERVING_TIER, PAYLOAD_MAX_BYTES
+from datathon_decision.src.admission_utils import AdmissionController, Rejected, check_payload_limits, request_deadline
+from datathon_decision.src.api_profiling import RequestProfiler
+from datathon_decision.src.startup_utils import ModelWarmup
 
 # Configuração de logging
 os.makedirs("../../logs", exist_ok=True)
@@ -14,8 +21,29 @@ logging.basicConfig(
         logging.FileHandler("../../logs/api.log")
     ]
 )
+logging.info(f"Imports do app concluídos em {time.perf_counter() - _APP_IMPORT_STARTED_AT:.3f}s (pandas/scikit-learn/model_utils ficam para o warm-up).")
+
+# model_utils (pandas, scikit-learn, preprocess_utils) só é importado no warm-up ou na primeira predição.
+# Com `gunicorn --preload` (DATATHON_PRELOAD_ARTIFACTS=1) o warm-up roda aqui mesmo, no master e antes
+# do fork: os workers herdam as mesmas páginas (modelo packed mapeado via mmap) já prontos.
+# Sem preload o warm-up roda em background e /api/ready só responde 200 quando termina.
+warmup = ModelWarmup(started_at=_APP_IMPORT_STARTED_AT)
+if PRELOAD_MODEL_ARTIFACTS:
+    warmup.run()
+    if warmup.ready:
+        # Congela os objetos já alocados para o GC não tocá-los (evita copy-on-write nos workers)
+        gc.freeze()
+else:
+    warmup.start()
+
+# Limites de predições em execução/na fila e prazo por requisição (por worker; ver /api/admission)
+admission = AdmissionController()
+# cProfile de predições amostradas ou pedidas com X-Profile (desligado por padrão; ver /api/profiles)
+profiler = RequestProfiler()
 
 app = Flask(__name__)
+# Corpos maiores são recusados (413) antes de o JSON ser lido
+app.config["MAX_CONTENT_LENGTH"] = PAYLOAD_MAX_BYTES
 api = Api(
     app,
     version="1.0",
@@ -123,7 +151,21 @@ predict_input = api.model('PredictInput', {
 })
 
 success_response = api.model('SuccessResponse', {
-    'match_probability': fields.Float(description='Probabilidade de match (0 a 1)')
+    'match_probability': fields.Float(description='Probabilidade de match (0 a 1)'),
+    'tier': fields.String(description='Tier que respondeu: "full" (modelo publicado) ou "fast" (modelo destilado)')
+})
+
+explanation_model = api.model('Explanation', {
+    'base_value': fields.Float(description='Probabilidade média da floresta (antes de olhar as features)'),
+    'contributions': fields.Raw(description='Contribuição de cada feature original para a probabilidade (maiores em módulo)'),
+    'explain_ms': fields.Float(description='Tempo gasto na explicação (ms)'),
+    'explanation_skipped': fields.String(description='Motivo de a explicação ter sido pulada (custo estimado acima '
+                                                     'do orçamento ou do prazo); base_value e contributions vêm vazios')
+})
+
+explained_response = api.model('ExplainedResponse', {
+    'match_probability': fields.Float(description='Probabilidade de match (0 a 1)'),
+    'explanation': fields.Nested(explanation_model)
 })
 
 error_response = api.model('ErrorResponse', {
@@ -132,25 +174,158 @@ error_response = api.model('ErrorResponse', {
 
 @ns.route('/health')
 class Health(Resource):
-    @api.doc(description="Verifica se a API está ativa.")
+    @api.doc(description="Verifica se a API está ativa (liveness; não indica que o modelo já foi carregado).")
     def get(self):
         logging.info("Health check called.")
         return {"status": "healthy"}
 
+@ns.route('/ready')
+class Ready(Resource):
+    @api.response(200, 'Modelo carregado e aquecido')
+    @api.response(503, 'Modelo ainda carregando (ou falha no warm-up)')
+    @api.doc(description="Readiness: só responde 200 depois que o modelo foi carregado e aquecido com uma predição sintética.")
+    def get(self):
+        state = warmup.snapshot()
+        return state, 200 if state["status"] == "ready" else 503
+
+@ns.route('/models')
+class Models(Resource):
+    @api.response(200, 'Modelos servidos')
+    @api.response(503, 'Modelos ainda carregando')
+    @api.doc(description="Modelos carregados, pesos de tráfego (A/B), modelos shadow e contadores da fila de shadows deste worker.")
+    def get(self):
+        if not warmup.ready:
+            return {"error": "Modelos ainda carregando"}, 503
+        from datathon_decision.src.model_registry import get_model_registry
+        return get_model_registry().snapshot()
+
+@ns.route('/drift')
+class Drift(Resource):
+    @api.response(200, 'Estatísticas de drift')
+    @api.response(404, 'Modelo sem sketches de referência')
+    @api.response(503, 'Modelo ainda carregando')
+    @api.doc(description="PSI por feature entre as predições recebidas por este worker (desde o início ou ?reset=true) "
+                         "e a distribuição do treino salva com o modelo.",
+             params={'reset': 'true para zerar os sketches de produção após o relatório'})
+    def get(self):
+        if not warmup.ready:
+            return {"error": "Modelos ainda carregando"}, 503
+        from datathon_decision.src.model_registry import get_model_registry
+        monitor = get_model_registry().drift_monitor
+        if monitor is None:
+            return {"error": "Referência de drift não encontrada; rode o pré-processamento novamente."}, 404
+        report = monitor.report()
+        if request.args.get('reset', '').lower() in ("1", "true", "yes"):
+            monitor.reset()
+        return report
+
+@ns.route('/admission')
+class Admission(Resource):
+    @api.doc(description="Controle de admissão deste worker: limites, predições em execução e na fila, tempo de serviço "
+                         "estimado por tier e contadores de admitidas/recusadas (fila cheia, prazo, payload).")
+    def get(self):
+        return admission.snapshot()
+
+def _profiles_forbidden():
+    # Sem token configurado, sem o header ou com token errado a resposta é a mesma 404: a rota não revela se existe
+    # um token configurado (os perfis amostrados ficam só no disco do servidor)
+    if profiler.token is None or not profiler.authorized(request.headers):
+        return {"error": "Não encontrado."}, 404
+    return None
+
+@ns.route('/profiles')
+class Profiles(Resource):
+    @api.response(200, 'Perfis guardados')
+    @api.response(404, 'DATATHON_API_PROFILE_TOKEN não configurado ou X-Profile-Token ausente ou inválido',
+                  error_response)
+    @api.doc(description="Perfis (cProfile) de predições medidas sob demanda, do mais recente para o mais antigo: tier, "
+                         "duração, status, motivo (amostragem ou header X-Profile) e formato do payload (tamanho dos "
+                         "textos). Exige DATATHON_API_PROFILE_TOKEN configurado e o header X-Profile-Token.",
+             params={'X-Profile-Token': {'in': 'header', 'description': 'Token de profiling'}})
+    def get(self):
+        forbidden = _profiles_forbidden()
+        if forbidden:
+            return forbidden
+        return {"enabled": profiler.enabled, "sample_rate": profiler.sample_rate,
+                "max_profiles": profiler.store.max_files, "profiles": profiler.store.list()}
+
+@ns.route('/profiles/<string:profile_id>')
+class Profile(Resource):
+    @api.response(200, 'Arquivo .prof (pstats) ou resumo em texto')
+    @api.response(404, 'Perfil não encontrado (ou já descartado do buffer), token não configurado ou X-Profile-Token '
+                       'ausente ou inválido', error_response)
+    @api.doc(description="Baixa o .prof de um perfil (abra com snakeviz ou pstats); com ?format=text, as funções mais "
+                         "caras ordenadas por ?sort= (cumulative, tottime, ncalls).",
+             params={'format': 'prof (padrão) ou text', 'sort': 'ordenação do resumo em texto (padrão cumulative)',
+                     'X-Profile-Token': {'in': 'header', 'description': 'Token de profiling'}})
+    def get(self, profile_id):
+        forbidden = _profiles_forbidden()
+        if forbidden:
+            return forbidden
+        path = profiler.store.path(profile_id)
+        if path is None:
+            return {"error": f"Perfil '{profile_id}' não encontrado."}, 404
+        if request.args.get('format') == 'text':
+            sort = request.args.get('sort', 'cumulative')
+            if sort not in ("cumulative", "tottime", "ncalls"):
+                return {"error": f"Ordenação inválida: '{sort}'."}, 400
+            return app.response_class(profiler.store.text_summary(profile_id, sort=sort), mimetype="text/plain")
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+
 @ns.route('/predict')
 class Predict(Resource):
     @api.expect(predict_input)
     @api.response(200, 'Sucesso', success_response)
     @api.response(400, 'Erro de validação ou processamento', error_response)
-    @api.doc(description="Endpoint de predição real. Envie um JSON bruto de candidato/vaga.")
+    @api.response(413, 'Payload ou texto (cv_pt, comentario_prospect) acima do limite', error_response)
+    @api.response(429, 'Fila de predições cheia (com Retry-After)', error_response)
+    @api.response(503, 'Prazo da requisição não pode ser cumprido (com Retry-After)', error_response)
+    @api.doc(description="Endpoint de predição real. Envie um JSON bruto de candidato/vaga. "
+                         "Com ?explain=true (ou \"explain\": true no corpo) a resposta inclui a contribuição de cada feature "
+                         "(sempre do modelo completo). ?tier=fast (ou \"tier\" no corpo) responde com o modelo destilado: "
+                         "mais rápido, um pouco menos preciso; ?tier=full usa o modelo publicado. "
+                         "O header X-Request-Deadline-Ms define o prazo da requisição (padrão DATATHON_DEADLINE_MS). "
+                         "X-Profile: 1 (com X-Profile-Token) grava o cProfile da predição, com o id em X-Profile-Id.",
+             params={'explain': 'true para incluir a explicação da predição',
+                     'tier': 'full (padrão) ou fast (modelo destilado)',
+                     'X-Request-Deadline-Ms': {'in': 'header', 'description': 'Prazo da requisição em ms'},
+                     'X-Profile': {'in': 'header', 'description': '1 para gravar o perfil desta predição'}},
+             responses={200: ('Sucesso (com explain=true)', explained_response)})
     def post(self):
         data = api.payload
         logging.info(f"/predict chamado. Dados recebidos: {data}")
         try:
             payload = data.get('payload', data)  # Permite tanto {payload: ...} quanto o dicionário direto
-            prob = predict_pipeline(payload)
-            logging.info(f"Probabilidade de match retornada: {prob}")
-            return {"match_probability": prob}
+            explain = str(request.args.get('explain', data.get('explain', False))).lower() in ("1", "true", "yes")
+            tier = request.args.get('tier') or data.get('tier') or SERVING_TIER
+            check_payload_limits(payload)
+            deadline = request_deadline(request.headers)
+            # Sem perfis durante o warm-up: o thread dele entraria no cProfile
+            trigger = profiler.trigger(request.headers) if warmup.ready else None
+            # Recusa na hora (429/503) se a fila está cheia ou se o prazo não cabe na espera estimada
+            with admission.admit(deadline, "explain" if explain else tier):
+                # O perfil cobre só a predição (não a espera na fila); a espera por um perfil em andamento respeita o prazo
+                with profiler.profile(trigger, payload, deadline=deadline, tier=tier, explain=explain) as profiled:
+                    if explain:
+                        from datathon_decision.src.model_utils import explain_pipeline
+                        result = explain_pipeline(payload, deadline=deadline)
+                        prob = result.pop("match_probability")
+                        logging.info(f"Probabilidade de match retornada (com explicação): {prob}")
+                        response = {"match_probability": prob, "explanation": result}
+                    else:
+                        from datathon_decision.src.model_utils import predict_pipeline
+                        prob = predict_pipeline(payload, tier=tier, deadline=deadline)
+                        logging.info(f"Probabilidade de match retornada (tier {tier}): {prob}")
+                        response = {"match_probability": prob, "tier": tier}
+            if profiled["profile_id"]:
+                return response, 200, {"X-Profile-Id": profiled["profile_id"]}
+            return response
+        except Rejected as e:
+            if e.status == 413:
+                admission.count("rejected_payload")
+            logging.warning(f"Predição recusada ({e.status}): {e}")
+            return {"error": str(e)}, e.status, {"Retry-After": str(e.retry_after)} if e.retry_after else {}
         except Exception as e:
             logging.error(f"Erro na predição: {e}", exc_info=True)
             return {"error": str(e)}, 400
@@ -0,0 +1,233 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Formato "packed": as árvores da floresta são achatadas em poucos arrays NumPy contíguos,
+# salvos sem compressão (.npy). Assim podem ser carregados com mmap_mode='r' e as páginas
+# ficam no page cache do sistema, compartilhadas entre todos os workers do gunicorn.
+PACKED_FOREST_ARRAYS = ("children_left", "children_right", "feature", "threshold", "value", "roots")
+PACKED_FOREST_META = "meta.json"
+# Variante comprimida: um único .npz (menor em disco, mas carregado inteiro, sem mmap)
+PACKED_FOREST_COMPRESSED = "arrays.npz"
+# Precisões suportadas para thresholds/valores dos nós
+PACKED_FOREST_PRECISIONS = ("float64", "float32", "float16")
+# Erro máximo de |Δp| (em relação ao sklearn) de cada precisão enquanto as decisões dos nós não mudam: metade do eps,
+# pois os valores das folhas estão em [0, 1]. O float32 mantém todas as decisões (ver with_precision); no float16 os
+# thresholds arredondados mudam decisões de features contínuas e o erro não tem esse limite (não é equivalente).
+PACKED_FOREST_VALUE_ERROR = {precision: float(np.finfo(precision).eps) / 2 for precision in PACKED_FOREST_PRECISIONS}
+# Lotes grandes são percorridos em blocos para limitar a memória intermediária (linhas x árvores)
+PACKED_FOREST_BATCH_ROWS = 4096
+
+
+class PackedForest:
+    """Representação achatada (somente inferência) de um RandomForestClassifier treinado."""
+
+    def __init__(self, children_left, children_right, feature, threshold, value, roots, meta):
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.roots = roots
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features_in"]
+        self.max_depth = meta["max_depth"]
+
+    @classmethod
+    def from_estimator(cls, model):
+        """Converte um RandomForestClassifier (sklearn) para o formato packed."""
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int32) + offset
+            is_leaf = tree.children_left == -1
+            # Folhas apontam para si mesmas: na travessia vetorizada, um passo que não muda
+            # o nó indica que aquele par (amostra, árvore) já terminou.
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+            # Mesma normalização de DecisionTreeClassifier.predict_proba (contagens ou frações)
+            node_values = tree.value[:, 0, :].astype(np.float64)
+            normalizer = node_values.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(node_values / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, int(tree.max_depth))
+
+        meta = {
+            "format": "packed_forest",
+            "version": 1,
+            "classes": [c.item() if hasattr(c, "item") else c for c in model.classes_],
+            "n_features_in": int(model.n_features_in_),
+            "n_estimators": len(model.estimators_),
+            "n_nodes": int(offset),
+            "max_depth": max_depth,
+            "feature_names_in": [str(c) for c in getattr(model, "feature_names_in_", [])],
+        }
+        return cls(
+            np.concatenate(lefts), np.concatenate(rights), np.concatenate(features),
+            np.concatenate(thresholds), np.concatenate(values), np.asarray(roots, dtype=np.int32), meta,
+        )
+
+    def with_precision(self, precision):
+        """
+        Cópia com thresholds/valores em precisão reduzida.
+        Os thresholds são arredondados para baixo: como o X é comparado em float32, em 'float32'
+        as decisões continuam idênticas e |Δp| ≤ PACKED_FOREST_VALUE_ERROR['float32']; em 'float16' podem mudar
+        para valores próximos do corte e a probabilidade muda em centésimos (pode trocar o rótulo perto de 0.5).
+        """
+        if precision not in PACKED_FOREST_PRECISIONS:
+            raise ValueError(f"Precisão inválida: '{precision}'. Use uma de {PACKED_FOREST_PRECISIONS}.")
+        dtype = np.dtype(precision)
+        threshold = np.asarray(self.threshold, dtype=np.float64)
+        rounded = threshold.astype(dtype)
+        above = rounded.astype(np.float64) > threshold
+        rounded[above] = np.nextafter(rounded[above], dtype.type(-np.inf))
+        feature_dtype = np.int16 if self.n_features_in_ < np.iinfo(np.int16).max else np.int32
+        meta = dict(self.meta, precision=precision)
+        return PackedForest(
+            self.children_left, self.children_right, np.asarray(self.feature).astype(feature_dtype),
+            rounded, np.asarray(self.value).astype(dtype), self.roots, meta,
+        )
+
+    def save(self, out_dir, compress=False):
+        """Salva os arrays sem compressão (pré-requisito para mmap) e o meta.json; compress=True gera um .npz."""
+        os.makedirs(out_dir, exist_ok=True)
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in PACKED_FOREST_ARRAYS}
+        if compress:
+            np.savez_compressed(os.path.join(out_dir, PACKED_FOREST_COMPRESSED), **arrays)
+        else:
+            for name, array in arrays.items():
+                np.save(os.path.join(out_dir, f"{name}.npy"), array)
+        with open(os.path.join(out_dir, PACKED_FOREST_META), "w", encoding="utf-8") as f:
+            json.dump(dict(self.meta, compressed=bool(compress)), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, in_dir, mmap_mode="r"):
+        """Carrega a floresta; com mmap_mode='r' os arrays são mapeados (e compartilhados) em vez de copiados."""
+        with open(os.path.join(in_dir, PACKED_FOREST_META), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("compressed"):
+            with np.load(os.path.join(in_dir, PACKED_FOREST_COMPRESSED)) as archive:
+                arrays = {name: archive[name] for name in PACKED_FOREST_ARRAYS}
+        else:
+            arrays = {name: np.load(os.path.join(in_dir, f"{name}.npy"), mmap_mode=mmap_mode) for name in PACKED_FOREST_ARRAYS}
+        return cls(meta=meta, **arrays)
+
+    def apply(self, X):
+        """Retorna o índice (global) da folha alcançada em cada árvore: shape (n_amostras, n_arvores)."""
+        X = _as_float32_matrix(X)
+        n_samples, n_features = X.shape
+        n_trees = self.roots.shape[0]
+        X_flat = np.ascontiguousarray(X).ravel()
+        nodes = np.tile(np.asarray(self.roots, dtype=np.int64), n_samples)
+        row_offsets = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, n_trees)
+        # Só os pares (amostra, árvore) que ainda não chegaram a uma folha seguem para o próximo nível
+        active = np.arange(nodes.shape[0])
+        while active.size:
+            current = nodes[active]
+            go_left = X_flat[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.children_left[current], self.children_right[current])
+            nodes[active] = following
+            active = active[following != current]
+        return nodes.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X):
+        """Equivalente a RandomForestClassifier.predict_proba (média das probabilidades das árvores)."""
+        X = _as_float32_matrix(X)
+        if X.shape[0] <= PACKED_FOREST_BATCH_ROWS:
+            return self.value[self.apply(X)].mean(axis=1, dtype=np.float64)
+        return np.concatenate([
+            self.value[self.apply(X[start:start + PACKED_FOREST_BATCH_ROWS])].mean(axis=1, dtype=np.float64)
+            for start in range(0, X.shape[0], PACKED_FOREST_BATCH_ROWS)
+        ])
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def _contribution_tables(self, class_index):
+        """
+        Tabelas por nó (calculadas uma vez): variação da probabilidade da classe em relação ao nó pai
+        e a feature do split do pai. A soma das variações ao longo do caminho é a contribuição de cada feature.
+        """
+        tables = self.__dict__.setdefault("_contribution_cache", {})
+        if class_index not in tables:
+            value = np.asarray(self.value[:, class_index], dtype=np.float64)
+            left = np.asarray(self.children_left, dtype=np.int64)
+            right = np.asarray(self.children_right, dtype=np.int64)
+            node_ids = np.arange(left.shape[0])
+            parent = node_ids.copy()
+            internal = left != node_ids
+            parent[left[internal]] = node_ids[internal]
+            parent[right[internal]] = node_ids[internal]
+            tables[class_index] = (value - value[parent], np.asarray(self.feature, dtype=np.int64)[parent])
+        return tables[class_index]
+
+    def explain(self, X, class_index=1):
+        """
+        Contribuição de cada feature para a probabilidade da classe (decomposição por caminho de decisão):
+        retorna (bias, contribuições (n_amostras, n_features)) com bias + soma das contribuições = predict_proba.
+        """
+        X = _as_float32_matrix(X)
+        if X.shape[0] > PACKED_FOREST_BATCH_ROWS:
+            parts = [self.explain(X[start:start + PACKED_FOREST_BATCH_ROWS], class_index)
+                     for start in range(0, X.shape[0], PACKED_FOREST_BATCH_ROWS)]
+            return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+        delta, split_feature = self._contribution_tables(class_index)
+        n_samples, n_features = X.shape
+        n_trees = self.roots.shape[0]
+        X_flat = np.ascontiguousarray(X).ravel()
+        nodes = np.tile(np.asarray(self.roots, dtype=np.int64), n_samples)
+        sample_of = np.repeat(np.arange(n_samples, dtype=np.int64), n_trees)
+        contributions = np.zeros(n_samples * n_features, dtype=np.float64)
+        # Mesma travessia de apply(); a cada passo, soma a variação do nó alcançado na feature do split
+        active = np.arange(nodes.shape[0])
+        while active.size:
+            current = nodes[active]
+            go_left = X_flat[sample_of[active] * n_features + self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.children_left[current], self.children_right[current])
+            moved = following != current
+            active, following = active[moved], following[moved]
+            nodes[active] = following
+            contributions += np.bincount(sample_of[active] * n_features + split_feature[following],
+                                         weights=delta[following], minlength=contributions.shape[0])
+        bias = float(np.asarray(self.value[self.roots, class_index], dtype=np.float64).mean())
+        return np.full(n_samples, bias), contributions.reshape(n_samples, n_features) / n_trees
+
+
+def _as_float32_matrix(X):
+    # O sklearn compara X em float32 com thresholds em float64; replicamos a mesma regra.
+    if hasattr(X, "to_numpy"):
+        X = X.to_numpy(dtype=np.float32)
+    return np.asarray(X, dtype=np.float32)
+
+
+def save_packed_forest(model, out_dir, precision="float64", compress=False):
+    """Exporta o modelo no formato packed (escreve em diretório temporário e depois renomeia)."""
+    packed = model if isinstance(model, PackedForest) else PackedForest.from_estimator(model)
+    if precision != "float64":
+        packed = packed.with_precision(precision)
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    packed.save(tmp_dir, compress=compress)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return packed
+
+
+def load_packed_forest(in_dir, mmap_mode="r"):
+    return PackedForest.load(in_dir, mmap_mode=mmap_mode)
+
+
+def artifact_size_bytes(path):
+    """Tamanho em disco de um arquivo ou diretório de artefato."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+    return os.path.getsize(path)
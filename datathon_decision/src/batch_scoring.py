@@ -0,0 +1,296 @@
+"""
+Scoring offline em lote: todos os pares (vaga, prospect) de prospects.json e, opcionalmente, pares
+hipotéticos (CSV/JSONL com vaga_id e codigo_candidato).
+
+Os pares são processados em chunks de tamanho fixo (merge -> engineer_features -> encoder -> predict_proba)
+por um pool de processos; os resultados são gravados na ordem dos chunks, de forma incremental, em CSV
+ou JSONL. Um arquivo <saída>.progress.json registra o último chunk gravado: se a execução for interrompida,
+rodar de novo o mesmo comando continua dali.
+
+Uso: python -m datathon_decision.src.batch_scoring data/raw/ scores.csv [--pairs hipoteticos.csv]
+     [--no-prospects] [--chunk-rows 2000] [--workers 4] [--explain] [--restart]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from datathon_decision.src.config import (
+    RAW_DATA_DIR, REPORTS_DIR, MODEL_PATH, PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH, PACKED_MODEL_DIR,
+    TARGET_VARIABLE, BATCH_SCORING_CHUNK_ROWS, BATCH_SCORING_WORKERS,
+)
+from datathon_decision.src.preprocess_utils import (
+    load_data, add_candidate_history, merge_pairs, engineer_features, preprocess_data_split_save,
+)
+
+OUTPUT_FORMATS = ("csv", "jsonl")
+# Colunas de identificação copiadas dos pares para a saída
+ID_COLUMNS = ["vaga_id", "codigo_candidato_prospect", "origem"]
+# Campos do prospect usados em engineer_features: pares só hipotéticos (sem prospects.json) não os têm
+PROSPECT_FIELDS = ["comentario_prospect"]
+# Chunks em processamento ao mesmo tempo, por worker (limita a memória dos resultados fora de ordem)
+IN_FLIGHT_PER_WORKER = 2
+
+# Estado de cada processo do pool (herdado via fork ou recebido uma vez no initializer)
+_WORKER_STATE = {}
+
+
+def read_hypothetical_pairs(path):
+    """Pares hipotéticos de um CSV ou JSONL com as colunas vaga_id e codigo_candidato (ou codigo_profissional)."""
+    if str(path).endswith((".jsonl", ".json")):
+        df = pd.read_json(path, lines=True, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str)
+    df = df.rename(columns={"codigo_candidato": "codigo_candidato_prospect", "codigo_profissional": "codigo_candidato_prospect"})
+    missing = {"vaga_id", "codigo_candidato_prospect"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Arquivo de pares '{path}' sem as colunas {sorted(missing)}.")
+    return df[["vaga_id", "codigo_candidato_prospect"]].assign(origem="hipotetico")
+
+
+def load_scoring_inputs(raw_dir, pairs_path=None, include_prospects=True):
+    """
+    Carrega vagas e candidatos (com o histórico de desistência calculado sobre todos os prospects)
+    e monta a lista de pares a pontuar. Retorna (df_jobs, df_applicants, df_pairs).
+    """
+    df_jobs, df_prospects, df_applicants = load_data(raw_dir)
+    df_applicants = add_candidate_history(df_applicants, df_prospects)
+    pairs = []
+    if include_prospects:
+        pairs.append(df_prospects.assign(origem="prospect"))
+    if pairs_path:
+        pairs.append(read_hypothetical_pairs(pairs_path))
+    if not pairs:
+        raise ValueError("Nenhum par para pontuar: use --pairs ou não passe --no-prospects.")
+    df_pairs = pd.concat(pairs, ignore_index=True)
+    df_pairs["vaga_id"] = df_pairs["vaga_id"].astype(str)
+    df_pairs["codigo_candidato_prospect"] = df_pairs["codigo_candidato_prospect"].astype(str)
+    return df_jobs, df_applicants, df_pairs
+
+
+def scoring_fingerprint(df_pairs, chunk_rows, output_format, explain):
+    """Identifica a execução (pares, chunk, formato e artefatos do modelo): só se retoma com o mesmo fingerprint."""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df_pairs[ID_COLUMNS], index=False).to_numpy().tobytes())
+    digest.update(json.dumps([chunk_rows, output_format, bool(explain)]).encode())
+    for path in (MODEL_PATH, PACKED_MODEL_DIR / "meta.json", PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _init_worker(df_jobs, df_applicants, df_pairs, explain):
+    from datathon_decision.src.model_utils import load_artifacts
+    _WORKER_STATE.update(df_jobs=df_jobs, df_applicants=df_applicants, df_pairs=df_pairs,
+                         explain=explain, artifacts=load_artifacts())
+
+
+def score_chunk(start, stop):
+    """Pontua os pares [start, stop) e retorna o DataFrame de saída do chunk."""
+    state = _WORKER_STATE
+    return score_pairs(state["df_pairs"].iloc[start:stop], state["df_jobs"], state["df_applicants"],
+                       state["artifacts"], explain=state["explain"])
+
+
+def score_pairs(df_chunk, df_jobs, df_applicants, artifacts, explain=False):
+    """Pares -> merge -> engineer_features -> encoder -> predict_proba; retorna as colunas de saída."""
+    from datathon_decision.src.explain_utils import explain_batch, positive_class_index
+    model = artifacts["model"]
+    df_merged = merge_pairs(df_chunk, df_jobs, df_applicants)
+    missing = [column for column in PROSPECT_FIELDS if column not in df_merged.columns]
+    if missing:
+        df_merged = df_merged.assign(**{column: np.nan for column in missing})
+    X_features, _ = engineer_features(df_merged, similarity_engine=artifacts["similarity_engine"])
+    X_processed, _, _ = preprocess_data_split_save(
+        X_features, None, None, fit_ohe=False, ohe_encoder=artifacts["ohe"], training_cols_list=artifacts["training_cols"]
+    )
+    result = df_chunk[ID_COLUMNS].reset_index(drop=True)
+    if TARGET_VARIABLE in df_chunk.columns:
+        result[TARGET_VARIABLE] = df_chunk[TARGET_VARIABLE].to_numpy()
+    result["match_probability"] = model.predict_proba(X_processed)[:, positive_class_index(model)]
+    if explain:
+        explanations, _ = explain_batch(model, X_processed)
+        result["contributions"] = [e["contributions"] for e in explanations]
+    return result
+
+
+def format_chunk(df, output_format, header):
+    """Serializa o chunk (bytes) no formato de saída; no CSV as contribuições viram uma string JSON."""
+    if output_format == "jsonl":
+        text = df.to_json(orient="records", lines=True, force_ascii=False)
+        return (text if text.endswith("\n") else text + "\n").encode("utf-8")
+    if "contributions" in df.columns:
+        df = df.assign(contributions=[json.dumps(c, ensure_ascii=False) for c in df["contributions"]])
+    return df.to_csv(index=False, header=header).encode("utf-8")
+
+
+def iter_scored_chunks(bounds, workers, init_args):
+    """Gera (índice, DataFrame) na ordem dos chunks, processando até workers * IN_FLIGHT_PER_WORKER ao mesmo tempo."""
+    if workers == 1:
+        _init_worker(*init_args)
+        for index, (start, stop) in bounds:
+            yield index, score_chunk(start, stop)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as executor:
+        pending, ready = {}, {}
+        queue = iter(bounds)
+        next_index = bounds[0][0] if bounds else 0
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                index, (start, stop) = item
+                pending[executor.submit(score_chunk, start, stop)] = index
+
+        try:
+            for _ in range(workers * IN_FLIGHT_PER_WORKER):
+                submit_next()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ready[pending.pop(future)] = future.result()
+                    submit_next()
+                while next_index in ready:
+                    yield next_index, ready.pop(next_index)
+                    next_index += 1
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def load_progress(progress_path, fingerprint):
+    """Progresso salvo de uma execução anterior com o mesmo fingerprint (ou None)."""
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path, "r", encoding="utf-8") as f:
+        progress = json.load(f)
+    return progress if progress.get("fingerprint") == fingerprint else None
+
+
+def save_progress(progress_path, progress):
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, progress_path)
+
+
+def run_batch_scoring(raw_dir, output_path, pairs_path=None, include_prospects=True, chunk_rows=BATCH_SCORING_CHUNK_ROWS,
+                      workers=BATCH_SCORING_WORKERS, output_format=None, explain=False, restart=False):
+    """Pontua todos os pares e grava a saída de forma incremental e retomável; retorna o resumo da execução."""
+    from datathon_decision.src.model_utils import load_artifacts
+
+    output_format = output_format or ("jsonl" if str(output_path).endswith((".jsonl", ".json")) else "csv")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de saída inválido: '{output_format}'. Use um de {OUTPUT_FORMATS}.")
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    start_load = time.perf_counter()
+    df_jobs, df_applicants, df_pairs = load_scoring_inputs(raw_dir, pairs_path, include_prospects)
+    # Carregado antes do fork: os workers herdam o modelo (packed via mmap) sem recarregar
+    artifacts = load_artifacts()
+    if explain:
+        # Falha aqui (encoder de hashing, por exemplo), não no primeiro chunk de cada worker
+        from datathon_decision.src.explain_utils import contribution_owners
+        contribution_owners(artifacts["training_cols"])
+    load_s = time.perf_counter() - start_load
+
+    n_chunks = -(-len(df_pairs) // chunk_rows)
+    fingerprint = scoring_fingerprint(df_pairs, chunk_rows, output_format, explain)
+    progress_path = f"{output_path}.progress.json"
+    progress = None if restart or not os.path.exists(output_path) else load_progress(progress_path, fingerprint)
+    if progress is None:
+        progress = {"fingerprint": fingerprint, "output": str(output_path), "format": output_format,
+                    "chunk_rows": chunk_rows, "total_chunks": n_chunks, "total_rows": int(len(df_pairs)),
+                    "chunks_done": 0, "rows_done": 0, "bytes": 0}
+    elif progress.get("completed"):
+        print(f"✅ {output_path} já está completo para estes pares e este modelo (use --restart para refazer).")
+    else:
+        print(f"⚠️  Retomando após o chunk {progress['chunks_done']}/{n_chunks} ({progress['rows_done']} linhas já gravadas).")
+    resumed_from = progress["chunks_done"]
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    mode = "r+b" if resumed_from else "wb"
+    bounds = [(i, (i * chunk_rows, min((i + 1) * chunk_rows, len(df_pairs)))) for i in range(resumed_from, n_chunks)]
+    rows_scored = 0
+    start = time.perf_counter()
+    with open(output_path, mode) as f:
+        # Descarta o que foi escrito depois do último chunk confirmado no progresso
+        f.seek(progress["bytes"])
+        f.truncate()
+        for index, df_chunk in iter_scored_chunks(bounds, workers, (df_jobs, df_applicants, df_pairs, explain)):
+            f.write(format_chunk(df_chunk, output_format, header=index == 0))
+            f.flush()
+            os.fsync(f.fileno())
+            rows_scored += len(df_chunk)
+            progress.update(chunks_done=index + 1, rows_done=progress["rows_done"] + len(df_chunk), bytes=f.tell())
+            save_progress(progress_path, progress)
+            elapsed = time.perf_counter() - start
+            print(f"📊 Chunk {index + 1}/{n_chunks} | {progress['rows_done']}/{len(df_pairs)} linhas | "
+                  f"{rows_scored / elapsed:,.0f} linhas/s")
+    elapsed = time.perf_counter() - start
+    progress["completed"] = True
+    save_progress(progress_path, progress)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "output": str(output_path),
+        "format": output_format,
+        "total_rows": int(len(df_pairs)),
+        "rows_scored": rows_scored,
+        "resumed_from_chunk": resumed_from,
+        "chunk_rows": chunk_rows,
+        "workers": workers,
+        "explain": bool(explain),
+        "load_s": load_s,
+        "scoring_s": elapsed,
+        "rows_per_s": rows_scored / elapsed if elapsed > 0 else float(np.nan),
+    }
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Scoring offline em lote dos pares (vaga, candidato).")
+    parser.add_argument("raw_dir", nargs="?", default=str(RAW_DATA_DIR), help="Diretório com os JSON brutos")
+    parser.add_argument("output", help="Arquivo de saída (.csv ou .jsonl)")
+    parser.add_argument("--pairs", default=None, help="CSV/JSONL com pares hipotéticos (vaga_id, codigo_candidato)")
+    parser.add_argument("--no-prospects", action="store_true", help="Não pontua os pares de prospects.json")
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_SCORING_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=BATCH_SCORING_WORKERS, help="Processos (padrão: um por núcleo)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=None, help="Padrão: pela extensão da saída")
+    parser.add_argument("--explain", action="store_true", help="Inclui as contribuições por feature de cada par")
+    parser.add_argument("--restart", action="store_true", help="Ignora o progresso salvo e recomeça do zero")
+    parser.add_argument("--report", default=str(REPORTS_DIR / "batch_scoring.json"))
+    args = parser.parse_args()
+
+    try:
+        summary = run_batch_scoring(
+            args.raw_dir, args.output, pairs_path=args.pairs, include_prospects=not args.no_prospects,
+            chunk_rows=args.chunk_rows, workers=args.workers, output_format=args.format,
+            explain=args.explain, restart=args.restart,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("⚠️  Interrompido: rode o mesmo comando para continuar do último chunk gravado.")
+        return 130
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"✅ {summary['rows_scored']} pares pontuados em {summary['scoring_s']:.1f}s "
+          f"({summary['rows_per_s']:,.0f} linhas/s, {summary['workers']} worker(s)) -> {summary['output']}")
+    print(f"✅ Resumo salvo em {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
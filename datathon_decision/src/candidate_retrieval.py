@@ -0,0 +1,159 @@
+"""
+Recuperação de candidatos para uma vaga em todo o applicants.json, antes do modelo.
+
+Pontuar com o modelo todos os candidatos (merge -> engineer_features -> encoder -> predict_proba) para
+cada vaga é lento demais para uso interativo. O SkillIndex é um índice invertido token -> candidatos
+(matriz esparsa CSC: cada coluna é a posting list de um token) com os tokens normalizados de
+conhecimentos técnicos, CV, objetivo, certificações, área de atuação ('area:<área>') e KEY_TECH_SKILLS
+('skill:<termo>', mesma regra de substring do keyword_count de feature_spec). Para uma vaga, a pontuação de cada
+candidato é a soma do IDF dos tokens que ele tem em comum com a vaga (percorrendo só as posting lists
+dos tokens da vaga); os RETRIEVAL_CANDIDATES melhores são pontuados pelo modelo (batch_scoring.score_pairs).
+
+Recall em relação ao scoring completo e latência: scripts/benchmark_candidate_retrieval.py
+
+Uso: python -m datathon_decision.src.candidate_retrieval data/raw/ <vaga_id> [--top 20] [--candidates 500]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from datathon_decision.src.config import (
+    RAW_DATA_DIR, KEY_TECH_SKILLS, RETRIEVAL_CANDIDATES, RETRIEVAL_MIN_TOKEN_LENGTH,
+)
+from datathon_decision.src.preprocess_utils import nested_column, normalize_text
+
+# Campos (seção, campo) de cada lado; as áreas viram tokens próprios, não palavras soltas
+APPLICANT_TEXT_FIELDS = [
+    ("informacoes_profissionais", "conhecimentos_tecnicos"),
+    ("informacoes_profissionais", "objetivo_profissional"),
+    ("informacoes_profissionais", "certificacoes"),
+    ("cv_pt", None),
+]
+APPLICANT_AREA_FIELD = ("informacoes_profissionais", "area_atuacao")
+JOB_TEXT_FIELDS = [
+    ("perfil_vaga", "competencia_tecnicas_e_comportamentais"),
+    ("perfil_vaga", "principais_atividades"),
+    ("informacoes_basicas", "titulo_vaga"),
+]
+JOB_AREA_FIELD = ("perfil_vaga", "areas_atuacao")
+_SKILLS = [(f"skill:{normalize_text(skill)}", normalize_text(skill)) for skill in KEY_TECH_SKILLS]
+
+
+def _column(df, section, key):
+    column = section if key is None else nested_column(section, key)
+    return df[column] if column in df.columns else pd.Series("", index=df.index)
+
+
+def document_tokens(texts, areas, min_token_length=RETRIEVAL_MIN_TOKEN_LENGTH):
+    """Conjunto de tokens de um documento: palavras dos textos, 'area:<área>' e 'skill:<termo>'."""
+    text = normalize_text(" ".join(t for t in texts if isinstance(t, str)))
+    tokens = {token for token in text.split() if len(token) >= min_token_length and token != "desconhecido"}
+    if isinstance(areas, str):
+        tokens.update(f"area:{normalize_text(area)}" for area in areas.split(",") if area.strip())
+    tokens.update(token for token, skill in _SKILLS if skill in text)
+    return tokens
+
+
+def frame_tokens(df, text_fields, area_field, min_token_length=RETRIEVAL_MIN_TOKEN_LENGTH):
+    """Tokens de cada linha (colunas projetadas '<seção>.<campo>' do load_data)."""
+    texts = list(zip(*[_column(df, section, key).to_numpy() for section, key in text_fields]))
+    areas = _column(df, *area_field).to_numpy()
+    return [document_tokens(row_texts, row_areas, min_token_length) for row_texts, row_areas in zip(texts, areas)]
+
+
+class SkillIndex:
+    """Índice invertido token -> candidatos, com IDF por token."""
+
+    def __init__(self, min_token_length=RETRIEVAL_MIN_TOKEN_LENGTH):
+        self.min_token_length = min_token_length
+
+    def fit(self, df_applicants):
+        token_sets = frame_tokens(df_applicants, APPLICANT_TEXT_FIELDS, APPLICANT_AREA_FIELD, self.min_token_length)
+        lengths = np.fromiter(map(len, token_sets), dtype=np.int64, count=len(token_sets))
+        doc_ids = np.repeat(np.arange(len(token_sets), dtype=np.int64), lengths)
+        codes, vocabulary = pd.factorize(np.fromiter((t for s in token_sets for t in s), dtype=object, count=int(lengths.sum())))
+        # Posting lists: coluna j = candidatos com o token j (os conjuntos já não têm duplicatas)
+        self.postings_ = sp.csc_matrix((np.ones(len(codes), dtype=np.float32), (doc_ids, codes)),
+                                       shape=(len(token_sets), len(vocabulary)))
+        self.vocabulary_ = pd.Index(vocabulary, dtype=object)
+        document_frequency = np.diff(self.postings_.indptr)
+        self.idf_ = (np.log((1.0 + len(token_sets)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+        self.applicant_ids_ = df_applicants["codigo_profissional"].astype(str).to_numpy()
+        return self
+
+    def query(self, tokens, k=RETRIEVAL_CANDIDATES):
+        """Os k candidatos com maior soma de IDF dos tokens em comum; retorna (códigos, pontuações)."""
+        token_ids = self.vocabulary_.get_indexer(list(tokens))
+        token_ids = token_ids[token_ids >= 0]
+        if len(token_ids) == 0:
+            return self.applicant_ids_[:0], np.zeros(0, dtype=np.float32)
+        scores = self.postings_[:, token_ids] @ self.idf_[token_ids]
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return self.applicant_ids_[order], scores[order]
+
+    def job_tokens(self, df_job):
+        """Tokens da vaga (DataFrame de uma linha de df_jobs)."""
+        return frame_tokens(df_job, JOB_TEXT_FIELDS, JOB_AREA_FIELD, self.min_token_length)[0]
+
+    @property
+    def n_postings(self):
+        return int(self.postings_.nnz)
+
+
+def rank_candidates(vaga_id, df_jobs, df_applicants, index, artifacts, top=20, candidates=RETRIEVAL_CANDIDATES):
+    """
+    Recupera os candidatos da vaga no índice e pontua só esses com o modelo. Retorna o ranking
+    (codigo_candidato_prospect, retrieval_score, match_probability) e os tempos de cada fase em ms.
+    """
+    from datathon_decision.src.batch_scoring import score_pairs
+    start = time.perf_counter()
+    df_job = df_jobs[df_jobs["vaga_id"] == str(vaga_id)]
+    if df_job.empty:
+        raise KeyError(f"Vaga '{vaga_id}' não encontrada.")
+    applicant_ids, retrieval_scores = index.query(index.job_tokens(df_job), k=candidates)
+    retrieval_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    df_pairs = pd.DataFrame({"vaga_id": str(vaga_id), "codigo_candidato_prospect": applicant_ids, "origem": "recuperacao"})
+    ranking = score_pairs(df_pairs, df_jobs, df_applicants, artifacts) if len(df_pairs) else df_pairs.assign(match_probability=[])
+    ranking["retrieval_score"] = retrieval_scores
+    scoring_ms = (time.perf_counter() - start) * 1000
+    ranking = ranking.sort_values("match_probability", ascending=False, kind="stable").head(top).reset_index(drop=True)
+    return ranking, {"retrieval_ms": retrieval_ms, "scoring_ms": scoring_ms, "candidates": int(len(df_pairs))}
+
+
+def main():
+    """Função principal."""
+    from datathon_decision.src.batch_scoring import load_scoring_inputs
+    from datathon_decision.src.model_utils import load_artifacts
+
+    parser = argparse.ArgumentParser(description="Ranking de candidatos de todo o applicants.json para uma vaga.")
+    parser.add_argument("raw_dir", nargs="?", default=str(RAW_DATA_DIR))
+    parser.add_argument("vaga_id")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=RETRIEVAL_CANDIDATES, help="Candidatos recuperados para o modelo")
+    args = parser.parse_args()
+
+    df_jobs, df_applicants, _ = load_scoring_inputs(args.raw_dir)
+    start = time.perf_counter()
+    index = SkillIndex().fit(df_applicants)
+    print(f"📊 Índice: {len(index.applicant_ids_):,} candidatos, {len(index.vocabulary_):,} tokens, "
+          f"{index.n_postings:,} postings ({(time.perf_counter() - start):.2f}s)")
+    ranking, timings = rank_candidates(args.vaga_id, df_jobs, df_applicants, index, load_artifacts(),
+                                       top=args.top, candidates=args.candidates)
+    print(f"⏱️  {timings['candidates']} candidatos recuperados em {timings['retrieval_ms']:.1f} ms, "
+          f"pontuados em {timings['scoring_ms']:.1f} ms")
+    print(ranking[["codigo_candidato_prospect", "retrieval_score", "match_probability"]].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+Pré-processamento em chunks, com pico de memória limitado pelo tamanho do bloco e não pelo volume total.
+
+O pré-processamento normal (run_preprocessing_pipeline) materializa de uma vez o DataFrame mesclado, as features,
+a matriz codificada e o split. Aqui prospects.json é lido item a item (uma vaga e seus prospects por vez, sem
+carregar o arquivo) em blocos de chunk_rows linhas, em duas leituras:
+
+1. histórico e vocabulário: contagens de desistências/prospecções por candidato somadas bloco a bloco (as mesmas
+   de add_candidate_history no total) e frequências de documento dos tokens do motor de similaridade
+   (DocumentFrequencyCounter: o mesmo ajuste de fit_similarity_engine no DataFrame mesclado inteiro);
+2. features: merge + engineer_features de cada bloco, gravado em ENGINEERED_FEATURES_DIR (part-NNNNN.joblib), e a
+   contagem das categorias de cada CATEGORICAL_FEATURES;
+3. codificação: encoder ajustado a partir das categorias contadas (as mesmas categorias do fit no total), cada bloco
+   codificado, dividido em treino/validação por hash do par (vaga_id, codigo_candidato_prospect) e gravado como
+   bloco do split; no fim os blocos são juntados no formato normal de dataset_utils (cópia bloco a bloco via mmap).
+
+O que não é limitado pelo bloco (cresce com vagas e candidatos, não com o número de prospects):
+- vagas.json e applicants.json são carregados inteiros (load_jobs_and_applicants; projetados para os campos do config);
+- as contagens do histórico, uma linha por candidato com prospecção;
+- o vocabulário: frequência por token, os ids de vaga/candidato já vistos e um digest de 8 bytes por texto distinto
+  (os textos em si não ficam na memória);
+- a maior vaga de prospects.json (com todos os seus prospects) é lida de uma vez;
+- as contagens de categorias (uma por valor distinto) e a amostra da referência de drift (até DRIFT_REFERENCE_MAX_ROWS).
+
+Uso: python -m datathon_decision.src.chunked_preprocessing [raw_dir] [--chunk-rows 5000] [--keep-shards]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from datathon_decision.src.config import (
+    RAW_DATA_DIR, PROCESSED_DATA_DIR, PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH, SIMILARITY_ENGINE_PATH,
+    DRIFT_REFERENCE_PATH, ENGINEERED_FEATURES_DIR, PREPROCESS_CHUNK_ROWS, DRIFT_REFERENCE_MAX_ROWS,
+    CATEGORICAL_FEATURES, TEST_SIZE, RANDOM_STATE, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME, TEXT_SIMILARITY_MODE,
+)
+from datathon_decision.src.dataset_utils import save_processed_shard, consolidate_processed_split, split_dir
+from datathon_decision.src.preprocess_utils import (
+    load_jobs_and_applicants, prospect_rows, candidate_history_counts, add_candidate_history, merge_pairs,
+    engineer_features, preprocess_data_split_save, field_values, normalize_text,
+)
+from datathon_decision.src.profiling_utils import profile_stage
+from datathon_decision.src.similarity_utils import DocumentFrequencyCounter
+
+# Bloco padrão quando PREPROCESS_CHUNK_ROWS não está definido (CLI)
+DEFAULT_CHUNK_ROWS = 5000
+# Colunas que identificam o par: base do split por hash
+SPLIT_KEY_COLUMNS = ["vaga_id", "codigo_candidato_prospect"]
+FEATURES_MANIFEST_NAME = "manifest.json"
+# Caracteres lidos por vez de prospects.json (o buffer cresce até caber o item corrente)
+JSON_READ_CHARS = 1 << 20
+_JSON_WHITESPACE = re.compile(r"\s*")
+
+# Campos do fit do motor de similaridade, na ordem de fit_similarity_engine: ((seção, campo) ou coluna de primeiro
+# nível, coluna do id de quem tem o texto no DataFrame mesclado: o texto é o mesmo para o mesmo id)
+SIMILARITY_FIT_FIELDS = [
+    (("informacoes_profissionais", "objetivo_profissional"), "codigo_candidato_prospect"),
+    (("informacoes_basicas", "titulo_vaga"), "vaga_id"),
+    ("cv_pt", "codigo_candidato_prospect"),
+    (("perfil_vaga", "competencia_tecnicas_e_comportamentais"), "vaga_id"),
+]
+
+
+def iter_json_object_items(path, read_chars=JSON_READ_CHARS):
+    """(chave, valor) de cada item de um arquivo JSON com um objeto no primeiro nível, sem carregar o arquivo inteiro."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, position, eof = "", 0, False
+
+        def refill():
+            nonlocal buffer, position, eof
+            # Lê pelo menos o tamanho do buffer: um item grande é decodificado O(log n) vezes, não a cada leitura
+            data = f.read(max(read_chars, len(buffer) - position))
+            eof = not data
+            buffer, position = buffer[position:] + data, 0
+
+        def next_char():
+            nonlocal position
+            while True:
+                position = _JSON_WHITESPACE.match(buffer, position).end()
+                if position < len(buffer):
+                    return buffer[position]
+                if eof:
+                    raise ValueError(f"JSON incompleto em '{path}'.")
+                refill()
+
+        def next_value():
+            nonlocal position
+            while True:
+                next_char()
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # No fim do buffer o valor pode estar cortado (ex.: número): só vale com mais texto depois
+                    if end < len(buffer) or eof:
+                        position = end
+                        return value
+                refill()
+
+        def expect(chars):
+            nonlocal position
+            char = next_char()
+            if char not in chars:
+                raise ValueError(f"JSON inválido em '{path}': esperado um de {chars!r}, encontrado {char!r}.")
+            position += 1
+            return char
+
+        expect("{")
+        if next_char() == "}":
+            return
+        while True:
+            key = next_value()
+            expect(":")
+            yield key, next_value()
+            if expect(",}") == "}":
+                return
+
+
+def iter_prospect_chunks(raw_data_dir, chunk_rows):
+    """Blocos (DataFrame, como em load_data) de chunk_rows prospects de prospects.json, lido item a item."""
+    rows = []
+    for job_id, details in iter_json_object_items(os.path.join(raw_data_dir, "prospects.json")):
+        rows.extend(prospect_rows(job_id, details))
+        while len(rows) >= chunk_rows:
+            yield pd.DataFrame(rows[:chunk_rows])
+            del rows[:chunk_rows]
+    if rows:
+        yield pd.DataFrame(rows)
+
+
+def split_hash(df_keys, random_state=RANDOM_STATE):
+    """Hash uint64 de cada par (vaga_id, codigo_candidato_prospect), estável entre execuções e tamanhos de bloco."""
+    return pd.util.hash_pandas_object(df_keys[SPLIT_KEY_COLUMNS].astype(str), index=False,
+                                      hash_key=f"{random_state:016d}"[-16:]).to_numpy()
+
+
+def is_validation(hashes, test_size=TEST_SIZE):
+    """Linhas da validação: os 32 bits baixos do hash abaixo de test_size."""
+    return (hashes & 0xFFFFFFFF) < int(test_size * 2 ** 32)
+
+
+def _fit_texts(df_merged, field):
+    """Valores de um campo do fit do motor de similaridade (mesma semântica de fit_similarity_engine, sem normalizar)."""
+    if isinstance(field, tuple):
+        return field_values(df_merged, *field, default='')
+    return df_merged[field].fillna('')
+
+
+def history_and_vocabulary(raw_data_dir, df_jobs, df_applicants, chunk_rows, mode=TEXT_SIMILARITY_MODE):
+    """
+    Primeira leitura de prospects.json: contagens do histórico de desistência por candidato e o motor de
+    similaridade ajustado pelas frequências de documento (mesmo resultado de fit_similarity_engine no merge inteiro).
+    Retorna (contagens do histórico, motor).
+    """
+    history_counts = None
+    counter = DocumentFrequencyCounter(len(SIMILARITY_FIT_FIELDS))
+    seen_ids = {id_column: set() for _, id_column in SIMILARITY_FIT_FIELDS}
+    for chunk in iter_prospect_chunks(raw_data_dir, chunk_rows):
+        counts = candidate_history_counts(chunk)
+        history_counts = counts if history_counts is None else history_counts.add(counts, fill_value=0)
+        df_merged = merge_pairs(chunk, df_jobs, df_applicants)
+        for id_column, seen in seen_ids.items():
+            # Só a primeira linha de cada vaga/candidato ainda não visto, na ordem do merge
+            ids = df_merged[id_column]
+            new = ~ids.duplicated().to_numpy() & np.array([value not in seen for value in ids], dtype=bool)
+            if not new.any():
+                continue
+            new_rows = df_merged[new]
+            seen.update(new_rows[id_column])
+            for field_index, (field, field_id_column) in enumerate(SIMILARITY_FIT_FIELDS):
+                if field_id_column == id_column:
+                    for value in _fit_texts(new_rows, field):
+                        counter.add(field_index, normalize_text(value))
+    return history_counts, counter.engine(mode)
+
+
+def engineer_features_chunked(raw_data_dir, features_dir=ENGINEERED_FEATURES_DIR, chunk_rows=DEFAULT_CHUNK_ROWS,
+                              similarity_engine_path=SIMILARITY_ENGINE_PATH):
+    """
+    Passadas de histórico/vocabulário e de features (duas leituras de prospects.json): grava o motor de
+    similaridade, um part-NNNNN.joblib por bloco ((X, y, chaves do par), índice = posição global da linha mesclada)
+    e o manifesto com as contagens das categorias. Retorna o manifesto.
+    """
+    df_jobs, df_applicants = load_jobs_and_applicants(raw_data_dir)
+    if df_jobs is None or df_applicants is None:
+        raise RuntimeError("Falha ao carregar um ou mais arquivos de dados brutos.")
+
+    with profile_stage('vocabulario'):
+        history_counts, similarity_engine = history_and_vocabulary(raw_data_dir, df_jobs, df_applicants, chunk_rows)
+    if history_counts is None:
+        raise RuntimeError(f"Nenhum prospect em '{os.path.join(raw_data_dir, 'prospects.json')}'.")
+    joblib.dump(similarity_engine, similarity_engine_path)
+    df_applicants = add_candidate_history(df_applicants, None, history_counts=history_counts)
+    del history_counts
+
+    shutil.rmtree(features_dir, ignore_errors=True)
+    os.makedirs(features_dir, exist_ok=True)
+    category_counts = {feature: {} for feature in CATEGORICAL_FEATURES}
+    shards, offset = [], 0
+    with profile_stage('features'):
+        for shard_id, chunk in enumerate(iter_prospect_chunks(raw_data_dir, chunk_rows)):
+            df_merged = merge_pairs(chunk, df_jobs, df_applicants)
+            X_chunk, y_chunk = engineer_features(df_merged, similarity_engine=similarity_engine)
+            index = pd.RangeIndex(offset, offset + len(X_chunk))
+            X_chunk.index = index
+            if y_chunk is not None:
+                y_chunk.index = index
+            keys = df_merged[SPLIT_KEY_COLUMNS].set_axis(index)
+            for feature, counts in category_counts.items():
+                for value, count in X_chunk[feature].value_counts(sort=False).items():
+                    counts[value] = counts.get(value, 0) + int(count)
+            path = os.path.join(features_dir, f"part-{shard_id:05d}.joblib")
+            joblib.dump((X_chunk, y_chunk, keys), path)
+            shards.append({"path": os.path.basename(path), "rows": int(len(X_chunk))})
+            offset += len(X_chunk)
+            del chunk, df_merged, X_chunk, y_chunk, keys
+
+    manifest = {"chunk_rows": chunk_rows, "n_rows": offset, "shards": shards, "category_counts": category_counts}
+    with open(os.path.join(features_dir, FEATURES_MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest
+
+
+def load_features_manifest(features_dir=ENGINEERED_FEATURES_DIR):
+    with open(os.path.join(features_dir, FEATURES_MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_feature_shards(features_dir=ENGINEERED_FEATURES_DIR):
+    """(X, y, chaves) de cada bloco gravado por engineer_features_chunked, em ordem."""
+    for shard in load_features_manifest(features_dir)["shards"]:
+        yield joblib.load(os.path.join(features_dir, shard["path"]))
+
+
+def vocabulary_frame(category_counts, encoder):
+    """
+    DataFrame pequeno cujo fit dá ao encoder as mesmas categorias do fit em todas as linhas: cada categoria
+    distinta uma vez. Com max_categories (OrdinalEncoder), as max_categories - 1 mais frequentes (mesmo desempate
+    do sklearn) aparecem mais vezes, para as demais continuarem agrupadas como infrequentes.
+    """
+    max_categories = getattr(encoder, "max_categories", None)
+    columns = {}
+    for feature in CATEGORICAL_FEATURES:
+        categories = sorted(category_counts.get(feature) or {"DESCONHECIDO": 1})
+        values, padding = list(categories), categories[0]
+        if max_categories is not None and len(categories) >= max_categories:
+            counts = np.array([category_counts[feature][category] for category in categories])
+            kept = [categories[i] for i in sorted(np.argsort(counts, kind="mergesort")[-(max_categories - 1):])]
+            values += kept
+            # O preenchimento das colunas mais curtas também precisa ser de uma categoria frequente
+            padding = kept[0] if kept else padding
+        columns[feature] = (values, padding)
+    n_rows = max(len(values) for values, _ in columns.values())
+    return pd.DataFrame({feature: values + [padding] * (n_rows - len(values)) for feature, (values, padding) in columns.items()})
+
+
+def fit_encoder_chunked(category_counts, preprocessor_path=PREPROCESSOR_PATH, training_columns_path=TRAINING_COLUMNS_PATH):
+    """Encoder das categóricas e colunas de treino a partir das contagens, salvos como em preprocess_data_split_save."""
+    from datathon_decision.src.model_backends import categorical_encoding_for, make_categorical_encoder
+    encoder = make_categorical_encoder(categorical_encoding_for())
+    _, _, training_cols = preprocess_data_split_save(
+        vocabulary_frame(category_counts, encoder), None, out_dir_path=None, fit_ohe=True, ohe_encoder=encoder,
+        preprocessor_path=preprocessor_path, training_columns_path=training_columns_path,
+    )
+    return encoder, training_cols
+
+
+def encode_split_chunked(features_dir=ENGINEERED_FEATURES_DIR, processed_dir=PROCESSED_DATA_DIR,
+                         drift_reference_path=DRIFT_REFERENCE_PATH, keep_shards=False,
+                         preprocessor_path=PREPROCESSOR_PATH, training_columns_path=TRAINING_COLUMNS_PATH):
+    """
+    Passada de codificação: encoder ajustado pelas contagens do manifesto, cada bloco de features codificado e
+    dividido por hash entre treino e validação (blocos part-NNNNN dos splits), depois juntados no formato normal.
+    A referência de drift sai de uma amostra por hash de até DRIFT_REFERENCE_MAX_ROWS linhas de treino.
+    Retorna (linhas de treino, linhas de validação, colunas de treino).
+    """
+    from datathon_decision.src.drift_utils import save_drift_reference
+    manifest = load_features_manifest(features_dir)
+    encoder, training_cols = fit_encoder_chunked(manifest["category_counts"], preprocessor_path, training_columns_path)
+    for split_name in (TRAIN_SPLIT_NAME, VAL_SPLIT_NAME):
+        shutil.rmtree(split_dir(processed_dir, split_name), ignore_errors=True)
+
+    # Fração das linhas de treino (estimada pela proporção de validação) que entra na referência de drift
+    drift_rate = min(1.0, DRIFT_REFERENCE_MAX_ROWS / max(manifest["n_rows"] * (1 - TEST_SIZE), 1))
+    drift_sample = []
+    with profile_stage('codificacao'):
+        for shard_id, (X_chunk, y_chunk, keys) in enumerate(iter_feature_shards(features_dir)):
+            X_encoded, _, _ = preprocess_data_split_save(X_chunk, None, out_dir_path=None, fit_ohe=False,
+                                                        ohe_encoder=encoder, training_cols_list=training_cols)
+            X_encoded.index = X_chunk.index
+            hashes = split_hash(keys)
+            validation = is_validation(hashes)
+            save_processed_shard(X_encoded[~validation], y_chunk[~validation], processed_dir, TRAIN_SPLIT_NAME, shard_id)
+            save_processed_shard(X_encoded[validation], y_chunk[validation], processed_dir, VAL_SPLIT_NAME, shard_id)
+            # Amostra com os 32 bits altos do hash (independentes dos usados no split)
+            sampled = ~validation & ((hashes >> np.uint64(32)) < np.uint64(int(drift_rate * 2 ** 32)))
+            drift_sample.append(X_chunk[sampled])
+            del X_chunk, y_chunk, keys, X_encoded
+
+    with profile_stage('consolidacao'):
+        n_train = consolidate_processed_split(processed_dir, TRAIN_SPLIT_NAME, keep_shards=keep_shards)
+        n_val = consolidate_processed_split(processed_dir, VAL_SPLIT_NAME, keep_shards=keep_shards)
+    save_drift_reference(pd.concat(drift_sample), drift_reference_path)
+    return n_train, n_val, training_cols
+
+
+def run_chunked_preprocessing(raw_data_dir, chunk_rows=DEFAULT_CHUNK_ROWS, keep_shards=False):
+    """Pré-processamento completo em chunks (features + codificação/split); retorna o resumo."""
+    manifest = engineer_features_chunked(raw_data_dir, chunk_rows=chunk_rows)
+    n_train, n_val, training_cols = encode_split_chunked(keep_shards=keep_shards)
+    return {"rows": manifest["n_rows"], "chunks": len(manifest["shards"]), "train_rows": n_train,
+            "val_rows": n_val, "n_columns": len(training_cols)}
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Pré-processamento em chunks, com memória limitada pelo bloco.")
+    parser.add_argument("raw_dir", nargs="?", default=str(RAW_DATA_DIR))
+    parser.add_argument("--chunk-rows", type=int, default=PREPROCESS_CHUNK_ROWS or DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--keep-shards", action="store_true", help="Mantém os blocos part-NNNNN dos splits após juntá-los")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = run_chunked_preprocessing(args.raw_dir, chunk_rows=args.chunk_rows, keep_shards=args.keep_shards)
+    print(f"✅ {summary['rows']:,} linhas em {summary['chunks']} blocos de até {args.chunk_rows:,} "
+          f"({time.perf_counter() - start:.1f}s)")
+    print(f"📊 Treino: {summary['train_rows']:,} linhas | validação: {summary['val_rows']:,} | "
+          f"{summary['n_columns']} colunas -> {PROCESSED_DATA_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import json
+import os
 import pathlib
 
 # Paths
@@ -7,6 +9,7 @@ RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 MODELS_DIR = BASE_DIR / "models"
 LOGS_DIR = BASE_DIR / "logs"
+REPORTS_DIR = BASE_DIR / "reports"
 
 # Create dirs if they don't exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -14,19 +17,225 @@ RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
+REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Data files
 APPLICANTS_FILE = RAW_DATA_DIR / "applicants.json"
 JOBS_FILE = RAW_DATA_DIR / "vagas.json"
 PROSPECTS_FILE = RAW_DATA_DIR / "prospects.json"
 
+# Campos dos JSON brutos usados pelas features (projeção feita no load_data): só estes são lidos, já como
+# colunas planas '<seção>.<campo>'; None = campo de primeiro nível, mantido com o próprio nome.
+# Um campo novo usado em engineer_features precisa ser declarado aqui.
+RAW_JOB_FIELDS = {
+    "informacoes_basicas": ["vaga_sap", "titulo_vaga"],
+    "perfil_vaga": ["nivel profissional", "nivel_academico", "nivel_ingles", "areas_atuacao",
+                    "competencia_tecnicas_e_comportamentais", "principais_atividades"],
+}
+RAW_APPLICANT_FIELDS = {
+    "informacoes_profissionais": ["nivel_profissional", "area_atuacao", "conhecimentos_tecnicos", "experiencias",
+                                  "certificacoes", "objetivo_profissional"],
+    "formacao_e_idiomas": ["nivel_academico", "nivel_ingles"],
+    "cv_pt": None,
+}
+
+# Processed datasets (arrays .npy + columns.json por split, ver dataset_utils.py)
+TRAIN_SPLIT_NAME = "train"
+VAL_SPLIT_NAME = "val"
+
+# Backend do modelo (ver model_backends.py): "random_forest" (OHE denso) ou
+# "hist_gradient_boosting" (categóricas nativas sobre códigos ordinais, sem expansão OHE)
+MODEL_BACKEND = os.environ.get("DATATHON_MODEL_BACKEND", "random_forest")
+# Codificação das categóricas no treino: vazio = a do backend; "hashing" = HASHING_ENCODER_BUCKETS colunas de largura
+# fixa, sem vocabulário ajustado nem alinhamento na predição (compare com scripts/benchmark_categorical_encoders.py)
+CATEGORICAL_ENCODING = os.environ.get("DATATHON_CATEGORICAL_ENCODING") or None
+HASHING_ENCODER_BUCKETS = 64
+
 # Model and preprocessor files
-MODEL_NAME = "random_forest_model.joblib"
+MODEL_NAME = f"{MODEL_BACKEND}_model.joblib"
 PREPROCESSOR_NAME = "preprocessor_objects.joblib"
 TRAINING_COLUMNS_NAME = "training_columns.joblib"
 MODEL_PATH = MODELS_DIR / MODEL_NAME
 PREPROCESSOR_PATH = MODELS_DIR / PREPROCESSOR_NAME
 TRAINING_COLUMNS_PATH = MODELS_DIR / TRAINING_COLUMNS_NAME
+SIMILARITY_ENGINE_NAME = "text_similarity.joblib"
+SIMILARITY_ENGINE_PATH = MODELS_DIR / SIMILARITY_ENGINE_NAME
+
+# Features engenheiradas (antes do OHE/split), saída intermediária do pipeline_runner
+ENGINEERED_FEATURES_PATH = PROCESSED_DATA_DIR / "engineered_features.joblib"
+# Pré-processamento em chunks (chunked_preprocessing.py): com PREPROCESS_CHUNK_ROWS > 0 os prospects passam por
+# merge, features e codificação em blocos desse tamanho e o pico de memória fica limitado pelo bloco (não pelo total;
+# vagas, candidatos e o vocabulário ficam inteiros, ver chunked_preprocessing.py).
+# As features de cada bloco ficam em ENGINEERED_FEATURES_DIR (no lugar de ENGINEERED_FEATURES_PATH); o split
+# treino/validação é por hash do par (vaga_id, codigo_candidato_prospect), determinístico e sem estratificação, e a
+# referência de drift usa uma amostra (também por hash) de até DRIFT_REFERENCE_MAX_ROWS linhas de treino.
+PREPROCESS_CHUNK_ROWS = int(os.environ.get("DATATHON_PREPROCESS_CHUNK_ROWS", "0"))
+ENGINEERED_FEATURES_DIR = PROCESSED_DATA_DIR / "engineered_features"
+DRIFT_REFERENCE_MAX_ROWS = 50000
+# Métricas de validação gravadas pela etapa 'evaluate' do pipeline_runner
+VALIDATION_METRICS_PATH = REPORTS_DIR / "validation_metrics.json"
+# Cache content-addressed das saídas de cada etapa do pipeline (ver pipeline_runner.py)
+PIPELINE_CACHE_DIR = DATA_DIR / "cache"
+
+# Formato "packed" do modelo: arrays .npy sem compressão, carregados com mmap e
+# compartilhados entre os workers do gunicorn (ver artifact_utils.py)
+PACKED_MODEL_NAME = "random_forest_packed"
+PACKED_MODEL_DIR = MODELS_DIR / PACKED_MODEL_NAME
+# Precisão dos thresholds/valores no formato packed ("float64", "float32" ou "float16") e compressão (.npz,
+# desativa o mmap). Compare as variantes com scripts/benchmark_model_artifacts.py antes de mudar.
+PACKED_MODEL_PRECISION = "float64"
+PACKED_MODEL_COMPRESS = False
+# "packed" (padrão) ou "joblib" (RandomForest completo do sklearn); outros backends usam sempre joblib
+MODEL_ARTIFACT_FORMAT = os.environ.get("DATATHON_MODEL_FORMAT", "packed")
+# mmap_mode usado ao carregar os artefatos (None desativa o mapeamento)
+ARTIFACT_MMAP_MODE = os.environ.get("DATATHON_MMAP_MODE", "r") or None
+# Carrega e aquece o modelo de forma síncrona no import do app (antes do fork quando o gunicorn usa
+# --preload). Desativado, o warm-up roda em background e a API sobe sem esperar (ver /api/ready).
+PRELOAD_MODEL_ARTIFACTS = os.environ.get("DATATHON_PRELOAD_ARTIFACTS", "0") == "1"
+
+# Hiperparâmetros de cada backend; MODEL_PARAMS são os do backend ativo
+MODEL_BACKEND_PARAMS = {
+    "random_forest": {"n_estimators": 100, "random_state": 42, "class_weight": "balanced"},
+    "hist_gradient_boosting": {"max_iter": 200, "learning_rate": 0.1, "random_state": 42, "class_weight": "balanced"},
+}
+MODEL_PARAMS = MODEL_BACKEND_PARAMS.get(MODEL_BACKEND, {})
+
+# Linhas (hash de features + rótulo) usadas no treino do modelo publicado: base do retreino incremental
+TRAINING_ROWS_NAME = "training_rows.npy"
+TRAINING_ROWS_PATH = MODELS_DIR / TRAINING_ROWS_NAME
+
+# Retreino incremental (incremental_training.py): árvores novas (warm start) treinadas nas linhas novas ou com rótulo
+# alterado do split de treino mais INCREMENTAL_REPLAY_RATIO x esse número de linhas antigas sorteadas; o nº de árvores
+# novas acompanha a fração de linhas novas (mínimo INCREMENTAL_MIN_NEW_TREES) e as mais antigas acima de
+# INCREMENTAL_MAX_TREES são descartadas. Se alguma INCREMENTAL_GUARD_METRICS cai mais que INCREMENTAL_MAX_METRIC_DROP
+# na validação em relação ao modelo atual, o retreino completo é feito no lugar.
+INCREMENTAL_MIN_NEW_TREES = 10
+INCREMENTAL_MAX_TREES = 150
+INCREMENTAL_REPLAY_RATIO = 1.0
+INCREMENTAL_GUARD_METRICS = ("roc_auc", "f1")
+INCREMENTAL_MAX_METRIC_DROP = 0.01
+INCREMENTAL_REPORT_PATH = REPORTS_DIR / "incremental_training.json"
+
+# Tier rápido (distillation.py): modelo aluno compacto treinado nas probabilidades do modelo publicado (professor)
+# sobre o split de treino. "logistic" (regressão logística nas probabilidades; a predição é um produto escalar) ou
+# "shallow_trees" (gradient boosting raso regredindo a probabilidade). A concordância com o professor e a latência
+# dos dois tiers vão para DISTILLATION_REPORT_PATH.
+DISTILLED_MODEL_KIND = os.environ.get("DATATHON_DISTILLED_MODEL_KIND", "logistic")
+DISTILLED_MODEL_PARAMS = {
+    "logistic": {"C": 1.0, "max_iter": 1000},
+    "shallow_trees": {"max_depth": 3, "max_iter": 100, "learning_rate": 0.1, "random_state": 42},
+}
+DISTILLED_MODEL_NAME = "distilled_model.joblib"
+DISTILLED_MODEL_PATH = MODELS_DIR / DISTILLED_MODEL_NAME
+DISTILLATION_REPORT_PATH = REPORTS_DIR / "distillation.json"
+# Tiers de serving escolhidos por requisição (?tier=): "full" = modelo publicado (com o roteamento A/B de
+# SERVING_TRAFFIC), "fast" = modelo destilado. SERVING_TIER é o padrão quando a requisição não escolhe.
+SERVING_TIERS = ("full", "fast")
+SERVING_TIER = os.environ.get("DATATHON_SERVING_TIER", "full")
+
+# Avaliação (evaluation_utils.py): validação cruzada estratificada, IC bootstrap e segmentos
+CV_FOLDS = 5
+CV_N_JOBS = -1  # folds treinados em paralelo, um processo por núcleo
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_CONFIDENCE = 0.95
+EVALUATION_SEGMENTS = ["vaga_eh_sap_cat", "vaga_nivel_profissional_norm_cat", "candidato_nivel_profissional_norm_cat"]
+
+# Explicações (explain_utils.py): nº de features retornadas e orçamento de latência (ms) da explicação na API. Com o
+# custo estimado (média móvel por worker) acima do orçamento ou do prazo restante da requisição, a resposta traz só
+# a probabilidade e "explanation_skipped"; 1 a cada EXPLANATION_PROBE_EVERY pedidos pulados ainda é explicado para
+# reavaliar o custo.
+EXPLANATION_TOP_FEATURES = 10
+EXPLANATION_LATENCY_BUDGET_MS = 25.0
+EXPLANATION_PROBE_EVERY = 20
+
+# Serving multi-modelo (model_registry.py). "default" é o modelo de MODELS_DIR; modelos extras vêm de
+# DATATHON_SERVING_MODELS, JSON {"nome": {"dir": "<diretório com o layout de models/>", "backend": "random_forest"}}.
+# SERVING_TRAFFIC ("nome:peso,...") divide as requisições entre os modelos que respondem (teste A/B);
+# os SHADOW_MODELS são pontuados em background, só para log, sem mudar a resposta.
+SERVING_MODELS = json.loads(os.environ.get("DATATHON_SERVING_MODELS", "{}"))
+SERVING_TRAFFIC = os.environ.get("DATATHON_SERVING_TRAFFIC", "default:1")
+SHADOW_MODELS = [name for name in os.environ.get("DATATHON_SHADOW_MODELS", "").split(",") if name]
+# Tarefas em background pendentes (shadows e sketches de drift); com a fila cheia elas são descartadas e contadas
+# (a resposta nunca espera)
+SHADOW_QUEUE_SIZE = 256
+SHADOW_LOG_PATH = LOGS_DIR / "shadow_predictions.jsonl"
+
+# Controle de admissão do /api/predict (admission_utils.py), por worker: até ADMISSION_MAX_IN_FLIGHT predições em
+# execução e ADMISSION_MAX_QUEUE esperando (além disso, 429). Prazo padrão de cada requisição em ms (o cliente pode
+# mandar X-Request-Deadline-Ms, limitado a esse padrão); se a fila não deixa cumpri-lo, ou se ele estoura entre as
+# etapas, 503. As recusas levam Retry-After (mínimo ADMISSION_RETRY_AFTER_S). Textos do payload acima de PAYLOAD_TEXT_LIMITS (caracteres)
+# e corpos acima de PAYLOAD_MAX_BYTES são recusados com 413.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("DATATHON_MAX_IN_FLIGHT", "1"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("DATATHON_MAX_QUEUE", "2"))
+ADMISSION_DEADLINE_MS = float(os.environ.get("DATATHON_DEADLINE_MS", "5000"))
+ADMISSION_RETRY_AFTER_S = 1
+PAYLOAD_TEXT_LIMITS = {
+    "cv_pt": int(os.environ.get("DATATHON_MAX_CV_CHARS", "50000")),
+    "comentario_prospect": int(os.environ.get("DATATHON_MAX_COMMENT_CHARS", "5000")),
+}
+PAYLOAD_MAX_BYTES = int(os.environ.get("DATATHON_MAX_PAYLOAD_BYTES", str(1024 * 1024)))
+
+# Profiling sob demanda do /api/predict (api_profiling.py): cProfile da predição de uma fração
+# API_PROFILE_SAMPLE_RATE das requisições e das que mandam "X-Profile: 1" com X-Profile-Token = API_PROFILE_TOKEN
+# (sem token configurado, o header é ignorado e /api/profiles responde 404). Os API_PROFILE_MAX_FILES perfis mais
+# recentes ficam em API_PROFILE_DIR (compartilhado pelos workers). Com taxa 0 e sem token, nada é medido. A predição
+# medida espera as em andamento por até API_PROFILE_MAX_WAIT_MS (ou o prazo da requisição); depois disso roda sem perfil.
+API_PROFILE_SAMPLE_RATE = float(os.environ.get("DATATHON_API_PROFILE_SAMPLE_RATE", "0"))
+API_PROFILE_TOKEN = os.environ.get("DATATHON_API_PROFILE_TOKEN") or None
+API_PROFILE_DIR = REPORTS_DIR / "api_profiles"
+API_PROFILE_MAX_FILES = int(os.environ.get("DATATHON_API_PROFILE_MAX_FILES", "50"))
+API_PROFILE_MAX_WAIT_MS = float(os.environ.get("DATATHON_API_PROFILE_MAX_WAIT_MS", "200"))
+
+# Monitoramento de drift (drift_utils.py): sketches de referência salvos com o modelo, histogramas com
+# DRIFT_NUMERIC_BINS bins (cortes nos quantis do treino) e contadores de até DRIFT_CATEGORY_CAPACITY categorias.
+# PSI < 0.1: estável; 0.1-0.25: moderado; > 0.25: significativo
+DRIFT_REFERENCE_NAME = "drift_reference.json"
+DRIFT_REFERENCE_PATH = MODELS_DIR / DRIFT_REFERENCE_NAME
+DRIFT_NUMERIC_BINS = 10
+DRIFT_CATEGORY_CAPACITY = 32
+DRIFT_PSI_THRESHOLDS = (0.1, 0.25)
+DRIFT_MIN_OBSERVATIONS = 200
+
+# Profiling do pipeline offline (profiling_utils.py): com DATATHON_PROFILE=1 (ou pipeline_runner --profile), tempo de
+# parede, CPU, pico de memória rastreada e tamanho dos DataFrames por etapa vão para PIPELINE_PROFILE_PATH;
+# DATATHON_PROFILE_CPROFILE=1 grava também um .prof do cProfile por etapa de primeiro nível. O tracemalloc deixa as
+# etapas mais lentas: DATATHON_PROFILE_TRACE_MEMORY=0 mede só tempo/CPU/DataFrames (tempos comparáveis aos sem profiling)
+PIPELINE_PROFILE = os.environ.get("DATATHON_PROFILE", "0") == "1"
+PIPELINE_PROFILE_CPROFILE = os.environ.get("DATATHON_PROFILE_CPROFILE", "0") == "1"
+PIPELINE_PROFILE_TRACE_MEMORY = os.environ.get("DATATHON_PROFILE_TRACE_MEMORY", "1") == "1"
+PIPELINE_PROFILE_PATH = REPORTS_DIR / "pipeline_profile.json"
+PIPELINE_PROFILE_CPROFILE_DIR = REPORTS_DIR / "profiles"
+# Resumo da última execução do pipeline_runner (tempo e pico de RSS por etapa, também das etapas em cache)
+PIPELINE_SUMMARY_PATH = REPORTS_DIR / "pipeline_summary.json"
+
+# Histórico de desempenho por commit (scripts/extract_metrics.py): uma linha JSON por commit com tempos do pipeline,
+# tamanho dos artefatos, carga do modelo, latência de inferência e pico de memória. Uma métrica regride quando passa
+# da mediana dos últimos PERFORMANCE_BASELINE_WINDOW commits por mais que a tolerância relativa E mais que a folga
+# absoluta (ruído de medição do runner). Todas as métricas rastreadas são "menor é melhor".
+PERFORMANCE_HISTORY_PATH = REPORTS_DIR / "metrics_history.jsonl"
+PERFORMANCE_BASELINE_WINDOW = 5
+PERFORMANCE_TOLERANCES = {  # métrica: (tolerância relativa, folga absoluta)
+    "preprocess_s": (0.50, 2.0),
+    "train_s": (0.50, 2.0),
+    "model_artifact_mb": (0.10, 0.5),
+    "packed_artifact_mb": (0.10, 0.5),
+    "model_load_ms": (0.50, 50.0),
+    "single_row_p50_ms": (0.50, 10.0),
+    "batch_ms_per_1k_rows": (0.50, 10.0),
+    "pipeline_peak_rss_mb": (0.20, 50.0),
+    "serving_peak_rss_mb": (0.20, 30.0),
+}
+
+# Scoring em lote (batch_scoring.py): pares por chunk e processos (None = um por núcleo)
+BATCH_SCORING_CHUNK_ROWS = 2000
+BATCH_SCORING_WORKERS = None
+
+# Recuperação de candidatos (candidate_retrieval.py): índice invertido token -> candidatos sobre conhecimentos técnicos,
+# CV, área de atuação e KEY_TECH_SKILLS de todo o applicants.json. Para uma vaga, os candidatos são pontuados pela soma
+# do IDF dos tokens em comum com ela e só os RETRIEVAL_CANDIDATES melhores passam pelo modelo. Tokens com menos de
+# RETRIEVAL_MIN_TOKEN_LENGTH caracteres não são indexados (preposições/artigos)
+RETRIEVAL_CANDIDATES = 500
+RETRIEVAL_MIN_TOKEN_LENGTH = 3
 
 # Target variable
 TARGET_VARIABLE = "situacao_candidado"
@@ -106,9 +315,75 @@ NUMERICAL_FEATURES = [
     # Proxies engajamento/cultural
     'candidato_taxa_desistencia_historica_num',
     'match_objetivo_vaga_score_num',
-    'candidato_numero_empregos_num'
+    'candidato_numero_empregos_num',
+    # Similaridade CV do candidato x competências da vaga
+    'match_cv_competencias_score_num'
 ]
 
+# Como cada feature é calculada (compilado por feature_spec.py em um extrator de uma passada por registro, o mesmo no
+# treino e na API). "fields": campos brutos ((seção, campo) projetados ou coluna de primeiro nível); "features":
+# features já declaradas acima na lista. Operações: level (map_level em "levels"), equals (normalize_text == "value" ->
+# "labels"), first_item (primeiro item separado por "separators", normalizado), keyword_count (termos de "keywords"
+# nos textos dos campos unidos por espaço), contains_any ('1'/'0' se algum termo aparece no texto normalizado),
+# compare_levels, same ('1'/'0'), text_length, number, list_length e similarity (TextSimilarityEngine em lote,
+# agrupando os textos por "keys"). Feature de CATEGORICAL_FEATURES/NUMERICAL_FEATURES sem spec vira
+# 'DESCONHECIDO'/0; spec que não está nas listas é só intermediária.
+FEATURE_SPEC = [
+    # Vaga
+    {"name": "vaga_nivel_profissional_norm_cat", "op": "level", "fields": [("perfil_vaga", "nivel profissional")],
+     "levels": PROFESSIONAL_LEVEL_MAP},
+    {"name": "vaga_nivel_academico_norm_cat", "op": "level", "fields": [("perfil_vaga", "nivel_academico")],
+     "levels": ACADEMIC_LEVEL_MAP},
+    {"name": "vaga_nivel_ingles_norm_cat", "op": "level", "fields": [("perfil_vaga", "nivel_ingles")],
+     "levels": LANGUAGE_LEVEL_MAP},
+    {"name": "vaga_eh_sap_cat", "op": "equals", "fields": [("informacoes_basicas", "vaga_sap")],
+     "value": "sim", "labels": ("SIM", "NAO")},
+    {"name": "vaga_area_atuacao_principal_cat", "op": "first_item", "fields": [("perfil_vaga", "areas_atuacao")],
+     "separators": ["-", ","]},
+    {"name": "vaga_competencias_keywords_count_num", "op": "keyword_count",
+     "fields": [("perfil_vaga", "competencia_tecnicas_e_comportamentais"), ("perfil_vaga", "principais_atividades")],
+     "keywords": KEY_TECH_SKILLS},
+    # Candidato
+    {"name": "candidato_nivel_profissional_norm_cat", "op": "level",
+     "fields": [("informacoes_profissionais", "nivel_profissional")], "levels": PROFESSIONAL_LEVEL_MAP},
+    {"name": "candidato_nivel_academico_norm_cat", "op": "level", "fields": [("formacao_e_idiomas", "nivel_academico")],
+     "levels": ACADEMIC_LEVEL_MAP},
+    {"name": "candidato_nivel_ingles_norm_cat", "op": "level", "fields": [("formacao_e_idiomas", "nivel_ingles")],
+     "levels": LANGUAGE_LEVEL_MAP},
+    {"name": "candidato_area_atuacao_principal_cat", "op": "first_item",
+     "fields": [("informacoes_profissionais", "area_atuacao")], "separators": [","]},
+    {"name": "candidato_conhecimentos_keywords_count_num", "op": "keyword_count",
+     "fields": [("informacoes_profissionais", "conhecimentos_tecnicos")], "keywords": KEY_TECH_SKILLS},
+    {"name": "candidato_cv_keywords_count_num", "op": "keyword_count", "fields": ["cv_pt"], "keywords": KEY_TECH_SKILLS},
+    *({"name": f"candidato_exp_{company_type}", "op": "contains_any", "fields": ["cv_pt"], "keywords": keywords}
+      for company_type, keywords in COMPANY_TYPE_KEYWORDS.items()),
+    {"name": "candidato_numero_empregos_num", "op": "list_length", "fields": [("informacoes_profissionais", "experiencias")]},
+    {"name": "candidato_taxa_desistencia_historica_num", "op": "number",
+     "fields": ["candidato_taxa_desistencia_historica_num"]},
+    # Vaga x candidato
+    {"name": "match_nivel_profissional_cat", "op": "compare_levels",
+     "features": ["vaga_nivel_profissional_norm_cat", "candidato_nivel_profissional_norm_cat"]},
+    {"name": "match_nivel_academico_cat", "op": "compare_levels",
+     "features": ["vaga_nivel_academico_norm_cat", "candidato_nivel_academico_norm_cat"]},
+    {"name": "match_nivel_ingles_cat", "op": "compare_levels",
+     "features": ["vaga_nivel_ingles_norm_cat", "candidato_nivel_ingles_norm_cat"]},
+    {"name": "match_area_atuacao_cat", "op": "same",
+     "features": ["vaga_area_atuacao_principal_cat", "candidato_area_atuacao_principal_cat"]},
+    {"name": "match_objetivo_vaga_score_num", "op": "similarity",
+     "fields": [("informacoes_profissionais", "objetivo_profissional"), ("informacoes_basicas", "titulo_vaga")],
+     "keys": ["codigo_profissional", "vaga_id"]},
+    {"name": "match_cv_competencias_score_num", "op": "similarity",
+     "fields": ["cv_pt", ("perfil_vaga", "competencia_tecnicas_e_comportamentais")],
+     "keys": ["codigo_profissional", "vaga_id"]},
+    # Prospect
+    {"name": "comentario_len_num", "op": "text_length", "fields": ["comentario_prospect"]},
+    {"name": "prospect_comentario_negativo_cat", "op": "contains_any", "fields": ["comentario_prospect"],
+     "keywords": NEGATIVE_COMMENT_KEYWORDS},
+]
+
+# Similaridade textual (similarity_utils.py): "jaccard" (conjuntos de tokens) ou "tfidf" (cosseno)
+TEXT_SIMILARITY_MODE = "jaccard"
+
 # Logging configuration
 LOG_FILE = LOGS_DIR / "api_log.txt"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
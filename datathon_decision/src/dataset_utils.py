@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Formato dos dados processados: um diretório por split (train/, val/) com arrays contíguos
+# sem compressão (X.npy em float32, y.npy, index.npy) e um pequeno columns.json com os metadados.
+# O float32 é o mesmo dtype que as árvores do sklearn usam internamente, então o treino não
+# precisa converter (nem copiar) a matriz; com mmap_mode='r' os dados são paginados sob demanda.
+DATASET_FEATURES_FILE = "X.npy"
+DATASET_TARGET_FILE = "y.npy"
+DATASET_INDEX_FILE = "index.npy"
+DATASET_METADATA_FILE = "columns.json"
+DATASET_FEATURES_DTYPE = np.float32
+DATASET_FILES = (DATASET_FEATURES_FILE, DATASET_TARGET_FILE, DATASET_INDEX_FILE, DATASET_METADATA_FILE)
+
+
+def split_dir(data_dir, split_name):
+    return os.path.join(data_dir, split_name)
+
+
+def legacy_split_path(data_dir, split_name):
+    """Caminho do formato antigo (tupla (X, y) pickled com joblib)."""
+    return os.path.join(data_dir, f"{split_name}_data.joblib")
+
+
+def save_processed_split(X, y, data_dir, split_name):
+    """Salva um split (X DataFrame, y Series) como arrays .npy contíguos + columns.json."""
+    out_dir = split_dir(data_dir, split_name)
+    os.makedirs(out_dir, exist_ok=True)
+    X_array = np.ascontiguousarray(X.to_numpy(dtype=DATASET_FEATURES_DTYPE))
+    np.save(os.path.join(out_dir, DATASET_FEATURES_FILE), X_array)
+    np.save(os.path.join(out_dir, DATASET_INDEX_FILE), np.asarray(X.index, dtype=np.int64))
+    if y is not None:
+        np.save(os.path.join(out_dir, DATASET_TARGET_FILE), np.asarray(y, dtype=np.int8))
+    metadata = {
+        "columns": [str(c) for c in X.columns],
+        "n_rows": int(X_array.shape[0]),
+        "features_dtype": np.dtype(DATASET_FEATURES_DTYPE).name,
+        "has_target": y is not None,
+        "target_name": getattr(y, "name", None),
+    }
+    with open(os.path.join(out_dir, DATASET_METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    return out_dir
+
+
+def shard_name(shard_id):
+    return f"part-{shard_id:05d}"
+
+
+def save_processed_shard(X, y, data_dir, split_name, shard_id):
+    """Salva um bloco de um split (pré-processamento em chunks) em <split>/part-NNNNN/, no mesmo formato de um split."""
+    return save_processed_split(X, y, split_dir(data_dir, split_name), shard_name(shard_id))
+
+
+def processed_shards(data_dir, split_name):
+    """Diretórios dos blocos de um split, em ordem."""
+    base = split_dir(data_dir, split_name)
+    if not os.path.isdir(base):
+        return []
+    return sorted(os.path.join(base, name) for name in os.listdir(base)
+                  if name.startswith("part-") and os.path.exists(os.path.join(base, name, DATASET_METADATA_FILE)))
+
+
+def consolidate_processed_split(data_dir, split_name, keep_shards=False):
+    """
+    Junta os blocos de um split no formato normal (X.npy, y.npy, index.npy, columns.json), copiando bloco a bloco
+    para um .npy mapeado em memória: o split inteiro nunca fica na RAM. Retorna o número de linhas.
+    """
+    base = split_dir(data_dir, split_name)
+    shards = processed_shards(data_dir, split_name)
+    if not shards:
+        raise FileNotFoundError(f"Nenhum bloco do split '{split_name}' em '{base}'.")
+    metadata = [load_dataset_metadata(os.path.dirname(shard), os.path.basename(shard)) for shard in shards]
+    columns = metadata[0]["columns"]
+    if any(m["columns"] != columns for m in metadata):
+        raise ValueError(f"Blocos do split '{split_name}' com colunas diferentes.")
+    n_rows = sum(m["n_rows"] for m in metadata)
+    has_target = all(m.get("has_target") for m in metadata)
+
+    X_out = np.lib.format.open_memmap(os.path.join(base, DATASET_FEATURES_FILE), mode="w+",
+                                      dtype=DATASET_FEATURES_DTYPE, shape=(n_rows, len(columns)))
+    index = np.empty(n_rows, dtype=np.int64)
+    y_out = np.empty(n_rows, dtype=np.int8) if has_target else None
+    offset = 0
+    for shard, shard_metadata in zip(shards, metadata):
+        stop = offset + shard_metadata["n_rows"]
+        X_out[offset:stop] = np.load(os.path.join(shard, DATASET_FEATURES_FILE), mmap_mode="r")
+        index[offset:stop] = np.load(os.path.join(shard, DATASET_INDEX_FILE))
+        if has_target:
+            y_out[offset:stop] = np.load(os.path.join(shard, DATASET_TARGET_FILE))
+        offset = stop
+    X_out.flush()
+    del X_out
+    np.save(os.path.join(base, DATASET_INDEX_FILE), index)
+    if has_target:
+        np.save(os.path.join(base, DATASET_TARGET_FILE), y_out)
+    with open(os.path.join(base, DATASET_METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(dict(metadata[0], n_rows=n_rows, has_target=has_target, shards=len(shards)), f, indent=2, ensure_ascii=False)
+    if not keep_shards:
+        for shard in shards:
+            shutil.rmtree(shard)
+    return n_rows
+
+
+def load_dataset_metadata(data_dir, split_name):
+    with open(os.path.join(split_dir(data_dir, split_name), DATASET_METADATA_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def processed_split_exists(data_dir, split_name):
+    return os.path.exists(os.path.join(split_dir(data_dir, split_name), DATASET_METADATA_FILE))
+
+
+def load_processed_split(data_dir, split_name, mmap_mode="r", as_frame=True):
+    """
+    Carrega um split processado. Com mmap_mode='r' nada é lido para a RAM até ser acessado.
+    Com as_frame=True retorna (DataFrame, Series) sem copiar os arrays (o DataFrame é uma view do mmap);
+    com as_frame=False retorna (X ndarray, y ndarray, columns).
+    Faz fallback para o formato antigo (joblib) se o novo não existir.
+    """
+    if not processed_split_exists(data_dir, split_name):
+        legacy_path = legacy_split_path(data_dir, split_name)
+        if not os.path.exists(legacy_path):
+            raise FileNotFoundError(f"Split '{split_name}' não encontrado em '{data_dir}' (nem no formato antigo {legacy_path}).")
+        X, y = joblib.load(legacy_path)
+        if as_frame:
+            return X, y
+        return X.to_numpy(dtype=DATASET_FEATURES_DTYPE), np.asarray(y), list(X.columns)
+
+    base = split_dir(data_dir, split_name)
+    metadata = load_dataset_metadata(data_dir, split_name)
+    X = np.load(os.path.join(base, DATASET_FEATURES_FILE), mmap_mode=mmap_mode)
+    y = np.load(os.path.join(base, DATASET_TARGET_FILE), mmap_mode=mmap_mode) if metadata.get("has_target") else None
+    if not as_frame:
+        return X, y, metadata["columns"]
+
+    index = pd.Index(np.load(os.path.join(base, DATASET_INDEX_FILE)))
+    X_frame = pd.DataFrame(X, columns=metadata["columns"], index=index, copy=False)
+    y_series = pd.Series(y, index=index, name=metadata.get("target_name"), copy=False) if y is not None else None
+    return X_frame, y_series
+
+
+def row_digests(X, y=None):
+    """Hash (uint64) de cada linha de X combinado com o rótulo: identifica as linhas (e rótulos) já vistos por um modelo."""
+    digests = pd.util.hash_pandas_object(pd.DataFrame(np.asarray(X)), index=False).to_numpy()
+    if y is not None:
+        digests = digests ^ pd.util.hash_array(np.asarray(y, dtype=np.int64))
+    return digests
@@ -0,0 +1,218 @@
+"""
+Destilação do modelo publicado (professor) em um modelo aluno compacto, servido como o tier "fast" da API.
+
+O aluno aprende as probabilidades do professor no split de treino (não os rótulos): "logistic" minimiza a
+entropia cruzada com os alvos suaves (cada linha entra com rótulo 1 e peso p e com rótulo 0 e peso 1 - p) e
+guarda só coeficientes e intercepto já na escala das colunas originais, então a predição é um produto escalar;
+"shallow_trees" regride a probabilidade com gradient boosting raso. Na validação são medidas a concordância com o
+professor (diferença das probabilidades, rótulos iguais, correlação de postos), as métricas dos dois e a latência
+do modelo em uma linha e em lote.
+
+Pré-requisito: modelo treinado e splits processados (pipeline_runner, etapa 'distill').
+
+Uso: python -m datathon_decision.src.distillation [--kind logistic|shallow_trees]
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from datathon_decision.src.config import (
+    MODEL_PATH, PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME, DISTILLED_MODEL_KIND, DISTILLED_MODEL_PARAMS,
+    DISTILLED_MODEL_PATH, DISTILLATION_REPORT_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+DISTILLED_MODEL_KINDS = ("logistic", "shallow_trees")
+# Linhas da validação usadas para medir a latência de uma linha
+LATENCY_SAMPLE_ROWS = 200
+
+
+class DistilledModel:
+    """Modelo aluno com a interface usada no serving (classes_, predict_proba) sobre as colunas de treino."""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, kind, feature_names, teacher_digest, estimator=None, coef=None, intercept=0.0):
+        self.kind = kind
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.teacher_digest = teacher_digest
+        self.estimator = estimator
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict_proba(self, X):
+        X = X.to_numpy(dtype=np.float64) if hasattr(X, "to_numpy") else np.asarray(X, dtype=np.float64)
+        if X.shape[1] != len(self.feature_names_in_):
+            raise ValueError(f"Entrada com {X.shape[1]} colunas; o modelo destilado espera {len(self.feature_names_in_)}.")
+        if self.kind == "logistic":
+            proba = 1.0 / (1.0 + np.exp(-(X @ self.coef_ + self.intercept_)))
+        else:
+            proba = np.clip(self.estimator.predict(X), 0.0, 1.0)
+        return np.column_stack([1.0 - proba, proba])
+
+
+def teacher_probabilities(teacher, X):
+    from datathon_decision.src.explain_utils import positive_class_index
+    return teacher.predict_proba(X)[:, positive_class_index(teacher)]
+
+
+def fit_student(X, soft_targets, kind=DISTILLED_MODEL_KIND, params=None, teacher_digest=None):
+    """Treina o aluno nas probabilidades do professor (soft_targets) para as linhas de X."""
+    if kind not in DISTILLED_MODEL_KINDS:
+        raise ValueError(f"Modelo destilado desconhecido: '{kind}'. Use um de {DISTILLED_MODEL_KINDS}.")
+    params = DISTILLED_MODEL_PARAMS[kind] if params is None else params
+    values = X.to_numpy(dtype=np.float64)
+    soft_targets = np.asarray(soft_targets, dtype=np.float64)
+    if kind == "shallow_trees":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        estimator = HistGradientBoostingRegressor(**params).fit(values, soft_targets)
+        return DistilledModel(kind, X.columns, teacher_digest, estimator=estimator)
+
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler().fit(values)
+    scaled = scaler.transform(values)
+    n_rows = len(values)
+    logistic = LogisticRegression(**params).fit(
+        np.vstack([scaled, scaled]), np.concatenate([np.ones(n_rows), np.zeros(n_rows)]),
+        sample_weight=np.concatenate([soft_targets, 1.0 - soft_targets]),
+    )
+    # Coeficientes na escala original: a predição não precisa do scaler
+    coef = logistic.coef_.ravel() / scaler.scale_
+    intercept = float(logistic.intercept_[0] - coef @ scaler.mean_)
+    return DistilledModel(kind, X.columns, teacher_digest, coef=coef, intercept=intercept)
+
+
+def agreement(teacher_proba, student_proba, threshold=0.5):
+    """Concordância do aluno com o professor nas mesmas linhas."""
+    from scipy.stats import spearmanr
+    diff = np.abs(teacher_proba - student_proba)
+    rank_corr = spearmanr(teacher_proba, student_proba).statistic if len(teacher_proba) > 1 else float("nan")
+    return {
+        "mean_abs_diff": float(diff.mean()),
+        "p95_abs_diff": float(np.quantile(diff, 0.95)),
+        "label_agreement": float(np.mean((teacher_proba >= threshold) == (student_proba >= threshold))),
+        "spearman": float(rank_corr),
+    }
+
+
+def model_latency(model, X, sample_rows=LATENCY_SAMPLE_ROWS, batch_rows=1000):
+    """Latência só do modelo: mediana/p95 de uma linha (DataFrame de 1 linha, como na API) e ms por 1000 linhas."""
+    single = []
+    for i in range(min(sample_rows, len(X))):
+        row = X.iloc[[i]]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        single.append((time.perf_counter() - start) * 1000)
+    batch = X.iloc[:batch_rows]
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_ms = (time.perf_counter() - start) * 1000
+    return {
+        "single_row_p50_ms": statistics.median(single),
+        "single_row_p95_ms": float(np.quantile(single, 0.95)),
+        "batch_ms_per_1k_rows": batch_ms * 1000 / max(len(batch), 1),
+    }
+
+
+def file_digest(path):
+    from datathon_decision.src.model_utils import _file_digest
+    return _file_digest(path)
+
+
+def distill(kind=DISTILLED_MODEL_KIND, output_path=DISTILLED_MODEL_PATH, report_path=DISTILLATION_REPORT_PATH):
+    """Treina, avalia e publica o modelo destilado; retorna o relatório (também gravado em report_path)."""
+    from datathon_decision.src.dataset_utils import load_processed_split
+    from datathon_decision.src.model_utils import load_artifacts, evaluate_model
+
+    # Professor como servido na API (formato packed, quando disponível)
+    teacher = load_artifacts(reload=True)["model"]
+    X_train, _ = load_processed_split(PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, mmap_mode="r")
+    X_val, y_val = load_processed_split(PROCESSED_DATA_DIR, VAL_SPLIT_NAME, mmap_mode="r")
+
+    start = time.perf_counter()
+    student = fit_student(X_train, teacher_probabilities(teacher, X_train), kind, teacher_digest=file_digest(MODEL_PATH))
+    fit_s = time.perf_counter() - start
+    joblib.dump(student, f"{output_path}.tmp")
+    os.replace(f"{output_path}.tmp", output_path)
+    logger.info(f"Modelo destilado ({kind}) salvo em {output_path}")
+
+    teacher_val, student_val = teacher_probabilities(teacher, X_val), teacher_probabilities(student, X_val)
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "kind": kind,
+        "params": DISTILLED_MODEL_PARAMS[kind],
+        "fit_seconds": fit_s,
+        "train_rows": int(len(X_train)),
+        "validation_rows": int(len(X_val)),
+        "artifact_mb": os.path.getsize(output_path) / 2 ** 20,
+        "agreement": agreement(teacher_val, student_val),
+        "metrics": {
+            "full": {k: float(v) for k, v in evaluate_model(teacher, X_val, y_val).items()},
+            "fast": {k: float(v) for k, v in evaluate_model(student, X_val, y_val).items()},
+        },
+        "latency": {"full": model_latency(teacher, X_val), "fast": model_latency(student, X_val)},
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+def load_distilled_model(path=DISTILLED_MODEL_PATH, teacher_path=MODEL_PATH):
+    """
+    Modelo destilado, ou None se não existir ou se foi destilado de outro modelo publicado (teacher_digest): o
+    tier "fast" não responde com um aluno de um professor que não é mais o servido no "full".
+    """
+    if not os.path.exists(path):
+        return None
+    student = joblib.load(path)
+    if os.path.exists(teacher_path) and student.teacher_digest != file_digest(teacher_path):
+        logger.warning(f"O modelo destilado ({path}) foi treinado com outro modelo publicado e não será servido: rode "
+                       f"a destilação novamente (python -m datathon_decision.src.distillation).")
+        return None
+    return student
+
+
+def print_report(report):
+    agreement_stats = report["agreement"]
+    print(f"✅ Modelo destilado ({report['kind']}) treinado em {report['fit_seconds']:.2f}s "
+          f"({report['artifact_mb']:.3f} MB)")
+    print(f"📊 Concordância com o professor: |Δp| médio={agreement_stats['mean_abs_diff']:.4f} "
+          f"p95={agreement_stats['p95_abs_diff']:.4f} | rótulos iguais={agreement_stats['label_agreement']:.1%} | "
+          f"spearman={agreement_stats['spearman']:.3f}")
+    for tier in ("full", "fast"):
+        metrics, latency = report["metrics"][tier], report["latency"][tier]
+        roc_auc = f"{metrics['roc_auc']:.3f}" if "roc_auc" in metrics else "n/d"
+        print(f"⏱️  {tier:4s} | ROC AUC={roc_auc} F1={metrics['f1']:.3f} | 1 linha p50={latency['single_row_p50_ms']:.3f} ms "
+              f"p95={latency['single_row_p95_ms']:.3f} ms | {latency['batch_ms_per_1k_rows']:.2f} ms/1000 linhas")
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Destila o modelo publicado em um modelo compacto (tier 'fast').")
+    parser.add_argument("--kind", choices=DISTILLED_MODEL_KINDS, default=DISTILLED_MODEL_KIND)
+    args = parser.parse_args()
+
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Modelo não encontrado em {MODEL_PATH}. Rode: python -m datathon_decision.src.pipeline_runner")
+        return 1
+    report = distill(kind=args.kind)
+    print_report(report)
+    print(f"📊 Relatório salvo em {DISTILLATION_REPORT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    # Pelo módulo importado: rodando com -m, o aluno seria gravado como __main__.DistilledModel e a API não o carregaria
+    from datathon_decision.src import distillation
+    sys.exit(distillation.main())
@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+
+from datathon_decision.src.config import (
+    CATEGORICAL_FEATURES, NUMERICAL_FEATURES,
+    DRIFT_NUMERIC_BINS, DRIFT_CATEGORY_CAPACITY, DRIFT_PSI_THRESHOLDS, DRIFT_MIN_OBSERVATIONS,
+)
+
+# Categorias fora do sketch de referência (ou além da capacidade) somam neste bucket
+OTHER_CATEGORY = "__outros__"
+# Proporção mínima por bin no PSI (evita log(0) quando um bin está vazio de um dos lados)
+PSI_EPSILON = 1e-4
+
+
+class NumericSketch:
+    """
+    Histograma de memória constante com os cortes nos quantis do treino: o mesmo binning é usado
+    na referência e em produção, e o PSI sai direto das contagens. Guarda também n, média, mín. e máx.
+    """
+
+    def __init__(self, edges, counts=None, n=0, total=0.0, minimum=None, maximum=None):
+        self.edges = [float(e) for e in edges]
+        self.counts = list(counts) if counts is not None else [0] * (len(self.edges) + 1)
+        self.n = n
+        self.total = total
+        self.min = minimum
+        self.max = maximum
+
+    @classmethod
+    def from_values(cls, values, n_bins=DRIFT_NUMERIC_BINS):
+        values = np.asarray(values, dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])) if values.size else []
+        sketch = cls(edges)
+        if values.size:
+            sketch.counts = np.bincount(np.searchsorted(sketch.edges, values, side="right"),
+                                        minlength=len(sketch.edges) + 1).tolist()
+            sketch.n, sketch.total = int(values.size), float(values.sum())
+            sketch.min, sketch.max = float(values.min()), float(values.max())
+        return sketch
+
+    def empty_like(self):
+        return NumericSketch(self.edges)
+
+    def update(self, value):
+        value = float(value)
+        self.counts[bisect_right(self.edges, value)] += 1
+        self.n += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Soma as contagens de outro sketch com os mesmos cortes (ex.: um lote observado fora do lock)."""
+        if other.edges != self.edges:
+            raise ValueError("NumericSketch.merge: os sketches não têm os mesmos cortes.")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.n += other.n
+        self.total += other.total
+        if other.n:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Quantil aproximado (interpolação linear dentro do bin; os bins das pontas vão até mín./máx.)."""
+        if not self.n:
+            return None
+        bounds = [self.min] + self.edges + [self.max]
+        target, cumulative = q * self.n, 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= target:
+                low, high = bounds[i], max(bounds[i + 1], bounds[i])
+                return low + (high - low) * (target - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def to_dict(self):
+        return {"edges": self.edges, "counts": self.counts, "n": self.n, "total": self.total,
+                "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["edges"], data["counts"], data["n"], data["total"], data["min"], data["max"])
+
+
+class CategorySketch:
+    """Contador de frequências limitado a `capacity` categorias (Space-Saving: a menos frequente cede o lugar)."""
+
+    def __init__(self, capacity=DRIFT_CATEGORY_CAPACITY, counters=None, n=0):
+        self.capacity = capacity
+        self.counters = dict(counters or {})
+        self.n = n
+
+    @classmethod
+    def from_values(cls, values, capacity=DRIFT_CATEGORY_CAPACITY):
+        """Referência exata: as `capacity - 1` categorias mais frequentes e o resto em OTHER_CATEGORY."""
+        counts = {}
+        for value in values:
+            counts[str(value)] = counts.get(str(value), 0) + 1
+        top = sorted(counts.items(), key=lambda item: -item[1])
+        counters = dict(top[:capacity - 1])
+        remainder = sum(count for _, count in top[capacity - 1:])
+        if remainder:
+            counters[OTHER_CATEGORY] = remainder
+        return cls(capacity, counters, len(values))
+
+    def empty_like(self):
+        return CategorySketch(self.capacity)
+
+    def update(self, value):
+        value = str(value)
+        self.n += 1
+        if value in self.counters:
+            self.counters[value] += 1
+        elif len(self.counters) < self.capacity:
+            self.counters[value] = 1
+        else:
+            evicted = min(self.counters, key=self.counters.get)
+            self.counters[value] = self.counters.pop(evicted) + 1
+
+    def merge(self, other):
+        """
+        Soma os contadores de outro sketch; acima da capacidade ficam os mais frequentes e as contagens
+        descartadas vão para o menor mantido (como em update, a soma dos contadores continua igual a n).
+        """
+        counters = dict(self.counters)
+        for value, count in other.counters.items():
+            counters[value] = counters.get(value, 0) + count
+        if len(counters) > self.capacity:
+            ranked = sorted(counters.items(), key=lambda item: -item[1])
+            counters = dict(ranked[:self.capacity])
+            counters[ranked[self.capacity - 1][0]] += sum(count for _, count in ranked[self.capacity:])
+        self.counters = counters
+        self.n += other.n
+        return self
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "counters": self.counters, "n": self.n}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["capacity"], data["counters"], data["n"])
+
+
+def population_stability_index(expected, actual):
+    """PSI entre duas distribuições de contagens sobre os mesmos bins."""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64) / max(sum(expected), 1), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64) / max(sum(actual), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def category_psi(reference, live):
+    """PSI sobre as categorias da referência; as desconhecidas somam em OTHER_CATEGORY."""
+    categories = list(reference.counters)
+    if OTHER_CATEGORY not in categories:
+        categories.append(OTHER_CATEGORY)
+    live_counts = dict.fromkeys(categories, 0)
+    for value, count in live.counters.items():
+        live_counts[value if value in live_counts else OTHER_CATEGORY] += count
+    return population_stability_index([reference.counters.get(c, 0) for c in categories],
+                                      [live_counts[c] for c in categories])
+
+
+def drift_status(psi):
+    low, high = DRIFT_PSI_THRESHOLDS
+    return "estavel" if psi < low else "moderado" if psi < high else "significativo"
+
+
+def build_drift_reference(X_features):
+    """Sketches de referência (features engenheiradas do treino, antes da codificação)."""
+    return {
+        "created_at": datetime.now().isoformat(),
+        "n_rows": int(len(X_features)),
+        "numerical": {c: NumericSketch.from_values(X_features[c]).to_dict() for c in NUMERICAL_FEATURES if c in X_features},
+        "categorical": {c: CategorySketch.from_values(X_features[c].astype(str).tolist()).to_dict()
+                        for c in CATEGORICAL_FEATURES if c in X_features},
+    }
+
+
+def save_drift_reference(X_features, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_drift_reference(X_features), f, ensure_ascii=False)
+
+
+class DriftMonitor:
+    """Sketches de produção (atualizados a cada predição) comparados com os de referência do treino."""
+
+    def __init__(self, reference):
+        self.reference_created_at = reference.get("created_at")
+        self.reference = {c: NumericSketch.from_dict(d) for c, d in reference["numerical"].items()}
+        self.reference.update({c: CategorySketch.from_dict(d) for c, d in reference["categorical"].items()})
+        self.numerical = [c for c in reference["numerical"]]
+        self.categorical = [c for c in reference["categorical"]]
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def load(cls, path):
+        """Monitor a partir da referência salva com o modelo (None se o arquivo não existe)."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def reset(self):
+        with self._lock:
+            self.live = {c: sketch.empty_like() for c, sketch in self.reference.items()}
+            self.started_at = datetime.now().isoformat()
+
+    def observe(self, X_features):
+        """Atualiza os sketches com as linhas de features engenheiradas (tipicamente 1 por requisição)."""
+        batch = {}
+        for column in self.numerical + self.categorical:
+            if column in X_features:
+                # Lote montado fora do lock; sob o lock só a soma das contagens
+                sketch = batch[column] = self.reference[column].empty_like()
+                for value in X_features[column].tolist():
+                    sketch.update(value)
+        with self._lock:
+            for column, sketch in batch.items():
+                self.live[column].merge(sketch)
+
+    def report(self):
+        """PSI e status por feature, mais um resumo (features com drift acima do limiar moderado)."""
+        with self._lock:
+            live = {c: type(s).from_dict(s.to_dict()) for c, s in self.live.items()}
+        features = {}
+        for column in self.numerical:
+            reference, current = self.reference[column], live[column]
+            psi = population_stability_index(reference.counts, current.counts) if current.n else None
+            features[column] = {
+                "type": "numerical", "psi": psi, "status": drift_status(psi) if psi is not None else None,
+                "n": current.n, "mean": current.total / current.n if current.n else None,
+                "reference_mean": reference.total / reference.n if reference.n else None,
+                "p50": current.quantile(0.5), "reference_p50": reference.quantile(0.5),
+            }
+        for column in self.categorical:
+            reference, current = self.reference[column], live[column]
+            psi = category_psi(reference, current) if current.n else None
+            top = sorted(current.counters.items(), key=lambda item: -item[1])[:5]
+            features[column] = {
+                "type": "categorical", "psi": psi, "status": drift_status(psi) if psi is not None else None,
+                "n": current.n, "top_values": {value: count / current.n for value, count in top},
+                "unseen_values": sorted(v for v in current.counters if v not in reference.counters),
+            }
+        observations = max((f["n"] for f in features.values()), default=0)
+        drifted = sorted(c for c, f in features.items() if f["psi"] is not None and f["psi"] >= DRIFT_PSI_THRESHOLDS[0])
+        return {
+            "reference_created_at": self.reference_created_at,
+            "since": self.started_at,
+            "observations": observations,
+            "sufficient_data": observations >= DRIFT_MIN_OBSERVATIONS,
+            "psi_thresholds": list(DRIFT_PSI_THRESHOLDS),
+            "drifted_features": drifted,
+            "max_psi": max((f["psi"] for f in features.values() if f["psi"] is not None), default=None),
+            "features": features,
+        }
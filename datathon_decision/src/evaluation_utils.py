@@ -0,0 +1,266 @@
+"""
+Avaliação do modelo com validação cruzada estratificada (folds treinados em paralelo),
+métricas derivadas de uma única passada de predict_proba, intervalos de confiança por
+bootstrap e quebra por segmentos (ex.: vaga SAP, nível profissional).
+
+Uso: python -m datathon_decision.src.evaluation_utils [--folds 5] [--n-jobs -1] [--bootstrap 1000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from datathon_decision.src.config import (
+    PROCESSED_DATA_DIR, PREPROCESSOR_PATH, REPORTS_DIR, CATEGORICAL_FEATURES,
+    TRAIN_SPLIT_NAME, VAL_SPLIT_NAME, RANDOM_STATE,
+    CV_FOLDS, CV_N_JOBS, BOOTSTRAP_SAMPLES, BOOTSTRAP_CONFIDENCE, EVALUATION_SEGMENTS,
+)
+from datathon_decision.src.dataset_utils import load_processed_split
+from datathon_decision.src.model_backends import get_model_backend
+
+METRIC_NAMES = ("accuracy", "precision", "recall", "f1", "roc_auc")
+# Reamostragens do bootstrap processadas por bloco (limita a matriz de pesos bloco x n_amostras)
+BOOTSTRAP_BLOCK = 100
+# Segmentos com menos linhas (ou sem as duas classes) não têm métricas reportadas
+MIN_SEGMENT_ROWS = 30
+
+
+def labels_from_proba(proba, classes):
+    """Rótulos a partir de predict_proba (mesma regra de predict: classe de maior probabilidade)."""
+    return np.asarray(classes).take(np.argmax(proba, axis=1), axis=0)
+
+
+def weighted_binary_metrics(weights, y_true, y_pred, y_score):
+    """
+    Acurácia, precisão, recall, F1 e ROC AUC ponderados, para várias ponderações de uma vez.
+    weights: (n_ponderacoes, n_amostras); pesos inteiros reproduzem uma reamostragem bootstrap
+    (peso = nº de vezes que a amostra foi sorteada) e pesos 0/1 selecionam um segmento.
+    Retorna um dicionário nome -> array (n_ponderacoes,); NaN quando a métrica é indefinida.
+    """
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    y_true = np.asarray(y_true).astype(bool)
+    y_pred = np.asarray(y_pred).astype(bool)
+    tp = weights @ (y_true & y_pred)
+    fp = weights @ (~y_true & y_pred)
+    fn = weights @ (y_true & ~y_pred)
+    total = weights.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accuracy = (total - fp - fn) / total
+        # zero_division=0, como no sklearn
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+    return {"accuracy": accuracy, "precision": precision, "recall": recall, "f1": f1,
+            "roc_auc": _weighted_roc_auc(weights, y_true, y_score)}
+
+
+def _weighted_roc_auc(weights, y_true, y_score):
+    # Mann-Whitney ponderado: para cada positivo, peso dos negativos com score menor (+ metade dos empates)
+    levels, level_of_sample = np.unique(np.asarray(y_score, dtype=np.float64), return_inverse=True)
+    n_weights, n_levels = weights.shape[0], len(levels)
+    # Soma dos pesos de positivos/negativos por nível de score, para todas as ponderações de uma vez
+    flat_levels = (np.arange(n_weights)[:, None] * n_levels + level_of_sample[None, :]).ravel()
+    pos_by_level = np.bincount(flat_levels, weights=(weights * y_true).ravel(), minlength=n_weights * n_levels)
+    neg_by_level = np.bincount(flat_levels, weights=(weights * ~y_true).ravel(), minlength=n_weights * n_levels)
+    pos_by_level = pos_by_level.reshape(n_weights, n_levels)
+    neg_by_level = neg_by_level.reshape(n_weights, n_levels)
+    neg_below = np.cumsum(neg_by_level, axis=1) - neg_by_level
+    numerator = (pos_by_level * (neg_below + 0.5 * neg_by_level)).sum(axis=1)
+    denominator = pos_by_level.sum(axis=1) * neg_by_level.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def bootstrap_metrics(y_true, y_pred, y_score, n_bootstrap=BOOTSTRAP_SAMPLES, confidence=BOOTSTRAP_CONFIDENCE,
+                      random_state=RANDOM_STATE):
+    """Métricas pontuais + intervalo de confiança percentil por bootstrap (reamostragem das linhas)."""
+    n = len(y_true)
+    point = {k: float(v[0]) for k, v in weighted_binary_metrics(np.ones((1, n)), y_true, y_pred, y_score).items()}
+    rng = np.random.default_rng(random_state)
+    samples = {name: [] for name in METRIC_NAMES}
+    for start in range(0, n_bootstrap, BOOTSTRAP_BLOCK):
+        block = min(BOOTSTRAP_BLOCK, n_bootstrap - start)
+        # Pesos = contagem de cada linha nas `block` reamostragens (equivalente a indexar e recalcular)
+        draws = rng.integers(0, n, size=(block, n)) + (np.arange(block)[:, None] * n)
+        weights = np.bincount(draws.ravel(), minlength=block * n).reshape(block, n)
+        for name, values in weighted_binary_metrics(weights, y_true, y_pred, y_score).items():
+            samples[name].append(values)
+    alpha = (1.0 - confidence) / 2.0
+    result = {}
+    for name in METRIC_NAMES:
+        values = np.concatenate(samples[name])
+        values = values[~np.isnan(values)]
+        low, high = (np.quantile(values, [alpha, 1.0 - alpha]) if len(values) else (np.nan, np.nan))
+        result[name] = {"value": point[name], "ci_low": float(low), "ci_high": float(high)}
+    return result
+
+
+def segment_metrics(segments, y_true, y_pred, y_score, min_rows=MIN_SEGMENT_ROWS):
+    """Métricas por valor de cada coluna de `segments` (DataFrame alinhado às linhas de y_true)."""
+    report = {}
+    for column in segments.columns:
+        codes, values = pd.factorize(segments[column].astype(object).fillna("DESCONHECIDO"), sort=True)
+        # Uma linha de pesos 0/1 por valor do segmento: todas as métricas saem de uma só chamada
+        weights = np.zeros((len(values), len(codes)))
+        weights[codes, np.arange(len(codes))] = 1.0
+        metrics = weighted_binary_metrics(weights, y_true, y_pred, y_score)
+        positives = weights @ np.asarray(y_true).astype(bool)
+        report[column] = {}
+        for i, value in enumerate(values):
+            rows = int(weights[i].sum())
+            entry = {"rows": rows, "positives": int(positives[i])}
+            if rows >= min_rows and 0 < positives[i] < rows:
+                entry.update({name: float(metrics[name][i]) for name in METRIC_NAMES})
+            report[column][str(value)] = entry
+    return report
+
+
+def decode_segments(X, columns, encoder, segment_features=EVALUATION_SEGMENTS):
+    """
+    Recupera as categorias originais (pré-OHE/ordinal) das features de segmento a partir da matriz codificada.
+    Retorna None com o encoder de hashing (largura fixa), que não tem volta para as categorias.
+    """
+    if getattr(encoder, "fixed_width", False):
+        return None
+    encoded_columns = list(encoder.get_feature_names_out(CATEGORICAL_FEATURES))
+    positions = pd.Index(columns).get_indexer(encoded_columns)
+    decoded = encoder.inverse_transform(np.asarray(X)[:, positions])
+    decoded = pd.DataFrame(decoded, columns=CATEGORICAL_FEATURES)
+    return decoded[[f for f in segment_features if f in decoded.columns]]
+
+
+def _fit_fold(backend_name, X, y, columns, train_idx, test_idx, fold):
+    """Treina um fold e devolve as probabilidades out-of-fold (executado em um processo do pool)."""
+    backend = get_model_backend(backend_name)
+    X_train = pd.DataFrame(X[train_idx], columns=columns, copy=False)
+    X_test = pd.DataFrame(X[test_idx], columns=columns, copy=False)
+    model = backend.build(columns)
+    start = time.perf_counter()
+    model.fit(X_train, y[train_idx])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    return {"fold": fold, "test_idx": test_idx, "proba": proba, "classes": model.classes_,
+            "fit_s": fit_s, "predict_s": time.perf_counter() - start}
+
+
+def cross_validate_model(X, y, columns, backend=None, n_splits=CV_FOLDS, n_jobs=CV_N_JOBS, random_state=RANDOM_STATE):
+    """
+    Validação cruzada estratificada com os folds treinados em paralelo (joblib).
+    Retorna as probabilidades out-of-fold (uma por linha), as classes e os tempos por fold.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    backend_name = get_model_backend(backend).name
+    y = np.asarray(y)
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(np.zeros(len(y)), y)
+    start = time.perf_counter()
+    # Arrays grandes são passados aos workers via memmap pelo joblib (sem cópia por fold)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(backend_name, X, y, list(columns), train_idx, test_idx, fold)
+        for fold, (train_idx, test_idx) in enumerate(folds)
+    )
+    wall_s = time.perf_counter() - start
+    classes = results[0]["classes"]
+    oof_proba = np.zeros((len(y), len(classes)))
+    fold_of_row = np.zeros(len(y), dtype=np.int64)
+    for result in results:
+        oof_proba[result["test_idx"]] = result["proba"]
+        fold_of_row[result["test_idx"]] = result["fold"]
+    timings = [{"fold": r["fold"], "fit_s": r["fit_s"], "predict_s": r["predict_s"]} for r in results]
+    return {"backend": backend_name, "oof_proba": oof_proba, "classes": classes, "fold_of_row": fold_of_row,
+            "fold_timings": timings, "wall_s": wall_s}
+
+
+def evaluate_cross_validation(X, y, columns, encoder, backend=None, n_splits=CV_FOLDS, n_jobs=CV_N_JOBS,
+                              n_bootstrap=BOOTSTRAP_SAMPLES, confidence=BOOTSTRAP_CONFIDENCE):
+    """Relatório completo: métricas out-of-fold com IC bootstrap, métricas por fold e por segmento."""
+    cv = cross_validate_model(X, y, columns, backend=backend, n_splits=n_splits, n_jobs=n_jobs)
+    y = np.asarray(y)
+    y_pred = labels_from_proba(cv["oof_proba"], cv["classes"])
+    y_score = cv["oof_proba"][:, list(cv["classes"]).index(1)] if 1 in list(cv["classes"]) else cv["oof_proba"][:, -1]
+
+    fold_weights = (cv["fold_of_row"][None, :] == np.arange(n_splits)[:, None]).astype(np.float64)
+    per_fold = weighted_binary_metrics(fold_weights, y, y_pred, y_score)
+    segments = decode_segments(X, columns, encoder) if encoder is not None else pd.DataFrame(index=range(len(y)))
+    segments_skipped = None
+    if segments is None:
+        segments_skipped = "CATEGORICAL_ENCODING=hashing: as categorias não são recuperáveis da matriz codificada"
+        segments = pd.DataFrame(index=range(len(y)))
+    fit_total = sum(t["fit_s"] for t in cv["fold_timings"])
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "backend": cv["backend"],
+        "rows": int(len(y)),
+        "folds": n_splits,
+        "confidence": confidence,
+        "bootstrap_samples": n_bootstrap,
+        "overall": bootstrap_metrics(y, y_pred, y_score, n_bootstrap=n_bootstrap, confidence=confidence),
+        "per_fold": {name: [float(v) for v in values] for name, values in per_fold.items()},
+        "per_fold_mean_std": {name: {"mean": float(np.nanmean(v)), "std": float(np.nanstd(v))} for name, v in per_fold.items()},
+        "segments": segment_metrics(segments, y, y_pred, y_score),
+        "segments_skipped": segments_skipped,
+        "timings": {"wall_s": cv["wall_s"], "sum_fit_s": fit_total, "folds": cv["fold_timings"]},
+    }
+
+
+def load_full_processed_dataset(data_dir=PROCESSED_DATA_DIR):
+    """Concatena os splits train e val (matriz float32, y, colunas) para a validação cruzada."""
+    X_train, y_train, columns = load_processed_split(data_dir, TRAIN_SPLIT_NAME, mmap_mode="r", as_frame=False)
+    X_val, y_val, _ = load_processed_split(data_dir, VAL_SPLIT_NAME, mmap_mode="r", as_frame=False)
+    return np.concatenate([X_train, X_val]), np.concatenate([y_train, y_val]), list(columns)
+
+
+def print_report(report):
+    print(f"\n📊 Validação cruzada ({report['backend']}, {report['folds']} folds, {report['rows']} linhas) - "
+          f"IC {report['confidence']:.0%} com {report['bootstrap_samples']} reamostragens")
+    for name in METRIC_NAMES:
+        m = report["overall"][name]
+        fold = report["per_fold_mean_std"][name]
+        print(f"   {name:10s} {m['value']:.4f}  [{m['ci_low']:.4f}, {m['ci_high']:.4f}]  "
+              f"(folds: {fold['mean']:.4f} ± {fold['std']:.4f})")
+    if report.get("segments_skipped"):
+        print(f"\n⚠️  Métricas por segmento puladas ({report['segments_skipped']})")
+    for column, values in report["segments"].items():
+        print(f"\n   Segmento {column}:")
+        for value, entry in values.items():
+            if "roc_auc" in entry:
+                print(f"     {value:24s} n={entry['rows']:6d} pos={entry['positives']:5d} | "
+                      f"AUC={entry['roc_auc']:.4f} F1={entry['f1']:.4f} Recall={entry['recall']:.4f}")
+            else:
+                print(f"     {value:24s} n={entry['rows']:6d} pos={entry['positives']:5d} | (amostra insuficiente)")
+    t = report["timings"]
+    print(f"\n⏱️  Tempo total {t['wall_s']:.2f}s (soma dos treinos por fold: {t['sum_fit_s']:.2f}s)")
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Validação cruzada com IC bootstrap e métricas por segmento.")
+    parser.add_argument("--backend", default=None, help="Backend do modelo (padrão: MODEL_BACKEND)")
+    parser.add_argument("--folds", type=int, default=CV_FOLDS)
+    parser.add_argument("--n-jobs", type=int, default=CV_N_JOBS)
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP_SAMPLES)
+    parser.add_argument("--output", default=str(REPORTS_DIR / "cv_evaluation.json"))
+    args = parser.parse_args()
+
+    X, y, columns = load_full_processed_dataset()
+    encoder = joblib.load(PREPROCESSOR_PATH) if os.path.exists(PREPROCESSOR_PATH) else None
+    report = evaluate_cross_validation(X, y, columns, encoder, backend=args.backend, n_splits=args.folds,
+                                       n_jobs=args.n_jobs, n_bootstrap=args.bootstrap)
+    print_report(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from datathon_decision.src.artifact_utils import PackedForest
+from datathon_decision.src.config import (
+    CATEGORICAL_FEATURES, NUMERICAL_FEATURES, EXPLANATION_TOP_FEATURES, EXPLANATION_LATENCY_BUDGET_MS,
+    EXPLANATION_PROBE_EVERY,
+)
+
+# Peso da última explicação na média móvel do custo
+EXPLANATION_COST_ALPHA = 0.2
+from datathon_decision.src.model_backends import HASHED_COLUMN_PREFIX
+
+
+def positive_class_index(model):
+    classes = list(model.classes_)
+    return classes.index(1) if 1 in classes else len(classes) - 1
+
+
+def explain_model(model, X):
+    """
+    (bias, contribuições por coluna do modelo) para a classe positiva, via caminhos de decisão da floresta.
+    Aceita o modelo packed ou o RandomForest do sklearn (convertido uma vez e guardado no próprio objeto).
+    """
+    if isinstance(model, PackedForest):
+        forest = model
+    elif hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        forest = model.__dict__.get("_packed_for_explain")
+        if forest is None:
+            forest = model.__dict__["_packed_for_explain"] = PackedForest.from_estimator(model)
+    else:
+        raise NotImplementedError(f"Explicações por contribuição só estão disponíveis para florestas (modelo: {type(model).__name__}).")
+    return forest.explain(X, class_index=positive_class_index(model))
+
+
+def contribution_owners(columns):
+    """
+    Feature original (pré-codificação) de cada coluna do modelo: as colunas OHE '<feature>_<valor>' voltam para <feature>.
+    Colunas do encoder de hashing não têm dona: um bucket mistura pares (feature, valor) de várias features, e um
+    bucket zerado também pesa na predição sem vir de nenhuma feature da linha.
+    """
+    owners = []
+    for column in columns:
+        if column in CATEGORICAL_FEATURES or column in NUMERICAL_FEATURES:
+            owners.append(column)
+            continue
+        if column.startswith(HASHED_COLUMN_PREFIX):
+            raise NotImplementedError("Explicações por feature não estão disponíveis com CATEGORICAL_ENCODING=hashing "
+                                      "(os buckets não voltam para as features originais).")
+        prefixes = [f for f in CATEGORICAL_FEATURES if column.startswith(f"{f}_")]
+        owners.append(max(prefixes, key=len) if prefixes else column)
+    return owners
+
+
+def aggregate_contributions(contributions, columns):
+    """Soma as contribuições das colunas de uma mesma feature original; retorna DataFrame (amostras x features)."""
+    owners = contribution_owners(columns)
+    codes, features = pd.factorize(pd.Series(owners), sort=False)
+    aggregation = np.zeros((len(columns), len(features)))
+    aggregation[np.arange(len(columns)), codes] = 1.0
+    return pd.DataFrame(np.asarray(contributions) @ aggregation, columns=list(features))
+
+
+def explain_batch(model, X_processed, top_features=EXPLANATION_TOP_FEATURES):
+    """
+    Explicação de um lote já codificado (colunas = training_cols): para cada linha, a probabilidade,
+    o valor base e as `top_features` maiores contribuições (em módulo) por feature original.
+    """
+    start = time.perf_counter()
+    bias, contributions = explain_model(model, X_processed)
+    aggregated = aggregate_contributions(contributions, list(X_processed.columns))
+    values = aggregated.to_numpy()
+    order = np.argsort(-np.abs(values), axis=1)[:, :top_features]
+    features = np.asarray(aggregated.columns)
+    explanations = []
+    for i in range(values.shape[0]):
+        explanations.append({
+            "match_probability": float(bias[i] + values[i].sum()),
+            "base_value": float(bias[i]),
+            "contributions": {str(features[j]): float(values[i, j]) for j in order[i]},
+        })
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return explanations, elapsed_ms
+
+
+class ExplanationBudget:
+    """
+    Orçamento de latência das explicações na API: a explicação não é interrompível no meio (a soma das contribuições
+    só fecha com todas as árvores), então a decisão é tomada antes, pela média móvel do custo medido neste processo.
+    """
+
+    def __init__(self, budget_ms=EXPLANATION_LATENCY_BUDGET_MS, probe_every=EXPLANATION_PROBE_EVERY):
+        self.budget_ms = budget_ms
+        self.probe_every = probe_every
+        self.estimate_ms = None
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    def skip_reason(self, deadline=None):
+        """Motivo para responder sem explicação (custo estimado acima do orçamento ou do prazo restante), ou None."""
+        remaining_ms = deadline.remaining_ms() if deadline is not None else float("inf")
+        with self._lock:
+            if self.estimate_ms is None or self.estimate_ms <= min(self.budget_ms, remaining_ms):
+                return None
+            if self.estimate_ms > remaining_ms:
+                return f"custo estimado {self.estimate_ms:.1f} ms acima do prazo restante ({remaining_ms:.1f} ms)"
+            # Acima só do orçamento: de tempos em tempos explica mesmo assim, para a estimativa poder baixar
+            self._skipped += 1
+            if self._skipped >= self.probe_every:
+                self._skipped = 0
+                return None
+            return f"custo estimado {self.estimate_ms:.1f} ms acima do orçamento ({self.budget_ms:.1f} ms)"
+
+    def record(self, elapsed_ms):
+        with self._lock:
+            self.estimate_ms = elapsed_ms if self.estimate_ms is None else (
+                EXPLANATION_COST_ALPHA * elapsed_ms + (1 - EXPLANATION_COST_ALPHA) * self.estimate_ms)
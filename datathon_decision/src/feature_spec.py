@@ -0,0 +1,252 @@
+"""
+Extrator de features compilado a partir de FEATURE_SPEC (config.py).
+
+Cada feature é declarada como uma operação sobre campos brutos ou sobre features anteriores. O FeatureExtractor
+resolve a spec uma vez (ordem, dependências, termos normalizados) e percorre os registros do DataFrame mesclado
+uma única vez, calculando todas as features de linha e gravando em arrays pré-alocados, sem Series intermediárias.
+Cada operação guarda o resultado por valor de entrada (no DataFrame mesclado, os campos da vaga e do candidato se
+repetem em muitas linhas e são calculados uma vez). As similaridades textuais são calculadas em lote depois da
+passada (TextSimilarityEngine.rowwise_similarity).
+
+O mesmo extrator (get_feature_extractor, um por processo) é usado no treino, no batch scoring e na API, via
+preprocess_utils.engineer_features.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from datathon_decision.src.config import FEATURE_SPEC
+from datathon_decision.src.preprocess_utils import (
+    nested_column, value_or_default, normalize_text, map_level, compare_levels,
+)
+
+# Textos normalizados recentes, compartilhados entre as operações (o CV de uma linha é usado por várias features)
+_normalized_text = lru_cache(maxsize=1024)(normalize_text)
+
+# Operações de linha: fábrica(spec) -> função dos valores de entrada, e o dtype do array de saída
+ROW_OPS = {}
+# Operações em lote, calculadas depois da passada pelos registros
+BATCH_OPS = {"similarity"}
+
+
+def row_op(name, dtype=object):
+    """Registra a fábrica de uma operação de linha de FEATURE_SPEC."""
+    def register(factory):
+        ROW_OPS[name] = (factory, dtype)
+        return factory
+    return register
+
+
+@row_op("level")
+def _level(spec):
+    levels = spec["levels"]
+    return lambda value: map_level(value_or_default(value), levels)
+
+
+@row_op("equals")
+def _equals(spec):
+    expected = spec["value"]
+    yes, no = spec.get("labels", ("1", "0"))
+    return lambda value: yes if normalize_text(value_or_default(value)) == expected else no
+
+
+@row_op("first_item")
+def _first_item(spec):
+    separators = spec["separators"]
+
+    def first_item(value):
+        value = value_or_default(value)
+        if not isinstance(value, str):
+            return normalize_text("DESCONHECIDO")
+        for separator in separators:
+            value = value.split(separator)[0]
+        return normalize_text(value)
+    return first_item
+
+
+def _joined_text(values):
+    """Textos dos campos com a semântica de field_values(..., ''): um campo é usado como está, vários são unidos por espaço."""
+    if len(values) == 1:
+        return value_or_default(values[0], "")
+    return " ".join(value_or_default(value, "") for value in values)
+
+
+@row_op("keyword_count", dtype=np.int64)
+def _keyword_count(spec):
+    # Quantos termos (normalizados uma vez) aparecem como substring do texto normalizado
+    keywords = [normalize_text(keyword) for keyword in spec["keywords"]]
+
+    def keyword_count(*values):
+        text = _joined_text(values)
+        text = _normalized_text(text) if isinstance(text, str) else "desconhecido"
+        if text == "desconhecido":
+            return 0
+        return sum(keyword in text for keyword in keywords)
+    return keyword_count
+
+
+@row_op("contains_any")
+def _contains_any(spec):
+    keywords = [normalize_text(keyword) for keyword in spec["keywords"]]
+
+    def contains_any(*values):
+        text = _joined_text(values)
+        text = _normalized_text(text) if isinstance(text, str) else "desconhecido"
+        return "1" if any(keyword in text for keyword in keywords) else "0"
+    return contains_any
+
+
+@row_op("normalized_text")
+def _normalized(spec):
+    # Interna: texto das operações em lote, com a semântica de field_values(..., '').apply(normalize_text)
+    def normalized(value):
+        value = value_or_default(value, "")
+        return _normalized_text(value) if isinstance(value, str) else "desconhecido"
+    return normalized
+
+
+@row_op("compare_levels")
+def _compare_levels(spec):
+    return compare_levels
+
+
+@row_op("same")
+def _same(spec):
+    return lambda a, b: "1" if a == b else "0"
+
+
+@row_op("text_length", dtype=np.int64)
+def _text_length(spec):
+    return lambda value: len(value) if isinstance(value, str) else 0
+
+
+@row_op("list_length", dtype=np.int64)
+def _list_length(spec):
+    return lambda value: len(value) if isinstance(value, list) else 0
+
+
+@row_op("number", dtype=np.float64)
+def _number(spec):
+    def number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+    return number
+
+
+def field_column(field):
+    """Coluna do DataFrame de um campo da spec: (seção, campo) projetado ou nome de primeiro nível."""
+    return nested_column(*field) if isinstance(field, tuple) else field
+
+
+def _column_values(df, column):
+    """Valores da coluna como array object, com os ausentes (NaN/None) como None; coluna inexistente = só None."""
+    if column not in df.columns:
+        return np.full(len(df), None, dtype=object)
+    values = df[column].to_numpy(dtype=object, copy=True)
+    values[pd.isna(values)] = None
+    return values
+
+
+def _text_column_name(field):
+    """Nome interno do texto normalizado de um campo usado em lote (não vira feature)."""
+    return f"_texto_normalizado:{field}"
+
+
+class FeatureExtractor:
+    """FEATURE_SPEC compilada: plano das operações de linha (uma passada) e das operações em lote."""
+
+    def __init__(self, spec=FEATURE_SPEC):
+        self.fields_ = []
+        self.row_steps_ = []
+        self.batch_steps_ = []
+        declared = set()
+        for feature in spec:
+            name, op = feature["name"], feature["op"]
+            if name in declared:
+                raise ValueError(f"Feature '{name}' declarada mais de uma vez em FEATURE_SPEC.")
+            row_features = {step[0] for step in self.row_steps_}
+            for dependency in feature.get("features", []):
+                if dependency not in row_features:
+                    raise ValueError(f"Feature '{name}' depende de '{dependency}', que não é uma feature de linha declarada antes dela.")
+            declared.add(name)
+
+            fields = [field_column(field) for field in feature.get("fields", [])]
+            if op in BATCH_OPS:
+                keys = feature.get("keys", [None] * len(fields))
+                if len(fields) != 2 or len(keys) != 2 or feature.get("features"):
+                    raise ValueError(f"Feature '{name}': '{op}' usa exatamente dois campos brutos (e duas keys).")
+                # Os textos normalizados saem da mesma passada (o CV já normalizado pelas outras features é reaproveitado)
+                for field in fields:
+                    if _text_column_name(field) not in row_features:
+                        self._add_row_step(_text_column_name(field), "normalized_text", [field], [], {})
+                        row_features.add(_text_column_name(field))
+                self.batch_steps_.append((name, op, fields, keys))
+            elif op in ROW_OPS:
+                self._add_row_step(name, op, fields, feature.get("features", []), feature)
+            else:
+                raise ValueError(f"Feature '{name}': operação '{op}' desconhecida (disponíveis: {sorted(ROW_OPS) + sorted(BATCH_OPS)}).")
+
+        # Posição de cada entrada no vetor de valores da linha: campos brutos primeiro, depois as features de linha
+        positions = {("field", field): i for i, field in enumerate(self.fields_)}
+        positions.update({("feature", name): len(self.fields_) + i for i, (name, *_) in enumerate(self.row_steps_)})
+        self._plan = [(len(self.fields_) + i, [positions[key] for key in inputs], func, dtype)
+                      for i, (name, inputs, func, dtype) in enumerate(self.row_steps_)]
+
+    def _add_row_step(self, name, op, fields, features, spec):
+        factory, dtype = ROW_OPS[op]
+        self.fields_.extend(field for field in dict.fromkeys(fields) if field not in self.fields_)
+        inputs = [("field", field) for field in fields] + [("feature", feature) for feature in features]
+        self.row_steps_.append((name, inputs, factory(spec), dtype))
+
+    @property
+    def feature_names(self):
+        row_names = [name for name, *_ in self.row_steps_ if not name.startswith("_")]
+        return row_names + [name for name, *_ in self.batch_steps_]
+
+    def extract_records(self, df):
+        """Features de linha em uma passada pelos registros; retorna {feature: array} (com os textos internos do lote)."""
+        n_rows, n_fields = len(df), len(self.fields_)
+        columns = [_column_values(df, field) for field in self.fields_]
+        outputs = [np.empty(n_rows, dtype=dtype) for _, _, _, dtype in self._plan]
+        # (posição, entradas, função, cache por valor de entrada, array de saída)
+        plan = [(slot, inputs[0] if len(inputs) == 1 else inputs, len(inputs) == 1, func, {}, out)
+                for (slot, inputs, func, _), out in zip(self._plan, outputs)]
+        values = [None] * (n_fields + len(plan))
+        for i, record in enumerate(zip(*columns)):
+            values[:n_fields] = record
+            for slot, inputs, single, func, cache, out in plan:
+                key = values[inputs] if single else tuple([values[j] for j in inputs])
+                try:
+                    result = cache[key]
+                except KeyError:
+                    result = cache[key] = func(key) if single else func(*key)
+                except TypeError:
+                    # Entrada não hashable (ex.: lista de experiências): calculada sem cache
+                    result = func(key) if single else func(*key)
+                values[slot] = result
+                out[i] = result
+        return {name: out for (name, *_), out in zip(self.row_steps_, outputs)}
+
+    def extract_batch(self, df, records, similarity_engine):
+        """
+        Similaridades em lote sobre os textos normalizados de extract_records (removidos de records);
+        retorna {feature: array}.
+        """
+        results = {}
+        for name, _, fields, keys in self.batch_steps_:
+            texts_a, texts_b = (records[_text_column_name(field)] for field in fields)
+            keys_a, keys_b = (df[key] if key is not None and key in df.columns else None for key in keys)
+            results[name] = similarity_engine.rowwise_similarity(texts_a, texts_b, keys_a=keys_a, keys_b=keys_b)
+        for name in [name for name in records if name.startswith("_")]:
+            del records[name]
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_feature_extractor():
+    """FEATURE_SPEC compilada uma vez por processo (treino, batch scoring e API usam a mesma)."""
+    return FeatureExtractor(FEATURE_SPEC)
@@ -0,0 +1,205 @@
+"""
+Retreino incremental do RandomForest: em vez de refazer as 100 árvores com todo o histórico, carrega o
+modelo publicado e acrescenta árvores (warm_start) treinadas só nas linhas novas ou com rótulo alterado
+do split de treino (mais uma amostra de linhas antigas, para as árvores novas não verem só o recorte
+recente). As árvores mais antigas acima de INCREMENTAL_MAX_TREES são descartadas.
+
+O candidato é avaliado contra o modelo atual na validação (sem as linhas que o modelo atual já viu):
+se uma métrica de INCREMENTAL_GUARD_METRICS cair mais que INCREMENTAL_MAX_METRIC_DROP, ou se o
+incremental não for possível (colunas de treino mudaram, sem hash das linhas de treino, backend sem
+warm start), é feito o retreino completo (train_model).
+
+O modelo publicado (publish_model) é registrado como saída da etapa train do pipeline_runner e as etapas seguintes
+são refeitas na hora (evaluate e distill, o modelo do tier "fast"): o próximo pipeline_runner restaura este modelo
+do cache em vez do último treino completo.
+
+Pré-requisito: splits processados com os dados novos (pipeline_runner [raw_dir] --until encode_split).
+
+Uso: python -m datathon_decision.src.incremental_training [raw_dir] [--new-trees N] [--max-trees N] [--full]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from datathon_decision.src.config import (
+    MODEL_PATH, RAW_DATA_DIR, PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME, TRAINING_ROWS_PATH, RANDOM_STATE,
+    INCREMENTAL_MIN_NEW_TREES, INCREMENTAL_MAX_TREES, INCREMENTAL_REPLAY_RATIO, INCREMENTAL_GUARD_METRICS,
+    INCREMENTAL_MAX_METRIC_DROP, INCREMENTAL_REPORT_PATH,
+)
+from datathon_decision.src.dataset_utils import load_processed_split, row_digests
+from datathon_decision.src.model_backends import get_model_backend
+from datathon_decision.src.model_utils import train_model, evaluate_model, publish_model
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalNotPossible(Exception):
+    """O modelo publicado não pode ser estendido: o retreino completo é necessário."""
+
+
+def incremental_rows(train_digests, trained_digests, replay_ratio=INCREMENTAL_REPLAY_RATIO, random_state=RANDOM_STATE):
+    """Posições do split de treino para as árvores novas: linhas novas + amostra das já vistas."""
+    is_new = ~np.isin(train_digests, trained_digests)
+    new_positions = np.flatnonzero(is_new)
+    old_positions = np.flatnonzero(~is_new)
+    n_replay = min(len(old_positions), int(round(len(new_positions) * replay_ratio)))
+    replay = np.random.default_rng(random_state).choice(old_positions, size=n_replay, replace=False)
+    return new_positions, np.sort(np.concatenate([new_positions, replay]))
+
+
+def trees_to_add(n_trees, n_new_rows, n_train_rows, min_new_trees=INCREMENTAL_MIN_NEW_TREES):
+    """Árvores novas proporcionais à fração de linhas novas do treino."""
+    return max(min_new_trees, int(np.ceil(n_trees * n_new_rows / max(n_train_rows, 1))))
+
+
+def extend_forest(model, X, y, new_trees, max_trees=INCREMENTAL_MAX_TREES, y_full=None):
+    """
+    Acrescenta new_trees árvores treinadas em (X, y) e descarta as mais antigas acima de max_trees.
+    Com class_weight='balanced', os pesos vêm de y_full (o treino inteiro), não só das linhas do ajuste.
+    """
+    from sklearn.utils.class_weight import compute_class_weight
+    class_weight = model.class_weight
+    if class_weight == "balanced" and y_full is not None:
+        weights = compute_class_weight("balanced", classes=model.classes_, y=np.asarray(y_full))
+        model.set_params(class_weight=dict(zip(model.classes_, weights)))
+    n_before = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=n_before + new_trees)
+    model.fit(X, y)
+    retired = max(0, len(model.estimators_) - max_trees) if max_trees else 0
+    if retired:
+        model.estimators_ = model.estimators_[retired:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_), class_weight=class_weight)
+    return retired
+
+
+def _metric_drops(baseline, candidate):
+    return {name: baseline[name] - candidate.get(name, 0.0) for name in INCREMENTAL_GUARD_METRICS if name in baseline}
+
+
+def _validation_subset(X_val, y_val, trained_digests):
+    """Validação sem as linhas que o modelo atual viu no treino (o split muda quando chegam dados novos)."""
+    unseen = ~np.isin(row_digests(X_val, y_val), trained_digests)
+    if len(np.unique(y_val[unseen])) < 2:
+        logger.warning("Validação sem linhas inéditas das duas classes: usando o split de validação inteiro.")
+        return X_val, y_val
+    return X_val[unseen], y_val[unseen]
+
+
+def sync_pipeline(raw_data_dir, report):
+    """
+    Registra o modelo publicado como saída da etapa train e roda as etapas seguintes (evaluate, distill). Com
+    features/encode_split fora do cache (splits gerados sem o pipeline_runner), só a destilação é refeita.
+    """
+    from datathon_decision.src import pipeline_runner
+    manifest = pipeline_runner.record_stage_outputs("train", raw_data_dir, result={"published_by": "incremental_training",
+                                                                                    "mode": report["mode"]})
+    if manifest is None:
+        logger.warning("Splits processados sem manifesto do pipeline_runner para estes dados: o modelo não entra no "
+                       "cache (o próximo pipeline_runner refaz o treino completo). Refazendo só a destilação.")
+        from datathon_decision.src.distillation import distill
+        distill()
+        report["pipeline_stages"] = {"distill": "executada"}
+        return
+    summary = pipeline_runner.run_pipeline(raw_data_dir)
+    report["pipeline_stages"] = {row["stage"]: row["status"] for row in summary}
+
+
+def retrain_incremental(new_trees=None, max_trees=INCREMENTAL_MAX_TREES, force_full=False, raw_data_dir=RAW_DATA_DIR):
+    """Retreino incremental com fallback para o completo; retorna o relatório (também gravado em INCREMENTAL_REPORT_PATH)."""
+    report = {"timestamp": datetime.now().isoformat(), "mode": "incremental", "fallback_reason": None}
+    start = time.perf_counter()
+    X_train, y_train = load_processed_split(PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, mmap_mode="r")
+    X_val, y_val = load_processed_split(PROCESSED_DATA_DIR, VAL_SPLIT_NAME, mmap_mode="r")
+    train_digests = row_digests(X_train, y_train)
+    try:
+        if force_full:
+            raise IncrementalNotPossible("retreino completo solicitado (--full)")
+        if not get_model_backend().supports_packed:
+            raise IncrementalNotPossible(f"backend '{get_model_backend().name}' sem warm start de árvores")
+        if not os.path.exists(MODEL_PATH) or not os.path.exists(TRAINING_ROWS_PATH):
+            raise IncrementalNotPossible("sem modelo publicado ou sem o hash das linhas de treino")
+        model = joblib.load(MODEL_PATH)
+        if list(getattr(model, "feature_names_in_", [])) != list(X_train.columns):
+            raise IncrementalNotPossible("as colunas de treino mudaram (nova codificação das categóricas)")
+        trained_digests = np.load(TRAINING_ROWS_PATH)
+        new_positions, positions = incremental_rows(train_digests, trained_digests)
+        report.update(train_rows=int(len(X_train)), new_rows=int(len(new_positions)), fit_rows=int(len(positions)))
+        if len(new_positions) == 0:
+            logger.info("Nenhuma linha nova ou alterada no split de treino: o modelo publicado é mantido.")
+            report.update(mode="unchanged", published=False, seconds=time.perf_counter() - start)
+            return _save_report(report)
+        if len(np.unique(y_train.iloc[positions])) < 2:
+            raise IncrementalNotPossible("linhas novas + amostra antiga sem as duas classes")
+
+        X_check, y_check = _validation_subset(X_val, y_val, trained_digests)
+        report["validation_rows"] = int(len(X_check))
+        report["baseline_metrics"] = {k: float(v) for k, v in evaluate_model(model, X_check, y_check).items()}
+
+        n_trees = len(model.estimators_)
+        new_trees = new_trees or trees_to_add(n_trees, len(new_positions), len(X_train))
+        fit_start = time.perf_counter()
+        retired = extend_forest(model, X_train.iloc[positions], y_train.iloc[positions], new_trees, max_trees, y_train)
+        report.update(fit_seconds=time.perf_counter() - fit_start, added_trees=new_trees, retired_trees=retired,
+                      n_trees=len(model.estimators_))
+        report["candidate_metrics"] = {k: float(v) for k, v in evaluate_model(model, X_check, y_check).items()}
+        drops = _metric_drops(report["baseline_metrics"], report["candidate_metrics"])
+        degraded = {name: drop for name, drop in drops.items() if drop > INCREMENTAL_MAX_METRIC_DROP}
+        if degraded:
+            raise IncrementalNotPossible(f"métricas pioraram além de {INCREMENTAL_MAX_METRIC_DROP}: {degraded}")
+        publish_model(model, np.concatenate([trained_digests, train_digests[new_positions]]))
+    except IncrementalNotPossible as e:
+        logger.warning(f"Retreino incremental não aplicado ({e}): fazendo o retreino completo.")
+        report.update(mode="full", fallback_reason=str(e))
+        fit_start = time.perf_counter()
+        model = train_model(X_train, y_train)
+        report.update(fit_seconds=time.perf_counter() - fit_start, n_trees=len(model.estimators_)
+                      if hasattr(model, "estimators_") else None)
+        report["metrics"] = {k: float(v) for k, v in evaluate_model(model, X_val, y_val).items()}
+    report.update(published=True, seconds=time.perf_counter() - start)
+    sync_pipeline(raw_data_dir, report)
+    return _save_report(report)
+
+
+def _save_report(report, path=None):
+    with open(path or INCREMENTAL_REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Retreino incremental (warm start) do RandomForest publicado.")
+    parser.add_argument("raw_data_dir", nargs="?", default=str(RAW_DATA_DIR),
+                        help="Dados brutos usados no pipeline_runner --until encode_split")
+    parser.add_argument("--new-trees", type=int, help="Árvores novas (padrão: proporcional à fração de linhas novas)")
+    parser.add_argument("--max-trees", type=int, default=INCREMENTAL_MAX_TREES, help="Descarta as mais antigas acima disso (0 = sem limite)")
+    parser.add_argument("--full", action="store_true", help="Força o retreino completo")
+    args = parser.parse_args()
+
+    report = retrain_incremental(new_trees=args.new_trees, max_trees=args.max_trees, force_full=args.full,
+                                 raw_data_dir=args.raw_data_dir)
+    if report["mode"] == "unchanged":
+        print("✅ Nada a retreinar: nenhuma linha nova ou alterada.")
+    elif report["mode"] == "incremental":
+        print(f"✅ Incremental: {report['new_rows']} linhas novas ({report['fit_rows']} no ajuste), "
+              f"+{report['added_trees']} / -{report['retired_trees']} árvores -> {report['n_trees']} | "
+              f"ajuste em {report['fit_seconds']:.2f}s")
+        for name in INCREMENTAL_GUARD_METRICS:
+            if name in report["baseline_metrics"]:
+                print(f"   {name}: {report['baseline_metrics'][name]:.4f} -> {report['candidate_metrics'][name]:.4f}")
+    else:
+        print(f"⚠️  Retreino completo ({report['fallback_reason']}) em {report['fit_seconds']:.2f}s")
+    print(f"📊 Relatório salvo em {INCREMENTAL_REPORT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
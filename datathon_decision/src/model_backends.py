@@ -0,0 +1,115 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from datathon_decision.src.config import (
+    MODEL_BACKEND, MODEL_BACKEND_PARAMS, CATEGORICAL_FEATURES, CATEGORICAL_ENCODING, HASHING_ENCODER_BUCKETS,
+)
+
+# Codificação das CATEGORICAL_FEATURES esperada por cada backend:
+# - "onehot": uma coluna 0/1 por categoria (OneHotEncoder)
+# - "ordinal": uma coluna por feature com o código da categoria (OrdinalEncoder); desconhecidas viram -1,
+#   que o HistGradientBoosting trata como valor ausente
+# - "hashing": largura fixa, sem vocabulário (HashingCategoricalEncoder); só via CATEGORICAL_ENCODING
+CATEGORICAL_ENCODINGS = ("onehot", "ordinal", "hashing")
+# O HistGradientBoosting aceita no máximo 255 categorias por feature (max_bins); as raras são agrupadas
+ORDINAL_MAX_CATEGORIES = 255
+# Nome das colunas do HashingCategoricalEncoder ('hash_<bucket>')
+HASHED_COLUMN_PREFIX = "hash_"
+
+
+class ModelBackend:
+    """Backend de modelo: como construir o estimador e que codificação das categóricas ele consome."""
+
+    def __init__(self, name, build, categorical_encoding, supports_packed=False):
+        self.name = name
+        self._build = build
+        self.categorical_encoding = categorical_encoding
+        self.supports_packed = supports_packed
+
+    def build(self, feature_names, params=None):
+        """Instancia o estimador (não treinado) para as colunas feature_names."""
+        params = dict(MODEL_BACKEND_PARAMS.get(self.name, {}) if params is None else params)
+        return self._build(list(feature_names), params)
+
+    def __repr__(self):
+        return f"ModelBackend(name='{self.name}', categorical_encoding='{self.categorical_encoding}')"
+
+
+def _build_random_forest(feature_names, params):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(**params)
+
+
+def _build_hist_gradient_boosting(feature_names, params):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    categorical = [c for c in feature_names if c in CATEGORICAL_FEATURES]
+    return HistGradientBoostingClassifier(categorical_features=categorical or None, **params)
+
+
+MODEL_BACKENDS = {
+    "random_forest": ModelBackend("random_forest", _build_random_forest, "onehot", supports_packed=True),
+    "hist_gradient_boosting": ModelBackend("hist_gradient_boosting", _build_hist_gradient_boosting, "ordinal"),
+}
+
+
+class HashingCategoricalEncoder:
+    """
+    Cada par (feature, valor) soma 1 num de n_buckets buckets (blake2b de '<feature>=<valor>'). A largura é fixa
+    e não há vocabulário ajustado: valores novos não mudam as colunas e a predição não precisa de alinhamento,
+    ao custo de colisões (pares diferentes no mesmo bucket ficam indistinguíveis para o modelo).
+    """
+
+    # preprocess_data_split_save pula o alinhamento com training_cols para encoders de largura fixa
+    fixed_width = True
+
+    def __init__(self, n_buckets=HASHING_ENCODER_BUCKETS):
+        self.n_buckets = n_buckets
+
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.asarray(list(X.columns), dtype=object)
+        return self
+
+    def transform(self, X):
+        encoded = np.zeros((len(X), self.n_buckets))
+        rows = np.arange(len(X))
+        for feature in X.columns:
+            # Um hash por valor distinto da coluna, não por linha
+            codes, uniques = pd.factorize(X[feature].astype(str))
+            buckets = np.array([self.bucket(feature, value) for value in uniques], dtype=np.int64)
+            np.add.at(encoded, (rows, buckets[codes]), 1.0)
+        return encoded
+
+    def bucket(self, feature, value):
+        digest = hashlib.blake2b(f"{feature}={value}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.n_buckets
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"{HASHED_COLUMN_PREFIX}{i}" for i in range(self.n_buckets)], dtype=object)
+
+
+def get_model_backend(name=None):
+    """Backend pelo nome (padrão: MODEL_BACKEND do config)."""
+    name = name or MODEL_BACKEND
+    if name not in MODEL_BACKENDS:
+        raise ValueError(f"Backend de modelo desconhecido: '{name}'. Use um de {sorted(MODEL_BACKENDS)}.")
+    return MODEL_BACKENDS[name]
+
+
+def categorical_encoding_for(backend=None):
+    """Codificação usada no treino: CATEGORICAL_ENCODING do config, se definida, senão a do backend."""
+    return CATEGORICAL_ENCODING or (backend or get_model_backend()).categorical_encoding
+
+
+def make_categorical_encoder(encoding):
+    """Encoder (não treinado) das CATEGORICAL_FEATURES para a codificação pedida."""
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+    if encoding == "hashing":
+        return HashingCategoricalEncoder(HASHING_ENCODER_BUCKETS)
+    if encoding == "onehot":
+        return OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+    if encoding == "ordinal":
+        return OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+                              encoded_missing_value=-1, max_categories=ORDINAL_MAX_CATEGORIES)
+    raise ValueError(f"Codificação categórica inválida: '{encoding}'. Use uma de {CATEGORICAL_ENCODINGS}.")
@@ -0,0 +1,232 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from datathon_decision.src.config import (
+    SERVING_MODELS, SERVING_TRAFFIC, SHADOW_MODELS, SHADOW_QUEUE_SIZE, SHADOW_LOG_PATH, DRIFT_REFERENCE_PATH,
+    SERVING_TIERS, SERVING_TIER,
+)
+from datathon_decision.src.drift_utils import DriftMonitor
+from datathon_decision.src.model_utils import (
+    load_artifacts, load_model_bundle, engineer_payload_features, encode_model_input,
+)
+
+logger = logging.getLogger(__name__)
+
+# Nome do modelo carregado de MODELS_DIR (load_artifacts)
+DEFAULT_MODEL_NAME = "default"
+# Nome do modelo destilado do default (tier "fast"), quando existe (distillation.py)
+DISTILLED_MODEL_NAME = "distilled"
+
+
+def parse_traffic(spec):
+    """'default:0.9,rf_v2:0.1' -> {'default': 0.9, 'rf_v2': 0.1} (pesos normalizados)."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition(":")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if not weights or total <= 0:
+        raise ValueError(f"SERVING_TRAFFIC inválido: '{spec}'.")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def _shadow_logger():
+    shadow_logger = logging.getLogger("datathon_decision.shadow")
+    if not shadow_logger.handlers:
+        handler = logging.FileHandler(SHADOW_LOG_PATH, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        shadow_logger.addHandler(handler)
+        shadow_logger.setLevel(logging.INFO)
+        shadow_logger.propagate = False
+    return shadow_logger
+
+
+class ModelRegistry:
+    """
+    Vários modelos servidos ao mesmo tempo. Cada requisição calcula as features uma vez por motor de
+    similaridade e codifica uma vez por encoder: modelos com os mesmos artefatos de pré-processamento
+    reaproveitam a mesma entrada. No tier "full" responde com um modelo escolhido pelos pesos de tráfego; no
+    tier "fast", com o modelo destilado. Os shadows (e a atualização dos sketches de drift) vão para uma fila
+    limitada, processada por um thread em background.
+    """
+
+    def __init__(self, bundles, traffic, shadows=(), queue_size=SHADOW_QUEUE_SIZE, drift_monitor=None):
+        unknown = (set(traffic) | set(shadows)) - set(bundles)
+        if unknown:
+            raise ValueError(f"Modelos sem artefatos configurados: {sorted(unknown)}. Disponíveis: {sorted(bundles)}.")
+        self.bundles = bundles
+        self.traffic = traffic
+        self.shadows = [name for name in shadows if name in bundles]
+        self.queue_size = queue_size
+        self.drift_monitor = drift_monitor
+        self._arms = list(traffic.items())
+        self._stats = {"shadow_scored": 0, "shadow_dropped": 0, "shadow_errors": 0, "shadow_ms_total": 0.0, "drift_dropped": 0}
+        self._stats_lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+
+    @classmethod
+    def from_config(cls):
+        """Registry a partir do config: 'default' (load_artifacts) + SERVING_MODELS."""
+        from datathon_decision.src.distillation import load_distilled_model
+        bundles = {DEFAULT_MODEL_NAME: load_artifacts()}
+        # O aluno usa as mesmas features e codificação do default (mesmas chaves: a entrada é reaproveitada)
+        distilled = load_distilled_model()
+        if distilled is not None:
+            bundles[DISTILLED_MODEL_NAME] = dict(bundles[DEFAULT_MODEL_NAME], model=distilled, backend=f"distilled_{distilled.kind}")
+        for name, spec in SERVING_MODELS.items():
+            bundles[name] = load_model_bundle(spec["dir"], spec.get("backend"))
+        return cls(bundles, parse_traffic(SERVING_TRAFFIC), SHADOW_MODELS, drift_monitor=DriftMonitor.load(DRIFT_REFERENCE_PATH))
+
+    def route(self, input_data_dict, tier=None):
+        """Modelo que responde: o destilado no tier "fast"; no "full", sorteio pelos pesos (estável para o mesmo payload)."""
+        tier = tier or SERVING_TIER
+        if tier not in SERVING_TIERS:
+            raise ValueError(f"Tier inválido: '{tier}'. Use um de {list(SERVING_TIERS)}.")
+        if tier == "fast":
+            if DISTILLED_MODEL_NAME not in self.bundles:
+                raise ValueError("Tier 'fast' indisponível: modelo destilado não encontrado ou destilado de outro "
+                                 "modelo publicado (rode python -m datathon_decision.src.distillation).")
+            return DISTILLED_MODEL_NAME
+        if len(self._arms) == 1:
+            return self._arms[0][0]
+        digest = hashlib.md5(json.dumps(input_data_dict, sort_keys=True, default=str).encode("utf-8")).digest()
+        point = int.from_bytes(digest[:8], "big") / 2 ** 64
+        cumulative = 0.0
+        for name, weight in self._arms:
+            cumulative += weight
+            if point < cumulative:
+                return name
+        return self._arms[-1][0]
+
+    def model_input(self, name, input_data_dict, features_cache, encoded_cache, deadline=None):
+        """
+        Entrada do modelo `name`, reaproveitando features/codificação já calculadas na requisição.
+        Com deadline (admission_utils.Deadline), o prazo é conferido antes de cada etapa.
+        """
+        bundle = self.bundles[name]
+        if bundle["encoding_key"] not in encoded_cache:
+            if bundle["features_key"] not in features_cache:
+                if deadline is not None:
+                    deadline.check("features")
+                features_cache[bundle["features_key"]] = engineer_payload_features(input_data_dict, bundle)
+            if deadline is not None:
+                deadline.check("codificacao")
+            encoded_cache[bundle["encoding_key"]] = encode_model_input(features_cache[bundle["features_key"]], bundle)
+        return encoded_cache[bundle["encoding_key"]]
+
+    def score(self, name, X):
+        model = self.bundles[name]["model"]
+        classes = list(model.classes_)
+        return float(model.predict_proba(X)[0, classes.index(1) if 1 in classes else -1])
+
+    def predict(self, input_data_dict, tier=None, deadline=None):
+        """
+        Retorna (probabilidade, nome do modelo que respondeu). Os shadows e a atualização dos sketches
+        de drift vão para a fila de background sem bloquear a resposta.
+        """
+        name = self.route(input_data_dict, tier)
+        features_cache, encoded_cache = {}, {}
+        X = self.model_input(name, input_data_dict, features_cache, encoded_cache, deadline)
+        if deadline is not None:
+            deadline.check("modelo")
+        probability = self.score(name, X)
+        if self.drift_monitor is not None:
+            self._submit(functools.partial(self.drift_monitor.observe, features_cache[self.bundles[name]["features_key"]]),
+                         "drift_dropped")
+        shadows = [shadow for shadow in self.shadows if shadow != name]
+        if shadows:
+            record = {"timestamp": datetime.now().isoformat(), "model": name, "probability": probability}
+            self._submit(functools.partial(self._score_shadows, record, input_data_dict, shadows, features_cache, encoded_cache),
+                         "shadow_dropped", len(shadows))
+        return probability, name
+
+    def _submit(self, task, dropped_counter, weight=1):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats[dropped_counter] += weight
+
+    def _ensure_worker(self):
+        # O thread (e a fila, com seus locks) não sobrevive ao fork: cada processo cria os seus
+        if self._pid == os.getpid():
+            return
+        with self._stats_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                threading.Thread(target=self._background_loop, args=(self._queue,), name="registry-background", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _background_loop(self, pending):
+        while True:
+            task = pending.get()
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Erro numa tarefa em background do registry: {e}", exc_info=True)
+            finally:
+                pending.task_done()
+
+    def _score_shadows(self, record, input_data_dict, shadows, features_cache, encoded_cache):
+        shadow_logger = _shadow_logger()
+        for shadow in shadows:
+            start = time.perf_counter()
+            try:
+                probability = self.score(shadow, self.model_input(shadow, input_data_dict, features_cache, encoded_cache))
+            except Exception as e:
+                logger.error(f"Erro ao pontuar o modelo shadow '{shadow}': {e}", exc_info=True)
+                with self._stats_lock:
+                    self._stats["shadow_errors"] += 1
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._stats["shadow_scored"] += 1
+                self._stats["shadow_ms_total"] += elapsed_ms
+            shadow_logger.info(json.dumps(dict(record, shadow_model=shadow, shadow_probability=probability,
+                                               shadow_ms=round(elapsed_ms, 3)), ensure_ascii=False))
+
+    def wait_for_background(self, timeout=10.0):
+        """Espera a fila de background (shadows e drift) esvaziar (para testes e benchmarks)."""
+        deadline = time.perf_counter() + timeout
+        while self._queue is not None and self._queue.unfinished_tasks and time.perf_counter() < deadline:
+            time.sleep(0.005)
+
+    def snapshot(self):
+        """Modelos servidos, pesos de tráfego, shadows e contadores da fila (para /api/models)."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        scored = stats.pop("shadow_ms_total")
+        stats["shadow_avg_ms"] = scored / stats["shadow_scored"] if stats["shadow_scored"] else None
+        stats["background_queue_size"] = self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+        return {
+            "models": {name: {"backend": b["backend"], "features_key": b["features_key"], "encoding_key": b["encoding_key"]}
+                       for name, b in self.bundles.items()},
+            "traffic": self.traffic,
+            "tiers": {"default": SERVING_TIER, "full": list(self.traffic),
+                      "fast": DISTILLED_MODEL_NAME if DISTILLED_MODEL_NAME in self.bundles else None},
+            "shadows": self.shadows,
+            "stats": stats,
+        }
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_model_registry():
+    """Registry do processo, criado na primeira chamada (o warm-up já o cria ao aquecer o modelo)."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                _REGISTRY = ModelRegistry.from_config()
+    return _REGISTRY
@@ -1,11 +1,11 @@
+import hashlib
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, roc_auc_score
 import logging
 import sys
 import os
+import threading
 
 # Adicionando o diretório pai de 'src' ao sys.path para permitir importações relativas
 # Isso é importante para 'from datathon_decision.src.config import ...' funcionar
@@ -15,7 +15,19 @@ import os
 # Se 'datathon_decision' é a raiz do seu projeto e 'src' está dentro dele.
 
 try:
-    from datathon_decision.src.config import MODEL_PATH, PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH
+    from datathon_decision.src.config import (
+        MODEL_PATH, PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH, MODELS_DIR,
+        PREPROCESSOR_NAME, TRAINING_COLUMNS_NAME, SIMILARITY_ENGINE_NAME, PACKED_MODEL_NAME,
+        PACKED_MODEL_DIR, MODEL_ARTIFACT_FORMAT, ARTIFACT_MMAP_MODE,
+        SIMILARITY_ENGINE_PATH, PACKED_MODEL_PRECISION, PACKED_MODEL_COMPRESS, MODEL_PARAMS, MODEL_BACKEND,
+        EXPLANATION_LATENCY_BUDGET_MS, TRAINING_ROWS_PATH
+    )
+    from datathon_decision.src.dataset_utils import row_digests
+    from datathon_decision.src.model_backends import get_model_backend
+    from datathon_decision.src.explain_utils import explain_batch, positive_class_index, ExplanationBudget
+    from datathon_decision.src.artifact_utils import save_packed_forest, load_packed_forest
+    from datathon_decision.src.profiling_utils import profiled
+    from datathon_decision.src.admission_utils import DeadlineExceeded
     # As funções de preprocess_utils são necessárias para o predict_pipeline
     from datathon_decision.src.preprocess_utils import engineer_features, preprocess_data_split_save 
 except ModuleNotFoundError:
@@ -32,23 +44,50 @@ if not logger.hasHandlers():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', stream=sys.stdout)
 
 
+@profiled()
 def train_model(X_train, y_train):
-    """Treina um modelo RandomForestClassifier e o salva."""
-    logger.info(f"Iniciando treinamento do modelo com X_train shape: {X_train.shape}")
-    # Adicionado class_weight='balanced' para ajudar com classes desbalanceadas
-    model = RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced')
+    """Treina o modelo do backend configurado (MODEL_BACKEND, padrão RandomForest) e o salva."""
+    backend = get_model_backend()
+    logger.info(f"Iniciando treinamento do modelo ({backend.name}) com X_train shape: {X_train.shape}")
+    # MODEL_PARAMS inclui class_weight='balanced' para ajudar com classes desbalanceadas
+    model = backend.build(X_train.columns, MODEL_PARAMS)
     model.fit(X_train, y_train)
-    joblib.dump(model, MODEL_PATH)
-    logger.info(f"Modelo salvo em {MODEL_PATH}")
+    publish_model(model, row_digests(X_train, y_train), backend)
     return model
 
+def publish_model(model, training_rows, backend=None):
+    """
+    Grava o modelo, o formato packed e o hash das linhas de treino, cada um em arquivo temporário renomeado
+    por cima do atual: quem carrega os artefatos nunca vê um arquivo pela metade. O conjunto não é atômico: um
+    processo que carrega no meio da publicação (ou uma falha entre as trocas) pode ver o modelo novo com o
+    packed antigo. O hash das linhas vai por último: interrompido antes dele, o retreino incremental seguinte
+    só trata como novas linhas que o modelo já viu.
+    """
+    backend = backend or get_model_backend()
+    # Sem compressão: os arrays podem ser carregados com mmap_mode
+    joblib.dump(model, f"{MODEL_PATH}.tmp", compress=0)
+    os.replace(f"{MODEL_PATH}.tmp", MODEL_PATH)
+    logger.info(f"Modelo salvo em {MODEL_PATH}")
+    if backend.supports_packed:
+        save_packed_forest(model, PACKED_MODEL_DIR, precision=PACKED_MODEL_PRECISION, compress=PACKED_MODEL_COMPRESS)
+        logger.info(f"Modelo (formato packed, {PACKED_MODEL_PRECISION}) exportado em {PACKED_MODEL_DIR}")
+    with open(f"{TRAINING_ROWS_PATH}.tmp", "wb") as f:
+        np.save(f, np.unique(training_rows))
+    os.replace(f"{TRAINING_ROWS_PATH}.tmp", TRAINING_ROWS_PATH)
+
+@profiled()
 def evaluate_model(model, X_val, y_val):
     """Avalia o modelo e retorna um dicionário de métricas."""
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, roc_auc_score
     logger.info(f"Avaliando modelo no conjunto de validação X_val shape: {X_val.shape}")
-    y_pred = model.predict(X_val)
     y_proba = None
     if hasattr(model, 'predict_proba'):
-        y_proba = model.predict_proba(X_val)[:, 1] 
+        # Uma única passada pelo modelo: os rótulos saem das probabilidades (mesma regra de predict)
+        proba = model.predict_proba(X_val)
+        y_pred = model.classes_.take(np.argmax(proba, axis=1), axis=0)
+        y_proba = proba[:, 1]
+    else:
+        y_pred = model.predict(X_val)
     
     acc = accuracy_score(y_val, y_pred)
     prec = precision_score(y_val, y_pred, zero_division=0)
@@ -69,62 +108,81 @@ def evaluate_model(model, X_val, y_val):
         metrics_dict["roc_auc"] = roc_auc
     return metrics_dict
 
-def predict_pipeline(input_data_dict):
+_ARTIFACTS_CACHE = None
+# O warm-up em background e a primeira requisição podem pedir os artefatos ao mesmo tempo
+_ARTIFACTS_LOCK = threading.Lock()
+
+def load_artifacts(reload=False):
+    """
+    Carrega (uma única vez por processo) modelo, OHE e colunas de treino.
+    Com MODEL_ARTIFACT_FORMAT='packed' a floresta é mapeada em memória (mmap); chamando esta
+    função antes do fork (gunicorn --preload) todos os workers compartilham as mesmas páginas.
+    """
+    global _ARTIFACTS_CACHE
+    if _ARTIFACTS_CACHE is not None and not reload:
+        return _ARTIFACTS_CACHE
+    with _ARTIFACTS_LOCK:
+        if _ARTIFACTS_CACHE is None or reload:
+            _ARTIFACTS_CACHE = _load_artifacts_uncached()
+    return _ARTIFACTS_CACHE
+
+def _load_artifacts_uncached(models_dir=None, backend_name=None):
+    """
+    Carrega os artefatos de um diretório com o layout de models/ (padrão: os caminhos do config).
+    Inclui as chaves 'features_key' e 'encoding_key' (hash do motor de similaridade e do encoder +
+    colunas): modelos com a mesma chave podem compartilhar as features calculadas (ver model_registry.py).
+    """
+    backend_name = backend_name or MODEL_BACKEND
+    if models_dir is None:
+        model_path, packed_dir = MODEL_PATH, PACKED_MODEL_DIR
+        preprocessor_path, training_columns_path, similarity_path = PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH, SIMILARITY_ENGINE_PATH
+    else:
+        model_path, packed_dir = os.path.join(models_dir, f"{backend_name}_model.joblib"), os.path.join(models_dir, PACKED_MODEL_NAME)
+        preprocessor_path = os.path.join(models_dir, PREPROCESSOR_NAME)
+        training_columns_path = os.path.join(models_dir, TRAINING_COLUMNS_NAME)
+        similarity_path = os.path.join(models_dir, SIMILARITY_ENGINE_NAME)
+    logger.info(f"Carregando artefatos para predição: MODEL_PATH='{model_path}', PREPROCESSOR_PATH='{preprocessor_path}', TRAINING_COLUMNS_PATH='{training_columns_path}'")
+    if MODEL_ARTIFACT_FORMAT == "packed" and get_model_backend(backend_name).supports_packed and os.path.isdir(packed_dir):
+        model = load_packed_forest(packed_dir, mmap_mode=ARTIFACT_MMAP_MODE)
+        logger.info(f"Modelo packed carregado de {packed_dir} (mmap_mode={ARTIFACT_MMAP_MODE})")
+    else:
+        model = joblib.load(model_path, mmap_mode=ARTIFACT_MMAP_MODE)
+    ohe = joblib.load(preprocessor_path) # OneHotEncoder salvo
+    training_cols = joblib.load(training_columns_path) # Lista de nomes de colunas pós-OHE
+    # Vocabulário/IDF da similaridade textual; opcional (modelos antigos não têm o arquivo)
+    similarity_engine = joblib.load(similarity_path) if os.path.exists(similarity_path) else None
+    features_key = _file_digest(similarity_path) if similarity_engine is not None else "sem_similaridade"
+    encoding_key = f"{features_key}:{_file_digest(preprocessor_path)}:{_file_digest(training_columns_path)}"
+    logger.info(f"Modelo ({backend_name}), encoder das categóricas e colunas de treino ({len(training_cols)}) carregados.")
+    return {"model": model, "ohe": ohe, "training_cols": training_cols, "similarity_engine": similarity_engine,
+            "backend": backend_name, "features_key": features_key, "encoding_key": encoding_key}
+
+def load_model_bundle(models_dir, backend_name=None):
+    """Artefatos de um modelo extra (diretório com o layout de models/), sem passar pelo cache de load_artifacts."""
+    return _load_artifacts_uncached(models_dir, backend_name)
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def predict_pipeline(input_data_dict, tier=None, deadline=None):
     """
     Recebe um dicionário (payload JSON), processa as features e retorna a probabilidade de match.
     Esta função é destinada a ser chamada pela API para uma única predição.
+    tier: "full" (modelo publicado) ou "fast" (modelo destilado); None usa SERVING_TIER.
+    deadline: admission_utils.Deadline conferido antes de cada etapa (DeadlineExceeded se estourar).
     """
+    # O registry responde com o modelo do tier (ou o braço do teste A/B) e agenda os modelos shadow
+    from datathon_decision.src.model_registry import get_model_registry
     try:
-        logger.info(f"Carregando artefatos para predição: MODEL_PATH='{MODEL_PATH}', PREPROCESSOR_PATH='{PREPROCESSOR_PATH}', TRAINING_COLUMNS_PATH='{TRAINING_COLUMNS_PATH}'")
-        model = joblib.load(MODEL_PATH)
-        ohe = joblib.load(PREPROCESSOR_PATH) # OneHotEncoder salvo
-        training_cols = joblib.load(TRAINING_COLUMNS_PATH) # Lista de nomes de colunas pós-OHE
-        logger.info(f"Modelo, OHE e colunas de treino ({len(training_cols)}) carregados.")
-        # logger.debug(f"Colunas de treino carregadas: {training_cols[:10]}...")
-
-
-        df_input = pd.DataFrame([input_data_dict])
-        logger.info(f"DataFrame de entrada para engineer_features (1 linha): \n{df_input.to_string()}")
-
-        X_features_engineered, _ = engineer_features(df_input) # y_target é None aqui
-        logger.info(f"Features após engineer_features (antes de OHE e alinhamento): \n{X_features_engineered.to_string()}")
-        logger.info(f"Shape de X_features_engineered: {X_features_engineered.shape}")
-        logger.info(f"Colunas em X_features_engineered: {X_features_engineered.columns.tolist()}")
-
-
-        X_processed_for_predict, _, _ = preprocess_data_split_save(
-            df_features=X_features_engineered, 
-            series_target=None,             # Target é None para predição
-            out_dir_path=None,              # Não salva dados de treino/val
-            fit_ohe=False,                  # Usa o encoder treinado
-            ohe_encoder=ohe,                # Passa o encoder carregado
-            training_cols_list=training_cols # Passa a lista de colunas para alinhamento
-        )
-        logger.info(f"Features após preprocess_data_split_save (OHE e alinhamento com training_cols): \n{X_processed_for_predict.head().to_string()}")
-        logger.info(f"Shape de X_processed_for_predict: {X_processed_for_predict.shape}")
-        logger.info(f"Colunas em X_processed_for_predict ({len(X_processed_for_predict.columns)}): {X_processed_for_predict.columns.tolist()[:10]}...")
-
-
-        # Checagem final de consistência das colunas (preprocess_data_split_save já deveria ter feito isso)
-        if list(X_processed_for_predict.columns) != training_cols:
-            logger.warning("Desalinhamento de colunas detectado em predict_pipeline APÓS preprocess_data_split_save. Isso não deveria acontecer.")
-            # Tentativa de realinhar como fallback, mas indica um problema na lógica de preprocess_data_split_save
-            temp_df = pd.DataFrame(columns=training_cols, index=X_processed_for_predict.index)
-            for col in training_cols:
-                if col in X_processed_for_predict.columns:
-                    temp_df[col] = X_processed_for_predict[col]
-                else:
-                    temp_df[col] = 0 # Assume que colunas OHE faltantes são 0
-            X_processed_for_predict = temp_df[training_cols]
-            logger.warning(f"Colunas realinhadas à força. Novo shape: {X_processed_for_predict.shape}")
-        
-        prob_positive_class_array = model.predict_proba(X_processed_for_predict)[:, 1]
-        
-        # Se X_processed_for_predict tiver apenas uma linha, prob_positive_class_array será um array com um elemento
-        prediction_result = float(prob_positive_class_array[0])
-        logger.info(f"Probabilidade predita (classe positiva): {prediction_result}")
+        prediction_result, model_name = get_model_registry().predict(input_data_dict, tier, deadline)
+        logger.info(f"Probabilidade predita (classe positiva, modelo '{model_name}'): {prediction_result}")
         return prediction_result
 
+    except DeadlineExceeded as e:
+        logger.warning(f"Predição interrompida: {e}")
+        raise
+
     except FileNotFoundError as e:
         logger.error(f"Erro CRÍTICO em predict_pipeline: Arquivo de modelo/pré-processador não encontrado. {e}", exc_info=True)
         raise 
@@ -133,4 +191,88 @@ def predict_pipeline(input_data_dict):
         raise
     except Exception as e:
         logger.error(f"Erro inesperado em predict_pipeline: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+_EXPLANATION_BUDGET = ExplanationBudget()
+
+def explain_pipeline(input_data_dict, deadline=None, enforce_budget=True):
+    """
+    Como predict_pipeline, mas retorna também a explicação: valor base e contribuição de cada feature
+    original (OHE agregado) para a probabilidade, calculadas pelos caminhos de decisão da floresta.
+    Com enforce_budget, se o custo estimado da explicação não cabe em EXPLANATION_LATENCY_BUDGET_MS (ou no prazo
+    restante), retorna só a probabilidade, com "explanation_skipped" (o warm-up passa False: a primeira explicação
+    monta as tabelas por nó e não representa o custo normal).
+    """
+    artifacts = load_artifacts()
+    X_processed_for_predict = build_model_input(input_data_dict, artifacts)
+    if deadline is not None:
+        deadline.check("explicacao")
+    skip_reason = _EXPLANATION_BUDGET.skip_reason(deadline) if enforce_budget else None
+    if skip_reason is not None:
+        model = artifacts["model"]
+        probability = float(model.predict_proba(X_processed_for_predict)[0, positive_class_index(model)])
+        logger.warning(f"Explicação pulada ({skip_reason}); retornando só a probabilidade.")
+        return {"match_probability": probability, "base_value": None, "contributions": {}, "explain_ms": 0.0,
+                "explanation_skipped": skip_reason}
+    explanations, elapsed_ms = explain_batch(artifacts["model"], X_processed_for_predict)
+    if enforce_budget:
+        _EXPLANATION_BUDGET.record(elapsed_ms)
+    if elapsed_ms > EXPLANATION_LATENCY_BUDGET_MS:
+        logger.warning(f"Explicação levou {elapsed_ms:.1f} ms (orçamento: {EXPLANATION_LATENCY_BUDGET_MS} ms).")
+    result = dict(explanations[0], explain_ms=elapsed_ms, explanation_skipped=None)
+    logger.info(f"Probabilidade predita (classe positiva): {result['match_probability']} | explicação em {elapsed_ms:.2f} ms")
+    return result
+
+def build_model_input(input_data_dict, artifacts):
+    """Payload (dicionário) -> DataFrame de 1 linha com as colunas de treino, pronto para o modelo."""
+    X_features_engineered = engineer_payload_features(input_data_dict, artifacts)
+    return encode_model_input(X_features_engineered, artifacts)
+
+def engineer_payload_features(input_data_dict, artifacts):
+    """Payload (dicionário) -> features engenheiradas (antes da codificação), com o motor de similaridade dos artefatos."""
+    df_input = pd.DataFrame([input_data_dict])
+    # to_string custa mais que a predição do modelo: só com o logger em DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"DataFrame de entrada para engineer_features (1 linha): \n{df_input.to_string()}")
+
+    X_features_engineered, _ = engineer_features(df_input, similarity_engine=artifacts["similarity_engine"]) # y_target é None aqui
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Features após engineer_features (antes de OHE e alinhamento): \n{X_features_engineered.to_string()}")
+    logger.info(f"Shape de X_features_engineered: {X_features_engineered.shape}")
+    logger.info(f"Colunas em X_features_engineered: {X_features_engineered.columns.tolist()}")
+    return X_features_engineered
+
+def encode_model_input(X_features_engineered, artifacts):
+    """Features engenheiradas -> colunas de treino (encoder e alinhamento dos artefatos)."""
+    ohe = artifacts["ohe"]
+    training_cols = artifacts["training_cols"]
+    # logger.debug(f"Colunas de treino carregadas: {training_cols[:10]}...")
+
+    X_processed_for_predict, _, _ = preprocess_data_split_save(
+        df_features=X_features_engineered, 
+        series_target=None,             # Target é None para predição
+        out_dir_path=None,              # Não salva dados de treino/val
+        fit_ohe=False,                  # Usa o encoder treinado
+        ohe_encoder=ohe,                # Passa o encoder carregado
+        training_cols_list=training_cols # Passa a lista de colunas para alinhamento
+    )
+    # to_string custa mais que a predição do modelo: só com o logger em DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Features após preprocess_data_split_save (OHE e alinhamento com training_cols): \n{X_processed_for_predict.head().to_string()}")
+    logger.info(f"Shape de X_processed_for_predict: {X_processed_for_predict.shape}")
+    logger.info(f"Colunas em X_processed_for_predict ({len(X_processed_for_predict.columns)}): {X_processed_for_predict.columns.tolist()[:10]}...")
+
+
+    # Checagem final de consistência das colunas (preprocess_data_split_save já deveria ter feito isso)
+    if list(X_processed_for_predict.columns) != training_cols:
+        logger.warning("Desalinhamento de colunas detectado em predict_pipeline APÓS preprocess_data_split_save. Isso não deveria acontecer.")
+        # Tentativa de realinhar como fallback, mas indica um problema na lógica de preprocess_data_split_save
+        temp_df = pd.DataFrame(columns=training_cols, index=X_processed_for_predict.index)
+        for col in training_cols:
+            if col in X_processed_for_predict.columns:
+                temp_df[col] = X_processed_for_predict[col]
+            else:
+                temp_df[col] = 0 # Assume que colunas OHE faltantes são 0
+        X_processed_for_predict = temp_df[training_cols]
+        logger.warning(f"Colunas realinhadas à força. Novo shape: {X_processed_for_predict.shape}")
+    return X_processed_for_predict
\ No newline at end of file
@@ -0,0 +1,447 @@
+"""
+Runner do pipeline de treino como um DAG de etapas com cache content-addressed.
+
+Etapas: features -> encode_split -> train -> evaluate / distill (modelo do tier rápido). Cada etapa
+declara suas entradas (hash dos arquivos brutos, constantes do config.py, hash do código-fonte dos módulos
+que usa, versões das bibliotecas e o digest das saídas das etapas anteriores) e suas saídas (arquivos
+ou diretórios no layout normal do projeto). O fingerprint das entradas identifica a execução:
+se já existe um manifesto para ele no cache, as saídas são restauradas em vez de recalculadas.
+
+As saídas ficam em PIPELINE_CACHE_DIR/objects/<sha256> (armazenamento por conteúdo, sem
+duplicatas) e PIPELINE_CACHE_DIR/manifests/<etapa>/<fingerprint>.json mapeia caminho -> hash. Quem publica
+saídas de uma etapa fora do runner (retreino incremental) as registra com record_stage_outputs: senão, o próximo
+cache hit da etapa restauraria as saídas antigas por cima delas.
+
+Uso: python -m datathon_decision.src.pipeline_runner [raw_dir] [--force etapa ...] [--until etapa] [--no-cache]
+     [--profile [--cprofile] [--no-trace-memory]]   (etapas em cache não são medidas: use --no-cache para o pipeline inteiro)
+     Com DATATHON_PREPROCESS_CHUNK_ROWS > 0, features e encode_split rodam em blocos (chunked_preprocessing.py).
+"""
+
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import joblib
+
+from datathon_decision.src import config
+from datathon_decision.src.config import (
+    RAW_DATA_DIR, PROCESSED_DATA_DIR, MODELS_DIR, PIPELINE_CACHE_DIR,
+    APPLICANTS_FILE, JOBS_FILE, PROSPECTS_FILE,
+    ENGINEERED_FEATURES_PATH, ENGINEERED_FEATURES_DIR, PREPROCESS_CHUNK_ROWS, VALIDATION_METRICS_PATH,
+    PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH, SIMILARITY_ENGINE_PATH,
+    MODEL_PATH, PACKED_MODEL_DIR, TRAINING_ROWS_PATH, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME, DRIFT_REFERENCE_PATH, PIPELINE_SUMMARY_PATH,
+    DISTILLED_MODEL_PATH, DISTILLATION_REPORT_PATH,
+)
+from datathon_decision.src.model_backends import get_model_backend
+from datathon_decision.src.profiling_utils import profile_session, profile_stage
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_CACHE_VERSION = 1
+HASH_CHUNK_BYTES = 1 << 20
+# Bibliotecas cujas versões entram no fingerprint de todas as etapas
+FINGERPRINT_LIBRARIES = ("numpy", "pandas", "scikit-learn", "scipy", "joblib")
+
+
+class Stage:
+    """Uma etapa do DAG: entradas declaradas (arquivos, constantes do config, código) e saídas."""
+
+    def __init__(self, name, run, outputs, deps=(), input_files=(), config_keys=(), code_modules=()):
+        self.name = name
+        self.run = run
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.input_files = list(input_files)
+        self.config_keys = list(config_keys)
+        self.code_modules = list(code_modules)
+
+
+class ContentStore:
+    """Armazenamento por conteúdo (objects/<sha256>) + manifestos por etapa/fingerprint."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = str(cache_dir)
+        self.objects_dir = os.path.join(self.cache_dir, "objects")
+        self.manifests_dir = os.path.join(self.cache_dir, "manifests")
+        self._hash_index_path = os.path.join(self.cache_dir, "file_hashes.json")
+        self._hash_index = None
+
+    def file_digest(self, path):
+        """sha256 de um arquivo, reaproveitando o último hash quando tamanho e mtime não mudaram."""
+        if self._hash_index is None:
+            self._hash_index = {}
+            if os.path.exists(self._hash_index_path):
+                with open(self._hash_index_path, "r", encoding="utf-8") as f:
+                    self._hash_index = json.load(f)
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        cached = self._hash_index.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        self._hash_index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def save_hash_index(self):
+        if self._hash_index is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._hash_index_path, "w", encoding="utf-8") as f:
+                json.dump(self._hash_index, f)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def manifest_path(self, stage_name, fingerprint):
+        return os.path.join(self.manifests_dir, stage_name, f"{fingerprint}.json")
+
+    def load_manifest(self, stage_name, fingerprint):
+        path = self.manifest_path(stage_name, fingerprint)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Manifesto só vale se todos os objetos ainda estiverem no cache
+        if not all(os.path.exists(self._object_path(d)) for d in manifest["files"].values()):
+            return None
+        return manifest
+
+    def store_outputs(self, stage_name, fingerprint, output_paths, extra):
+        """Copia as saídas para objects/ e grava o manifesto; retorna o manifesto."""
+        files = {}
+        for output in output_paths:
+            for path in _expand_output(output):
+                digest = self.file_digest(path)
+                object_path = self._object_path(digest)
+                if not os.path.exists(object_path):
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    shutil.copyfile(path, f"{object_path}.tmp")
+                    os.replace(f"{object_path}.tmp", object_path)
+                files[_relative_to_base(path)] = digest
+        manifest = {
+            "stage": stage_name,
+            "fingerprint": fingerprint,
+            "created_at": datetime.now().isoformat(),
+            "outputs": [_relative_to_base(o) for o in output_paths],
+            "files": files,
+            "output_digest": _digest_json(files),
+            **extra,
+        }
+        manifest_path = self.manifest_path(stage_name, fingerprint)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+
+    def matches_disk(self, manifest):
+        """Os arquivos do manifesto estão no layout do projeto com o mesmo conteúdo."""
+        for relative_path, digest in manifest["files"].items():
+            path = _absolute_from_base(relative_path)
+            if not os.path.exists(path) or self.file_digest(path) != digest:
+                return False
+        return True
+
+    def restore_outputs(self, manifest):
+        """Recria as saídas no layout do projeto a partir dos objetos (pula arquivos já idênticos)."""
+        restored = 0
+        for output in manifest["outputs"]:
+            output_path = _absolute_from_base(output)
+            expected = {p for p in manifest["files"] if p == output or p.startswith(output + "/")}
+            # Diretórios de saída são recriados com exatamente os arquivos do manifesto
+            if os.path.isdir(output_path):
+                for path in _expand_output(output_path):
+                    if _relative_to_base(path) not in expected:
+                        os.remove(path)
+        for relative_path, digest in manifest["files"].items():
+            path = _absolute_from_base(relative_path)
+            if os.path.exists(path) and self.file_digest(path) == digest:
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Copia para um temporário e renomeia: nunca escreve por cima de um arquivo mapeado (mmap)
+            shutil.copyfile(self._object_path(digest), f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            restored += 1
+        return restored
+
+
+def _expand_output(path):
+    path = str(path)
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Saída declarada não foi gerada: {path}")
+    return [path]
+
+
+def _relative_to_base(path):
+    return os.path.relpath(str(path), str(config.BASE_DIR)).replace(os.sep, "/")
+
+
+def _absolute_from_base(relative_path):
+    return os.path.join(str(config.BASE_DIR), *relative_path.split("/"))
+
+
+def _digest_json(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _library_versions():
+    # Lê os metadados instalados em vez de importar (importar o sklearn custa ~1s)
+    return {name: importlib.metadata.version(name) for name in FINGERPRINT_LIBRARIES}
+
+
+def stage_fingerprint(stage, store, raw_data_dir, upstream_digests):
+    """Fingerprint das entradas declaradas de uma etapa."""
+    inputs = {
+        "cache_version": PIPELINE_CACHE_VERSION,
+        "stage": stage.name,
+        "files": {os.path.basename(str(p)): store.file_digest(os.path.join(raw_data_dir, os.path.basename(str(p))))
+                  for p in stage.input_files},
+        "config": {key: getattr(config, key) for key in stage.config_keys},
+        "code": {module: store.file_digest(os.path.join(SRC_DIR, f"{module}.py")) for module in stage.code_modules},
+        "libraries": _library_versions(),
+        "upstream": {dep: upstream_digests[dep] for dep in stage.deps},
+    }
+    return _digest_json(inputs)
+
+
+# --- Etapas -----------------------------------------------------------------------------------
+
+def run_features(context):
+    if PREPROCESS_CHUNK_ROWS:
+        from datathon_decision.src.chunked_preprocessing import engineer_features_chunked
+        manifest = engineer_features_chunked(context["raw_data_dir"], chunk_rows=PREPROCESS_CHUNK_ROWS)
+        return {"rows": manifest["n_rows"], "chunks": len(manifest["shards"])}
+    from datathon_decision.src.preprocess_utils import load_data, merge_data, fit_similarity_engine, engineer_features
+    df_jobs, df_prospects, df_applicants = load_data(context["raw_data_dir"])
+    if df_jobs is None or df_prospects is None or df_applicants is None:
+        raise RuntimeError("Falha ao carregar um ou mais arquivos de dados brutos.")
+    df_merged = merge_data(df_jobs, df_prospects, df_applicants)
+    similarity_engine = fit_similarity_engine(df_merged)
+    joblib.dump(similarity_engine, SIMILARITY_ENGINE_PATH)
+    X_engineered, y_target = engineer_features(df_merged, similarity_engine=similarity_engine)
+    joblib.dump((X_engineered, y_target), ENGINEERED_FEATURES_PATH)
+    return {"rows": int(len(X_engineered))}
+
+
+def run_encode_split(context):
+    if PREPROCESS_CHUNK_ROWS:
+        from datathon_decision.src.chunked_preprocessing import encode_split_chunked
+        n_train, n_val, training_cols = encode_split_chunked()
+        return {"train_rows": n_train, "val_rows": n_val, "n_columns": len(training_cols)}
+    from datathon_decision.src.preprocess_utils import preprocess_data_split_save
+    from datathon_decision.src.drift_utils import save_drift_reference
+    X_engineered, y_target = joblib.load(ENGINEERED_FEATURES_PATH)
+    X_train, X_val, _, _, training_cols = preprocess_data_split_save(
+        X_engineered, y_target, out_dir_path=PROCESSED_DATA_DIR, fit_ohe=True
+    )
+    # Referência do monitoramento de drift: features (antes da codificação) das linhas de treino
+    save_drift_reference(X_engineered.iloc[X_train.index], DRIFT_REFERENCE_PATH)
+    return {"train_shape": list(X_train.shape), "val_shape": list(X_val.shape), "n_columns": len(training_cols)}
+
+
+def run_train(context):
+    from datathon_decision.src.dataset_utils import load_processed_split
+    from datathon_decision.src.model_utils import train_model
+    X_train, y_train = load_processed_split(PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, mmap_mode="r")
+    train_model(X_train, y_train)
+    return {}
+
+
+def run_evaluate(context):
+    from datathon_decision.src.dataset_utils import load_processed_split
+    from datathon_decision.src.model_utils import evaluate_model
+    model = joblib.load(MODEL_PATH, mmap_mode="r")
+    X_val, y_val = load_processed_split(PROCESSED_DATA_DIR, VAL_SPLIT_NAME, mmap_mode="r")
+    metrics = {k: float(v) for k, v in evaluate_model(model, X_val, y_val).items()}
+    with open(VALIDATION_METRICS_PATH, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+    return {"metrics": metrics}
+
+
+def run_distill(context):
+    from datathon_decision.src.distillation import distill, print_report
+    report = distill()
+    print_report(report)
+    return {"kind": report["kind"], "agreement": report["agreement"]}
+
+
+FEATURE_CONFIG_KEYS = (
+    "KEY_TECH_SKILLS", "PROFESSIONAL_LEVEL_MAP", "LANGUAGE_LEVEL_MAP", "ACADEMIC_LEVEL_MAP",
+    "COMPANY_TYPE_KEYWORDS", "NEGATIVE_COMMENT_KEYWORDS", "CATEGORICAL_FEATURES", "NUMERICAL_FEATURES",
+    "TARGET_VARIABLE", "POSITIVE_CLASS", "TEXT_SIMILARITY_MODE", "RAW_JOB_FIELDS", "RAW_APPLICANT_FIELDS",
+    "FEATURE_SPEC",
+)
+
+STAGES = [
+    Stage(
+        "features", run_features,
+        # Em chunks (PREPROCESS_CHUNK_ROWS > 0), as features ficam em blocos em ENGINEERED_FEATURES_DIR
+        outputs=[ENGINEERED_FEATURES_DIR if PREPROCESS_CHUNK_ROWS else ENGINEERED_FEATURES_PATH, SIMILARITY_ENGINE_PATH],
+        input_files=[JOBS_FILE, PROSPECTS_FILE, APPLICANTS_FILE],
+        config_keys=FEATURE_CONFIG_KEYS + ("PREPROCESS_CHUNK_ROWS",),
+        code_modules=["preprocess_utils", "feature_spec", "similarity_utils", "chunked_preprocessing"],
+    ),
+    Stage(
+        "encode_split", run_encode_split,
+        outputs=[PROCESSED_DATA_DIR / TRAIN_SPLIT_NAME, PROCESSED_DATA_DIR / VAL_SPLIT_NAME,
+                 PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH, DRIFT_REFERENCE_PATH],
+        deps=["features"],
+        # O backend define a codificação das categóricas (OHE ou ordinal), a menos que CATEGORICAL_ENCODING a sobrescreva
+        config_keys=("CATEGORICAL_FEATURES", "NUMERICAL_FEATURES", "TEST_SIZE", "RANDOM_STATE", "MODEL_BACKEND",
+                     "CATEGORICAL_ENCODING", "HASHING_ENCODER_BUCKETS", "DRIFT_NUMERIC_BINS", "DRIFT_CATEGORY_CAPACITY",
+                     "PREPROCESS_CHUNK_ROWS", "DRIFT_REFERENCE_MAX_ROWS"),
+        code_modules=["preprocess_utils", "dataset_utils", "model_backends", "drift_utils", "chunked_preprocessing"],
+    ),
+    Stage(
+        "train", run_train,
+        outputs=[MODEL_PATH, TRAINING_ROWS_PATH] + ([PACKED_MODEL_DIR] if get_model_backend().supports_packed else []),
+        deps=["encode_split"],
+        config_keys=("MODEL_BACKEND", "MODEL_PARAMS", "PACKED_MODEL_PRECISION", "PACKED_MODEL_COMPRESS"),
+        code_modules=["model_utils", "model_backends", "artifact_utils", "dataset_utils"],
+    ),
+    Stage(
+        "evaluate", run_evaluate,
+        outputs=[VALIDATION_METRICS_PATH],
+        deps=["train", "encode_split"],
+        code_modules=["model_utils"],
+    ),
+    Stage(
+        "distill", run_distill,
+        outputs=[DISTILLED_MODEL_PATH, DISTILLATION_REPORT_PATH],
+        deps=["train", "encode_split"],
+        config_keys=("DISTILLED_MODEL_KIND", "DISTILLED_MODEL_PARAMS"),
+        code_modules=["distillation", "model_utils", "artifact_utils"],
+    ),
+]
+
+
+def print_stage_result(stage_name, result, from_cache):
+    """Repete as linhas de resultado no formato dos logs originais (o CI extrai as métricas delas)."""
+    if stage_name == "encode_split" and "train_shape" in result:
+        print(f"Shapes: X_train=({result['train_shape'][0]}, {result['train_shape'][1]}), "
+              f"X_val=({result['val_shape'][0]}, {result['val_shape'][1]})")
+    # Executada, a etapa evaluate já registra as métricas via evaluate_model
+    if stage_name == "evaluate" and from_cache and "metrics" in result:
+        m = result["metrics"]
+        roc_auc = f"{m['roc_auc']:.3f}" if "roc_auc" in m else "n/d"
+        print(f"Acurácia: {m['accuracy']:.3f} | Precisão: {m['precision']:.3f} | Recall: {m['recall']:.3f} | "
+              f"F1: {m['f1']:.3f} | ROC AUC: {roc_auc}")
+
+
+def run_pipeline(raw_data_dir=RAW_DATA_DIR, cache_dir=PIPELINE_CACHE_DIR, force=(), until=None, use_cache=True):
+    """Executa as etapas em ordem, pulando as que têm saída em cache para o mesmo fingerprint."""
+    store = ContentStore(cache_dir)
+    os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    context = {"raw_data_dir": str(raw_data_dir)}
+    upstream_digests = {}
+    summary = []
+    for stage in STAGES:
+        start = time.perf_counter()
+        fingerprint = stage_fingerprint(stage, store, raw_data_dir, upstream_digests)
+        manifest = store.load_manifest(stage.name, fingerprint) if use_cache and stage.name not in force else None
+        if manifest is not None:
+            restored = store.restore_outputs(manifest)
+            status = "cache"
+            print(f"⏭️  [{stage.name}] fingerprint {fingerprint[:12]} em cache ({restored} arquivo(s) restaurado(s))")
+        else:
+            print(f"▶️  [{stage.name}] executando (fingerprint {fingerprint[:12]})...")
+            with profile_stage(stage.name):
+                result = stage.run(context) or {}
+            # ru_maxrss (kB no Linux) é o pico do processo até aqui: fica no manifesto para as execuções em cache
+            manifest = store.store_outputs(stage.name, fingerprint, stage.outputs,
+                                           {"result": result, "duration_s": time.perf_counter() - start,
+                                            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss})
+            status = "executada"
+        print_stage_result(stage.name, manifest.get("result", {}), from_cache=status == "cache")
+        upstream_digests[stage.name] = manifest["output_digest"]
+        summary.append({"stage": stage.name, "status": status, "seconds": time.perf_counter() - start,
+                        "fingerprint": fingerprint, "original_seconds": manifest.get("duration_s"),
+                        "max_rss_kb": manifest.get("max_rss_kb")})
+        if stage.name == until:
+            break
+    store.save_hash_index()
+    return summary
+
+
+def record_stage_outputs(stage_name, raw_data_dir=RAW_DATA_DIR, cache_dir=PIPELINE_CACHE_DIR, result=None):
+    """
+    Registra as saídas atuais em disco de `stage_name` como o resultado da etapa para o fingerprint das entradas
+    atuais: a próxima execução as restaura (em vez das do último run da etapa) e refaz as etapas seguintes, que
+    veem o digest novo. Exige as etapas anteriores em cache e iguais ao disco; retorna o manifesto ou None.
+    """
+    store = ContentStore(cache_dir)
+    upstream_digests = {}
+    for stage in STAGES:
+        fingerprint = stage_fingerprint(stage, store, raw_data_dir, upstream_digests)
+        if stage.name == stage_name:
+            # Sem duração e pico de memória: não são os de uma execução da etapa (o histórico de desempenho os ignora)
+            manifest = store.store_outputs(stage.name, fingerprint, stage.outputs,
+                                           {"result": result or {}, "duration_s": None, "max_rss_kb": None})
+            store.save_hash_index()
+            return manifest
+        manifest = store.load_manifest(stage.name, fingerprint)
+        if manifest is None or not store.matches_disk(manifest):
+            store.save_hash_index()
+            return None
+        upstream_digests[stage.name] = manifest["output_digest"]
+    raise ValueError(f"Etapa desconhecida: '{stage_name}'.")
+
+
+def print_summary(summary):
+    print("\n📋 Resumo do pipeline")
+    print(f"{'etapa':14s} {'status':10s} {'tempo (s)':>10s} {'original (s)':>13s}  fingerprint")
+    for row in summary:
+        original = f"{row['original_seconds']:.2f}" if row["original_seconds"] is not None else "-"
+        print(f"{row['stage']:14s} {row['status']:10s} {row['seconds']:10.2f} {original:>13s}  {row['fingerprint'][:12]}")
+    hits = sum(1 for row in summary if row["status"] == "cache")
+    saved = sum(row["original_seconds"] or 0.0 for row in summary if row["status"] == "cache")
+    print(f"Cache hits: {hits}/{len(summary)} | tempo total: {sum(r['seconds'] for r in summary):.2f}s "
+          f"| economizado: ~{saved:.2f}s")
+
+
+def save_summary(summary, path=PIPELINE_SUMMARY_PATH):
+    """Grava o resumo (lido por scripts/extract_metrics.py para o histórico de desempenho)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created_at": datetime.now().isoformat(), "stages": summary}, f, indent=2)
+    return path
+
+
+def main():
+    """Função principal."""
+    stage_names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(description="Executa o pipeline de treino com cache por etapa.")
+    parser.add_argument("raw_data_dir", nargs="?", default=str(RAW_DATA_DIR))
+    parser.add_argument("--cache-dir", default=str(PIPELINE_CACHE_DIR))
+    parser.add_argument("--force", nargs="+", default=[], choices=stage_names, help="Etapas a reexecutar mesmo com cache")
+    parser.add_argument("--until", choices=stage_names, help="Para depois desta etapa")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora o cache (as saídas continuam sendo gravadas nele)")
+    parser.add_argument("--profile", action="store_true", default=config.PIPELINE_PROFILE,
+                        help="Mede tempo/CPU/memória por etapa executada (relatório em PIPELINE_PROFILE_PATH)")
+    parser.add_argument("--cprofile", action="store_true", default=config.PIPELINE_PROFILE_CPROFILE,
+                        help="Com --profile, grava também um .prof do cProfile por etapa")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        default=config.PIPELINE_PROFILE_TRACE_MEMORY,
+                        help="Com --profile, não liga o tracemalloc (tempos das etapas comparáveis aos sem profiling)")
+    args = parser.parse_args()
+
+    with profile_session("pipeline_runner", enabled=args.profile, cprofile=args.cprofile, trace_memory=args.trace_memory):
+        summary = run_pipeline(args.raw_data_dir, args.cache_dir, force=args.force, until=args.until,
+                               use_cache=not args.no_cache)
+    print_summary(summary)
+    save_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
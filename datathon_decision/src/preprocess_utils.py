@@ -3,24 +3,27 @@ import json
 import os
 import sys
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
 import joblib
 import re
-from datetime import datetime
 
 try:
     # Garantindo que todas as constantes necessárias do config.py sejam importadas
     from datathon_decision.src.config import (
-        CATEGORICAL_FEATURES, NUMERICAL_FEATURES, KEY_TECH_SKILLS,
-        PROFESSIONAL_LEVEL_MAP, LANGUAGE_LEVEL_MAP, ACADEMIC_LEVEL_MAP,
-        COMPANY_TYPE_KEYWORDS, NEGATIVE_COMMENT_KEYWORDS,
+        CATEGORICAL_FEATURES, NUMERICAL_FEATURES,
         TARGET_VARIABLE, POSITIVE_CLASS,
         PREPROCESSOR_PATH, TRAINING_COLUMNS_PATH,
         RAW_DATA_DIR as DEFAULT_RAW_DATA_DIR, 
         PROCESSED_DATA_DIR as DEFAULT_PROCESSED_DATA_DIR,
         MODELS_DIR as DEFAULT_MODELS_DIR,
-        TEST_SIZE, RANDOM_STATE # Garantindo que TEST_SIZE e RANDOM_STATE estão aqui
+        TEST_SIZE, RANDOM_STATE, # Garantindo que TEST_SIZE e RANDOM_STATE estão aqui
+        TRAIN_SPLIT_NAME, VAL_SPLIT_NAME,
+        TEXT_SIMILARITY_MODE, SIMILARITY_ENGINE_PATH, DRIFT_REFERENCE_PATH,
+        RAW_JOB_FIELDS, RAW_APPLICANT_FIELDS, PREPROCESS_CHUNK_ROWS
     )
+    from datathon_decision.src.dataset_utils import save_processed_split
+    from datathon_decision.src.similarity_utils import TextSimilarityEngine
+    from datathon_decision.src.model_backends import categorical_encoding_for, make_categorical_encoder
+    from datathon_decision.src.profiling_utils import profiled, profile_stage, profile_session
 except ModuleNotFoundError as e:
     print(f"AVISO CRÍTICO: Falha ao importar 'config' (datathon_decision.src.config). Detalhes: {e}")
     print("Verifique seu PYTHONPATH, a estrutura do projeto ou como o script está sendo executado.")
@@ -28,61 +31,135 @@ except ModuleNotFoundError as e:
     raise # Interrompe a execução se o config não puder ser importado
 
 
-def load_data(data_dir):
-    """Carrega os dados JSON de um diretório especificado."""
-    jobs_path = os.path.join(data_dir, 'vagas.json')
-    prospects_path = os.path.join(data_dir, 'prospects.json')
-    applicants_path = os.path.join(data_dir, 'applicants.json')
+# Todos os campos declarados no config (vagas + applicants), para achatar DataFrames com dicts aninhados
+RAW_FIELDS = {**RAW_JOB_FIELDS, **RAW_APPLICANT_FIELDS}
 
+def nested_column(section, key):
+    """Nome da coluna plana de um campo aninhado ('perfil_vaga', 'nivel_ingles' -> 'perfil_vaga.nivel_ingles')."""
+    return f"{section}.{key}"
+
+def project_records(records, fields, id_column):
+    """
+    Só os campos declarados dos registros do JSON bruto ({id: registro}), como um DataFrame plano
+    (uma lista por coluna; os dicts aninhados não são copiados).
+    """
+    columns = {id_column: list(records)}
+    for section, keys in fields.items():
+        values = [record.get(section) for record in records.values()]
+        if keys is None:
+            columns[section] = values
+            continue
+        values = [value if isinstance(value, dict) else {} for value in values]
+        for key in keys:
+            columns[nested_column(section, key)] = [value.get(key) for value in values]
+    return pd.DataFrame(columns)
+
+def flatten_nested_fields(df, fields=RAW_FIELDS):
+    """
+    Substitui as colunas de dicts aninhados (payload da API, load_data com projected=False) pelas colunas
+    planas dos campos declarados. Retorna um novo DataFrame; colunas já planas são mantidas.
+    """
+    nested = [section for section, keys in fields.items() if keys is not None and section in df.columns]
+    df_flat = df.drop(columns=nested)
+    for section in nested:
+        values = [value if isinstance(value, dict) else {} for value in df[section].tolist()]
+        for key in fields[section]:
+            df_flat[nested_column(section, key)] = pd.Series([value.get(key) for value in values], index=df.index)
+    return df_flat
+
+def _read_json(path):
     try:
-        with open(jobs_path, 'r', encoding='utf-8') as f:
-            jobs_data = json.load(f)
-        with open(prospects_path, 'r', encoding='utf-8') as f:
-            prospects_data = json.load(f)
-        with open(applicants_path, 'r', encoding='utf-8') as f:
-            applicants_data = json.load(f)
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except FileNotFoundError as e:
-        print(f"Erro: Um dos arquivos de dados não foi encontrado em '{data_dir}'. Detalhes: {e}")
+        print(f"Erro: Um dos arquivos de dados não foi encontrado em '{os.path.dirname(path)}'. Detalhes: {e}")
         raise
     except json.JSONDecodeError as e:
         print(f"Erro: Falha ao decodificar JSON em um dos arquivos. Detalhes: {e}")
         raise
 
-    df_jobs = pd.DataFrame.from_dict(jobs_data, orient='index')
-    df_jobs.index.name = 'vaga_id'
-    df_jobs.reset_index(inplace=True)
-
-    df_applicants = pd.DataFrame.from_dict(applicants_data, orient='index')
-    df_applicants.index.name = 'codigo_profissional'
-    df_applicants.reset_index(inplace=True)
+def prospect_rows(job_id, details):
+    """Linhas (uma por prospect) de um item de prospects.json ({vaga_id: {titulo, modalidade, prospects}})."""
+    return [
+        {
+            'vaga_id': str(job_id),
+            'titulo_vaga_prospect': details.get('titulo'),
+            'modalidade_prospect': details.get('modalidade'),
+            'nome_candidato_prospect': prospect.get('nome'),
+            'codigo_candidato_prospect': str(prospect.get('codigo')),
+            'situacao_candidado': prospect.get('situacao_candidado'),
+            'data_candidatura_prospect': prospect.get('data_candidatura'),
+            'ultima_atualizacao_prospect': prospect.get('ultima_atualizacao'),
+            'comentario_prospect': prospect.get('comentario'),
+            'recrutador_prospect': prospect.get('recrutador')
+        }
+        for prospect in details.get('prospects', [])
+    ]
+
+def load_jobs_and_applicants(data_dir, projected=True):
+    """Vagas e applicants de data_dir (ver load_data); retorna (df_jobs, df_applicants)."""
+    jobs_data = _read_json(os.path.join(data_dir, 'vagas.json'))
+    if projected:
+        df_jobs = project_records(jobs_data, RAW_JOB_FIELDS, 'vaga_id')
+    else:
+        df_jobs = pd.DataFrame.from_dict(jobs_data, orient='index')
+        df_jobs.index.name = 'vaga_id'
+        df_jobs.reset_index(inplace=True)
+    del jobs_data
+
+    applicants_data = _read_json(os.path.join(data_dir, 'applicants.json'))
+    if projected:
+        df_applicants = project_records(applicants_data, RAW_APPLICANT_FIELDS, 'codigo_profissional')
+    else:
+        df_applicants = pd.DataFrame.from_dict(applicants_data, orient='index')
+        df_applicants.index.name = 'codigo_profissional'
+        df_applicants.reset_index(inplace=True)
     df_applicants['codigo_profissional'] = df_applicants['codigo_profissional'].astype(str)
-
+    del applicants_data
+    return df_jobs, df_applicants
+
+@profiled(outputs=('jobs', 'prospects', 'applicants'))
+def load_data(data_dir, projected=True):
+    """
+    Carrega os dados JSON de um diretório especificado.
+    Vagas e applicants trazem só os campos de RAW_JOB_FIELDS/RAW_APPLICANT_FIELDS, já planos (projeção no
+    parse: os dicts aninhados completos são descartados arquivo a arquivo). projected=False mantém os dicts
+    inteiros, como antes (usado para comparação em scripts/benchmark_data_loading.py).
+    """
+    df_jobs, df_applicants = load_jobs_and_applicants(data_dir, projected)
+    prospects_data = _read_json(os.path.join(data_dir, 'prospects.json'))
     prospect_list = []
     for job_id, details in prospects_data.items():
-        for prospect in details.get('prospects', []):
-            prospect_entry = {
-                'vaga_id': str(job_id),
-                'titulo_vaga_prospect': details.get('titulo'),
-                'modalidade_prospect': details.get('modalidade'),
-                'nome_candidato_prospect': prospect.get('nome'),
-                'codigo_candidato_prospect': str(prospect.get('codigo')),
-                'situacao_candidado': prospect.get('situacao_candidado'),
-                'data_candidatura_prospect': prospect.get('data_candidatura'),
-                'ultima_atualizacao_prospect': prospect.get('ultima_atualizacao'),
-                'comentario_prospect': prospect.get('comentario'),
-                'recrutador_prospect': prospect.get('recrutador')
-            }
-            prospect_list.append(prospect_entry)
+        prospect_list.extend(prospect_rows(job_id, details))
     df_prospects = pd.DataFrame(prospect_list)
     return df_jobs, df_prospects, df_applicants
 
+@profiled(outputs=('merged',))
 def merge_data(df_jobs, df_prospects, df_applicants):
     """Mescla os dataframes de jobs, prospects e applicants."""
+    df_applicants = add_candidate_history(df_applicants, df_prospects)
+    return merge_pairs(df_prospects, df_jobs, df_applicants)
+
+def candidate_history_counts(df_prospects):
+    """
+    Desistências e prospecções por candidato (índice codigo_candidato_prospect). Contagens de blocos de prospects
+    somadas (DataFrame.add com fill_value=0) dão as mesmas contagens do total.
+    """
     desistencias = df_prospects[df_prospects['situacao_candidado'] == 'Desistiu']
     contagem_desistencias = desistencias.groupby('codigo_candidato_prospect').size().rename('num_desistencias')
     contagem_total_prospeccoes = df_prospects.groupby('codigo_candidato_prospect').size().rename('num_total_prospeccoes')
-
-    historico_candidato_stats = pd.concat([contagem_desistencias, contagem_total_prospeccoes], axis=1).reset_index()
+    counts = pd.concat([contagem_desistencias, contagem_total_prospeccoes], axis=1)
+    counts.index.name = 'codigo_candidato_prospect'
+    return counts.fillna(0)
+
+def add_candidate_history(df_applicants, df_prospects, history_counts=None):
+    """
+    Acrescenta aos applicants a taxa histórica de desistência calculada sobre df_prospects (ou sobre
+    history_counts, as contagens de candidate_history_counts já somadas bloco a bloco).
+    """
+    if history_counts is None:
+        history_counts = candidate_history_counts(df_prospects)
+    historico_candidato_stats = history_counts.reset_index()
     historico_candidato_stats['num_desistencias'] = historico_candidato_stats['num_desistencias'].fillna(0)
     historico_candidato_stats['num_total_prospeccoes'] = historico_candidato_stats['num_total_prospeccoes'].fillna(0).apply(lambda x: x if x > 0 else 1)
     historico_candidato_stats['candidato_taxa_desistencia_historica_num'] = (
@@ -96,26 +173,33 @@ def merge_data(df_jobs, df_prospects, df_applicants):
                                how='left')
     df_applicants['candidato_taxa_desistencia_historica_num'] = df_applicants['candidato_taxa_desistencia_historica_num'].fillna(0)
     df_applicants.drop(columns=['codigo_candidato_prospect'], inplace=True, errors='ignore')
+    return df_applicants
 
-    df_merged = pd.merge(df_prospects, df_jobs, on='vaga_id', how='left')
+def merge_pairs(df_pairs, df_jobs, df_applicants):
+    """Junta a cada par (vaga_id, codigo_candidato_prospect) os dados da vaga e do candidato (já com histórico)."""
+    df_merged = pd.merge(df_pairs, df_jobs, on='vaga_id', how='left')
     df_merged = pd.merge(df_merged, df_applicants,
                          left_on='codigo_candidato_prospect',
                          right_on='codigo_profissional',
                          how='left')
     return df_merged
 
-def safe_get(data_dict, key, default="DESCONHECIDO"):
-    if not isinstance(data_dict, dict):
-        return default
-    value = data_dict.get(key)
+def value_or_default(value, default="DESCONHECIDO"):
     return value if pd.notna(value) and value != '' else default
 
+def field_values(df, section, key, default="DESCONHECIDO"):
+    """Valores de um campo aninhado já projetado (coluna '<seção>.<campo>'); ausentes e vazios viram `default`."""
+    return df[nested_column(section, key)].apply(lambda value: value_or_default(value, default))
+
+_NON_TEXT_CHARS = re.compile(r'[^a-z0-9áéíóúãõâêîôûçàèìòùäëïöüñ\s]')
+_WHITESPACE = re.compile(r'\s+')
+
 def normalize_text(text):
     if not isinstance(text, str):
         return "desconhecido"
     text = text.lower()
-    text = re.sub(r'[^a-z0-9áéíóúãõâêîôûçàèìòùäëïöüñ\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _NON_TEXT_CHARS.sub('', text)
+    text = _WHITESPACE.sub(' ', text).strip()
     return text if text else "desconhecido"
 
 def map_level(level_text, level_map):
@@ -127,18 +211,6 @@ def map_level(level_text, level_map):
              return str(v_map)
     return "0"
 
-def count_keywords(text, keywords_list):
-    if not isinstance(text, str) or not keywords_list:
-        return 0
-    text_norm = normalize_text(text)
-    if not text_norm or text_norm == "desconhecido":
-        return 0
-    count = 0
-    for keyword in keywords_list:
-        if normalize_text(keyword) in text_norm:
-            count += 1
-    return count
-
 def compare_levels(level_vaga_numeric_str, level_candidato_numeric_str):
     if level_vaga_numeric_str == "0" or level_candidato_numeric_str == "0":
         return "DESCONHECIDO_LVL"
@@ -154,26 +226,29 @@ def compare_levels(level_vaga_numeric_str, level_candidato_numeric_str):
     else:
         return "CANDIDATO_INFERIOR"
 
-def diff_levels(level_vaga_numeric_str, level_candidato_numeric_str):
-    if level_vaga_numeric_str == "0" or level_candidato_numeric_str == "0":
-        return 0
-    try:
-        return abs(int(level_vaga_numeric_str) - int(level_candidato_numeric_str))
-    except ValueError:
-        return 0
-
-def parse_date_robust(date_str):
-    if not isinstance(date_str, str) or pd.isna(date_str):
-        return None
-    for fmt in ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d"):
-        try:
-            return datetime.strptime(date_str, fmt)
-        except (ValueError, TypeError):
-            continue
-    return None
-
-def engineer_features(df_input):
-    df = df_input.copy()
+@profiled()
+def fit_similarity_engine(df_merged, mode=TEXT_SIMILARITY_MODE):
+    """Ajusta o vocabulário do motor de similaridade no corpus de treino (objetivo, título, CV, competências)."""
+    df = flatten_nested_fields(df_merged)
+    engine = TextSimilarityEngine(mode=mode)
+    engine.fit(
+        field_values(df, 'informacoes_profissionais', 'objetivo_profissional', '').apply(normalize_text),
+        field_values(df, 'informacoes_basicas', 'titulo_vaga', '').apply(normalize_text),
+        df['cv_pt'].fillna('').apply(normalize_text),
+        field_values(df, 'perfil_vaga', 'competencia_tecnicas_e_comportamentais', '').apply(normalize_text),
+    )
+    return engine
+
+@profiled(outputs=('features', 'target'))
+def engineer_features(df_input, similarity_engine=None):
+    """
+    Cria as features do modelo a partir do DataFrame mesclado (ou do payload da API).
+    similarity_engine: TextSimilarityEngine ajustado no treino; se None, usa um motor no modo
+    TEXT_SIMILARITY_MODE sem vocabulário prévio (no modo 'jaccard' o resultado é o mesmo).
+    """
+    df = flatten_nested_fields(df_input)
+    if similarity_engine is None:
+        similarity_engine = TextSimilarityEngine(mode=TEXT_SIMILARITY_MODE)
 
     if TARGET_VARIABLE in df.columns:
         df['target'] = df[TARGET_VARIABLE].apply(lambda x: 1 if x == POSITIVE_CLASS else 0)
@@ -181,108 +256,48 @@ def engineer_features(df_input):
     else:
         y_target_series = None
 
-    df['vaga_nivel_profissional_raw'] = df['perfil_vaga'].apply(lambda x: safe_get(x, 'nivel profissional'))
-    df['vaga_nivel_profissional_norm_cat'] = df['vaga_nivel_profissional_raw'].apply(lambda x: map_level(x, PROFESSIONAL_LEVEL_MAP))
-    df['vaga_nivel_academico_raw'] = df['perfil_vaga'].apply(lambda x: safe_get(x, 'nivel_academico'))
-    df['vaga_nivel_academico_norm_cat'] = df['vaga_nivel_academico_raw'].apply(lambda x: map_level(x, ACADEMIC_LEVEL_MAP))
-    df['vaga_nivel_ingles_raw'] = df['perfil_vaga'].apply(lambda x: safe_get(x, 'nivel_ingles'))
-    df['vaga_nivel_ingles_norm_cat'] = df['vaga_nivel_ingles_raw'].apply(lambda x: map_level(x, LANGUAGE_LEVEL_MAP))
-    df['vaga_eh_sap_cat'] = df['informacoes_basicas'].apply(lambda x: 'SIM' if normalize_text(safe_get(x, 'vaga_sap')) == 'sim' else 'NAO')
-    vaga_areas_raw = df['perfil_vaga'].apply(lambda x: safe_get(x, 'areas_atuacao', 'DESCONHECIDO'))
-    df['vaga_area_atuacao_principal_cat'] = vaga_areas_raw.apply(lambda x: normalize_text(x.split('-')[0].split(',')[0] if isinstance(x, str) else 'DESCONHECIDO'))
-    vaga_competencias_txt_series = df['perfil_vaga'].apply(lambda x: safe_get(x, 'competencia_tecnicas_e_comportamentais', '') + " " + safe_get(x, 'principais_atividades', ''))
-    df['vaga_competencias_keywords_count_num'] = vaga_competencias_txt_series.apply(lambda x: count_keywords(x, KEY_TECH_SKILLS))
-    df['vaga_requer_sap_cat'] = vaga_competencias_txt_series.apply(lambda x: 'SIM' if 'sap' in normalize_text(x) else 'NAO')
-
-    df['candidato_nivel_profissional_raw'] = df['informacoes_profissionais'].apply(lambda x: safe_get(x, 'nivel_profissional'))
-    df['candidato_nivel_profissional_norm_cat'] = df['candidato_nivel_profissional_raw'].apply(lambda x: map_level(x, PROFESSIONAL_LEVEL_MAP))
-    df['candidato_nivel_academico_raw'] = df['formacao_e_idiomas'].apply(lambda x: safe_get(x, 'nivel_academico'))
-    df['candidato_nivel_academico_norm_cat'] = df['candidato_nivel_academico_raw'].apply(lambda x: map_level(x, ACADEMIC_LEVEL_MAP))
-    df['candidato_nivel_ingles_raw'] = df['formacao_e_idiomas'].apply(lambda x: safe_get(x, 'nivel_ingles'))
-    df['candidato_nivel_ingles_norm_cat'] = df['candidato_nivel_ingles_raw'].apply(lambda x: map_level(x, LANGUAGE_LEVEL_MAP))
-    candidato_areas_raw = df['informacoes_profissionais'].apply(lambda x: safe_get(x, 'area_atuacao', 'DESCONHECIDO'))
-    df['candidato_area_atuacao_principal_cat'] = candidato_areas_raw.apply(lambda x: normalize_text(x.split(',')[0] if isinstance(x, str) else 'DESCONHECIDO'))
-    candidato_conhecimentos_txt_series = df['informacoes_profissionais'].apply(lambda x: safe_get(x, 'conhecimentos_tecnicos', ''))
-    df['candidato_conhecimentos_keywords_count_num'] = candidato_conhecimentos_txt_series.apply(lambda x: count_keywords(x, KEY_TECH_SKILLS))
-    candidato_cv_txt_series = df['cv_pt'].fillna('').apply(normalize_text)
-    df['candidato_cv_keywords_count_num'] = candidato_cv_txt_series.apply(lambda x: count_keywords(x, KEY_TECH_SKILLS))
-
-    for company_type_key_cfg, keywords_list_cfg in COMPANY_TYPE_KEYWORDS.items():
-        df[f'candidato_exp_{company_type_key_cfg}'] = candidato_cv_txt_series.apply(
-            lambda cv_text: '1' if any(normalize_text(kw) in cv_text for kw in keywords_list_cfg) else '0'
-        )
-    df['candidato_tem_sap_cat'] = candidato_conhecimentos_txt_series.apply(lambda x: 'SIM' if 'sap' in normalize_text(x) else 'NAO')
-    df['candidato_num_experiencias_num'] = df['informacoes_profissionais'].apply(lambda x: len(safe_get(x, 'experiencias', [])) if isinstance(safe_get(x, 'experiencias', []), list) else 0)
-    df['candidato_num_certificacoes_num'] = df['informacoes_profissionais'].apply(lambda x: len(safe_get(x, 'certificacoes', '').split(',')) if isinstance(safe_get(x, 'certificacoes', ''), str) and safe_get(x, 'certificacoes', '') != "DESCONHECIDO" and safe_get(x, 'certificacoes', '') else 0)
-
-    df['match_nivel_profissional_cat'] = df.apply(lambda row: compare_levels(row['vaga_nivel_profissional_norm_cat'], row['candidato_nivel_profissional_norm_cat']), axis=1)
-    df['match_nivel_academico_cat'] = df.apply(lambda row: compare_levels(row['vaga_nivel_academico_norm_cat'], row['candidato_nivel_academico_norm_cat']), axis=1)
-    df['match_nivel_ingles_cat'] = df.apply(lambda row: compare_levels(row['vaga_nivel_ingles_norm_cat'], row['candidato_nivel_ingles_norm_cat']), axis=1)
-    df['match_area_atuacao_cat'] = (df['vaga_area_atuacao_principal_cat'] == df['candidato_area_atuacao_principal_cat']).astype(int).astype(str)
-    
-    df['diferenca_nivel_profissional_num'] = df.apply(lambda row: diff_levels(row['vaga_nivel_profissional_norm_cat'], row['candidato_nivel_profissional_norm_cat']), axis=1)
-    df['diferenca_nivel_academico_num'] = df.apply(lambda row: diff_levels(row['vaga_nivel_academico_norm_cat'], row['candidato_nivel_academico_norm_cat']), axis=1)
-    df['diferenca_nivel_ingles_num'] = df.apply(lambda row: diff_levels(row['vaga_nivel_ingles_norm_cat'], row['candidato_nivel_ingles_norm_cat']), axis=1)
-    
-    df['comentario_len_num'] = df['comentario_prospect'].fillna('').apply(len)
-    df['data_candidatura_dt'] = df['data_candidatura_prospect'].apply(parse_date_robust)
-    df['ultima_atualizacao_dt'] = df['ultima_atualizacao_prospect'].apply(parse_date_robust)
-    df['tempo_no_processo_dias_num'] = (df['ultima_atualizacao_dt'] - df['data_candidatura_dt']).dt.days.fillna(-1)
-    df['tempo_no_processo_dias_num'] = df['tempo_no_processo_dias_num'].apply(lambda x: x if x >= 0 else 0)
-
-    comentario_prospect_norm = df['comentario_prospect'].fillna('').apply(normalize_text)
-    df['prospect_comentario_negativo_cat'] = comentario_prospect_norm.apply(
-        lambda c: '1' if any(kw in c for kw in NEGATIVE_COMMENT_KEYWORDS) else '0'
-    )
-    if 'candidato_taxa_desistencia_historica_num' not in df.columns:
-        df['candidato_taxa_desistencia_historica_num'] = 0.0
-
-    candidato_objetivo_txt_series = df['informacoes_profissionais'].apply(lambda x: normalize_text(safe_get(x, 'objetivo_profissional', '')))
-    vaga_titulo_txt_series = df['informacoes_basicas'].apply(lambda x: normalize_text(safe_get(x, 'titulo_vaga', '')))
-
-    def jaccard_similarity_local(text1_series_local, text2_series_local):
-        scores = []
-        for t1, t2 in zip(text1_series_local, text2_series_local):
-            set1 = set(t1.split())
-            set2 = set(t2.split())
-            if not set1 or not set2:
-                scores.append(0.0)
-                continue
-            intersection = len(set1.intersection(set2))
-            union = len(set1.union(set2))
-            scores.append(intersection / union if union != 0 else 0.0)
-        return scores
-    df['match_objetivo_vaga_score_num'] = jaccard_similarity_local(candidato_objetivo_txt_series, vaga_titulo_txt_series)
-    
-    # Se 'candidato_numero_empregos_num' estiver em NUMERICAL_FEATURES e você quiser usar
-    # 'candidato_num_experiencias_num' como sua fonte:
-    if 'candidato_numero_empregos_num' in NUMERICAL_FEATURES:
-         df['candidato_numero_empregos_num'] = df['candidato_num_experiencias_num']
-
-    created_categorical_features = []
-    for col_name in CATEGORICAL_FEATURES:
-        if col_name not in df.columns:
-            # print(f"AVISO EngineerFeatures: Cat Feature '{col_name}' não criada. Adicionando como 'DESCONHECIDO'.")
-            df[col_name] = "DESCONHECIDO"
-        df[col_name] = df[col_name].astype(str).fillna("DESCONHECIDO")
-        created_categorical_features.append(col_name)
-
-    created_numerical_features = []
-    for col_name in NUMERICAL_FEATURES:
-        if col_name not in df.columns:
-            # print(f"AVISO EngineerFeatures: Num Feature '{col_name}' não criada. Adicionando como 0.")
-            df[col_name] = 0
-        df[col_name] = pd.to_numeric(df[col_name], errors='coerce').fillna(0)
-        created_numerical_features.append(col_name)
-        
-    final_feature_columns = created_categorical_features + created_numerical_features
+    # Features de FEATURE_SPEC: uma passada pelos registros + similaridades em lote (ver feature_spec.py)
+    from datathon_decision.src.feature_spec import get_feature_extractor
+    extractor = get_feature_extractor()
+    with profile_stage('registros'):
+        features = extractor.extract_records(df)
+    with profile_stage('similaridade'):
+        features.update(extractor.extract_batch(df, features, similarity_engine))
+    df_features = pd.DataFrame(features, index=df.index)
+
+    with profile_stage('finalizacao'):
+        created_categorical_features = []
+        for col_name in CATEGORICAL_FEATURES:
+            if col_name not in df_features.columns:
+                # print(f"AVISO EngineerFeatures: Cat Feature '{col_name}' não criada. Adicionando como 'DESCONHECIDO'.")
+                df_features[col_name] = "DESCONHECIDO"
+            df_features[col_name] = df_features[col_name].astype(str).fillna("DESCONHECIDO")
+            created_categorical_features.append(col_name)
+
+        created_numerical_features = []
+        for col_name in NUMERICAL_FEATURES:
+            if col_name not in df_features.columns:
+                # print(f"AVISO EngineerFeatures: Num Feature '{col_name}' não criada. Adicionando como 0.")
+                df_features[col_name] = 0
+            df_features[col_name] = pd.to_numeric(df_features[col_name], errors='coerce').fillna(0)
+            created_numerical_features.append(col_name)
+
+        final_feature_columns = created_categorical_features + created_numerical_features
     
     # A coluna 'target' pode não existir em df se y_target_series for None (predição)
     # Retorna apenas as features selecionadas.
-    return df[final_feature_columns], y_target_series
-
-
-def preprocess_data_split_save(df_features, series_target, out_dir_path, fit_ohe=False, ohe_encoder=None, training_cols_list=None):
+    return df_features[final_feature_columns], y_target_series
+
+
+@profiled(outputs=('X_train', 'X_val', 'y_train', 'y_val'))
+def preprocess_data_split_save(df_features, series_target, out_dir_path, fit_ohe=False, ohe_encoder=None, training_cols_list=None,
+                               categorical_encoding=None, preprocessor_path=PREPROCESSOR_PATH, training_columns_path=TRAINING_COLUMNS_PATH):
+    """
+    Codifica as categóricas, alinha as colunas e (com target) faz o split e salva train/val.
+    Com fit_ohe=True o encoder é ajustado com a codificação do backend do modelo ("onehot" ou "ordinal",
+    ver model_backends.py; CATEGORICAL_ENCODING e categorical_encoding sobrescrevem), ou ohe_encoder se
+    fornecido, e salvo em preprocessor_path. Encoders de largura fixa ("hashing") dispensam o alinhamento.
+    """
     X_to_process = df_features.copy()
 
     if not CATEGORICAL_FEATURES:
@@ -300,16 +315,17 @@ def preprocess_data_split_save(df_features, series_target, out_dir_path, fit_ohe
             X_to_process[col] = X_to_process[col].astype(str).fillna('DESCONHECIDO')
 
         if fit_ohe:
-            current_ohe_encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+            encoding = categorical_encoding or categorical_encoding_for()
+            current_ohe_encoder = ohe_encoder if ohe_encoder is not None else make_categorical_encoder(encoding)
             current_ohe_encoder.fit(X_to_process[CATEGORICAL_FEATURES])
-            joblib.dump(current_ohe_encoder, PREPROCESSOR_PATH)
-            print(f"Preprocessor (OHE) salvo em {PREPROCESSOR_PATH}")
+            joblib.dump(current_ohe_encoder, preprocessor_path)
+            print(f"Preprocessor ({encoding if ohe_encoder is None else type(ohe_encoder).__name__}) salvo em {preprocessor_path}")
         elif ohe_encoder is None:
             try:
-                current_ohe_encoder = joblib.load(PREPROCESSOR_PATH)
-                # print(f"Preprocessor (OHE) carregado de {PREPROCESSOR_PATH}")
+                current_ohe_encoder = joblib.load(preprocessor_path)
+                # print(f"Preprocessor (OHE) carregado de {preprocessor_path}")
             except FileNotFoundError:
-                raise ValueError(f"Preprocessor não encontrado em {PREPROCESSOR_PATH}. Treine primeiro ou forneça o encoder.")
+                raise ValueError(f"Preprocessor não encontrado em {preprocessor_path}. Treine primeiro ou forneça o encoder.")
         else:
             current_ohe_encoder = ohe_encoder
         
@@ -330,7 +346,7 @@ def preprocess_data_split_save(df_features, series_target, out_dir_path, fit_ohe
             X_processed = encoded_df
             final_column_names_for_output = list(ohe_feature_names)
 
-    if not fit_ohe and training_cols_list:
+    if not fit_ohe and training_cols_list and not getattr(current_ohe_encoder, "fixed_width", False):
         missing_cols = set(training_cols_list) - set(X_processed.columns)
         for c in missing_cols:
             X_processed[c] = 0
@@ -340,25 +356,41 @@ def preprocess_data_split_save(df_features, series_target, out_dir_path, fit_ohe
             X_processed = X_processed.drop(columns=list(extra_cols))
         X_processed = X_processed[training_cols_list]
     elif fit_ohe:
-        joblib.dump(final_column_names_for_output, TRAINING_COLUMNS_PATH)
-        print(f"Lista de colunas de treino ({len(final_column_names_for_output)}) salva em {TRAINING_COLUMNS_PATH}")
+        joblib.dump(final_column_names_for_output, training_columns_path)
+        print(f"Lista de colunas de treino ({len(final_column_names_for_output)}) salva em {training_columns_path}")
 
     if series_target is not None:
         X_train, X_val, y_train, y_val = train_test_split(
             X_processed, series_target, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=series_target
         )
         os.makedirs(out_dir_path, exist_ok=True)
-        joblib.dump((X_train, y_train), os.path.join(out_dir_path, 'train_data.joblib'))
-        joblib.dump((X_val, y_val), os.path.join(out_dir_path, 'val_data.joblib'))
+        # Arrays contíguos + metadados: o treino carrega com mmap_mode (ver dataset_utils.py)
+        save_processed_split(X_train, y_train, out_dir_path, TRAIN_SPLIT_NAME)
+        save_processed_split(X_val, y_val, out_dir_path, VAL_SPLIT_NAME)
         # print(f"Dados de treino e validação salvos em {out_dir_path}")
         return X_train, X_val, y_train, y_val, final_column_names_for_output
     else:
         return X_processed, None, final_column_names_for_output
 
 
-def run_preprocessing_pipeline(raw_data_input_dir, processed_data_output_dir, models_output_dir):
+def run_preprocessing_pipeline(raw_data_input_dir, processed_data_output_dir, models_output_dir, chunk_rows=PREPROCESS_CHUNK_ROWS):
     print(f"Iniciando pipeline de pré-processamento...")
     print(f"Lendo dados brutos de: {raw_data_input_dir}")
+    if chunk_rows:
+        # Em blocos de chunk_rows prospects, com memória limitada pelo bloco (ver chunked_preprocessing.py)
+        from datathon_decision.src.chunked_preprocessing import engineer_features_chunked, encode_split_chunked
+        os.makedirs(models_output_dir, exist_ok=True)
+        try:
+            manifest = engineer_features_chunked(raw_data_input_dir, chunk_rows=chunk_rows)
+            n_train, n_val, training_cols = encode_split_chunked(processed_dir=processed_data_output_dir)
+        except Exception as e:
+            msg = f"Erro durante o pré-processamento em chunks: {e}"
+            print(msg)
+            return False, msg, None
+        msg = (f"Pipeline de pré-processamento (em {len(manifest['shards'])} blocos de até {chunk_rows} linhas) concluído. "
+               f"Dados de treino/validação salvos em '{processed_data_output_dir}'. "
+               f"Linhas: treino {n_train}, validação {n_val}; {len(training_cols)} colunas")
+        return True, msg, training_cols
     try:
         df_jobs, df_prospects, df_applicants = load_data(raw_data_input_dir)
     except Exception as e:
@@ -380,7 +412,10 @@ def run_preprocessing_pipeline(raw_data_input_dir, processed_data_output_dir, mo
 
     print("Realizando engenharia de features...")
     try:
-        X_engineered_features, y_target_series = engineer_features(df_merged)
+        similarity_engine = fit_similarity_engine(df_merged)
+        joblib.dump(similarity_engine, SIMILARITY_ENGINE_PATH)
+        print(f"Motor de similaridade textual ({similarity_engine.mode}, {len(similarity_engine.vocabulary_)} tokens) salvo em {SIMILARITY_ENGINE_PATH}")
+        X_engineered_features, y_target_series = engineer_features(df_merged, similarity_engine=similarity_engine)
     except Exception as e:
         msg = f"Erro durante a engenharia de features: {e}"
         print(msg)
@@ -395,6 +430,9 @@ def run_preprocessing_pipeline(raw_data_input_dir, processed_data_output_dir, mo
             out_dir_path=processed_data_output_dir,
             fit_ohe=True
         )
+        # Referência do monitoramento de drift (drift_utils.py): features das linhas de treino, antes da codificação
+        from datathon_decision.src.drift_utils import save_drift_reference
+        save_drift_reference(X_engineered_features.iloc[X_train.index], DRIFT_REFERENCE_PATH)
         msg = (f"Pipeline de pré-processamento concluído. "
                f"Dados de treino/validação salvos em '{processed_data_output_dir}'. "
                f"Pré-processador salvo em '{PREPROCESSOR_PATH}'. "
@@ -426,11 +464,13 @@ if __name__ == "__main__":
     os.makedirs(DEFAULT_PROCESSED_DATA_DIR, exist_ok=True)
     os.makedirs(DEFAULT_MODELS_DIR, exist_ok=True)
 
-    success, message, training_cols_result = run_preprocessing_pipeline( # Capturar training_cols_result
-        raw_data_input_dir=raw_data_path_arg,
-        processed_data_output_dir=DEFAULT_PROCESSED_DATA_DIR,
-        models_output_dir=DEFAULT_MODELS_DIR
-    )
+    # Com DATATHON_PROFILE=1, tempo/memória por etapa vão para reports/pipeline_profile.json (sessão "preprocess")
+    with profile_session("preprocess"):
+        success, message, training_cols_result = run_preprocessing_pipeline( # Capturar training_cols_result
+            raw_data_input_dir=raw_data_path_arg,
+            processed_data_output_dir=DEFAULT_PROCESSED_DATA_DIR,
+            models_output_dir=DEFAULT_MODELS_DIR
+        )
     print(message) # Imprime a mensagem detalhada retornada pela função
     if success and training_cols_result:
         print(f"Colunas de treinamento final ({len(training_cols_result)}): {training_cols_result[:10]}...")
\ No newline at end of file
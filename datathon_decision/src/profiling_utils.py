@@ -0,0 +1,204 @@
+"""
+Profiler das etapas do pipeline offline: tempo de parede, tempo de CPU, pico de memória rastreada
+(tracemalloc) e tamanho dos DataFrames produzidos por etapa, com dumps opcionais do cProfile.
+
+As funções do pipeline são marcadas com @profiled / profile_stage e não fazem nada enquanto nenhum
+profiler está ativo (o custo no caminho de predição da API é uma checagem de None). Para medir:
+
+    with profile_session("preprocess", enabled=True):
+        run_preprocessing_pipeline(...)
+
+O relatório JSON é renderizado por scripts/generate_dashboard.py.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from datathon_decision.src.config import (
+    PIPELINE_PROFILE, PIPELINE_PROFILE_CPROFILE, PIPELINE_PROFILE_PATH, PIPELINE_PROFILE_CPROFILE_DIR,
+    PIPELINE_PROFILE_TRACE_MEMORY,
+)
+
+_ACTIVE = None
+
+
+class StageProfiler:
+    """Registra as etapas (aninhadas) executadas enquanto o profiler está ativo."""
+
+    def __init__(self, trace_memory=True, cprofile_dir=None):
+        self.trace_memory = trace_memory
+        self.cprofile_dir = str(cprofile_dir) if cprofile_dir else None
+        self.stages = []
+        self._stack = []
+        self._started = 0
+        self._started_tracing = False
+        self.created_at = datetime.now().isoformat()
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        # O pico do tracemalloc é global: antes de zerá-lo para esta etapa, o pico parcial é repassado à etapa pai
+        if self.trace_memory and self._stack:
+            self._stack[-1]["peak_traced_bytes"] = max(self._stack[-1]["peak_traced_bytes"], tracemalloc.get_traced_memory()[1])
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        path = "/".join([entry["name"] for entry in self._stack] + [name])
+        entry = {"name": name, "path": path, "depth": len(self._stack), "order": self._started,
+                 "frames": {}, "peak_traced_bytes": 0}
+        self._started += 1
+        self._stack.append(entry)
+        # Só um cProfile pode estar ativo por vez: o dump é feito para as etapas de primeiro nível
+        profile = cProfile.Profile() if self.cprofile_dir and entry["depth"] == 0 else None
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield entry
+        finally:
+            if profile is not None:
+                profile.disable()
+            entry["wall_s"] = time.perf_counter() - wall_start
+            entry["cpu_s"] = time.process_time() - cpu_start
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                entry["peak_traced_bytes"] = max(entry["peak_traced_bytes"], peak)
+                entry["retained_traced_bytes"] = current
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]["peak_traced_bytes"] = max(self._stack[-1]["peak_traced_bytes"], entry["peak_traced_bytes"])
+            if profile is not None:
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                entry["cprofile"] = os.path.join(self.cprofile_dir, re.sub(r"[^\w.-]+", "_", path) + ".prof")
+                profile.dump_stats(entry["cprofile"])
+            self.stages.append(entry)
+
+    def record_frames(self, **frames):
+        """Linhas, colunas e bytes (memory_usage deep) dos DataFrames/Series da etapa em execução."""
+        if not self._stack:
+            return
+        for name, frame in frames.items():
+            if isinstance(frame, (pd.DataFrame, pd.Series)):
+                memory = frame.memory_usage(deep=True)
+                self._stack[-1]["frames"][name] = {
+                    "rows": int(frame.shape[0]),
+                    "columns": int(frame.shape[1]) if frame.ndim == 2 else 1,
+                    "bytes": int(memory.sum() if isinstance(memory, pd.Series) else memory),
+                }
+
+    def report(self):
+        """Etapas na ordem em que começaram (a etapa pai antes das filhas)."""
+        stages = sorted(self.stages, key=lambda entry: entry["order"])
+        return {
+            "created_at": self.created_at,
+            "trace_memory": self.trace_memory,
+            "total_wall_s": sum(entry["wall_s"] for entry in stages if entry["depth"] == 0),
+            "max_peak_traced_bytes": max((entry["peak_traced_bytes"] for entry in stages), default=0),
+            "stages": [{key: value for key, value in entry.items() if key != "order"} for entry in stages],
+        }
+
+    def save(self, path, session):
+        """Grava o relatório como a sessão `session` de `path` (as demais sessões do arquivo são mantidas)."""
+        data = {"sessions": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        data.setdefault("sessions", {})[session] = self.report()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+
+
+@contextmanager
+def profiling(profiler):
+    """Ativa `profiler` para as funções marcadas com @profiled / profile_stage dentro do bloco."""
+    global _ACTIVE
+    previous, _ACTIVE = _ACTIVE, profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _ACTIVE = previous
+
+
+@contextmanager
+def profile_stage(name):
+    """Etapa do profiler ativo (sem profiler ativo, não faz nada)."""
+    if _ACTIVE is None:
+        yield None
+        return
+    with _ACTIVE.stage(name) as entry:
+        yield entry
+
+
+def record_frames(**frames):
+    if _ACTIVE is not None:
+        _ACTIVE.record_frames(**frames)
+
+
+def profiled(name=None, outputs=()):
+    """
+    Decorator: a função vira uma etapa do profiler ativo. `outputs` nomeia os DataFrames retornados
+    (na ordem da tupla de retorno) para registrar o tamanho deles; sem nomes, usa a posição.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE is None:
+                return func(*args, **kwargs)
+            with _ACTIVE.stage(stage_name):
+                result = func(*args, **kwargs)
+                values = result if isinstance(result, tuple) else (result,)
+                names = list(outputs) + [f"saida_{i}" for i in range(len(outputs), len(values))]
+                _ACTIVE.record_frames(**dict(zip(names, values)))
+            return result
+        return wrapper
+    return decorator
+
+
+def print_profile(report):
+    """Tabela das etapas (indentadas pelo aninhamento) no terminal."""
+    print(f"{'etapa':40s} {'parede (s)':>10s} {'CPU (s)':>9s} {'pico (MB)':>10s}  DataFrames")
+    for entry in report["stages"]:
+        frames = ", ".join(f"{name}: {frame['rows']}x{frame['columns']} {frame['bytes'] / 1e6:.1f} MB"
+                           for name, frame in entry["frames"].items())
+        peak = f"{entry['peak_traced_bytes'] / 1e6:10.1f}" if report["trace_memory"] else f"{'-':>10s}"
+        print(f"{'  ' * entry['depth'] + entry['name']:40s} {entry['wall_s']:10.2f} {entry['cpu_s']:9.2f} {peak}  {frames}")
+
+
+@contextmanager
+def profile_session(session, enabled=PIPELINE_PROFILE, cprofile=PIPELINE_PROFILE_CPROFILE, path=PIPELINE_PROFILE_PATH,
+                    trace_memory=PIPELINE_PROFILE_TRACE_MEMORY):
+    """Profiler ativo durante o bloco (se enabled); no fim, imprime a tabela e grava a sessão no relatório."""
+    if not enabled:
+        yield None
+        return
+    profiler = StageProfiler(trace_memory=trace_memory, cprofile_dir=PIPELINE_PROFILE_CPROFILE_DIR if cprofile else None)
+    try:
+        with profiling(profiler):
+            yield profiler
+    finally:
+        print(f"\n⏱️  Profiling ({session})")
+        print_profile(profiler.report())
+        print(f"✅ Relatório de profiling salvo em {profiler.save(path, session)}")
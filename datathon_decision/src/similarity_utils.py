@@ -0,0 +1,187 @@
+import hashlib
+import itertools
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+SIMILARITY_MODES = ("jaccard", "tfidf")
+
+
+class TextSimilarityEngine:
+    """
+    Similaridade texto-a-texto em lote com vetores esparsos.
+
+    - mode='jaccard': vetores binários; reproduz exatamente a similaridade de Jaccard entre
+      os conjuntos de tokens (`set(texto.split())`) usada originalmente em engineer_features.
+    - mode='tfidf': vetores TF-IDF normalizados (L2); a similaridade é o cosseno.
+
+    O vocabulário e as frequências de documento são ajustados uma vez (fit) no corpus de treino.
+    Em cada chamada, os textos são deduplicados (um vetor por vaga/candidato distinto), vetorizados
+    uma única vez e as similaridades linha a linha saem de um produto esparso em lote.
+    Tokens fora do vocabulário recebem colunas temporárias, válidas só dentro da chamada,
+    para que a interseção entre os dois lados continue exata (por isso o modo 'jaccard'
+    não depende de fit).
+    """
+
+    def __init__(self, mode="jaccard"):
+        if mode not in SIMILARITY_MODES:
+            raise ValueError(f"Modo de similaridade inválido: '{mode}'. Use um de {SIMILARITY_MODES}.")
+        self.mode = mode
+        self.vocabulary_ = {}
+        self.document_frequency_ = np.zeros(0, dtype=np.int64)
+        self.n_documents_ = 0
+
+    def fit(self, *text_series):
+        """Ajusta vocabulário e frequências de documento a partir dos textos distintos (já normalizados)."""
+        unique_texts = [t for texts in text_series for t in pd.unique(pd.Series(texts, dtype=object)) if isinstance(t, str)]
+        doc_ids, tokens = _tokenize(unique_texts)
+        token_codes, vocabulary_tokens = pd.factorize(tokens)
+        # Cada token conta uma vez por documento
+        doc_token_pairs = np.unique(doc_ids * len(vocabulary_tokens) + token_codes)
+        self.vocabulary_ = {token: token_id for token_id, token in enumerate(vocabulary_tokens)}
+        self.document_frequency_ = np.bincount(doc_token_pairs % max(len(vocabulary_tokens), 1), minlength=len(vocabulary_tokens)).astype(np.int64)
+        self.n_documents_ = len(unique_texts)
+        self._token_index = None
+        return self
+
+    def _vocabulary_index(self):
+        # pd.Index faz o lookup token -> id em C (get_indexer) em vez de um dict.get por token
+        if getattr(self, "_token_index", None) is None:
+            self._token_index = pd.Index(list(self.vocabulary_), dtype=object)
+        return self._token_index
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_token_index"] = None
+        return state
+
+    def _idf(self, n_columns):
+        # Mesmo IDF suavizado do TfidfVectorizer: ln((1 + n) / (1 + df)) + 1; tokens novos têm df = 0
+        df = np.zeros(n_columns, dtype=np.float64)
+        df[:len(self.document_frequency_)] = self.document_frequency_
+        return np.log((1.0 + self.n_documents_) / (1.0 + df)) + 1.0
+
+    def vectorize(self, texts):
+        """
+        Matriz CSR com uma linha por texto (binária no modo 'jaccard', TF-IDF L2 no modo 'tfidf').
+        Tokens fora do vocabulário ganham colunas temporárias após as do vocabulário.
+        """
+        doc_ids, tokens = _tokenize(texts)
+        base_size = len(self.vocabulary_)
+        token_ids = self._vocabulary_index().get_indexer(tokens) if base_size else np.full(len(tokens), -1, dtype=np.int64)
+        oov = token_ids < 0
+        n_extension = 0
+        if oov.any():
+            extension_codes, extension_tokens = pd.factorize(tokens[oov])
+            token_ids[oov] = base_size + extension_codes
+            n_extension = len(extension_tokens)
+        n_columns = max(base_size + n_extension, 1)
+
+        keys, counts = np.unique(doc_ids * n_columns + token_ids, return_counts=True)
+        rows = keys // n_columns
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(texts)))))
+        data = np.ones(len(keys), dtype=np.float64) if self.mode == "jaccard" else counts.astype(np.float64)
+        matrix = sp.csr_matrix((data, keys % n_columns, indptr), shape=(len(texts), n_columns))
+        if self.mode == "tfidf":
+            matrix = matrix.multiply(self._idf(n_columns)).tocsr()
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0.0] = 1.0
+            matrix = sp.diags(1.0 / norms).dot(matrix).tocsr()
+        return matrix
+
+    def rowwise_similarity(self, texts_a, texts_b, keys_a=None, keys_b=None):
+        """
+        Similaridade entre texts_a[i] e texts_b[i] para cada linha i (retorna ndarray float64).
+        keys_a/keys_b (opcionais): ids que determinam o texto de cada lado (ex.: codigo_profissional,
+        vaga_id); com eles a deduplicação usa os ids em vez de fazer hash dos textos longos.
+        """
+        codes_a, unique_a = _factorize_texts(texts_a, keys_a)
+        codes_b, unique_b = _factorize_texts(texts_b, keys_b)
+        # Os dois lados são vetorizados juntos para compartilharem as colunas temporárias (interseção exata)
+        vectors = self.vectorize(list(unique_a) + list(unique_b))
+        rows_a = vectors[codes_a]
+        rows_b = vectors[codes_b + len(unique_a)]
+        dot = np.asarray(rows_a.multiply(rows_b).sum(axis=1), dtype=np.float64).ravel()
+        if self.mode == "tfidf":
+            return dot
+
+        sizes = np.diff(vectors.indptr).astype(np.float64)
+        size_a = sizes[codes_a]
+        size_b = sizes[codes_b + len(unique_a)]
+        union = size_a + size_b - dot
+        scores = np.zeros(len(dot), dtype=np.float64)
+        valid = (size_a > 0) & (size_b > 0) & (union > 0)
+        scores[valid] = dot[valid] / union[valid]
+        return scores
+
+
+class DocumentFrequencyCounter:
+    """
+    Ajuste incremental do TextSimilarityEngine: textos (já normalizados) chegam aos poucos, em n_fields campos, e
+    só ficam as frequências de documento por token (na ordem da primeira aparição em cada campo) e um digest de
+    8 bytes de cada texto distinto, para contar cada um uma vez por campo. engine() dá o mesmo vocabulário e as
+    mesmas frequências de fit() com todos os textos de cada campo, na mesma ordem.
+    """
+
+    def __init__(self, n_fields):
+        self.field_frequencies = [{} for _ in range(n_fields)]
+        self.field_digests = [set() for _ in range(n_fields)]
+
+    def add(self, field, text):
+        if not isinstance(text, str):
+            return
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        if digest in self.field_digests[field]:
+            return
+        self.field_digests[field].add(digest)
+        frequencies = self.field_frequencies[field]
+        for token in dict.fromkeys(text.split()):
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+    def engine(self, mode="jaccard"):
+        # Vocabulário na ordem de fit(): tokens do 1º campo, depois os novos do 2º, e assim por diante
+        frequencies = {}
+        for field_frequencies in self.field_frequencies:
+            for token, count in field_frequencies.items():
+                frequencies[token] = frequencies.get(token, 0) + count
+        engine = TextSimilarityEngine(mode=mode)
+        engine.vocabulary_ = {token: token_id for token_id, token in enumerate(frequencies)}
+        engine.document_frequency_ = np.fromiter(frequencies.values(), dtype=np.int64, count=len(frequencies))
+        engine.n_documents_ = sum(len(digests) for digests in self.field_digests)
+        engine._token_index = None
+        return engine
+
+
+def _factorize_texts(texts, keys=None):
+    """Códigos por linha + texto de cada grupo distinto (agrupando por keys quando fornecidas)."""
+    texts = pd.Series(texts, dtype=object)
+    if keys is None:
+        return pd.factorize(texts, use_na_sentinel=False)
+    codes, _ = pd.factorize(pd.Series(keys).to_numpy(), use_na_sentinel=False)
+    first_rows = np.unique(codes, return_index=True)[1]
+    return codes, texts.to_numpy()[first_rows]
+
+
+def _tokenize(texts):
+    """Separa os textos em tokens (str.split); retorna (id do documento de cada token, array de tokens)."""
+    token_lists = [text.split() if isinstance(text, str) else [] for text in texts]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    doc_ids = np.repeat(np.arange(len(token_lists), dtype=np.int64), lengths)
+    tokens = np.fromiter(itertools.chain.from_iterable(token_lists), dtype=object, count=int(lengths.sum()))
+    return doc_ids, tokens
+
+
+def jaccard_similarity_loop(text1_series, text2_series):
+    """Implementação de referência (laço Python com sets), mantida para comparação nos benchmarks."""
+    scores = []
+    for t1, t2 in zip(text1_series, text2_series):
+        set1 = set(t1.split())
+        set2 = set(t2.split())
+        if not set1 or not set2:
+            scores.append(0.0)
+            continue
+        intersection = len(set1.intersection(set2))
+        union = len(set1.union(set2))
+        scores.append(intersection / union if union != 0 else 0.0)
+    return scores
@@ -0,0 +1,141 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Módulos pesados carregados no warm-up, nesta ordem: cada tempo é incremental
+# (o que já foi importado por um módulo anterior não conta de novo no seguinte).
+WARMUP_IMPORTS = (
+    "numpy",
+    "pandas",
+    "joblib",
+    "sklearn.preprocessing",
+    "datathon_decision.src.preprocess_utils",
+    "datathon_decision.src.model_utils",
+)
+
+# Payload sintético usado na predição de aquecimento (mesmos campos do exemplo da API)
+WARMUP_PAYLOAD = {
+    "perfil_vaga": {
+        "nivel profissional": "Sênior",
+        "nivel_academico": "Superior Completo",
+        "nivel_ingles": "Avançado",
+        "areas_atuacao": "TI - DEV",
+        "competencia_tecnicas_e_comportamentais": "Java Python SQL"
+    },
+    "informacoes_basicas": {"vaga_sap": "Não", "titulo_vaga": "Dev Java Sr"},
+    "informacoes_profissionais": {
+        "nivel_profissional": "Sênior",
+        "area_atuacao": "Desenvolvimento",
+        "conhecimentos_tecnicos": "Java Spring",
+        "objetivo_profissional": "Desenvolvedor Java"
+    },
+    "formacao_e_idiomas": {"nivel_academico": "Superior Completo", "nivel_ingles": "Avançado"},
+    "cv_pt": "Experiencia com Java e Python",
+    "comentario_prospect": "Candidato promissor",
+    "data_candidatura_prospect": "01-01-2023",
+    "ultima_atualizacao_prospect": "10-01-2023",
+    "candidato_taxa_desistencia_historica_num": 0.1
+}
+
+
+def timed_import(module_name, timings):
+    """Importa um módulo registrando o tempo gasto (segundos) em timings[module_name]."""
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    timings[module_name] = round(time.perf_counter() - start, 4)
+    return module
+
+
+class ModelWarmup:
+    """
+    Carrega os artefatos e faz uma predição sintética antes de o serviço ser declarado pronto.
+
+    Estados: 'pending' -> 'loading' -> 'ready' (ou 'failed'). Pode rodar no próprio thread
+    (run, usado com gunicorn --preload antes do fork) ou em background (start).
+    Se o processo for forkado antes do warm-up terminar, o filho reinicia o warm-up,
+    já que o thread do processo pai não existe no filho.
+    """
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.status = "pending"
+        self.error = None
+        self.timings = {}
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        """Dispara o warm-up em um thread daemon (não bloqueia o import do app)."""
+        with self._lock:
+            if self.status in ("loading", "ready"):
+                return
+            self.status = "loading"
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Executa o warm-up no thread atual."""
+        with self._lock:
+            if self.status == "ready":
+                return
+            self.status = "loading"
+        self._run()
+
+    def _run(self):
+        timings = {}
+        try:
+            imports = {}
+            for module_name in WARMUP_IMPORTS:
+                timed_import(module_name, imports)
+            timings["imports"] = imports
+            from datathon_decision.src import model_utils
+
+            start = time.perf_counter()
+            model_utils.load_artifacts()
+            timings["load_artifacts_s"] = round(time.perf_counter() - start, 4)
+
+            start = time.perf_counter()
+            model_utils.predict_pipeline(WARMUP_PAYLOAD)
+            timings["warmup_prediction_s"] = round(time.perf_counter() - start, 4)
+
+            # Monta as tabelas por nó das explicações agora, e não no primeiro ?explain=true
+            start = time.perf_counter()
+            try:
+                model_utils.explain_pipeline(WARMUP_PAYLOAD, enforce_budget=False)
+                timings["warmup_explanation_s"] = round(time.perf_counter() - start, 4)
+            except NotImplementedError:
+                pass
+        except Exception as e:
+            with self._lock:
+                self.status, self.error, self.timings = "failed", str(e), timings
+            logger.error(f"Warm-up do modelo falhou; o serviço não ficará pronto. {e}", exc_info=True)
+            return
+
+        timings["startup_total_s"] = round(time.perf_counter() - self.started_at, 4)
+        with self._lock:
+            self.status, self.error, self.timings = "ready", None, timings
+        logger.info(
+            f"Serviço pronto em {timings['startup_total_s']:.2f}s "
+            f"(imports: {sum(imports.values()):.2f}s, artefatos: {timings['load_artifacts_s']:.2f}s, "
+            f"predição de aquecimento: {timings['warmup_prediction_s']:.3f}s). Imports por módulo: {imports}"
+        )
+
+    def _after_fork(self):
+        # O lock pode ter sido copiado travado e o thread do pai não existe no filho
+        self._lock = threading.Lock()
+        if self.status == "loading":
+            self.status = "pending"
+            self.start()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def snapshot(self):
+        with self._lock:
+            return {"status": self.status, "error": self.error, "timings": dict(self.timings)}
@@ -1,18 +1,27 @@
-import joblib
-from datathon_decision.src.config import PROCESSED_DATA_DIR
+from datathon_decision.src.config import PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME
+from datathon_decision.src.dataset_utils import load_processed_split
+from datathon_decision.src.model_backends import get_model_backend
 from datathon_decision.src.model_utils import train_model, evaluate_model
+from datathon_decision.src.profiling_utils import profile_session, profile_stage
 
-if __name__ == "__main__":
+
+def main():
     print("Carregando dados de treino e validação...")
-    train_path = PROCESSED_DATA_DIR / "train_data.joblib"
-    val_path = PROCESSED_DATA_DIR / "val_data.joblib"
-    X_train, y_train = joblib.load(train_path)
-    X_val, y_val = joblib.load(val_path)
+    # mmap_mode='r': os arrays são paginados sob demanda em vez de desserializados inteiros na RAM
+    with profile_stage("load_processed_split"):
+        X_train, y_train = load_processed_split(PROCESSED_DATA_DIR, TRAIN_SPLIT_NAME, mmap_mode="r")
+        X_val, y_val = load_processed_split(PROCESSED_DATA_DIR, VAL_SPLIT_NAME, mmap_mode="r")
     print(f"Shapes: X_train={X_train.shape}, y_train={y_train.shape}, X_val={X_val.shape}, y_val={y_val.shape}")
 
-    print("Treinando modelo RandomForest...")
+    print(f"Treinando modelo ({get_model_backend().name})...")
     model = train_model(X_train, y_train)
 
     print("Avaliando modelo no conjunto de validação...")
     metrics = evaluate_model(model, X_val, y_val)
-    print("Métricas de validação:", metrics) 
\ No newline at end of file
+    print("Métricas de validação:", metrics)
+
+
+if __name__ == "__main__":
+    # Com DATATHON_PROFILE=1, tempo/memória por etapa vão para reports/pipeline_profile.json (sessão "train")
+    with profile_session("train"):
+        main()
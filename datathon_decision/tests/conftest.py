@@ -0,0 +1,43 @@
+"""Fixtures compartilhadas: registros golden no formato do payload e um data/raw/ mínimo montado a partir deles."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from datathon_decision.src.config import RAW_APPLICANT_FIELDS, RAW_JOB_FIELDS
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="session")
+def golden_records():
+    with open(DATA_DIR / "feature_spec_records.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def make_raw_dir(golden_records, tmp_path):
+    """
+    Fábrica de diretórios no layout de data/raw/ (vagas.json, applicants.json, prospects.json) com os registros
+    golden repetidos `copies` vezes (ids com sufixo '-<cópia>'); `records` sobrescreve os registros.
+    """
+    def make(name="raw", copies=1, records=None):
+        jobs, applicants, prospects = {}, {}, {}
+        for copy in range(copies):
+            for record in records if records is not None else golden_records:
+                job_id, candidate_id = f"{record['vaga_id']}-{copy}", f"{record['codigo_profissional']}-{copy}"
+                jobs.setdefault(job_id, {section: record[section] for section in RAW_JOB_FIELDS if section in record})
+                applicants.setdefault(candidate_id,
+                                      {section: record[section] for section in RAW_APPLICANT_FIELDS if section in record})
+                prospects.setdefault(job_id, {"titulo": job_id, "modalidade": "", "prospects": []})["prospects"].append({
+                    "nome": candidate_id, "codigo": candidate_id, "situacao_candidado": record.get("situacao_candidado"),
+                    "comentario": record.get("comentario_prospect"), "recrutador": "",
+                })
+        raw_dir = tmp_path / name
+        raw_dir.mkdir()
+        for file_name, data in (("vagas.json", jobs), ("applicants.json", applicants), ("prospects.json", prospects)):
+            with open(raw_dir / file_name, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        return raw_dir
+    return make
@@ -0,0 +1,107 @@
+"""
+Controle de admissão: fila cheia (429) e prazo impossível (503) com Retry-After, header de prazo que só encurta,
+limites de texto do payload (413) e contadores em execução/na fila zerados depois de exceções.
+"""
+
+import time
+
+import pytest
+
+from datathon_decision.src.admission_utils import (
+    AdmissionController, Deadline, DeadlineExceeded, Rejected, check_payload_limits, request_deadline,
+)
+from datathon_decision.src.config import ADMISSION_RETRY_AFTER_S, PAYLOAD_TEXT_LIMITS
+
+DEFAULT_MS = 5000.0
+
+
+def test_queue_full_is_rejected_with_429():
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    controller.service_ms["full"] = 3500.0
+    with controller.admit(Deadline(DEFAULT_MS), "full"):
+        with pytest.raises(Rejected) as rejected:
+            with controller.admit(Deadline(DEFAULT_MS), "full"):
+                pass
+    # Retry-After: espera estimada (1 predição de 3,5 s na frente) arredondada para cima
+    assert (rejected.value.status, rejected.value.retry_after) == (429, 4)
+    assert controller.counters["shed_queue_full"] == 1
+    assert (controller.in_flight, controller.queued) == (0, 0)
+
+
+def test_unmeetable_deadline_is_rejected_with_503():
+    controller = AdmissionController(max_in_flight=1, max_queue=5)
+    controller.service_ms["full"] = 2500.0
+    with controller.admit(Deadline(DEFAULT_MS), "full"):
+        # 2,5 s de espera + 2,5 s de serviço não cabem em 3 s: recusa sem entrar na fila
+        with pytest.raises(Rejected) as rejected:
+            with controller.admit(Deadline(3000.0), "full"):
+                pass
+        assert (rejected.value.status, rejected.value.retry_after) == (503, 3)
+        assert controller.queued == 0
+        # Prazo já esgotado ao chegar: 503 com o Retry-After mínimo
+        with pytest.raises(Rejected) as expired:
+            with controller.admit(Deadline(10.0, elapsed_ms=20.0), "full"):
+                pass
+        assert (expired.value.status, expired.value.retry_after) == (503, ADMISSION_RETRY_AFTER_S)
+    assert controller.counters["shed_deadline"] == 2
+
+
+def test_deadline_expiring_in_the_queue_is_rejected():
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    with controller.admit(Deadline(DEFAULT_MS), "full"):
+        # Sem tempo de serviço estimado a requisição entra na fila e o prazo acaba esperando
+        with pytest.raises(Rejected) as rejected:
+            with controller.admit(Deadline(30.0), "full"):
+                pass
+        assert rejected.value.status == 503
+        assert controller.queued == 0
+    assert controller.in_flight == 0
+
+
+@pytest.mark.parametrize("header, budget_ms", [
+    ("1000", 1000.0), ("9000", DEFAULT_MS), ("inf", DEFAULT_MS), ("-inf", DEFAULT_MS), ("nan", DEFAULT_MS),
+    ("0", DEFAULT_MS), ("-5", DEFAULT_MS), ("abc", DEFAULT_MS), (None, DEFAULT_MS),
+])
+def test_deadline_header_only_shortens(header, budget_ms):
+    headers = {} if header is None else {"X-Request-Deadline-Ms": header}
+    deadline = request_deadline(headers, default_ms=DEFAULT_MS)
+    assert deadline.budget_ms == budget_ms
+    assert 0 < deadline.remaining_ms() <= budget_ms
+
+
+def test_request_start_is_discounted():
+    started = f"t={(time.time() - 2.0) * 1e6:.0f}"  # µs, como o nginx envia
+    deadline = request_deadline({"X-Request-Deadline-Ms": "3000", "X-Request-Start": started}, default_ms=DEFAULT_MS)
+    assert 900 < deadline.remaining_ms() <= 1000
+    # Header inválido é ignorado
+    assert request_deadline({"X-Request-Start": "t=nan"}, default_ms=DEFAULT_MS).remaining_ms() > DEFAULT_MS - 100
+
+
+@pytest.mark.parametrize("field", list(PAYLOAD_TEXT_LIMITS))
+def test_payload_text_limits(field):
+    limit = PAYLOAD_TEXT_LIMITS[field]
+    check_payload_limits({field: "x" * limit})
+    with pytest.raises(Rejected) as rejected:
+        check_payload_limits({field: "x" * (limit + 1)})
+    assert (rejected.value.status, rejected.value.retry_after) == (413, None)
+    # Campos não textuais e payloads que não são dicionários passam (a validação é de outra etapa)
+    check_payload_limits({field: 12345})
+    check_payload_limits(["x" * (limit + 1)])
+
+
+def test_counters_return_to_zero_after_exceptions():
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    with pytest.raises(ValueError):
+        with controller.admit(Deadline(DEFAULT_MS), "full"):
+            raise ValueError("erro na predição")
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit(Deadline(DEFAULT_MS), "full"):
+            raise DeadlineExceeded("modelo")
+    assert (controller.in_flight, controller.queued) == (0, 0)
+    counters = controller.counters
+    assert (counters["admitted"], counters["completed"], counters["deadline_exceeded"]) == (2, 0, 1)
+    # Sem predição concluída não há tempo de serviço estimado, e a próxima é admitida normalmente
+    assert controller.service_ms == {}
+    with controller.admit(Deadline(DEFAULT_MS), "full"):
+        assert controller.in_flight == 1
+    assert controller.in_flight == 0 and controller.counters["completed"] == 1
@@ -0,0 +1,140 @@
+"""
+Profiling sob demanda: a predição medida roda sozinha no worker, as esperas respeitam o prazo da requisição (503 para
+quem espera um perfil, sem perfil para quem não consegue a exclusividade a tempo) e /api/profiles só responde ao token.
+"""
+
+import threading
+import time
+
+import pytest
+
+from datathon_decision.src.admission_utils import Deadline, DeadlineExceeded
+from datathon_decision.src.api_profiling import ProfileStore, RequestProfiler
+
+TOKEN = "segredo"
+WAIT_S = 5.0
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(sample_rate=0, token=TOKEN, store=ProfileStore(tmp_path / "profiles"), max_wait_ms=5000)
+
+
+class Prediction(threading.Thread):
+    """Predição em outro thread que fica dentro do bloco do perfil até `release` ser sinalizado."""
+
+    def __init__(self, profiler, name, trigger=None, log=None):
+        super().__init__(daemon=True)
+        self.profiler, self.name, self.trigger, self.log = profiler, name, trigger, log
+        self.entered, self.release = threading.Event(), threading.Event()
+        self.result = None
+
+    def run(self):
+        with self.profiler.profile(self.trigger, {"cv_pt": "texto"}) as self.result:
+            if self.log is not None:
+                self.log.append(("start", self.name))
+            self.entered.set()
+            self.release.wait(WAIT_S)
+            if self.log is not None:
+                self.log.append(("end", self.name))
+
+
+def wait_until(condition):
+    stop = time.monotonic() + WAIT_S
+    while not condition():
+        assert time.monotonic() < stop
+        time.sleep(0.005)
+
+
+def test_profiled_prediction_runs_alone(profiler):
+    log = []
+    running = Prediction(profiler, "running", log=log)
+    running.start()
+    assert running.entered.wait(WAIT_S)
+    # O perfil espera a predição em andamento; a que chega depois dele espera o perfil terminar
+    profiled = Prediction(profiler, "profiled", trigger="header", log=log)
+    profiled.start()
+    wait_until(lambda: profiler._profiling)
+    later = Prediction(profiler, "later", log=log)
+    later.start()
+    time.sleep(0.05)
+    assert not profiled.entered.is_set() and not later.entered.is_set()
+
+    running.release.set()
+    assert profiled.entered.wait(WAIT_S)
+    time.sleep(0.05)
+    assert not later.entered.is_set()
+    profiled.release.set()
+    later.release.set()
+    for thread in (running, profiled, later):
+        thread.join(WAIT_S)
+    assert log == [("start", "running"), ("end", "running"), ("start", "profiled"), ("end", "profiled"),
+                   ("start", "later"), ("end", "later")]
+    assert profiled.result["profile_id"] in [meta["id"] for meta in profiler.store.list()]
+    assert (profiler._running, profiler._profiling) == (0, False)
+
+
+def test_waiting_for_a_profile_is_bounded_by_the_deadline(profiler):
+    profiled = Prediction(profiler, "profiled", trigger="header")
+    profiled.start()
+    assert profiled.entered.wait(WAIT_S)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as exceeded:
+        with profiler.profile(None, deadline=Deadline(50.0)):
+            pytest.fail("a predição não deveria rodar durante o perfil")
+    assert time.monotonic() - start < WAIT_S / 2
+    assert exceeded.value.status == 503 and exceeded.value.retry_after
+    assert profiler._running == 0
+    profiled.release.set()
+    profiled.join(WAIT_S)
+    assert (profiler._running, profiler._profiling) == (0, False)
+
+
+@pytest.mark.parametrize("max_wait_ms, deadline_ms", [(50, None), (5000, 50.0)])
+def test_trigger_without_exclusivity_in_time_runs_unprofiled(profiler, max_wait_ms, deadline_ms):
+    profiler.max_wait_ms = max_wait_ms
+    deadline = None if deadline_ms is None else Deadline(deadline_ms)
+    running = Prediction(profiler, "running")
+    running.start()
+    assert running.entered.wait(WAIT_S)
+    start = time.monotonic()
+    # Não consegue rodar sozinha dentro de min(max_wait_ms, prazo): roda sem perfil, junto com a outra
+    with profiler.profile("header", {"cv_pt": "texto"}, deadline=deadline) as profiled:
+        assert (profiler._running, profiler._profiling) == (2, False)
+    assert time.monotonic() - start < WAIT_S / 2
+    assert profiled["profile_id"] is None and profiler.store.list() == []
+    running.release.set()
+    running.join(WAIT_S)
+    assert profiler._running == 0
+
+
+@pytest.fixture
+def client():
+    from datathon_decision.src import app as app_module
+    return app_module, app_module.app.test_client()
+
+
+@pytest.mark.parametrize("token, headers", [
+    (None, {}), (None, {"X-Profile-Token": TOKEN}), (TOKEN, {}), (TOKEN, {"X-Profile-Token": "errado"}),
+])
+def test_profiles_are_hidden_without_the_right_token(client, monkeypatch, tmp_path, token, headers):
+    app_module, test_client = client
+    store = ProfileStore(tmp_path / "profiles")
+    monkeypatch.setattr(app_module, "profiler", RequestProfiler(sample_rate=0, token=token, store=store))
+    # A mesma 404 em todos os casos: a resposta não revela se há token configurado
+    responses = [test_client.get("/api/profiles", headers=headers),
+                 test_client.get("/api/profiles/inexistente", headers=headers)]
+    assert [(r.status_code, r.get_json()) for r in responses] == [(404, {"error": "Não encontrado."})] * 2
+
+
+def test_profiles_are_listed_with_the_right_token(client, monkeypatch, tmp_path):
+    app_module, test_client = client
+    profiler = RequestProfiler(sample_rate=0, token=TOKEN, store=ProfileStore(tmp_path / "profiles"))
+    monkeypatch.setattr(app_module, "profiler", profiler)
+    with profiler.profile("header", {"cv_pt": "texto"}, tier="full") as profiled:
+        sum(range(1000))
+    response = test_client.get("/api/profiles", headers={"X-Profile-Token": TOKEN})
+    assert response.status_code == 200
+    assert [meta["id"] for meta in response.get_json()["profiles"]] == [profiled["profile_id"]]
+    missing = test_client.get("/api/profiles/inexistente", headers={"X-Profile-Token": TOKEN})
+    assert missing.status_code == 404 and "inexistente" in missing.get_json()["error"]
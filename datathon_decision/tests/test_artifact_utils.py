@@ -0,0 +1,81 @@
+"""
+Formato packed da floresta: mesmas probabilidades do RandomForestClassifier, inclusive carregado via mmap, e limite de
+erro das variantes de precisão reduzida.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from datathon_decision.src.artifact_utils import (
+    PACKED_FOREST_VALUE_ERROR, PackedForest, load_packed_forest, save_packed_forest,
+)
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=400, n_features=8, n_informative=5, random_state=0)
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])]), y
+
+
+@pytest.fixture(scope="module")
+def forest(data):
+    X, y = data
+    return RandomForestClassifier(n_estimators=25, min_samples_leaf=2, class_weight="balanced", random_state=0).fit(X, y)
+
+
+def test_packed_predict_proba_matches_sklearn(forest, data):
+    X, _ = data
+    packed = PackedForest.from_estimator(forest)
+    np.testing.assert_array_equal(packed.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(packed.predict(X), forest.predict(X))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_packed_saved_and_loaded_matches_sklearn(forest, data, tmp_path, compress):
+    X, _ = data
+    save_packed_forest(forest, tmp_path / "packed", compress=compress)
+    packed = load_packed_forest(tmp_path / "packed", mmap_mode="r")
+    if not compress:
+        # Sem compressão os arrays são mapeados, não copiados
+        assert isinstance(packed.threshold, np.memmap)
+    np.testing.assert_array_equal(packed.predict_proba(X), forest.predict_proba(X))
+    assert list(packed.classes_) == list(forest.classes_)
+
+
+def test_packed_predict_proba_in_batches(forest, data, monkeypatch):
+    from datathon_decision.src import artifact_utils
+    X, _ = data
+    # Força o caminho em blocos (lotes maiores que PACKED_FOREST_BATCH_ROWS)
+    monkeypatch.setattr(artifact_utils, "PACKED_FOREST_BATCH_ROWS", 64)
+    np.testing.assert_array_equal(PackedForest.from_estimator(forest).predict_proba(X), forest.predict_proba(X))
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_precision_keeps_decisions_within_bound(forest, data, tmp_path, precision):
+    X, _ = data
+    save_packed_forest(forest, tmp_path / precision, precision=precision)
+    packed = load_packed_forest(tmp_path / precision)
+    expected = forest.predict_proba(X)
+    # Mesmas folhas em todas as árvores: só o arredondamento dos valores muda a probabilidade
+    np.testing.assert_array_equal(packed.apply(X), PackedForest.from_estimator(forest).apply(X))
+    assert np.abs(packed.predict_proba(X) - expected).max() <= PACKED_FOREST_VALUE_ERROR[precision]
+
+
+def test_float16_bound_holds_only_when_decisions_do_not_change(data):
+    X, y = data
+    # Features inteiras: os cortes (x.5) são exatos em float16 e nenhuma decisão muda
+    X_grid = X.round().clip(-8, 8)
+    grid_forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(X_grid, y)
+    grid_packed = PackedForest.from_estimator(grid_forest).with_precision("float16")
+    assert np.abs(grid_packed.predict_proba(X_grid) - grid_forest.predict_proba(X_grid)).max() \
+        <= PACKED_FOREST_VALUE_ERROR["float16"]
+
+    # Features contínuas: thresholds arredondados trocam decisões e o erro passa do limite (não equivalente)
+    forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(X, y)
+    packed = PackedForest.from_estimator(forest).with_precision("float16")
+    X_near = X + 1e-3 * np.random.default_rng(0).standard_normal(X.shape)
+    assert (packed.apply(X_near) != PackedForest.from_estimator(forest).apply(X_near)).any()
+    assert np.abs(packed.predict_proba(X_near) - forest.predict_proba(X_near)).max() > PACKED_FOREST_VALUE_ERROR["float16"]
@@ -0,0 +1,99 @@
+"""Scoring em lote retomável: a execução interrompida e retomada grava os mesmos bytes; fingerprint novo recomeça."""
+
+import os
+
+import joblib
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from datathon_decision.src import batch_scoring, model_utils
+from datathon_decision.src.config import TEXT_SIMILARITY_MODE
+from datathon_decision.src.preprocess_utils import engineer_features, merge_pairs, preprocess_data_split_save
+from datathon_decision.src.similarity_utils import TextSimilarityEngine
+
+CHUNK_ROWS = 5
+
+
+@pytest.fixture
+def raw_dir(make_raw_dir):
+    # 8 registros x 4 cópias = 32 pares, 7 chunks
+    return make_raw_dir(copies=4)
+
+
+@pytest.fixture
+def artifacts(raw_dir, tmp_path, monkeypatch):
+    """Modelo pequeno treinado sobre os próprios pares, servido por load_artifacts (sem models/)."""
+    df_jobs, df_applicants, df_pairs = batch_scoring.load_scoring_inputs(raw_dir)
+    engine = TextSimilarityEngine(mode=TEXT_SIMILARITY_MODE)
+    X, y = engineer_features(merge_pairs(df_pairs, df_jobs, df_applicants), similarity_engine=engine)
+    X_processed, _, _ = preprocess_data_split_save(
+        X, None, None, fit_ohe=True, categorical_encoding="onehot",
+        preprocessor_path=tmp_path / "ohe.joblib", training_columns_path=tmp_path / "cols.joblib",
+    )
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X_processed, y)
+    loaded = {"model": model, "ohe": joblib.load(tmp_path / "ohe.joblib"), "training_cols": list(X_processed.columns),
+              "similarity_engine": engine}
+    monkeypatch.setattr(model_utils, "load_artifacts", lambda reload=False: loaded)
+    # O fingerprint considera o arquivo do modelo: um caminho do teste, não o de models/
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"modelo")
+    monkeypatch.setattr(batch_scoring, "MODEL_PATH", model_path)
+    for name in ("PACKED_MODEL_DIR", "PREPROCESSOR_PATH", "TRAINING_COLUMNS_PATH"):
+        monkeypatch.setattr(batch_scoring, name, tmp_path / "ausente" / name)
+    return loaded
+
+
+def score(raw_dir, output, **kwargs):
+    return batch_scoring.run_batch_scoring(raw_dir, output, chunk_rows=CHUNK_ROWS, workers=1, **kwargs)
+
+
+def interrupt_after(monkeypatch, n_chunks):
+    """score_chunk levanta KeyboardInterrupt no chunk n_chunks (como um Ctrl+C no meio da execução)."""
+    original, calls = batch_scoring.score_chunk, []
+
+    def flaky(start, stop):
+        if len(calls) == n_chunks:
+            raise KeyboardInterrupt
+        calls.append(start)
+        return original(start, stop)
+    monkeypatch.setattr(batch_scoring, "score_chunk", flaky)
+    return lambda: monkeypatch.setattr(batch_scoring, "score_chunk", original)
+
+
+@pytest.mark.parametrize("suffix", ["csv", "jsonl"])
+def test_resumed_run_is_byte_identical(raw_dir, artifacts, tmp_path, monkeypatch, suffix):
+    expected = tmp_path / f"full.{suffix}"
+    summary = score(raw_dir, expected)
+    assert summary["rows_scored"] == summary["total_rows"] == 32
+
+    output = tmp_path / f"scores.{suffix}"
+    restore = interrupt_after(monkeypatch, 3)
+    with pytest.raises(KeyboardInterrupt):
+        score(raw_dir, output)
+    restore()
+    # Bytes de um chunk escrito pela metade, depois do último confirmado no progresso
+    with open(output, "ab") as f:
+        f.write(b"lixo de um chunk incompleto")
+
+    resumed = score(raw_dir, output)
+    assert resumed["resumed_from_chunk"] == 3
+    assert resumed["rows_scored"] == 32 - 3 * CHUNK_ROWS
+    assert output.read_bytes() == expected.read_bytes()
+
+
+def test_changed_fingerprint_restarts(raw_dir, artifacts, tmp_path, monkeypatch):
+    expected = tmp_path / "full.csv"
+    score(raw_dir, expected)
+    output = tmp_path / "scores.csv"
+    restore = interrupt_after(monkeypatch, 2)
+    with pytest.raises(KeyboardInterrupt):
+        score(raw_dir, output)
+    restore()
+
+    # Modelo republicado (outro mtime): o progresso salvo não vale mais
+    stat = os.stat(batch_scoring.MODEL_PATH)
+    os.utime(batch_scoring.MODEL_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    restarted = score(raw_dir, output)
+    assert restarted["resumed_from_chunk"] == 0
+    assert restarted["rows_scored"] == 32
+    assert output.read_bytes() == expected.read_bytes()
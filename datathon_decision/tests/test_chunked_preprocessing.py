@@ -0,0 +1,74 @@
+"""
+Pré-processamento em chunks: leitura de prospects.json item a item e, sobre os registros golden, train/val e motor de
+similaridade iguais aos do caminho normal (merge_data + fit_similarity_engine + preprocess_data_split_save) com o
+mesmo split por hash.
+"""
+
+import json
+
+import joblib
+import numpy as np
+import pytest
+
+from datathon_decision.src.chunked_preprocessing import (
+    encode_split_chunked, engineer_features_chunked, is_validation, iter_json_object_items, split_hash,
+)
+from datathon_decision.src.config import TRAIN_SPLIT_NAME, VAL_SPLIT_NAME
+from datathon_decision.src.dataset_utils import load_processed_split
+from datathon_decision.src.preprocess_utils import (
+    engineer_features, fit_similarity_engine, load_data, merge_data, preprocess_data_split_save,
+)
+
+
+@pytest.mark.parametrize("read_chars", [1, 7, 1 << 20])
+def test_json_items_are_read_incrementally(tmp_path, read_chars):
+    data = {"1": {"prospects": [{"codigo": 10, "nota": 1.5e3}], "titulo": "Dev \"Sênior\" {java}"},
+            "2": {"prospects": []}, "3": 12345, "4": [1, "}", None]}
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    assert list(iter_json_object_items(path, read_chars=read_chars)) == list(data.items())
+    path.write_text(" { } ", encoding="utf-8")
+    assert list(iter_json_object_items(path, read_chars=read_chars)) == []
+    path.write_text('{"1": {"a": 1}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_object_items(path, read_chars=read_chars))
+
+
+@pytest.fixture
+def expected(make_raw_dir, tmp_path):
+    """Caminho normal sobre os registros golden (3 cópias), com o split por hash do modo em chunks."""
+    raw_dir = make_raw_dir(copies=3)
+    df_merged = merge_data(*load_data(raw_dir))
+    engine = fit_similarity_engine(df_merged)
+    X, y = engineer_features(df_merged, similarity_engine=engine)
+    X_encoded, _, columns = preprocess_data_split_save(
+        X, None, None, fit_ohe=True, preprocessor_path=tmp_path / "enc.joblib", training_columns_path=tmp_path / "cols.joblib")
+    validation = is_validation(split_hash(df_merged))
+    splits = {TRAIN_SPLIT_NAME: (X_encoded[~validation], y[~validation]),
+              VAL_SPLIT_NAME: (X_encoded[validation], y[validation])}
+    return raw_dir, engine, columns, splits
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 5, 1000])
+def test_chunked_output_matches_normal_preprocessing(expected, tmp_path, chunk_rows):
+    raw_dir, engine, columns, splits = expected
+    out = tmp_path / f"chunked-{chunk_rows}"
+    out.mkdir()
+    engineer_features_chunked(raw_dir, features_dir=out / "features", chunk_rows=chunk_rows,
+                              similarity_engine_path=out / "similarity.joblib")
+    _, _, training_cols = encode_split_chunked(
+        features_dir=out / "features", processed_dir=out / "processed", drift_reference_path=out / "drift.json",
+        preprocessor_path=out / "enc.joblib", training_columns_path=out / "cols.joblib")
+    assert training_cols == columns
+
+    # Mesmo vocabulário (inclusive a ordem dos tokens) e mesmas frequências de documento do ajuste no merge inteiro
+    chunked_engine = joblib.load(out / "similarity.joblib")
+    assert list(chunked_engine.vocabulary_.items()) == list(engine.vocabulary_.items())
+    np.testing.assert_array_equal(chunked_engine.document_frequency_, engine.document_frequency_)
+    assert chunked_engine.n_documents_ == engine.n_documents_
+
+    for split_name, (X_expected, y_expected) in splits.items():
+        X, y = load_processed_split(out / "processed", split_name)
+        assert list(X.columns) == columns
+        np.testing.assert_array_equal(X.to_numpy(), X_expected.to_numpy(dtype=X.to_numpy().dtype))
+        np.testing.assert_array_equal(np.asarray(y), y_expected.to_numpy())
@@ -0,0 +1,56 @@
+"""Destilação: aluno logístico concorda com o professor e aluno de outro modelo publicado não é servido."""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from datathon_decision.src.distillation import (
+    agreement, file_digest, fit_student, load_distilled_model, teacher_probabilities,
+)
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=1200, n_features=8, n_informative=5, random_state=0)
+    X = pd.DataFrame(X * np.arange(1, 9), columns=[f"f{i}" for i in range(X.shape[1])])
+    return X.iloc[:900], y[:900], X.iloc[900:], y[900:]
+
+
+def test_logistic_student_recovers_a_logistic_teacher(data):
+    X_train, y_train, X_val, _ = data
+    # Professor logístico: o aluno (mesma família, coeficientes na escala original) deve reproduzi-lo
+    teacher = LogisticRegression(max_iter=1000).fit(X_train, y_train)
+    student = fit_student(X_train, teacher_probabilities(teacher, X_train), "logistic", params={"C": 1e4, "max_iter": 1000})
+    stats = agreement(teacher_probabilities(teacher, X_val), teacher_probabilities(student, X_val))
+    assert stats["mean_abs_diff"] < 0.01
+    assert stats["label_agreement"] >= 0.99
+    assert stats["spearman"] > 0.999
+
+
+def test_logistic_student_agrees_with_a_forest(data):
+    X_train, y_train, X_val, _ = data
+    teacher = RandomForestClassifier(n_estimators=50, random_state=0).fit(X_train, y_train)
+    student = fit_student(X_train, teacher_probabilities(teacher, X_train), "logistic")
+    stats = agreement(teacher_probabilities(teacher, X_val), teacher_probabilities(student, X_val))
+    assert stats["label_agreement"] > 0.85
+    assert stats["spearman"] > 0.8
+
+
+def test_student_of_another_teacher_is_not_served(data, tmp_path):
+    X_train, y_train, _, _ = data
+    teacher = LogisticRegression(max_iter=1000).fit(X_train, y_train)
+    teacher_path, student_path = tmp_path / "model.joblib", tmp_path / "distilled.joblib"
+    joblib.dump(teacher, teacher_path)
+    student = fit_student(X_train, teacher_probabilities(teacher, X_train), "logistic",
+                          teacher_digest=file_digest(teacher_path))
+    joblib.dump(student, student_path)
+    assert load_distilled_model(student_path, teacher_path) is not None
+
+    # Modelo republicado (outro treino) sem destilar de novo: o aluno antigo fica fora do tier "fast"
+    joblib.dump(LogisticRegression(C=0.01, max_iter=1000).fit(X_train, y_train), teacher_path)
+    assert load_distilled_model(student_path, teacher_path) is None
+    assert load_distilled_model(tmp_path / "ausente.joblib", teacher_path) is None
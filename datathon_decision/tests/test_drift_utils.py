@@ -0,0 +1,85 @@
+"""Sketches de drift: merge igual a observar tudo num sketch só, e PSI ~0 na mesma distribuição e alto com deslocamento."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datathon_decision.src.config import CATEGORICAL_FEATURES, DRIFT_PSI_THRESHOLDS, NUMERICAL_FEATURES
+from datathon_decision.src.drift_utils import (
+    CategorySketch, DriftMonitor, NumericSketch, build_drift_reference, population_stability_index,
+)
+
+NUMERIC, CATEGORY = NUMERICAL_FEATURES[0], CATEGORICAL_FEATURES[0]
+
+
+def features(rng, n_rows, shift=0.0, categories=("A", "B", "C"), weights=(0.6, 0.3, 0.1)):
+    return pd.DataFrame({
+        NUMERIC: rng.normal(loc=shift, size=n_rows),
+        CATEGORY: rng.choice(categories, size=n_rows, p=weights),
+    })
+
+
+def test_numeric_merge_equals_observing_everything():
+    values = np.random.default_rng(0).normal(size=1000)
+    reference = NumericSketch.from_values(values)
+    whole, first, second = reference.empty_like(), reference.empty_like(), reference.empty_like()
+    for value in values:
+        whole.update(value)
+    for value in values[:300]:
+        first.update(value)
+    for value in values[300:]:
+        second.update(value)
+    merged = first.merge(second)
+    assert merged.counts == whole.counts == reference.counts
+    assert (merged.n, merged.min, merged.max) == (whole.n, whole.min, whole.max)
+    assert merged.total == pytest.approx(whole.total)
+    # Merge com um sketch vazio não muda nada
+    assert reference.empty_like().merge(reference.empty_like()).min is None
+    with pytest.raises(ValueError):
+        merged.merge(NumericSketch([0.0]))
+
+
+def test_category_merge_keeps_counts_and_heavy_hitters():
+    first, second = CategorySketch(capacity=4), CategorySketch(capacity=4)
+    for value in ["A"] * 5 + ["B"] * 2:
+        first.update(value)
+    for value in ["A"] * 3 + ["C"]:
+        second.update(value)
+    assert first.merge(second).counters == {"A": 8, "B": 2, "C": 1}
+    assert first.n == 11
+
+    # Acima da capacidade: os mais frequentes ficam e a soma dos contadores continua igual a n
+    many = CategorySketch(capacity=4)
+    for value in ["D", "E", "F", "G"]:
+        many.update(value)
+    first.merge(many)
+    assert len(first.counters) == 4 and first.counters["A"] == 8
+    assert sum(first.counters.values()) == first.n == 15
+
+
+def test_psi_is_zero_on_identical_counts_and_large_when_shifted():
+    counts = [10, 20, 40, 20, 10]
+    assert population_stability_index(counts, counts) == 0.0
+    assert population_stability_index(counts, [2 * c for c in counts]) == pytest.approx(0.0)
+    assert population_stability_index(counts, counts[::-1][1:] + [0]) > DRIFT_PSI_THRESHOLDS[1]
+
+
+def test_monitor_reports_stable_and_shifted_distributions():
+    rng = np.random.default_rng(0)
+    monitor = DriftMonitor(build_drift_reference(features(rng, 5000)))
+    # Mesma distribuição, observada em lotes (como as requisições)
+    for _ in range(20):
+        monitor.observe(features(rng, 100))
+    report = monitor.report()
+    assert report["observations"] == 2000 and report["sufficient_data"]
+    for column in (NUMERIC, CATEGORY):
+        assert report["features"][column]["psi"] < DRIFT_PSI_THRESHOLDS[0]
+        assert report["features"][column]["status"] == "estavel"
+    assert report["drifted_features"] == []
+
+    monitor.reset()
+    monitor.observe(features(rng, 2000, shift=1.5, categories=("A", "B", "Z"), weights=(0.1, 0.3, 0.6)))
+    report = monitor.report()
+    assert report["features"][NUMERIC]["status"] == report["features"][CATEGORY]["status"] == "significativo"
+    assert report["features"][CATEGORY]["unseen_values"] == ["Z"]
+    assert report["drifted_features"] == sorted([NUMERIC, CATEGORY])
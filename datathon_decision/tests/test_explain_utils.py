@@ -0,0 +1,78 @@
+"""Explicações por contribuição: soma fecha com a probabilidade após agregar o OHE, hashing recusado e orçamento."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from datathon_decision.src.admission_utils import Deadline
+from datathon_decision.src.artifact_utils import PackedForest
+from datathon_decision.src.config import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+from datathon_decision.src.explain_utils import ExplanationBudget, explain_batch, positive_class_index
+
+CATEGORY, OTHER_CATEGORY = CATEGORICAL_FEATURES[0], CATEGORICAL_FEATURES[1]
+OWNERS = [CATEGORY, OTHER_CATEGORY, NUMERICAL_FEATURES[0], NUMERICAL_FEATURES[1]]
+
+
+@pytest.fixture(scope="module")
+def encoded():
+    """Matriz no layout do modelo: colunas OHE '<feature>_<valor>' e numéricas."""
+    rng = np.random.default_rng(0)
+    n_rows = 300
+    category = rng.integers(0, 3, n_rows)
+    other = rng.integers(0, 2, n_rows)
+    numeric = rng.normal(size=(n_rows, 2))
+    X = pd.DataFrame({
+        **{f"{CATEGORY}_{value}": (category == i).astype(float) for i, value in enumerate(["A", "B", "C"])},
+        **{f"{OTHER_CATEGORY}_{value}": (other == i).astype(float) for i, value in enumerate(["SIM", "NAO"])},
+        NUMERICAL_FEATURES[0]: numeric[:, 0], NUMERICAL_FEATURES[1]: numeric[:, 1],
+    })
+    y = ((category == 1) ^ (numeric[:, 0] > 0.3)).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest(encoded):
+    X, y = encoded
+    return RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_contributions_add_up_to_probability_after_ohe_aggregation(forest, encoded, packed):
+    X, _ = encoded
+    model = PackedForest.from_estimator(forest) if packed else forest
+    explanations, _ = explain_batch(model, X.iloc[:50], top_features=len(OWNERS))
+    expected = forest.predict_proba(X.iloc[:50])[:, positive_class_index(forest)]
+    for explanation, probability in zip(explanations, expected):
+        # As colunas OHE voltam para a feature original
+        assert set(explanation["contributions"]) <= set(OWNERS)
+        total = explanation["base_value"] + sum(explanation["contributions"].values())
+        assert total == pytest.approx(probability, abs=1e-9)
+        assert explanation["match_probability"] == pytest.approx(probability, abs=1e-9)
+
+
+def test_hashing_columns_are_rejected(encoded):
+    X, y = encoded
+    hashed = pd.DataFrame(X.to_numpy(), columns=[f"hash_{i}" for i in range(X.shape[1] - 2)] + NUMERICAL_FEATURES[:2])
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(hashed, y)
+    with pytest.raises(NotImplementedError, match="hashing"):
+        explain_batch(model, hashed.iloc[:3])
+
+
+def test_budget_explains_until_the_estimate_exceeds_it():
+    budget = ExplanationBudget(budget_ms=10.0, probe_every=3)
+    assert budget.skip_reason() is None  # sem estimativa ainda
+    budget.record(5.0)
+    assert budget.skip_reason() is None
+    budget.record(200.0)
+    assert budget.estimate_ms > 10.0
+    # Acima do orçamento: pula, e a cada probe_every pulos explica uma vez para reavaliar
+    assert [budget.skip_reason() is None for _ in range(6)] == [False, False, True, False, False, True]
+
+
+def test_budget_skips_when_the_deadline_cannot_fit():
+    budget = ExplanationBudget(budget_ms=50.0, probe_every=1)
+    budget.record(20.0)
+    assert budget.skip_reason(Deadline(1000.0)) is None
+    # Dentro do orçamento, mas não no prazo restante: pula sempre (sem probe)
+    assert all("prazo" in budget.skip_reason(Deadline(5.0)) for _ in range(3))
@@ -0,0 +1,101 @@
+"""
+Retreino incremental: árvores acrescentadas e as mais antigas descartadas, class_weight restaurado, e os caminhos
+de retrain_incremental (incremental, guarda de métricas caindo para o completo, nada novo para treinar).
+"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from datathon_decision.src import incremental_training
+from datathon_decision.src.config import TRAIN_SPLIT_NAME, VAL_SPLIT_NAME
+from datathon_decision.src.dataset_utils import load_processed_split, row_digests, save_processed_split
+from datathon_decision.src.incremental_training import extend_forest, retrain_incremental
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=600, n_features=6, n_informative=4, weights=[0.8], random_state=0)
+    X = pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])])
+    return X.iloc[:450], pd.Series(y[:450]), X.iloc[450:], pd.Series(y[450:])
+
+
+def forest(X, y, n_estimators=10):
+    return RandomForestClassifier(n_estimators=n_estimators, class_weight="balanced", random_state=0).fit(X, y)
+
+
+def test_extend_forest_adds_and_retires_trees_and_restores_class_weight(data):
+    X, y, _, _ = data
+    model = forest(X, y)
+    kept = model.estimators_[3:]
+    retired = extend_forest(model, X.iloc[:100], y.iloc[:100], new_trees=5, max_trees=12, y_full=y)
+    assert retired == 3
+    assert len(model.estimators_) == model.n_estimators == 12
+    # As 3 mais antigas saem; as 7 restantes vêm antes das 5 novas
+    assert all(a is b for a, b in zip(model.estimators_[:7], kept))
+    assert model.class_weight == "balanced" and model.warm_start is False
+    assert model.predict_proba(X).shape == (len(X), 2)
+
+
+@pytest.fixture
+def published(data, tmp_path, monkeypatch):
+    """Splits processados e modelo publicado em tmp_path; publish_model, train_model e sync_pipeline registrados."""
+    X_train, y_train, X_val, y_val = data
+    save_processed_split(X_train, y_train, tmp_path, TRAIN_SPLIT_NAME)
+    save_processed_split(X_val, y_val, tmp_path, VAL_SPLIT_NAME)
+    calls = {"publish": [], "train": [], "sync": []}
+
+    def publish(model, digests=None):
+        calls["publish"].append(digests)
+
+    def train(X, y):
+        calls["train"].append(len(X))
+        return forest(X, y)
+    for name, value in (("PROCESSED_DATA_DIR", tmp_path), ("MODEL_PATH", tmp_path / "model.joblib"),
+                        ("TRAINING_ROWS_PATH", tmp_path / "training_rows.npy"),
+                        ("INCREMENTAL_REPORT_PATH", tmp_path / "report.json"),
+                        ("publish_model", publish), ("train_model", train),
+                        ("sync_pipeline", lambda raw_data_dir, report: calls["sync"].append(report["mode"]))):
+        monkeypatch.setattr(incremental_training, name, value)
+
+    def publish_trained_on(n_rows):
+        """Modelo publicado treinado nas n_rows primeiras linhas do treino (as demais são as novas)."""
+        # Como em train_model: hashes das linhas do split gravado (no dtype do disco)
+        X_seen, y_seen = load_processed_split(tmp_path, TRAIN_SPLIT_NAME)
+        X_seen, y_seen = X_seen.iloc[:n_rows], y_seen.iloc[:n_rows]
+        joblib.dump(forest(X_seen, y_seen), tmp_path / "model.joblib")
+        np.save(tmp_path / "training_rows.npy", row_digests(X_seen, y_seen))
+    return calls, publish_trained_on
+
+
+def test_incremental_path_publishes_extended_forest(published, monkeypatch):
+    calls, publish_trained_on = published
+    publish_trained_on(350)
+    monkeypatch.setattr(incremental_training, "INCREMENTAL_MAX_METRIC_DROP", 1.0)
+    report = retrain_incremental(new_trees=4, max_trees=0)
+    assert report["mode"] == "incremental" and report["published"]
+    assert (report["new_rows"], report["added_trees"], report["retired_trees"], report["n_trees"]) == (100, 4, 0, 14)
+    # Hashes publicados: os já vistos mais as 100 linhas novas
+    assert len(calls["publish"]) == 1 and len(calls["publish"][0]) == 450
+    assert calls["train"] == [] and calls["sync"] == ["incremental"]
+
+
+def test_metric_drop_falls_back_to_full_training(published, monkeypatch):
+    calls, publish_trained_on = published
+    publish_trained_on(350)
+    # Qualquer variação conta como queda: a guarda sempre dispara
+    monkeypatch.setattr(incremental_training, "INCREMENTAL_MAX_METRIC_DROP", -np.inf)
+    report = retrain_incremental(new_trees=4)
+    assert report["mode"] == "full" and "pioraram" in report["fallback_reason"]
+    assert calls["publish"] == [] and calls["train"] == [450] and calls["sync"] == ["full"]
+
+
+def test_no_new_rows_keeps_published_model(published):
+    calls, publish_trained_on = published
+    publish_trained_on(450)
+    report = retrain_incremental()
+    assert report["mode"] == "unchanged" and report["published"] is False and report["new_rows"] == 0
+    assert calls == {"publish": [], "train": [], "sync": []}
@@ -0,0 +1,75 @@
+"""
+Encoder de hashing: colunas fixas entre treinos e com categorias novas, sem alinhamento no preprocess, e as
+guardas da avaliação (métricas por segmento) e das explicações, que não têm volta para as categorias.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datathon_decision.src import batch_scoring, model_utils
+from datathon_decision.src.config import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+from datathon_decision.src.evaluation_utils import decode_segments, evaluate_cross_validation
+from datathon_decision.src.model_backends import HASHED_COLUMN_PREFIX, HashingCategoricalEncoder
+from datathon_decision.src.preprocess_utils import preprocess_data_split_save
+
+N_BUCKETS = 16
+
+
+def features(seed, n_rows=60, values=("A", "B", "C")):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: rng.choice(values, size=n_rows) for column in CATEGORICAL_FEATURES})
+    for column in NUMERICAL_FEATURES:
+        df[column] = rng.normal(size=n_rows)
+    return df
+
+
+def test_layout_is_stable_across_fits_and_unseen_values():
+    first = HashingCategoricalEncoder(N_BUCKETS).fit(features(0)[CATEGORICAL_FEATURES])
+    # Outro treino, com outras categorias: mesmas colunas e mesmos buckets
+    second = HashingCategoricalEncoder(N_BUCKETS).fit(features(1, values=("X", "Y"))[CATEGORICAL_FEATURES])
+    names = list(first.get_feature_names_out(CATEGORICAL_FEATURES))
+    assert names == list(second.get_feature_names_out()) == [f"{HASHED_COLUMN_PREFIX}{i}" for i in range(N_BUCKETS)]
+    X = features(2)[CATEGORICAL_FEATURES]
+    np.testing.assert_array_equal(first.transform(X), second.transform(X))
+
+    # Valores nunca vistos: mesma largura, um 1 por feature em cada linha
+    unseen = features(3, values=("nunca visto", "outro"))[CATEGORICAL_FEATURES]
+    encoded = first.transform(unseen)
+    assert encoded.shape == (len(unseen), N_BUCKETS)
+    np.testing.assert_array_equal(encoded.sum(axis=1), len(CATEGORICAL_FEATURES))
+
+
+def test_fixed_width_skips_alignment(tmp_path):
+    paths = {"preprocessor_path": tmp_path / "enc.joblib", "training_columns_path": tmp_path / "cols.joblib"}
+    X_fit, _, training_cols = preprocess_data_split_save(
+        features(0), None, None, fit_ohe=True, ohe_encoder=HashingCategoricalEncoder(N_BUCKETS), **paths)
+    encoder = HashingCategoricalEncoder(N_BUCKETS).fit(features(0)[CATEGORICAL_FEATURES])
+    unseen = features(1, values=("nunca visto",))
+    # Com training_cols em outra ordem nada é reordenado, completado ou removido: a largura já é a do treino
+    X_pred, _, _ = preprocess_data_split_save(unseen, None, None, fit_ohe=False, ohe_encoder=encoder,
+                                              training_cols_list=training_cols[::-1], **paths)
+    assert list(X_pred.columns) == list(X_fit.columns) == training_cols
+    np.testing.assert_array_equal(X_pred[NUMERICAL_FEATURES], unseen[NUMERICAL_FEATURES])
+
+
+def test_evaluation_skips_segments_with_hashing(tmp_path):
+    df = features(0, n_rows=80)
+    y = (df[NUMERICAL_FEATURES[0]] > 0).astype(int).to_numpy()
+    encoder = HashingCategoricalEncoder(N_BUCKETS)
+    X, _, columns = preprocess_data_split_save(df, None, None, fit_ohe=True, ohe_encoder=encoder,
+                                               preprocessor_path=tmp_path / "enc.joblib",
+                                               training_columns_path=tmp_path / "cols.joblib")
+    assert decode_segments(X.to_numpy(), columns, encoder) is None
+    report = evaluate_cross_validation(X.to_numpy(), y, columns, encoder, n_splits=2, n_jobs=1, n_bootstrap=20)
+    assert "hashing" in report["segments_skipped"]
+    assert report["segments"] == {}
+
+
+def test_batch_scoring_explain_rejects_hashing_before_scoring(make_raw_dir, tmp_path, monkeypatch):
+    training_cols = NUMERICAL_FEATURES + [f"{HASHED_COLUMN_PREFIX}{i}" for i in range(N_BUCKETS)]
+    monkeypatch.setattr(model_utils, "load_artifacts", lambda reload=False: {"training_cols": training_cols})
+    output = tmp_path / "scores.csv"
+    with pytest.raises(NotImplementedError, match="hashing"):
+        batch_scoring.run_batch_scoring(make_raw_dir(), output, workers=1, explain=True)
+    assert not output.exists()
@@ -0,0 +1,59 @@
+"""
+Golden test do extrator compilado (FEATURE_SPEC): as features de engineer_features para registros no formato do
+payload da API (seções aninhadas ausentes, nulas, vazias, strings vazias, taxa como texto) devem bater com o frame
+esperado em data/engineer_features_expected.json, gerado pelo extrator escrito à mão que o FEATURE_SPEC substituiu.
+"""
+
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from datathon_decision.src.preprocess_utils import engineer_features
+
+DATA_DIR = Path(__file__).parent / "data"
+MISSING_SECTIONS = ["perfil_vaga", "formacao_e_idiomas"]
+
+
+def load_json(name):
+    with open(DATA_DIR / name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def records():
+    return load_json("feature_spec_records.json")
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return load_json("engineer_features_expected.json")
+
+
+def assert_matches(X, y, case):
+    expected_X = pd.DataFrame(case["data"], columns=case["columns"])
+    assert list(X.columns) == case["columns"]
+    pd.testing.assert_frame_equal(X.reset_index(drop=True), expected_X, check_dtype=False, rtol=1e-9)
+    assert y.tolist() == case["target"]
+
+
+def test_engineer_features_matches_golden(records, expected):
+    X, y = engineer_features(pd.DataFrame(records))
+    assert_matches(X, y, expected["records"])
+
+
+def test_engineer_features_without_section_columns(records, expected):
+    # Nenhum registro traz a seção: a coluna inteira some do DataFrame, mesmo resultado de seções nulas
+    df = pd.DataFrame(records).drop(columns=MISSING_SECTIONS)
+    X, y = engineer_features(df)
+    assert_matches(X, y, expected["missing_sections"])
+
+
+def test_engineer_features_single_payload_matches_batch(records):
+    # Caminho da API (um registro por vez) igual à linha correspondente do lote
+    X_batch, _ = engineer_features(pd.DataFrame(records))
+    for position, record in enumerate(records):
+        X_single, _ = engineer_features(pd.DataFrame([record]))
+        pd.testing.assert_frame_equal(X_single.reset_index(drop=True),
+                                      X_batch.iloc[[position]].reset_index(drop=True), check_dtype=False)
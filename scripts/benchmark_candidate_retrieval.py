@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Script para comparar o ranking de candidatos de uma vaga com scoring completo (modelo em todos os
+candidatos do applicants.json) e com a recuperação pelo índice invertido (candidate_retrieval.SkillIndex)
+seguida do modelo só nos candidatos recuperados.
+
+Para uma amostra de vagas e para cada orçamento de candidatos: recall@k (fração do top-k do scoring
+completo que está entre os recuperados), recall das contratações reais da vaga (prospects com
+POSITIVE_CLASS) e latência por vaga (recuperação + modelo vs. scoring completo).
+
+Uso: python scripts/benchmark_candidate_retrieval.py <caminho_para_dados_brutos> [--jobs 10]
+     [--candidates 100 200 500 1000] [--k 10 50]
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.batch_scoring import load_scoring_inputs, score_pairs  # noqa: E402
+from datathon_decision.src.candidate_retrieval import SkillIndex, rank_candidates  # noqa: E402
+from datathon_decision.src.config import (  # noqa: E402
+    BATCH_SCORING_CHUNK_ROWS, POSITIVE_CLASS, RANDOM_STATE, REPORTS_DIR, TARGET_VARIABLE,
+)
+from datathon_decision.src.model_utils import load_artifacts  # noqa: E402
+
+
+def full_scoring(vaga_id, df_jobs, df_applicants, artifacts, chunk_rows=BATCH_SCORING_CHUNK_ROWS):
+    """Modelo em todos os candidatos (em chunks, como o batch_scoring); retorna (probabilidades por código, ms)."""
+    start = time.perf_counter()
+    codes = df_applicants["codigo_profissional"].astype(str).to_numpy()
+    df_pairs = pd.DataFrame({"vaga_id": str(vaga_id), "codigo_candidato_prospect": codes, "origem": "completo"})
+    scored = pd.concat([score_pairs(df_pairs.iloc[i:i + chunk_rows], df_jobs, df_applicants, artifacts)
+                        for i in range(0, len(df_pairs), chunk_rows)], ignore_index=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return scored.set_index("codigo_candidato_prospect")["match_probability"], elapsed_ms
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Recall e latência da recuperação de candidatos vs. scoring completo.")
+    parser.add_argument("raw_data_dir", nargs="?", default=str(ROOT_DIR / "datathon_decision" / "data" / "raw"))
+    parser.add_argument("--jobs", type=int, default=10, help="Vagas sorteadas (prioriza as que têm contratações)")
+    parser.add_argument("--candidates", nargs="+", type=int, default=[100, 200, 500, 1000])
+    parser.add_argument("--k", nargs="+", type=int, default=[10, 50])
+    parser.add_argument("--output", default=str(REPORTS_DIR / "candidate_retrieval.json"))
+    args = parser.parse_args()
+
+    for name in ("datathon_decision.src.model_utils", "datathon_decision.src.preprocess_utils"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    df_jobs, df_applicants, df_prospects = load_scoring_inputs(args.raw_data_dir)
+    artifacts = load_artifacts()
+    start = time.perf_counter()
+    index = SkillIndex().fit(df_applicants)
+    build_s = time.perf_counter() - start
+    print(f"📊 Índice: {len(index.applicant_ids_):,} candidatos, {len(index.vocabulary_):,} tokens, "
+          f"{index.n_postings:,} postings, construído em {build_s:.2f}s")
+
+    hires = df_prospects[df_prospects[TARGET_VARIABLE] == POSITIVE_CLASS].groupby("vaga_id")["codigo_candidato_prospect"].agg(set)
+    known_jobs = df_jobs["vaga_id"].astype(str)
+    with_hires = [v for v in hires.index if v in set(known_jobs)]
+    rng = np.random.default_rng(RANDOM_STATE)
+    pool = with_hires if len(with_hires) >= args.jobs else known_jobs.tolist()
+    sample = [str(v) for v in rng.choice(pool, size=min(args.jobs, len(pool)), replace=False)]
+
+    per_budget = {c: {"recall": {k: [] for k in args.k}, "hire_recall": [], "retrieval_ms": [], "total_ms": []}
+                  for c in args.candidates}
+    full_ms = []
+    for vaga_id in sample:
+        probabilities, elapsed_ms = full_scoring(vaga_id, df_jobs, df_applicants, artifacts)
+        full_ms.append(elapsed_ms)
+        ranked = probabilities.sort_values(ascending=False, kind="stable")
+        job_hires = hires.get(vaga_id, set())
+        for budget in args.candidates:
+            retrieved, _ = index.query(index.job_tokens(df_jobs[known_jobs == vaga_id]), k=budget)
+            retrieved = set(retrieved)
+            _, timings = rank_candidates(vaga_id, df_jobs, df_applicants, index, artifacts, candidates=budget)
+            stats = per_budget[budget]
+            for k in args.k:
+                stats["recall"][k].append(len(set(ranked.index[:k]) & retrieved) / min(k, len(ranked)))
+            if job_hires:
+                stats["hire_recall"].append(len(job_hires & retrieved) / len(job_hires))
+            stats["retrieval_ms"].append(timings["retrieval_ms"])
+            stats["total_ms"].append(timings["retrieval_ms"] + timings["scoring_ms"])
+
+    results = []
+    print(f"⏱️  Scoring completo: {statistics.median(full_ms):,.0f} ms/vaga (mediana, {len(df_applicants):,} candidatos)")
+    for budget, stats in per_budget.items():
+        result = {
+            "candidates": budget,
+            "recall_at_k": {str(k): statistics.mean(v) for k, v in stats["recall"].items()},
+            "hire_recall": statistics.mean(stats["hire_recall"]) if stats["hire_recall"] else None,
+            "retrieval_ms_p50": statistics.median(stats["retrieval_ms"]),
+            "total_ms_p50": statistics.median(stats["total_ms"]),
+            "speedup": statistics.median(full_ms) / statistics.median(stats["total_ms"]),
+        }
+        results.append(result)
+        recalls = " ".join(f"R@{k}={v:.3f}" for k, v in result["recall_at_k"].items())
+        hire = f"{result['hire_recall']:.3f}" if result["hire_recall"] is not None else "n/d"
+        print(f"📊 {budget:5d} candidatos | {recalls} | contratações={hire} | "
+              f"recuperação={result['retrieval_ms_p50']:6.1f} ms | total={result['total_ms_p50']:7.1f} ms "
+              f"({result['speedup']:.1f}x)")
+
+    report = {
+        "timestamp": datetime.now().isoformat(), "raw_data_dir": args.raw_data_dir, "jobs": sample,
+        "applicants": int(len(df_applicants)), "vocabulary": int(len(index.vocabulary_)), "postings": index.n_postings,
+        "index_build_s": build_s, "full_scoring_ms_p50": statistics.median(full_ms), "results": results,
+    }
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
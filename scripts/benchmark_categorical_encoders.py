@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Script para comparar a codificação das categóricas do RandomForest: OHE (vocabulário ajustado, largura
+cresce com cada categoria nova) vs. hashing com largura fixa (model_backends.HashingCategoricalEncoder)
+em vários números de buckets: colunas, colisões, tamanho do encoder e do modelo, latência de uma linha
+(codificação + alinhamento e codificação + modelo) e métricas de validação.
+
+Todas as variantes partem das mesmas features engenheiradas e do mesmo split. Nada é gravado em models/:
+tudo vai para um diretório temporário.
+
+Pré-requisito: features engenheiradas (python -m datathon_decision.src.pipeline_runner --until features)
+
+Uso: python scripts/benchmark_categorical_encoders.py [--buckets 16 32 64 128 256]
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.artifact_utils import artifact_size_bytes, save_packed_forest  # noqa: E402
+from datathon_decision.src.config import (  # noqa: E402
+    CATEGORICAL_FEATURES, ENGINEERED_FEATURES_PATH, REPORTS_DIR, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME,
+)
+from datathon_decision.src.dataset_utils import load_processed_split  # noqa: E402
+from datathon_decision.src.model_backends import HashingCategoricalEncoder, get_model_backend, make_categorical_encoder  # noqa: E402
+from datathon_decision.src.model_utils import evaluate_model  # noqa: E402
+from datathon_decision.src.preprocess_utils import preprocess_data_split_save  # noqa: E402
+
+
+def median_ms(func, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def hashing_collisions(encoder, X_engineered):
+    """Pares (feature, valor) distintos, buckets ocupados e pares que dividem bucket com outro par."""
+    pairs = {(feature, value) for feature in CATEGORICAL_FEATURES for value in X_engineered[feature].astype(str).unique()}
+    buckets = {}
+    for feature, value in pairs:
+        buckets.setdefault(encoder.bucket(feature, value), []).append((feature, value))
+    return {
+        "distinct_pairs": len(pairs),
+        "occupied_buckets": len(buckets),
+        "colliding_pairs": sum(len(members) for members in buckets.values() if len(members) > 1),
+    }
+
+
+def benchmark_encoder(name, encoder, X_engineered, y_target, work_dir, latency_samples):
+    """Codifica, treina o RandomForest e mede uma variante; retorna o dicionário de resultados."""
+    variant_dir = Path(work_dir) / name
+    variant_dir.mkdir(parents=True, exist_ok=True)
+    preprocessor_path = variant_dir / "preprocessor.joblib"
+    training_columns_path = variant_dir / "training_columns.joblib"
+
+    start = time.perf_counter()
+    _, _, _, _, training_cols = preprocess_data_split_save(
+        X_engineered, y_target, out_dir_path=str(variant_dir), fit_ohe=True, ohe_encoder=encoder,
+        preprocessor_path=preprocessor_path, training_columns_path=training_columns_path,
+    )
+    encode_s = time.perf_counter() - start
+    encoder = joblib.load(preprocessor_path)
+    X_train, y_train = load_processed_split(str(variant_dir), TRAIN_SPLIT_NAME, mmap_mode=None)
+    X_val, y_val = load_processed_split(str(variant_dir), VAL_SPLIT_NAME, mmap_mode=None)
+
+    backend = get_model_backend("random_forest")
+    model = backend.build(X_train.columns)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    model_path = variant_dir / "model.joblib"
+    joblib.dump(model, model_path, compress=0)
+    packed_dir = variant_dir / "packed"
+    save_packed_forest(model, packed_dir)
+
+    engineered_row = X_engineered.iloc[[0]]
+
+    def encode_row():
+        return preprocess_data_split_save(engineered_row, None, None, fit_ohe=False, ohe_encoder=encoder,
+                                          training_cols_list=training_cols)[0]
+
+    result = {
+        "variant": name,
+        "n_columns": len(training_cols),
+        "encode_s": encode_s,
+        "fit_s": fit_s,
+        "encoder_size_bytes": artifact_size_bytes(preprocessor_path) + artifact_size_bytes(training_columns_path),
+        "artifact_size_bytes": artifact_size_bytes(model_path),
+        "packed_size_bytes": artifact_size_bytes(packed_dir),
+        "single_row_encode_p50_ms": median_ms(encode_row, latency_samples),
+        "single_row_encode_predict_p50_ms": median_ms(lambda: model.predict_proba(encode_row()), latency_samples),
+        "metrics": {k: float(v) for k, v in evaluate_model(model, X_val, y_val).items()},
+    }
+    if isinstance(encoder, HashingCategoricalEncoder):
+        result["collisions"] = hashing_collisions(encoder, X_engineered)
+    return result
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Compara OHE e hashing na codificação das categóricas.")
+    parser.add_argument("--buckets", nargs="+", type=int, default=[16, 32, 64, 128, 256])
+    parser.add_argument("--latency-samples", type=int, default=100)
+    parser.add_argument("--output", default=str(REPORTS_DIR / "categorical_encoders.json"))
+    args = parser.parse_args()
+
+    if not Path(ENGINEERED_FEATURES_PATH).exists():
+        print(f"❌ Features engenheiradas não encontradas em {ENGINEERED_FEATURES_PATH}.")
+        print("   Rode: python -m datathon_decision.src.pipeline_runner --until features")
+        return 1
+    logging.getLogger("datathon_decision.src.model_utils").setLevel(logging.WARNING)
+    X_engineered, y_target = joblib.load(ENGINEERED_FEATURES_PATH)
+
+    variants = [("onehot", make_categorical_encoder("onehot"))]
+    variants += [(f"hashing_{n}", HashingCategoricalEncoder(n)) for n in args.buckets]
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, encoder in variants:
+            result = benchmark_encoder(name, encoder, X_engineered, y_target, work_dir, args.latency_samples)
+            results.append(result)
+            m = result["metrics"]
+            collisions = result.get("collisions")
+            collided = f"{collisions['colliding_pairs']:3d}/{collisions['distinct_pairs']} pares colididos" if collisions else " " * 20
+            print(f"📊 {name:12s} | {result['n_columns']:4d} colunas | {collided} | "
+                  f"encoder={result['encoder_size_bytes'] / 1024:6.1f} KB | packed={result['packed_size_bytes'] / 1024:8.1f} KB | "
+                  f"1 linha: encode={result['single_row_encode_p50_ms']:5.2f} ms, "
+                  f"encode+modelo={result['single_row_encode_predict_p50_ms']:6.2f} ms | "
+                  f"AUC={m.get('roc_auc', float('nan')):.4f} F1={m['f1']:.4f}")
+
+    report = {"timestamp": datetime.now().isoformat(), "rows": int(len(X_engineered)), "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Script para comparar memória e tempo por etapa (load -> merge -> features) com os dicts aninhados
+completos (load_data com projected=False, formato antigo) e com a projeção dos campos declarados em
+RAW_JOB_FIELDS/RAW_APPLICANT_FIELDS (padrão).
+
+Cada variante roda em um subprocesso isolado. Por etapa são medidos o tempo, os bytes dos DataFrames
+(memory_usage(deep=True)), a memória Python retida e o pico (tracemalloc); por variante, o pico de RSS.
+As features engenheiradas das duas variantes precisam ser idênticas.
+
+Uso: python scripts/benchmark_data_loading.py <caminho_para_dados_brutos>
+"""
+
+import argparse
+import hashlib
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+VARIANTS = {"nested": False, "projected": True}
+STAGES = ["load", "merge", "features"]
+
+
+def frame_bytes(*frames) -> int:
+    return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+
+def run_variant(variant: str, raw_data_dir: str) -> dict:
+    """Executado no subprocesso: roda as três etapas medindo cada uma."""
+    import pandas as pd
+    from datathon_decision.src.preprocess_utils import load_data, merge_data, fit_similarity_engine, engineer_features
+
+    stages = {}
+    tracemalloc.start()
+
+    def measure(stage, func, *args):
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed_s = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        stages[stage] = {"seconds": elapsed_s, "retained_bytes": current, "peak_bytes": peak}
+        return result
+
+    frames = measure("load", load_data, raw_data_dir, VARIANTS[variant])
+    stages["load"]["dataframe_bytes"] = frame_bytes(*frames)
+    df_merged = measure("merge", merge_data, *frames)
+    stages["merge"]["dataframe_bytes"] = frame_bytes(df_merged)
+    stages["merge"]["columns"] = int(df_merged.shape[1])
+    X_features, _ = measure("features", lambda df: engineer_features(df, fit_similarity_engine(df)), df_merged)
+    stages["features"]["dataframe_bytes"] = frame_bytes(X_features)
+    tracemalloc.stop()
+
+    features_digest = hashlib.sha256(pd.util.hash_pandas_object(X_features, index=True).values.tobytes()).hexdigest()
+    return {
+        "variant": variant,
+        "stages": stages,
+        # ru_maxrss é reportado em kB no Linux
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rows": int(len(X_features)),
+        "features_digest": features_digest,
+    }
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Compara a carga dos dados brutos com e sem projeção dos campos.")
+    parser.add_argument("raw_data_dir", nargs="?", default=str(ROOT_DIR / "datathon_decision" / "data" / "raw"))
+    parser.add_argument("--output", default=str(ROOT_DIR / "datathon_decision" / "reports" / "data_loading.json"))
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.raw_data_dir)))
+        return 0
+
+    results = {}
+    for variant in VARIANTS:
+        completed = subprocess.run(
+            [sys.executable, __file__, args.raw_data_dir, "--variant", variant],
+            capture_output=True, text=True, check=True,
+        )
+        results[variant] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    before, after = results["nested"], results["projected"]
+    print(f"📊 {before['rows']} linhas | antes (dicts aninhados) -> depois (campos projetados):")
+    for stage in STAGES:
+        b, a = before["stages"][stage], after["stages"][stage]
+        print(f"   {stage:9s} tempo {b['seconds']:7.2f}s -> {a['seconds']:7.2f}s | "
+              f"DataFrames {b['dataframe_bytes'] / 1e6:8.1f} MB -> {a['dataframe_bytes'] / 1e6:8.1f} MB | "
+              f"retido {b['retained_bytes'] / 1e6:8.1f} MB -> {a['retained_bytes'] / 1e6:8.1f} MB | "
+              f"pico {b['peak_bytes'] / 1e6:8.1f} MB -> {a['peak_bytes'] / 1e6:8.1f} MB")
+    print(f"   RSS máx.  {before['max_rss_kb'] / 1024:.1f} MB -> {after['max_rss_kb'] / 1024:.1f} MB")
+
+    identical = before["features_digest"] == after["features_digest"]
+    report = {"timestamp": datetime.now().isoformat(), "raw_data_dir": args.raw_data_dir,
+              "identical_features": identical, "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    if not identical:
+        print("❌ As features engenheiradas diferem entre as variantes.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Script para comparar tempo de carga e memória (RSS) dos dados processados:
+formato antigo (joblib com DataFrames pickled) vs. arrays .npy (carga completa e mmap).
+
+Cada variante roda em um subprocesso isolado para que o RSS seja comparável.
+
+Uso: python scripts/benchmark_dataset_formats.py [--split train] [--repeat 3]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+VARIANTS = ["joblib_pickle", "npy_full", "npy_mmap"]
+
+
+def current_rss_kb() -> int:
+    """RSS atual do processo (kB); usa /proc quando disponível, senão o pico do getrusage."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        pass
+    # ru_maxrss é reportado em kB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_variant(variant: str, data_dir: str, split: str, legacy_file: str) -> dict:
+    """Executado no subprocesso: carrega o split, depois percorre todos os valores."""
+    import joblib
+    import numpy as np
+    from datathon_decision.src.dataset_utils import load_processed_split
+
+    baseline_kb = current_rss_kb()
+    start = time.perf_counter()
+    if variant == "joblib_pickle":
+        X, y = joblib.load(legacy_file)
+    else:
+        X, y = load_processed_split(data_dir, split, mmap_mode="r" if variant == "npy_mmap" else None)
+    load_s = time.perf_counter() - start
+    load_rss_kb = current_rss_kb() - baseline_kb
+
+    start = time.perf_counter()
+    checksum = float(X.to_numpy().sum(dtype=np.float64))
+    scan_s = time.perf_counter() - start
+    return {
+        "variant": variant,
+        "load_s": load_s,
+        "rss_after_load_kb": load_rss_kb,
+        "full_scan_s": scan_s,
+        "rss_after_scan_kb": current_rss_kb() - baseline_kb,
+        "shape": list(X.shape),
+        "checksum": checksum,
+    }
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Compara formatos dos dados processados.")
+    parser.add_argument("--data-dir", default=str(ROOT_DIR / "datathon_decision" / "data" / "processed"))
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=str(ROOT_DIR / "datathon_decision" / "reports" / "dataset_formats.json"))
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    parser.add_argument("--legacy-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.data_dir, args.split, args.legacy_file)))
+        return 0
+
+    import joblib
+    from datathon_decision.src.dataset_utils import load_processed_split
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Gera o arquivo no formato antigo a partir do split atual para a comparação
+        legacy_file = str(Path(tmp_dir) / f"{args.split}_data.joblib")
+        X, y = load_processed_split(args.data_dir, args.split, mmap_mode=None)
+        joblib.dump((X.astype("float64"), y.astype("int64")), legacy_file)
+        del X, y
+
+        results = []
+        for variant in VARIANTS:
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--variant", variant, "--data-dir", args.data_dir,
+                     "--split", args.split, "--legacy-file", legacy_file],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            best = min(runs, key=lambda r: r["load_s"])
+            best["file_size_bytes"] = (
+                Path(legacy_file).stat().st_size if variant == "joblib_pickle"
+                else sum(p.stat().st_size for p in (Path(args.data_dir) / args.split).iterdir())
+            )
+            results.append(best)
+            print(f"📊 {variant:14s} | load={best['load_s'] * 1000:8.1f} ms | "
+                  f"RSS após load={best['rss_after_load_kb'] / 1024:7.1f} MB | "
+                  f"scan={best['full_scan_s'] * 1000:7.1f} ms | "
+                  f"RSS após scan={best['rss_after_scan_kb'] / 1024:7.1f} MB")
+
+    report = {"timestamp": datetime.now().isoformat(), "split": args.split, "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Script para medir o custo das explicações por contribuição (explain_utils.py) sobre o modelo treinado.
+
+- Latência de uma linha (já codificada): só a probabilidade vs. probabilidade + explicação (p50/p99)
+- Vazão em lote do explain_batch sobre o split de validação
+- Consistência: valor base + soma das contribuições deve reproduzir predict_proba
+
+Sai com código 1 se o p99 extra de uma linha passar de EXPLANATION_LATENCY_BUDGET_MS
+ou se a explicação não reproduzir a probabilidade.
+
+Pré-requisito: modelo treinado (python -m datathon_decision.src.pipeline_runner)
+
+Uso: python scripts/benchmark_explanations.py [--samples 300] [--batch-rows 2000]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.config import (  # noqa: E402
+    EXPLANATION_LATENCY_BUDGET_MS, PROCESSED_DATA_DIR, REPORTS_DIR, VAL_SPLIT_NAME
+)
+from datathon_decision.src.dataset_utils import load_processed_split  # noqa: E402
+from datathon_decision.src.explain_utils import explain_batch, positive_class_index  # noqa: E402
+from datathon_decision.src.model_utils import load_artifacts  # noqa: E402
+
+# Tolerância numérica da checagem base + contribuições = probabilidade
+CONSISTENCY_TOLERANCE = 1e-9
+
+
+def timings_ms(func, rows, samples):
+    """Tempo (ms) de func(linha) para `samples` linhas distintas (cíclicas)."""
+    timings = []
+    for i in range(samples):
+        row = rows.iloc[[i % len(rows)]]
+        start = time.perf_counter()
+        func(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.asarray(timings)
+
+
+def percentiles(timings):
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Mede o custo das explicações por contribuição.")
+    parser.add_argument("--samples", type=int, default=300, help="Predições de uma linha medidas")
+    parser.add_argument("--batch-rows", type=int, default=2000, help="Linhas do teste de vazão em lote")
+    parser.add_argument("--output", default=str(REPORTS_DIR / "explanations.json"))
+    args = parser.parse_args()
+
+    logging.getLogger("datathon_decision.src.model_utils").setLevel(logging.WARNING)
+    try:
+        artifacts = load_artifacts()
+        X_val, _ = load_processed_split(str(PROCESSED_DATA_DIR), VAL_SPLIT_NAME, mmap_mode=None)
+    except FileNotFoundError as e:
+        print(f"❌ Artefatos não encontrados: {e}")
+        print("   Rode: python -m datathon_decision.src.pipeline_runner")
+        return 1
+    model = artifacts["model"]
+    class_index = positive_class_index(model)
+    X_val = X_val[artifacts["training_cols"]]
+
+    # Aquecimento: a primeira explicação monta as tabelas por nó (e converte o RF do sklearn, se for o caso)
+    explain_batch(model, X_val.iloc[:1])
+
+    predict = timings_ms(lambda row: model.predict_proba(row), X_val, args.samples)
+    explain = timings_ms(lambda row: explain_batch(model, row), X_val, args.samples)
+    single_row = {"predict": percentiles(predict), "explain": percentiles(explain),
+                  "overhead": percentiles(np.maximum(explain - predict, 0.0))}
+
+    batch = X_val.iloc[:args.batch_rows]
+    start = time.perf_counter()
+    proba = model.predict_proba(batch)[:, class_index]
+    predict_s = time.perf_counter() - start
+    explanations, explain_ms = explain_batch(model, batch)
+    explained_proba = np.array([e["match_probability"] for e in explanations])
+    max_abs_diff = float(np.max(np.abs(explained_proba - proba)))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "model": type(model).__name__,
+        "n_columns": int(X_val.shape[1]),
+        "budget_ms": EXPLANATION_LATENCY_BUDGET_MS,
+        "single_row": single_row,
+        "batch": {
+            "rows": int(len(batch)),
+            "predict_rows_per_s": len(batch) / predict_s,
+            "explain_rows_per_s": len(batch) / (explain_ms / 1000),
+        },
+        "max_abs_proba_diff": max_abs_diff,
+    }
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"📊 1 linha: predict p50={single_row['predict']['p50_ms']:.2f} ms p99={single_row['predict']['p99_ms']:.2f} ms | "
+          f"explain p50={single_row['explain']['p50_ms']:.2f} ms p99={single_row['explain']['p99_ms']:.2f} ms")
+    print(f"📊 Lote de {len(batch)} linhas: predict={report['batch']['predict_rows_per_s']:.0f} linhas/s | "
+          f"explain={report['batch']['explain_rows_per_s']:.0f} linhas/s")
+    print(f"📊 |base + contribuições - probabilidade| máx: {max_abs_diff:.2e}")
+    print(f"✅ Relatório salvo em {args.output}")
+
+    status = 0
+    if max_abs_diff > CONSISTENCY_TOLERANCE:
+        print(f"❌ A explicação não reproduz a probabilidade (diferença {max_abs_diff:.2e}).")
+        status = 1
+    if single_row["overhead"]["p99_ms"] > EXPLANATION_LATENCY_BUDGET_MS:
+        print(f"❌ p99 extra da explicação ({single_row['overhead']['p99_ms']:.2f} ms) acima do orçamento "
+              f"({EXPLANATION_LATENCY_BUDGET_MS} ms).")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
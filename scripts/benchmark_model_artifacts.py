@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Script para comparar variantes do artefato do modelo (tamanho, tempo de carga, latência de
+inferência e métricas de validação) e escolher a de carga mais rápida dentro da tolerância de ROC AUC.
+
+Variantes: joblib do RandomForest completo (compress 0/3/9) e formato packed em float64/float32/float16,
+sem compressão (mmap) ou comprimido (.npz). "equivalent" indica |Δp| dentro de PACKED_FOREST_VALUE_ERROR: o
+float16 muda decisões de nós perto dos thresholds e não é equivalente ao modelo do sklearn (só entra pela tolerância
+de AUC).
+
+Uso: python scripts/benchmark_model_artifacts.py [--auc-tolerance 0.002] [--publish]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.artifact_utils import (  # noqa: E402
+    PACKED_FOREST_VALUE_ERROR, PackedForest, artifact_size_bytes, load_packed_forest, save_packed_forest
+)
+from datathon_decision.src.config import (  # noqa: E402
+    MODEL_PATH, PACKED_MODEL_DIR, PROCESSED_DATA_DIR, REPORTS_DIR, VAL_SPLIT_NAME
+)
+from datathon_decision.src.dataset_utils import load_processed_split  # noqa: E402
+
+LOAD_TIME_TIE_RATIO = 0.10
+
+JOBLIB_VARIANTS = [("joblib_c0", 0), ("joblib_c3", 3), ("joblib_c9", 9)]
+PACKED_VARIANTS = [
+    ("packed_float64", "float64", False),
+    ("packed_float32", "float32", False),
+    ("packed_float16", "float16", False),
+    ("packed_float32_npz", "float32", True),
+    ("packed_float16_npz", "float16", True),
+]
+
+
+def best_of(func, repeat):
+    """Menor tempo de `repeat` execuções (e o último resultado)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def evaluate_variant(name, path, loader, X_val, y_val, reference_proba, repeat, latency_samples, max_error=0.0):
+    load_s, model = best_of(lambda: loader(path), repeat)
+    single_row = X_val.iloc[:1]
+    # Com mmap a carga é preguiçosa: o custo real de cold start inclui a primeira predição
+    cold_start_s, _ = best_of(lambda: loader(path).predict_proba(single_row), repeat)
+    latencies = []
+    for _ in range(latency_samples):
+        start = time.perf_counter()
+        model.predict_proba(single_row)
+        latencies.append(time.perf_counter() - start)
+    batch_s, proba = best_of(lambda: model.predict_proba(X_val)[:, 1], repeat)
+    return {
+        "variant": name,
+        "size_bytes": artifact_size_bytes(path),
+        "load_s": load_s,
+        "load_and_first_predict_s": cold_start_s,
+        "single_row_p50_ms": statistics.median(latencies) * 1000,
+        "batch_s": batch_s,
+        "batch_rows": int(X_val.shape[0]),
+        "roc_auc": float(roc_auc_score(y_val, proba)),
+        "max_abs_proba_diff": float(np.abs(proba - reference_proba).max()),
+        "equivalent": bool(np.abs(proba - reference_proba).max() <= max_error),
+    }
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Compara variantes do artefato do modelo.")
+    parser.add_argument("--auc-tolerance", type=float, default=0.002, help="Queda máxima aceitável de ROC AUC")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency-samples", type=int, default=200)
+    parser.add_argument("--publish", action="store_true", help="Publica a variante packed escolhida em PACKED_MODEL_DIR")
+    parser.add_argument("--output", default=str(REPORTS_DIR / "model_artifacts.json"))
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    X_val, y_val = load_processed_split(PROCESSED_DATA_DIR, VAL_SPLIT_NAME, mmap_mode=None)
+    reference_proba = model.predict_proba(X_val)[:, 1]
+    reference_auc = float(roc_auc_score(y_val, reference_proba))
+    packed = PackedForest.from_estimator(model)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        variant_paths = {}
+        for name, level in JOBLIB_VARIANTS:
+            path = Path(tmp_dir) / f"{name}.joblib"
+            joblib.dump(model, path, compress=level)
+            results.append(evaluate_variant(name, path, joblib.load, X_val, y_val, reference_proba, args.repeat, args.latency_samples))
+        for name, precision, compress in PACKED_VARIANTS:
+            path = Path(tmp_dir) / name
+            save_packed_forest(packed, path, precision=precision, compress=compress)
+            variant_paths[name] = path
+            results.append(evaluate_variant(name, path, load_packed_forest, X_val, y_val, reference_proba, args.repeat,
+                                            args.latency_samples, max_error=PACKED_FOREST_VALUE_ERROR[precision]))
+
+        for result in results:
+            result["auc_delta"] = result["roc_auc"] - reference_auc
+            result["within_tolerance"] = result["auc_delta"] >= -args.auc_tolerance
+            print(f"📊 {result['variant']:20s} | {result['size_bytes'] / 1024:9.1f} KB | load={result['load_s'] * 1000:8.2f} ms | "
+                  f"load+1ª predição={result['load_and_first_predict_s'] * 1000:8.2f} ms | "
+                  f"1 linha p50={result['single_row_p50_ms']:6.2f} ms | lote={result['batch_s'] * 1000:8.1f} ms | "
+                  f"AUC={result['roc_auc']:.4f} (Δ {result['auc_delta']:+.4f}) | max|Δp|={result['max_abs_proba_diff']:.2e}"
+                  f"{'' if result['equivalent'] else ' ⚠️ não equivalente'}")
+
+        candidates = [r for r in results if r["within_tolerance"]]
+        chosen = None
+        if candidates:
+            # Tempos a menos de 10% do mais rápido são considerados empate; no empate vence a variante mais fiel
+            fastest = min(r["load_and_first_predict_s"] for r in candidates)
+            tied = [r for r in candidates if r["load_and_first_predict_s"] <= fastest * (1 + LOAD_TIME_TIE_RATIO)]
+            chosen = min(tied, key=lambda r: (r["max_abs_proba_diff"], r["load_and_first_predict_s"]))
+        if chosen:
+            print(f"🏆 Variante recomendada (carga mais rápida dentro da tolerância de AUC {args.auc_tolerance}): {chosen['variant']}")
+        if args.publish and chosen:
+            if chosen["variant"] in variant_paths:
+                shutil.rmtree(PACKED_MODEL_DIR, ignore_errors=True)
+                shutil.copytree(variant_paths[chosen["variant"]], PACKED_MODEL_DIR)
+                print(f"🚀 Variante publicada em {PACKED_MODEL_DIR}")
+            else:
+                print("⚠️  A variante escolhida é um joblib do sklearn; nada foi publicado (use DATATHON_MODEL_FORMAT=joblib).")
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "reference_roc_auc": reference_auc,
+        "auc_tolerance": args.auc_tolerance,
+        "recommended_variant": chosen["variant"] if chosen else None,
+        "results": results,
+    }
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Script para comparar os backends de modelo (model_backends.py): tempo de treino, tamanho do artefato,
+latência de uma linha (só o modelo e codificação + modelo) e métricas de validação.
+
+Cada backend recebe as categóricas na sua própria codificação (OHE denso para o RandomForest,
+códigos ordinais com suporte categórico nativo para o HistGradientBoosting), a partir das mesmas
+features engenheiradas e do mesmo split. Nada é gravado em models/: tudo vai para um diretório temporário.
+
+Pré-requisito: features engenheiradas (python -m datathon_decision.src.pipeline_runner --until features)
+
+Uso: python scripts/benchmark_model_backends.py [--backends random_forest hist_gradient_boosting]
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.artifact_utils import artifact_size_bytes, save_packed_forest  # noqa: E402
+from datathon_decision.src.config import ENGINEERED_FEATURES_PATH, REPORTS_DIR, TRAIN_SPLIT_NAME, VAL_SPLIT_NAME  # noqa: E402
+from datathon_decision.src.dataset_utils import load_processed_split  # noqa: E402
+from datathon_decision.src.model_backends import MODEL_BACKENDS, get_model_backend  # noqa: E402
+from datathon_decision.src.model_utils import evaluate_model  # noqa: E402
+from datathon_decision.src.preprocess_utils import preprocess_data_split_save  # noqa: E402
+
+
+def median_ms(func, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def benchmark_backend(backend, X_engineered, y_target, work_dir, latency_samples):
+    """Codifica, treina e mede um backend; retorna o dicionário de resultados."""
+    backend_dir = Path(work_dir) / backend.name
+    backend_dir.mkdir(parents=True, exist_ok=True)
+    preprocessor_path = backend_dir / "preprocessor.joblib"
+
+    start = time.perf_counter()
+    _, _, _, _, training_cols = preprocess_data_split_save(
+        X_engineered, y_target, out_dir_path=str(backend_dir), fit_ohe=True,
+        categorical_encoding=backend.categorical_encoding,
+        preprocessor_path=preprocessor_path, training_columns_path=backend_dir / "training_columns.joblib",
+    )
+    encode_s = time.perf_counter() - start
+    encoder = joblib.load(preprocessor_path)
+    X_train, y_train = load_processed_split(str(backend_dir), TRAIN_SPLIT_NAME, mmap_mode=None)
+    X_val, y_val = load_processed_split(str(backend_dir), VAL_SPLIT_NAME, mmap_mode=None)
+
+    model = backend.build(X_train.columns)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    model_path = backend_dir / "model.joblib"
+    joblib.dump(model, model_path, compress=0)
+    result = {
+        "backend": backend.name,
+        "categorical_encoding": backend.categorical_encoding,
+        "n_columns": len(training_cols),
+        "encode_s": encode_s,
+        "fit_s": fit_s,
+        "artifact_size_bytes": artifact_size_bytes(model_path),
+    }
+    if backend.supports_packed:
+        packed_dir = backend_dir / "packed"
+        save_packed_forest(model, packed_dir)
+        result["packed_size_bytes"] = artifact_size_bytes(packed_dir)
+
+    # Latência de uma linha: só o modelo, e do dicionário de features engenheiradas até a probabilidade
+    single_row = X_val.iloc[:1]
+    engineered_row = X_engineered.iloc[[0]]
+    result["single_row_model_p50_ms"] = median_ms(lambda: model.predict_proba(single_row), latency_samples)
+    result["single_row_encode_predict_p50_ms"] = median_ms(
+        lambda: model.predict_proba(preprocess_data_split_save(
+            engineered_row, None, None, fit_ohe=False, ohe_encoder=encoder, training_cols_list=training_cols
+        )[0]),
+        latency_samples,
+    )
+    start = time.perf_counter()
+    model.predict_proba(X_val)
+    result["batch_predict_s"] = time.perf_counter() - start
+    result["metrics"] = {k: float(v) for k, v in evaluate_model(model, X_val, y_val).items()}
+    return result
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Compara os backends de modelo.")
+    parser.add_argument("--backends", nargs="+", default=list(MODEL_BACKENDS), choices=list(MODEL_BACKENDS))
+    parser.add_argument("--latency-samples", type=int, default=100)
+    parser.add_argument("--output", default=str(REPORTS_DIR / "model_backends.json"))
+    args = parser.parse_args()
+
+    if not Path(ENGINEERED_FEATURES_PATH).exists():
+        print(f"❌ Features engenheiradas não encontradas em {ENGINEERED_FEATURES_PATH}.")
+        print("   Rode: python -m datathon_decision.src.pipeline_runner --until features")
+        return 1
+    logging.getLogger("datathon_decision.src.model_utils").setLevel(logging.WARNING)
+    X_engineered, y_target = joblib.load(ENGINEERED_FEATURES_PATH)
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in args.backends:
+            result = benchmark_backend(get_model_backend(name), X_engineered, y_target, work_dir, args.latency_samples)
+            results.append(result)
+            m = result["metrics"]
+            print(f"📊 {name:24s} | {result['n_columns']:4d} colunas ({result['categorical_encoding']}) | "
+                  f"fit={result['fit_s']:6.2f} s | artefato={result['artifact_size_bytes'] / 1024:9.1f} KB | "
+                  f"1 linha: modelo={result['single_row_model_p50_ms']:6.2f} ms, "
+                  f"encode+modelo={result['single_row_encode_predict_p50_ms']:6.2f} ms | "
+                  f"AUC={m.get('roc_auc', float('nan')):.4f} F1={m['f1']:.4f}")
+
+    report = {"timestamp": datetime.now().isoformat(), "rows": int(len(X_engineered)), "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Script para comparar a similaridade textual em laço Python (sets por linha) com o motor
+esparso em lote (similarity_utils.TextSimilarityEngine) nos modos 'jaccard' e 'tfidf'.
+
+Uso: python scripts/benchmark_text_similarity.py <caminho_para_dados_brutos> [--replicate 5]
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.preprocess_utils import load_data, merge_data, normalize_text, field_values  # noqa: E402
+from datathon_decision.src.similarity_utils import TextSimilarityEngine, jaccard_similarity_loop  # noqa: E402
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Benchmark da similaridade textual.")
+    parser.add_argument("raw_data_dir", nargs="?", default=str(ROOT_DIR / "datathon_decision" / "data" / "raw"))
+    parser.add_argument("--replicate", type=int, default=5, help="Replica as linhas para simular lotes maiores")
+    parser.add_argument("--output", default=str(ROOT_DIR / "datathon_decision" / "reports" / "text_similarity.json"))
+    args = parser.parse_args()
+
+    df_merged = merge_data(*load_data(args.raw_data_dir))
+    pairs = {
+        "objetivo_x_titulo": (
+            field_values(df_merged, 'informacoes_profissionais', 'objetivo_profissional', '').apply(normalize_text),
+            field_values(df_merged, 'informacoes_basicas', 'titulo_vaga', '').apply(normalize_text),
+        ),
+        "cv_x_competencias": (
+            df_merged['cv_pt'].fillna('').apply(normalize_text),
+            field_values(df_merged, 'perfil_vaga', 'competencia_tecnicas_e_comportamentais', '').apply(normalize_text),
+        ),
+    }
+    pairs = {name: tuple(pd.concat([s] * args.replicate, ignore_index=True) for s in texts) for name, texts in pairs.items()}
+    candidato_keys = pd.concat([df_merged['codigo_profissional']] * args.replicate, ignore_index=True)
+    vaga_keys = pd.concat([df_merged['vaga_id']] * args.replicate, ignore_index=True)
+    tfidf_engine, fit_s = timed(TextSimilarityEngine("tfidf").fit, *[s for texts in pairs.values() for s in texts])
+
+    results = []
+    for name, (texts_a, texts_b) in pairs.items():
+        reference, loop_s = timed(jaccard_similarity_loop, texts_a, texts_b)
+        jaccard, jaccard_s = timed(TextSimilarityEngine("jaccard").rowwise_similarity, texts_a, texts_b, candidato_keys, vaga_keys)
+        _, tfidf_s = timed(tfidf_engine.rowwise_similarity, texts_a, texts_b, candidato_keys, vaga_keys)
+        result = {
+            "pair": name,
+            "rows": len(texts_a),
+            "loop_s": loop_s,
+            "jaccard_engine_s": jaccard_s,
+            "tfidf_engine_s": tfidf_s,
+            "speedup_jaccard": loop_s / jaccard_s,
+            "jaccard_identical": bool(np.array_equal(np.asarray(reference), jaccard)),
+        }
+        results.append(result)
+        print(f"📊 {name:18s} | {result['rows']:,} linhas | laço={loop_s:.3f}s | "
+              f"jaccard={jaccard_s:.3f}s (x{result['speedup_jaccard']:.1f}, idêntico={result['jaccard_identical']}) | "
+              f"tfidf={tfidf_s:.3f}s")
+
+    report = {"timestamp": datetime.now().isoformat(), "tfidf_fit_s": fit_s, "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,13 @@
 Script para verificar se os arquivos necessários para treinamento existem.
 """
 
+import json
 import os
 import sys
 from pathlib import Path
 
+import numpy as np
+
 
 def check_file_exists(filepath: str, description: str) -> bool:
     """Verifica se um arquivo existe e mostra informações sobre ele."""
@@ -48,15 +51,45 @@ def check_directory_contents(directory: str, description: str):
             print(f"     📁 {file_path.name}/ (directory)")
 
 
+def check_processed_split(directory: str, description: str) -> bool:
+    """Valida um split processado (X.npy/y.npy/columns.json) abrindo os arrays com mmap (sem ler os dados)."""
+    path = Path(directory)
+    metadata_path = path / "columns.json"
+    if not metadata_path.exists():
+        print(f"❌ {description}: {metadata_path} (NOT FOUND)")
+        return False
+
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    X = np.load(path / "X.npy", mmap_mode="r")
+    ok = X.shape == (metadata["n_rows"], len(metadata["columns"]))
+    if metadata.get("has_target"):
+        y = np.load(path / "y.npy", mmap_mode="r")
+        ok = ok and y.shape[0] == X.shape[0]
+    status = "✅" if ok else "❌"
+    print(f"{status} {description}: {directory}")
+    print(f"   📐 X: {X.shape} ({X.dtype}) | columns.json: {len(metadata['columns'])} colunas, {metadata['n_rows']:,} linhas")
+    return ok
+
+
 def main():
     """Função principal para verificar arquivos de treinamento."""
     
     print("🔍 Checking training files and directories...")
     
-    # Arquivos essenciais para o treinamento
+    # Arquivos essenciais para o treinamento (arrays .npy + columns.json, carregados com mmap)
     required_files = [
-        ("datathon_decision/data/processed/train_data.joblib", "Training data"),
-        ("datathon_decision/data/processed/val_data.joblib", "Validation data"),
+        ("datathon_decision/data/processed/train/X.npy", "Training features"),
+        ("datathon_decision/data/processed/train/y.npy", "Training target"),
+        ("datathon_decision/data/processed/train/columns.json", "Training column metadata"),
+        ("datathon_decision/data/processed/val/X.npy", "Validation features"),
+        ("datathon_decision/data/processed/val/y.npy", "Validation target"),
+        ("datathon_decision/data/processed/val/columns.json", "Validation column metadata"),
+    ]
+
+    processed_splits = [
+        ("datathon_decision/data/processed/train", "Training split"),
+        ("datathon_decision/data/processed/val", "Validation split"),
     ]
     
     # Arquivos opcionais mas importantes
@@ -64,6 +97,7 @@ def main():
         ("datathon_decision/models/preprocessor_objects.joblib", "Preprocessor"),
         ("datathon_decision/models/training_columns.joblib", "Training columns"),
         ("datathon_decision/models/random_forest_model.joblib", "Trained model"),
+        ("datathon_decision/models/random_forest_packed/meta.json", "Packed model (mmap)"),
     ]
     
     print("\n" + "="*60)
@@ -75,6 +109,14 @@ def main():
         if not check_file_exists(filepath, description):
             missing_required.append(filepath)
     
+    print("\n" + "="*60)
+    print("🧮 PROCESSED SPLITS (mmap)")
+    print("="*60)
+
+    for directory, description in processed_splits:
+        if Path(directory).exists() and not check_processed_split(directory, description):
+            missing_required.append(directory)
+
     print("\n" + "="*60)
     print("📋 OPTIONAL/OUTPUT FILES")
     print("="*60)
@@ -1,14 +1,50 @@
 #!/usr/bin/env python3
 """
 Script para extrair métricas do output de treinamento e salvar em JSON.
+
+Além das métricas de validação, mede o desempenho do commit (tempos de pré-processamento e treino
+do resumo do pipeline_runner, tamanho dos artefatos, carga do modelo, latência de uma linha e do
+lote, pico de memória), acrescenta a entrada ao histórico (uma linha JSON por commit) e falha
+(exit 1) quando uma métrica rastreada piora além da tolerância (PERFORMANCE_TOLERANCES) em relação
+à mediana dos últimos commits do histórico.
+
+Uso: python extract_metrics.py <training_output.txt> <commit_sha> <branch> [--history caminho.jsonl]
+     [--no-performance]
 """
 
+import argparse
 import json
+import logging
 import re
+import statistics
+import subprocess
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.config import (  # noqa: E402
+    MODEL_PATH, PACKED_MODEL_DIR, PERFORMANCE_BASELINE_WINDOW, PERFORMANCE_HISTORY_PATH, PERFORMANCE_TOLERANCES,
+    PIPELINE_SUMMARY_PATH, PROCESSED_DATA_DIR, VAL_SPLIT_NAME,
+)
+
+LATENCY_SAMPLES = 50
+BATCH_ROWS = 1000
+BATCH_REPEATS = 5
+# Processo de serving isolado: carrega os artefatos e faz LATENCY_SAMPLES predições, como um worker da API
+SERVING_RSS_SCRIPT = """
+import resource
+from datathon_decision.src import model_utils
+from datathon_decision.src.startup_utils import WARMUP_PAYLOAD
+model_utils.load_artifacts()
+for _ in range({samples}):
+    model_utils.predict_pipeline(WARMUP_PAYLOAD)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
 
 def extract_metrics_from_output(output_file: str, commit_sha: str, branch: str) -> dict:
     """Extrai métricas do arquivo de output do treinamento."""
@@ -76,32 +112,160 @@ def save_metrics(metrics: dict, output_file: str = 'metrics.json'):
         return False
 
 
+def median_ms(func, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def load_pipeline_summary(summary_file) -> dict:
+    """Etapas do último pipeline_runner por nome (vazio se o resumo não existe)."""
+    try:
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            return {row['stage']: row for row in json.load(f).get('stages', [])}
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"⚠️  Resumo do pipeline não encontrado em {summary_file}")
+        return {}
+
+
+def stage_seconds(stages: dict, *names):
+    """Soma dos tempos originais das etapas (para etapas em cache, o tempo da execução que gerou o cache)."""
+    values = [stages.get(name, {}).get('original_seconds') for name in names]
+    return sum(values) if all(v is not None for v in values) else None
+
+
+def serving_peak_rss_mb():
+    """Pico de RSS (MB) de um processo que só carrega o modelo e prediz (sem o split de validação deste script)."""
+    result = subprocess.run(
+        [sys.executable, "-c", SERVING_RSS_SCRIPT.format(samples=LATENCY_SAMPLES)],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(f"⚠️  Falha ao medir a memória do serving: {result.stderr.strip().splitlines()[-1:]}")
+        return None
+    # ru_maxrss é reportado em kB no Linux
+    return int(result.stdout.strip().splitlines()[-1]) / 1024
+
+
+def measure_performance(summary_file=PIPELINE_SUMMARY_PATH) -> dict:
+    """Mede o desempenho do commit com os artefatos em models/ e o split de validação em data/processed/."""
+    from datathon_decision.src.artifact_utils import artifact_size_bytes
+    from datathon_decision.src.dataset_utils import load_processed_split
+    from datathon_decision.src import model_utils
+    from datathon_decision.src.startup_utils import WARMUP_PAYLOAD
+
+    for name in ("datathon_decision.src.model_utils", "datathon_decision.src.model_registry"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    stages = load_pipeline_summary(summary_file)
+    peaks = [row['max_rss_kb'] for row in stages.values() if row.get('max_rss_kb') is not None]
+
+    start = time.perf_counter()
+    artifacts = model_utils.load_artifacts(reload=True)
+    model_load_ms = (time.perf_counter() - start) * 1000
+    model_utils.predict_pipeline(WARMUP_PAYLOAD)  # aquecimento (registry, caches do engine)
+    single_row_p50_ms = median_ms(lambda: model_utils.predict_pipeline(WARMUP_PAYLOAD), LATENCY_SAMPLES)
+
+    X_val, _ = load_processed_split(PROCESSED_DATA_DIR, VAL_SPLIT_NAME, mmap_mode="r")
+    X_batch = X_val.iloc[:BATCH_ROWS]
+    batch_ms = median_ms(lambda: artifacts['model'].predict_proba(X_batch), BATCH_REPEATS)
+
+    performance = {
+        'preprocess_s': stage_seconds(stages, 'features', 'encode_split'),
+        'train_s': stage_seconds(stages, 'train'),
+        'model_artifact_mb': artifact_size_bytes(MODEL_PATH) / 1e6,
+        'packed_artifact_mb': artifact_size_bytes(PACKED_MODEL_DIR) / 1e6 if Path(PACKED_MODEL_DIR).is_dir() else None,
+        'model_load_ms': model_load_ms,
+        'single_row_p50_ms': single_row_p50_ms,
+        'batch_ms_per_1k_rows': batch_ms / len(X_batch) * 1000,
+        # ru_maxrss é reportado em kB no Linux
+        'pipeline_peak_rss_mb': max(peaks) / 1024 if peaks else None,
+        'serving_peak_rss_mb': serving_peak_rss_mb(),
+    }
+    for name, value in performance.items():
+        print(f"⏱️  {name}: {value:.3f}" if value is not None else f"⚠️  {name}: não disponível")
+    return performance
+
+
+def load_history(history_file) -> list:
+    """Entradas do histórico (uma por linha), da mais antiga para a mais recente."""
+    try:
+        with open(history_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def performance_baseline(history: list, commit_sha: str, window: int = PERFORMANCE_BASELINE_WINDOW) -> dict:
+    """Mediana de cada métrica nos últimos `window` commits (reexecuções do mesmo commit não entram)."""
+    previous = [entry.get('performance', {}) for entry in history if entry.get('commit_sha') != commit_sha][-window:]
+    baseline = {}
+    for name in PERFORMANCE_TOLERANCES:
+        values = [p[name] for p in previous if p.get(name) is not None]
+        if values:
+            baseline[name] = statistics.median(values)
+    return baseline
+
+
+def find_regressions(performance: dict, baseline: dict) -> list:
+    """Métricas acima da baseline por mais que a tolerância relativa e a folga absoluta."""
+    regressions = []
+    for name, (relative, absolute) in PERFORMANCE_TOLERANCES.items():
+        value, reference = performance.get(name), baseline.get(name)
+        if value is None or reference is None:
+            continue
+        limit = max(reference * (1 + relative), reference + absolute)
+        if value > limit:
+            regressions.append({'metric': name, 'value': value, 'baseline': reference, 'limit': limit})
+    return regressions
+
+
+def append_history(metrics: dict, history_file) -> None:
+    Path(history_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(history_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(metrics, ensure_ascii=False) + '\n')
+    print(f"📊 Histórico atualizado em {history_file}")
+
+
 def main():
     """Função principal."""
-    if len(sys.argv) < 4:
-        print("Uso: python extract_metrics.py <training_output.txt> <commit_sha> <branch>")
-        sys.exit(1)
-    
-    output_file = sys.argv[1]
-    commit_sha = sys.argv[2]
-    branch = sys.argv[3]
-    
-    print(f"🔍 Extraindo métricas de: {output_file}")
-    print(f"📝 Commit: {commit_sha[:8]}")
-    print(f"🌿 Branch: {branch}")
-    
-    metrics = extract_metrics_from_output(output_file, commit_sha, branch)
-    
-    if metrics and any(v is not None for v in metrics.values()):
-        success = save_metrics(metrics)
-        if success:
-            print("✅ Extração de métricas concluída com sucesso!")
-        else:
-            sys.exit(1)
-    else:
+    parser = argparse.ArgumentParser(description="Extrai as métricas do treino e mede o desempenho do commit.")
+    parser.add_argument("output_file", help="training_output.txt")
+    parser.add_argument("commit_sha")
+    parser.add_argument("branch")
+    parser.add_argument("--history", default=str(PERFORMANCE_HISTORY_PATH), help="Histórico de desempenho (JSONL)")
+    parser.add_argument("--summary", default=str(PIPELINE_SUMMARY_PATH), help="Resumo do pipeline_runner")
+    parser.add_argument("--no-performance", action="store_true", help="Só as métricas de validação (sem histórico)")
+    args = parser.parse_args()
+
+    print(f"🔍 Extraindo métricas de: {args.output_file}")
+    print(f"📝 Commit: {args.commit_sha[:8]}")
+    print(f"🌿 Branch: {args.branch}")
+
+    metrics = extract_metrics_from_output(args.output_file, args.commit_sha, args.branch)
+    if not metrics or all(v is None for v in metrics.values()):
         print("❌ Nenhuma métrica foi extraída")
         sys.exit(1)
 
+    regressions = []
+    if not args.no_performance:
+        history = load_history(args.history)
+        metrics['performance'] = measure_performance(args.summary)
+        metrics['baseline'] = performance_baseline(history, args.commit_sha)
+        regressions = find_regressions(metrics['performance'], metrics['baseline'])
+        metrics['regressions'] = regressions
+        append_history(metrics, args.history)
+
+    if not save_metrics(metrics):
+        sys.exit(1)
+    if regressions:
+        for r in regressions:
+            print(f"❌ Regressão em {r['metric']}: {r['value']:.3f} (baseline {r['baseline']:.3f}, limite {r['limit']:.3f})")
+        sys.exit(1)
+    print("✅ Extração de métricas concluída com sucesso!")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -22,7 +22,102 @@ def load_metrics(metrics_file: str = 'metrics.json') -> dict:
         return {}
 
 
-def generate_dashboard_html(metrics: dict, commit_sha: str, branch: str, run_id: str, repo: str) -> str:
+def load_profile(profile_file: str) -> dict:
+    """Carrega o relatório de profiling do pipeline (opcional: sem arquivo, a seção não é gerada)."""
+    try:
+        with open(profile_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def generate_profile_html(profile: dict) -> str:
+    """Tabela por sessão de profiling: tempo de parede, CPU, pico de memória e DataFrames por etapa."""
+    html = '''
+        <h2>⏱️ Pipeline Profile</h2>'''
+    for session, report in profile.get('sessions', {}).items():
+        total = report.get('total_wall_s') or 0
+        html += f'''
+        <div class="info-section">
+            <h3>{session} <span class="info-value">({report.get('created_at', 'N/A')}, {total:.1f}s)</span></h3>
+            <table class="profile-table">
+                <tr><th>Stage</th><th>Wall (s)</th><th>CPU (s)</th><th>Peak traced (MB)</th><th>DataFrames</th></tr>'''
+        for stage in report.get('stages', []):
+            share = stage['wall_s'] / total * 100 if total else 0
+            frames = '<br>'.join(f"{name}: {frame['rows']:,}×{frame['columns']} ({frame['bytes'] / 1e6:.1f} MB)"
+                                 for name, frame in stage.get('frames', {}).items())
+            peak = f"{stage['peak_traced_bytes'] / 1e6:.1f}" if report.get('trace_memory') else '-'
+            html += f'''
+                <tr>
+                    <td style="padding-left: {10 + 20 * stage['depth']}px">{stage['name']}</td>
+                    <td><div class="profile-bar" style="width: {min(share, 100):.0f}%"></div>{stage['wall_s']:.2f}</td>
+                    <td>{stage['cpu_s']:.2f}</td>
+                    <td>{peak}</td>
+                    <td>{frames}</td>
+                </tr>'''
+        html += '''
+            </table>
+        </div>'''
+    return html
+
+
+def load_history(history_file: str) -> list:
+    """Carrega o histórico de desempenho (uma linha JSON por commit; opcional como o profiling)."""
+    try:
+        with open(history_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def generate_history_html(history: list, regressions: list) -> str:
+    """Gráficos de tendência por commit: um para as métricas de validação e um por métrica de desempenho."""
+    labels = [entry.get('commit_sha', '')[:8] for entry in history]
+    charts = [('validation', 'Validation metrics', [(key, [entry.get(key) for entry in history])
+                                                   for key in ('accuracy', 'f1_score', 'roc_auc')])]
+    names = []
+    for entry in history:
+        names += [name for name in entry.get('performance', {}) if name not in names]
+    for name in names:
+        charts.append((name, name, [(name, [entry.get('performance', {}).get(name) for entry in history])]))
+
+    html = '''
+        <h2>📈 Performance History</h2>'''
+    if regressions:
+        html += '''
+        <div class="info-section">
+            <h3>❌ Regressions in this commit</h3>'''
+        for r in regressions:
+            html += f'''
+            <div class="info-item">
+                <span class="info-label">{r['metric']}</span>
+                <span class="info-value">{r['value']:.3f} (baseline {r['baseline']:.3f}, limit {r['limit']:.3f})</span>
+            </div>'''
+        html += '''
+        </div>'''
+    html += '''
+        <div class="history-grid">'''
+    for chart_id, title, _ in charts:
+        html += f'''
+            <div class="info-section"><h3>{title}</h3><canvas id="chart-{chart_id}"></canvas></div>'''
+    html += '''
+        </div>
+        <script>'''
+    for chart_id, _, series in charts:
+        datasets = [{'label': label, 'data': values, 'spanGaps': True, 'tension': 0.2} for label, values in series]
+        html += f'''
+            new Chart(document.getElementById('chart-{chart_id}'), {{
+                type: 'line',
+                data: {{labels: {json.dumps(labels)}, datasets: {json.dumps(datasets)}}},
+                options: {{plugins: {{legend: {{display: {json.dumps(len(series) > 1)}}}}}}}
+            }});'''
+    html += '''
+        </script>'''
+    return html
+
+
+def generate_dashboard_html(metrics: dict, commit_sha: str, branch: str, run_id: str, repo: str, profile: dict = None,
+                            history: list = None) -> str:
     """Gera HTML do dashboard."""
     
     current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
@@ -151,6 +246,28 @@ def generate_dashboard_html(metrics: dict, commit_sha: str, branch: str, run_id:
         .link-button:hover {{
             background: #0056b3;
         }}
+        .profile-table {{
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.9em;
+        }}
+        .profile-table th, .profile-table td {{
+            text-align: left;
+            padding: 6px 10px;
+            border-bottom: 1px solid #e9ecef;
+            vertical-align: top;
+        }}
+        .history-grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(350px, 1fr));
+            gap: 0 20px;
+        }}
+        .profile-bar {{
+            height: 4px;
+            background: #667eea;
+            border-radius: 2px;
+            margin-bottom: 3px;
+        }}
     </style>
 </head>
 <body>
@@ -254,6 +371,12 @@ def generate_dashboard_html(metrics: dict, commit_sha: str, branch: str, run_id:
         </div>
         '''
     
+    if history:
+        html += generate_history_html(history, metrics.get('regressions', []))
+
+    if profile:
+        html += generate_profile_html(profile)
+
     # Links úteis
     html += f'''
         <div class="info-section">
@@ -286,7 +409,8 @@ def generate_dashboard_html(metrics: dict, commit_sha: str, branch: str, run_id:
 def main():
     """Função principal."""    
     if len(sys.argv) < 5:
-        print("Uso: python generate_dashboard.py <commit_sha> <branch> <run_id> <repo>")
+        print("Uso: python generate_dashboard.py <commit_sha> <branch> <run_id> <repo> [relatorio_de_profiling.json] "
+              "[historico.jsonl]")
         sys.exit(1)
     
     commit_sha = sys.argv[1]
@@ -299,7 +423,11 @@ def main():
     print(f"🌿 Branch: {branch}")
     
     metrics = load_metrics()
-    html = generate_dashboard_html(metrics, commit_sha, branch, run_id, repo)
+    # Relatório do profiling do pipeline (pipeline_runner --profile ou DATATHON_PROFILE=1)
+    profile = load_profile(sys.argv[5] if len(sys.argv) > 5 else 'datathon_decision/reports/pipeline_profile.json')
+    # Histórico de desempenho por commit (scripts/extract_metrics.py)
+    history = load_history(sys.argv[6] if len(sys.argv) > 6 else 'datathon_decision/reports/metrics_history.jsonl')
+    html = generate_dashboard_html(metrics, commit_sha, branch, run_id, repo, profile, history)
     
     try:
         with open('dashboard.html', 'w', encoding='utf-8') as f:
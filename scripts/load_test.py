@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Teste de carga da API: sobe o app localmente (servidor do Flask ou gunicorn), envia um corpus de
+payloads gerados para /api/predict com concorrência e taxa configuráveis e reporta vazão,
+latência p50/p95/p99 (só das respostas 200), taxa de erro e taxa de recusas do controle de admissão (429/503).
+
+Roda offline contra o modelo treinado localmente (models/). O relatório JSON inclui o commit
+atual; use --compare com o relatório de outro commit para ver as diferenças.
+
+Uso: python scripts/load_test.py [--server gunicorn|flask] [--workers 2] [--concurrency 8]
+     [--requests 1000] [--rate 200] [--explain] [--tier full|fast] [--compare reports/load_test_base.json]
+     python scripts/load_test.py --url http://127.0.0.1:5050   # API já em execução
+"""
+
+import argparse
+import copy
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from datathon_decision.src.config import (  # noqa: E402
+    ACADEMIC_LEVEL_MAP, KEY_TECH_SKILLS, LANGUAGE_LEVEL_MAP, MODEL_PATH, PROFESSIONAL_LEVEL_MAP, REPORTS_DIR,
+)
+from datathon_decision.src.startup_utils import WARMUP_PAYLOAD  # noqa: E402
+
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+from measure_worker_memory import free_port, wait_until_up  # noqa: E402
+
+AREAS = ["TI - DEV", "TI - SAP", "TI - Infraestrutura", "Administrativa", "Financeira/Controladoria"]
+COMMENTS = ["Candidato promissor", "Não responde às mensagens", "Sem interesse na vaga", "Perfil aderente", ""]
+# Métricas comparadas com --compare (menor é melhor, exceto a vazão)
+COMPARED_METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "shed_rate")
+# Recusas do controle de admissão (fila cheia ou prazo): contadas à parte, não como erro
+SHED_STATUSES = (429, 503)
+
+
+def generate_payloads(n, seed=42):
+    """Corpus sintético de payloads (variações do payload de aquecimento sobre os vocabulários do config)."""
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(n):
+        payload = copy.deepcopy(WARMUP_PAYLOAD)
+        skills = " ".join(rng.sample(KEY_TECH_SKILLS, rng.randint(1, 5)))
+        payload["perfil_vaga"].update({
+            "nivel profissional": rng.choice(list(PROFESSIONAL_LEVEL_MAP)).title(),
+            "nivel_academico": rng.choice(list(ACADEMIC_LEVEL_MAP)).title(),
+            "nivel_ingles": rng.choice(list(LANGUAGE_LEVEL_MAP)).title(),
+            "areas_atuacao": rng.choice(AREAS),
+            "competencia_tecnicas_e_comportamentais": skills,
+        })
+        payload["informacoes_basicas"]["vaga_sap"] = rng.choice(["Sim", "Não"])
+        payload["informacoes_profissionais"].update({
+            "nivel_profissional": rng.choice(list(PROFESSIONAL_LEVEL_MAP)).title(),
+            "area_atuacao": rng.choice(AREAS),
+            "conhecimentos_tecnicos": " ".join(rng.sample(KEY_TECH_SKILLS, rng.randint(0, 5))),
+        })
+        payload["formacao_e_idiomas"] = {
+            "nivel_academico": rng.choice(list(ACADEMIC_LEVEL_MAP)).title(),
+            "nivel_ingles": rng.choice(list(LANGUAGE_LEVEL_MAP)).title(),
+        }
+        payload["cv_pt"] = f"Experiência com {skills} em {rng.choice(['consultoria', 'multinacional', 'startup'])}"
+        payload["comentario_prospect"] = rng.choice(COMMENTS)
+        payload["candidato_taxa_desistencia_historica_num"] = round(rng.random() * 0.5, 2)
+        payloads.append(payload)
+    return payloads
+
+
+def load_corpus(path):
+    """Corpus de um arquivo JSON (lista de payloads) ou JSONL (um payload por linha)."""
+    with open(path, "r", encoding="utf-8") as f:
+        if str(path).endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def start_server(server, workers):
+    """Sobe a API numa porta livre; retorna (processo, url base)."""
+    port = free_port()
+    env = dict(os.environ, DATATHON_PRELOAD_ARTIFACTS="1" if server == "gunicorn" else "0")
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "--preload", "--workers", str(workers), "--worker-class", "gthread",
+                   "--threads", "4",
+                   "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "datathon_decision.src.app:app"]
+    else:
+        command = [sys.executable, "-m", "flask", "--app", "datathon_decision.src.app:app", "run",
+                   "--host", "127.0.0.1", "--port", str(port), "--with-threads"]
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def run_load(base_url, payloads, n_requests, concurrency, rate=None, explain=False, tier=None):
+    """
+    Envia n_requests POST /api/predict (payloads em rodízio) com `concurrency` clientes.
+    Com rate (req/s), cada requisição tem um horário agendado e a latência conta a partir dele,
+    incluindo a espera na fila (sem coordinated omission). Retorna (latências ms, status, duração s).
+    """
+    url = urllib.parse.urlsplit(base_url)
+    query = urllib.parse.urlencode({key: value for key, value in (("explain", "true" if explain else None), ("tier", tier)) if value})
+    path = "/api/predict" + (f"?{query}" if query else "")
+    bodies = [json.dumps({"payload": p}).encode("utf-8") for p in payloads]
+    latencies = np.full(n_requests, np.nan)
+    statuses = np.zeros(n_requests, dtype=np.int32)
+    counter = iter(range(n_requests))
+    counter_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def client():
+        connection = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            scheduled = start + i / rate if rate else time.perf_counter()
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                connection.request("POST", path, body=bodies[i % len(bodies)], headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                statuses[i] = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                statuses[i] = 0
+            latencies[i] = (time.perf_counter() - scheduled) * 1000
+        connection.close()
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def latency_stats(latencies, prefix=""):
+    """Média, p50/p95/p99 e máximo (ms); None quando não há requisições."""
+    names = ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    if len(latencies) == 0:
+        return {f"{prefix}{name}": None for name in names}
+    values = (np.mean(latencies), *np.percentile(latencies, [50, 95, 99]), np.max(latencies))
+    return {f"{prefix}{name}": float(value) for name, value in zip(names, values)}
+
+
+def summarize(latencies, statuses, duration_s):
+    # Latência só das respostas 200: as recusas (429/503) voltam quase na hora e puxariam os percentis para baixo
+    ok = statuses == 200
+    shed = np.isin(statuses, SHED_STATUSES)
+    codes, counts = np.unique(statuses, return_counts=True)
+    return {
+        "requests": int(len(statuses)),
+        "duration_s": duration_s,
+        "throughput_rps": float(ok.sum() / duration_s),
+        "error_rate": float((~ok & ~shed).mean()),
+        "shed_rate": float(shed.mean()),
+        "status_counts": {str(int(c)): int(n) for c, n in zip(codes, counts)},
+        **latency_stats(latencies[ok]),
+        **latency_stats(latencies[shed], prefix="shed_"),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(result, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"📊 Comparação com {baseline_path} (commit {baseline.get('commit')}):")
+    for metric in COMPARED_METRICS:
+        before, after = baseline["results"].get(metric), result[metric]
+        if before is None or after is None:
+            print(f"   {metric:15s} {before} -> {after}")
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"   {metric:15s} {before:10.3f} -> {after:10.3f} ({change})")
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Teste de carga do endpoint /api/predict.")
+    parser.add_argument("--server", choices=["gunicorn", "flask"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="Workers do gunicorn")
+    parser.add_argument("--url", default=None, help="URL base de uma API já em execução (não sobe servidor)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=None, help="Taxa alvo (req/s); padrão: o mais rápido possível")
+    parser.add_argument("--warmup-requests", type=int, default=20)
+    parser.add_argument("--corpus", default=None, help="JSON/JSONL de payloads (padrão: corpus gerado)")
+    parser.add_argument("--corpus-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--explain", action="store_true", help="Usa /api/predict?explain=true")
+    parser.add_argument("--tier", choices=["full", "fast"], default=None, help="Tier de serving (padrão: o da API)")
+    parser.add_argument("--output", default=str(REPORTS_DIR / "load_test.json"))
+    parser.add_argument("--compare", default=None, help="Relatório anterior para comparar")
+    args = parser.parse_args()
+
+    payloads = load_corpus(args.corpus) if args.corpus else generate_payloads(args.corpus_size, args.seed)
+    process = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        if not Path(MODEL_PATH).exists():
+            print(f"❌ Modelo não encontrado em {MODEL_PATH}. Rode: python -m datathon_decision.src.pipeline_runner")
+            return 1
+        process, base_url = start_server(args.server, args.workers)
+        print(f"🔍 Subindo {args.server} em {base_url}...")
+    try:
+        if not wait_until_up(f"{base_url}/api/ready"):
+            print(f"❌ A API não ficou pronta em {base_url}/api/ready")
+            return 1
+        if args.warmup_requests:
+            run_load(base_url, payloads, args.warmup_requests, args.concurrency, explain=args.explain, tier=args.tier)
+        latencies, statuses, duration_s = run_load(base_url, payloads, args.requests, args.concurrency,
+                                                   rate=args.rate, explain=args.explain, tier=args.tier)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    result = summarize(latencies, statuses, duration_s)
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "config": {"server": "external" if args.url else args.server, "workers": args.workers,
+                   "concurrency": args.concurrency, "rate": args.rate, "explain": args.explain, "tier": args.tier,
+                   "corpus": args.corpus or f"gerado ({args.corpus_size}, seed={args.seed})"},
+        "results": result,
+    }
+    latency = (f"p50={result['p50_ms']:.1f} ms p95={result['p95_ms']:.1f} ms p99={result['p99_ms']:.1f} ms"
+               if result["p50_ms"] is not None else "sem respostas 200")
+    print(f"📊 {result['requests']} requisições em {duration_s:.1f}s | {result['throughput_rps']:.1f} req/s | "
+          f"{latency} | erros={result['error_rate']:.2%}")
+    if result["shed_rate"]:
+        print(f"⚠️  Recusadas pelo controle de admissão (429/503): {result['shed_rate']:.2%} "
+              f"(p50={result['shed_p50_ms']:.1f} ms); aumente DATATHON_MAX_QUEUE/DATATHON_MAX_IN_FLIGHT ou reduza "
+              f"--concurrency para medir sem recusas")
+    if args.compare:
+        print_comparison(result, args.compare)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    # Recusas do controle de admissão são o comportamento esperado sob sobrecarga, não falha do teste
+    return 0 if result["error_rate"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Script para medir RSS/PSS por worker do gunicorn (1, 2 e 4 workers) servindo a API.
+
+Com --preload e o modelo no formato packed (mmap), as páginas do modelo são compartilhadas
+entre os workers: o PSS (memória proporcional) por worker deve cair conforme N aumenta.
+
+Uso: python scripts/measure_worker_memory.py [--workers 1 2 4] [--format packed joblib]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+REPORT_FILE = ROOT_DIR / "datathon_decision" / "reports" / "worker_memory.json"
+
+EXAMPLE_PAYLOAD = {
+    "perfil_vaga": {
+        "nivel profissional": "Sênior",
+        "nivel_academico": "Superior Completo",
+        "nivel_ingles": "Avançado",
+        "areas_atuacao": "TI - DEV",
+        "competencia_tecnicas_e_comportamentais": "Java Python SQL"
+    },
+    "informacoes_basicas": {"vaga_sap": "Não", "titulo_vaga": "Dev Java Sr"},
+    "informacoes_profissionais": {
+        "nivel_profissional": "Sênior",
+        "area_atuacao": "Desenvolvimento",
+        "conhecimentos_tecnicos": "Java Spring",
+        "objetivo_profissional": "Desenvolvedor Java"
+    },
+    "formacao_e_idiomas": {"nivel_academico": "Superior Completo", "nivel_ingles": "Avançado"},
+    "cv_pt": "Experiencia com Java e Python",
+    "comentario_prospect": "Candidato promissor",
+    "data_candidatura_prospect": "01-01-2023",
+    "ultima_atualizacao_prospect": "10-01-2023",
+    "candidato_taxa_desistencia_historica_num": 0.1
+}
+
+
+def read_memory_stats(pid: int) -> dict:
+    """Lê Rss/Pss/Shared/Private (kB) de /proc/<pid>/smaps_rollup (Linux)."""
+    stats = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                stats[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_kb": stats.get("Rss", 0),
+        "pss_kb": stats.get("Pss", 0),
+        "shared_kb": stats.get("Shared_Clean", 0) + stats.get("Shared_Dirty", 0),
+        "private_kb": stats.get("Private_Clean", 0) + stats.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(pid: int) -> list:
+    """Lista os processos filhos diretos (workers) de um pid."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+    return sorted(children)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 120.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def post_predict(base_url: str) -> None:
+    body = json.dumps({"payload": EXAMPLE_PAYLOAD}).encode("utf-8")
+    request = urllib.request.Request(f"{base_url}/api/predict", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+
+
+def measure(n_workers: int, model_format: str, requests_per_worker: int) -> dict:
+    """Sobe o gunicorn com N workers, aquece com algumas predições e mede a memória de cada processo."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATATHON_MODEL_FORMAT=model_format, DATATHON_PRELOAD_ARTIFACTS="1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--preload", "--workers", str(n_workers),
+         "--worker-class", "sync", "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+         "datathon_decision.src.app:app"],
+        cwd=ROOT_DIR, env=env,
+    )
+    try:
+        if not wait_until_up(f"{base_url}/api/ready"):
+            raise RuntimeError(f"gunicorn não respondeu em {base_url}")
+        for _ in range(requests_per_worker * n_workers):
+            post_predict(base_url)
+        time.sleep(1.0)
+
+        workers = [{"pid": pid, **read_memory_stats(pid)} for pid in child_pids(process.pid)]
+        master = {"pid": process.pid, **read_memory_stats(process.pid)}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    total_pss_kb = master["pss_kb"] + sum(w["pss_kb"] for w in workers)
+    return {
+        "workers": n_workers,
+        "model_format": model_format,
+        "master": master,
+        "worker_stats": workers,
+        "avg_worker_rss_kb": sum(w["rss_kb"] for w in workers) / max(len(workers), 1),
+        "avg_worker_pss_kb": sum(w["pss_kb"] for w in workers) / max(len(workers), 1),
+        "total_pss_kb": total_pss_kb,
+    }
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Mede RSS/PSS por worker do gunicorn.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--format", dest="formats", nargs="+", default=["packed", "joblib"])
+    parser.add_argument("--requests-per-worker", type=int, default=5)
+    parser.add_argument("--output", default=str(REPORT_FILE))
+    args = parser.parse_args()
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        print("❌ /proc/<pid>/smaps_rollup não disponível (necessário Linux >= 4.14)")
+        return 1
+
+    results = []
+    for model_format in args.formats:
+        for n_workers in args.workers:
+            print(f"🔍 Medindo formato={model_format} workers={n_workers}...")
+            result = measure(n_workers, model_format, args.requests_per_worker)
+            results.append(result)
+            print(f"   📊 master RSS={result['master']['rss_kb'] / 1024:.1f} MB | "
+                  f"worker RSS médio={result['avg_worker_rss_kb'] / 1024:.1f} MB | "
+                  f"worker PSS médio={result['avg_worker_pss_kb'] / 1024:.1f} MB | "
+                  f"PSS total={result['total_pss_kb'] / 1024:.1f} MB")
+
+    report = {"timestamp": datetime.now().isoformat(), "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())